@@ -6,7 +6,7 @@ from django.urls import path
 
 from .models import (
     DataLog, Location, Sensor, SensorType, Measurement, 
-    AcquisitionControl 
+    MeasurementRollup, AcquisitionControl, AcquisitionWorker
 )
 from . import mqtt_runner
 
@@ -22,10 +22,24 @@ class MeasurementAdmin(admin.ModelAdmin):
     search_fields = ('sensor__name', 'sensor__location__room')
 
 
+@admin.register(MeasurementRollup)
+class MeasurementRollupAdmin(admin.ModelAdmin):
+    list_display = ('sensor', 'resolution', 'bucket_start', 'min_value', 'max_value', 'count', 'last_value')
+    list_filter = ('resolution', 'sensor__type__name')
+    date_hierarchy = 'bucket_start'
+
+
+@admin.register(AcquisitionWorker)
+class AcquisitionWorkerAdmin(admin.ModelAdmin):
+    list_display = ('name', 'member', 'members', 'host', 'pid', 'last_heartbeat', 'stop_requested')
+    list_filter = ('group', 'host')
+    readonly_fields = ('stats',)
+
+
 @admin.register(DataLog)
 class DataLogAdmin(admin.ModelAdmin):
-    list_display = ('timestamp', 'level', 'message', 'measurement')
-    list_filter = ('level', 'timestamp')
+    list_display = ('timestamp', 'level', 'source', 'message', 'repeat_count', 'last_seen', 'measurement')
+    list_filter = ('level', 'source', 'timestamp')
     date_hierarchy = 'timestamp'
     search_fields = ('message',)
 
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class AcquisitionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'acquisition'
\ No newline at end of file
+    name = 'acquisition'
+
+    def ready(self):
+        import acquisition.signals  # noqa
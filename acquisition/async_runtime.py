@@ -0,0 +1,290 @@
+"""
+Runtime akwizycji na asyncio (ACQUISITION_RUNTIME = "asyncio").
+
+Jedna pętla zdarzeń zamiast wątku na etap:
+- odbiór MQTT - AsyncMQTTManager woła submit() w pętli, element trafia do kolejki asyncio
+  (bez odpytywania z timeoutem); pełna kolejka wstrzymuje odczyt gniazda,
+- etapy parse..persist jak w potoku wątkowym (AcquisitionStages), wsadami w jednym wątku
+  pomocniczym - Django ORM jest synchroniczne; zapis do bazy dalej robi wątek DatabaseManager,
+- wysyłka do alarmów - przy ACQUISITION_ALARMS_DISPATCH = "http" przez httpx.AsyncClient,
+  do ACQUISITION_ASYNC_MAX_IN_FLIGHT wsadów naraz; w trybie "inprocess" w wątku pomocniczym.
+  Wsady z pomiarami tego samego czujnika wysyłane są po kolei - alarmy (BreachTracker,
+  tłumienie) zakładają pomiary czujnika w kolejności czasu.
+"""
+import asyncio
+import collections
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+from .data_logic.handle_data import HandleData
+from .data_logic.pipeline_stages import AcquisitionStages
+from .logic.inbox import MessageInbox
+from .logic.pipeline import Pipeline, PipelineItem, compute_percentiles
+from .services import AcquisitionDataService
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - zależność opcjonalna
+    httpx = None
+
+THREADS = 'threads'
+ASYNCIO = 'asyncio'
+RUNTIMES = (THREADS, ASYNCIO)
+
+# etapy wykonywane po kolei w wątku pomocniczym
+SYNC_STAGES = ('parse', 'resolve', 'reorder', 'validate', 'dedupe', 'transform', 'persist')
+
+
+def runtime_mode() -> str:
+    mode = getattr(settings, 'ACQUISITION_RUNTIME', THREADS)
+    if mode not in RUNTIMES:
+        raise ImproperlyConfigured(f"ACQUISITION_RUNTIME musi być jednym z: {', '.join(RUNTIMES)}")
+    return mode
+
+
+class AsyncAcquisitionRuntime:
+    # jak długo czekać na wiadomość, zanim bufor reorder dostanie tick (jak Stage.POLL_TIMEOUT)
+    TICK_SECONDS = 0.1
+
+    def __init__(self, data_handler: HandleData, acquisition_service: AcquisitionDataService,
+                 stages: Optional[AcquisitionStages] = None, batch_size: Optional[int] = None,
+                 queue_size: Optional[int] = None, max_in_flight: Optional[int] = None, http_client=None,
+                 inbox: Optional[MessageInbox] = None):
+        self.acquisition_service = acquisition_service
+        # trwały bufor odbioru - wiadomość potwierdzana po wysyłce do alarmów albo odrzuceniu
+        self.inbox = inbox
+        self.stages = stages or AcquisitionStages(data_handler, acquisition_service)
+        self.batch_size = batch_size or getattr(settings, 'ACQUISITION_PIPELINE_BATCH_SIZE', 64)
+        self.queue_size = queue_size or getattr(settings, 'ACQUISITION_PIPELINE_QUEUE_SIZE', 2000)
+        self.max_in_flight = max_in_flight or getattr(settings, 'ACQUISITION_ASYNC_MAX_IN_FLIGHT', 1000)
+        self.http_client = http_client
+        self._owns_http_client = False
+        # źródło wiadomości z pause_reading()/resume_reading() (AsyncMQTTManager)
+        self.source = None
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+        # czujnik -> ostatnia wysyłka z jego pomiarami; następna czeka na jej zakończenie
+        self._sensor_tails: Dict[Any, asyncio.Task] = {}
+        self._worker: Optional[asyncio.Task] = None
+        self._paused = False
+
+        self.received = 0
+        self.completed = 0
+        self.dispatch_errors = 0
+        self.pauses = 0
+        self.max_in_flight_seen = 0
+        self.max_queue_depth = 0
+        self._recent_latencies = collections.deque(maxlen=Pipeline.LATENCY_SAMPLES)
+
+    # -------------------
+    # Cykl życia
+    # -------------------
+    async def start(self) -> None:
+        if self.acquisition_service.alarms_dispatch == 'http' and self.http_client is None:
+            if httpx is None:
+                raise ImproperlyConfigured("Runtime asyncio z ACQUISITION_ALARMS_DISPATCH=http wymaga pakietu httpx")
+            self.http_client = httpx.AsyncClient(
+                timeout=5, limits=httpx.Limits(max_connections=min(self.max_in_flight, 100)))
+            self._owns_http_client = True
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='acq-async-sync')
+        self._queue = asyncio.Queue()
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._worker = asyncio.get_running_loop().create_task(self._process_loop())
+        if self.inbox is not None:
+            # wiadomości, które przed awarią nie opuściły potoku
+            for topic, payload in self.inbox.recover():
+                self.submit(topic, payload)
+
+    async def stop(self) -> None:
+        """Przetwarza kolejkę do końca, oddaje bufor reorder i czeka na wysyłki w locie"""
+        if self._worker is None:
+            return
+        self._queue.put_nowait(None)
+        await self._worker
+        self._worker = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._owns_http_client:
+            await self.http_client.aclose()
+            self.http_client = None
+            self._owns_http_client = False
+        # połączenia z bazą wątku pomocniczego zamykane w nim samym
+        await self._run_sync(connections.close_all)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # -------------------
+    # Odbiór
+    # -------------------
+    def submit(self, topic: str, payload) -> None:
+        """Przyjmuje wiadomość; wołane w wątku pętli zdarzeń (callback klienta MQTT)"""
+        self.received += 1
+        seq = self.inbox.append(topic, payload) if self.inbox is not None else None
+        self._queue.put_nowait(PipelineItem(topic, payload, seq=seq))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        if depth >= self.queue_size and not self._paused and self.source is not None:
+            self._paused = True
+            self.pauses += 1
+            self.source.pause_reading()
+
+    def _maybe_resume(self) -> None:
+        if self._paused and self._queue.qsize() <= self.queue_size // 2:
+            self._paused = False
+            self.source.resume_reading()
+
+    # -------------------
+    # Przetwarzanie
+    # -------------------
+    async def _run_sync(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _process_loop(self) -> None:
+        stopping = False
+        while not stopping:
+            if self._queue.empty():
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), self.TICK_SECONDS)
+                except asyncio.TimeoutError:
+                    await self._forward(await self._run_sync(self._tick, False))
+                    continue
+            else:
+                item = self._queue.get_nowait()
+
+            batch = []
+            while True:
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size or self._queue.empty():
+                    break
+                item = self._queue.get_nowait()
+            self._maybe_resume()
+
+            if batch:
+                await self._forward(await self._run_sync(self._process_batch, batch))
+        await self._forward(await self._run_sync(self._tick, True))
+
+    def _process_batch(self, batch: List[PipelineItem]):
+        return self._prepare_dispatch(self._run_stages(batch, SYNC_STAGES))
+
+    def _tick(self, force: bool):
+        # pomiary zwolnione z bufora reorder przechodzą pozostałe etapy
+        try:
+            released = self.stages.reorder_tick(force)
+        except Exception as e:
+            print(f"ASYNC RUNTIME ERROR [reorder]: {e}")
+            return [], None
+        return self._prepare_dispatch(self._run_stages(released, SYNC_STAGES[SYNC_STAGES.index('reorder') + 1:]))
+
+    def _run_stages(self, batch: List[PipelineItem], names) -> List[PipelineItem]:
+        for name in names:
+            if not batch:
+                break
+            try:
+                results = getattr(self.stages, name)(batch)
+            except Exception as e:
+                print(f"ASYNC RUNTIME ERROR [{name}]: {e}")
+                self._release(batch)
+                return []
+            # bufor reorder wstrzymuje elementy - nie są odrzucone
+            if name != 'reorder' and len(results) < len(batch):
+                kept = {id(item) for item in results}
+                self._release([item for item in batch if id(item) not in kept])
+            batch = results
+        return batch
+
+    def _release(self, items: List[PipelineItem]) -> None:
+        if self.inbox is not None:
+            self.inbox.release(item.seq for item in items if item.seq is not None)
+
+    def _prepare_dispatch(self, batch: List[PipelineItem]):
+        # treść żądania budowana w wątku pomocniczym - odczyt czujnika może sięgnąć do bazy
+        if self.http_client is None or not batch:
+            return batch, None
+        measurements = [item.measurement for item in batch if not item.late]
+        return batch, self.acquisition_service.build_alarm_batch(measurements) if measurements else None
+
+    async def _forward(self, prepared) -> None:
+        batch, body = prepared
+        if not batch:
+            return
+        await self._in_flight.acquire()
+        sensors = {getattr(item.measurement, 'sensor_id', None) for item in batch} - {None}
+        after = {self._sensor_tails[sensor] for sensor in sensors if sensor in self._sensor_tails}
+        task = asyncio.get_running_loop().create_task(self._dispatch(batch, body, after))
+        for sensor in sensors:
+            self._sensor_tails[sensor] = task
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        task.add_done_callback(functools.partial(self._clear_tails, sensors))
+        if len(self._tasks) > self.max_in_flight_seen:
+            self.max_in_flight_seen = len(self._tasks)
+
+    def _clear_tails(self, sensors, task: asyncio.Task) -> None:
+        for sensor in sensors:
+            if self._sensor_tails.get(sensor) is task:
+                del self._sensor_tails[sensor]
+
+    async def _dispatch(self, batch: List[PipelineItem], body: Optional[Dict[str, Any]], after=()) -> None:
+        try:
+            if after:
+                # wcześniejsze wysyłki tych samych czujników (ich błąd nie wstrzymuje kolejnych)
+                await asyncio.wait(after)
+            if self.http_client is not None:
+                if body is not None:
+                    response = await self.http_client.post(self.acquisition_service.alarms_batch_url, json=body)
+                    response.raise_for_status()
+            else:
+                await self._run_sync(self.stages.dispatch, batch)
+        except Exception as e:
+            self.dispatch_errors += 1
+            print(f"Błąd wysyłki do alarmów: {e}")
+        finally:
+            self._in_flight.release()
+            self._record_completed(batch)
+
+    def _record_completed(self, batch: List[PipelineItem]) -> None:
+        self._release(batch)
+        now = time.monotonic()
+        for item in batch:
+            self._recent_latencies.append((now - item.received_at) * 1000.0)
+        self.completed += len(batch)
+
+    def latency_samples(self) -> List[float]:
+        return list(self._recent_latencies)
+
+    def get_stats(self) -> Dict[str, Any]:
+        p50, p99 = compute_percentiles(self.latency_samples(), 50, 99)
+        return {
+            'runtime': ASYNCIO,
+            'received': self.received,
+            'completed': self.completed,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue_depth': self.max_queue_depth,
+            'pauses': self.pauses,
+            'in_flight': len(self._tasks),
+            'max_in_flight': self.max_in_flight_seen,
+            'dispatch_errors': self.dispatch_errors,
+            'p50_end_to_end_ms': round(p50, 3),
+            'p99_end_to_end_ms': round(p99, 3),
+            'reorder': self.stages.reorder_buffer.get_stats(),
+        }
@@ -0,0 +1,126 @@
+"""
+Pomiar wydajności akwizycji na ruchu z generatora lub z nagrania (manage.py benchmark_acquisition).
+
+Tryby:
+- "process"  - każda wiadomość przechodzi synchronicznie przez HandleData.process,
+- "pipeline" - pełny potok jak w _acquisition_loop; wiadomości dostarcza InProcessBroker
+               z filtrami subskrypcji routera topiców, zamiast klienta MQTT.
+W obu trybach zapis idzie przez DatabaseManager (bufor i wątek zapisu wsadów);
+pomiar kończy się po zapisaniu wszystkich wsadów.
+"""
+import time
+from typing import Any, Dict, Iterable, List
+
+from .data_logic.deduplicator import Deduplicator
+from .data_logic.handle_data import HandleData
+from .data_logic.pipeline_stages import build_acquisition_pipeline
+from .data_logic.transformer import Transformer
+from .data_logic.validator import Validator
+from .logic.database_manager import DatabaseManager
+from .logic.load_generator import InProcessBroker, Message, QueueSampler, replay
+from .logic.pipeline import compute_percentiles
+from .services import AcquisitionDataService
+
+PROCESS = 'process'
+PIPELINE = 'pipeline'
+MODES = (PROCESS, PIPELINE)
+
+
+def _build_handler(db_manager: DatabaseManager) -> HandleData:
+    return HandleData(db_manager, Validator(db_manager), Deduplicator(db_manager), Transformer(db_manager))
+
+
+def _writer_depth(db_manager: DatabaseManager) -> int:
+    return db_manager.get_writer_stats()['measurement_queue']['depth']
+
+
+def _report(mode: str, sent: int, started: float, processed_at: float, written_at: float,
+            latencies_ms: List[float], db_manager: DatabaseManager, max_depths: Dict[str, int],
+            extra: Dict[str, Any]) -> Dict[str, Any]:
+    p50, p99 = compute_percentiles(latencies_ms, 50, 99)
+    writer = db_manager.measurement_writer.stats.as_dict()
+    processing_s = max(processed_at - started, 1e-9)
+    total_s = max(written_at - started, 1e-9)
+    report = {
+        'mode': mode,
+        'messages': sent,
+        'elapsed_s': round(total_s, 3),
+        'msgs_per_sec': round(sent / processing_s, 1),
+        'p50_latency_ms': round(p50, 3),
+        'p99_latency_ms': round(p99, 3),
+        'max_latency_ms': round(max(latencies_ms, default=0.0), 3),
+        'rows_written': writer['rows_written'],
+        'rows_skipped': writer['rows_skipped'],
+        'db_rows_per_sec': round(writer['rows_written'] / total_s, 1),
+        'writer_errors': writer['errors'],
+        'max_queue_depths': max_depths,
+    }
+    report.update(extra)
+    return report
+
+
+def run_process_benchmark(messages: Iterable[Message], speed: float = 0.0) -> Dict[str, Any]:
+    """Synchroniczne HandleData.process; opóźnienie to czas obsługi jednej wiadomości"""
+    db_manager = DatabaseManager()
+    handler = _build_handler(db_manager)
+    sampler = QueueSampler(lambda: {'writer': _writer_depth(db_manager)})
+    latencies: List[float] = []
+
+    def publish(topic: str, payload: bytes):
+        t0 = time.perf_counter()
+        handler.process(topic, payload)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    sampler.start()
+    started = time.monotonic()
+    try:
+        sent = replay(messages, publish, speed)
+        processed_at = time.monotonic()
+    finally:
+        db_manager.shutdown()
+        sampler.stop()
+    written_at = time.monotonic()
+    return _report(PROCESS, sent, started, processed_at, written_at, latencies, db_manager,
+                   sampler.max_depths, {})
+
+
+def run_pipeline_benchmark(messages: Iterable[Message], speed: float = 0.0,
+                           drain_timeout: float = 60.0) -> Dict[str, Any]:
+    """
+    Pełny potok akwizycji; opóźnienie end-to-end mierzy sam potok (od przyjęcia
+    wiadomości do końca ostatniego etapu), percentyle z ostatnich Pipeline.LATENCY_SAMPLES.
+    """
+    db_manager = DatabaseManager()
+    handler = _build_handler(db_manager)
+    pipeline = build_acquisition_pipeline(handler, AcquisitionDataService(db_manager))
+    broker = InProcessBroker()
+    for topic_filter in handler.topic_router.filters():
+        broker.subscribe(topic_filter, pipeline.submit)
+
+    def probe():
+        depths = {name: stage['queue_depth'] for name, stage in pipeline.get_stats()['stages'].items()}
+        depths['writer'] = _writer_depth(db_manager)
+        return depths
+
+    sampler = QueueSampler(probe)
+    pipeline.start()
+    sampler.start()
+    started = time.monotonic()
+    try:
+        sent = replay(messages, broker.publish, speed)
+    finally:
+        # stop() czeka, aż każdy etap opróżni kolejkę
+        pipeline.stop(drain_timeout=drain_timeout)
+        processed_at = time.monotonic()
+        db_manager.shutdown()
+        sampler.stop()
+    written_at = time.monotonic()
+
+    stats = pipeline.get_stats()
+    extra = {
+        'completed': stats['completed'],
+        'unrouted': broker.unrouted,
+        'stage_errors': {name: stage['errors'] for name, stage in stats['stages'].items() if stage['errors']},
+    }
+    return _report(PIPELINE, sent, started, processed_at, written_at, pipeline.latency_samples(), db_manager,
+                   sampler.max_depths, extra)
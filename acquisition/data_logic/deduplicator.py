@@ -1,30 +1,148 @@
-from typing import Dict
+import datetime
+import heapq
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from django.conf import settings
 
 from ..logic.database_manager import DatabaseManager
 from ..models import Measurement, DataLog, DataLogLevel
 
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def _timestamp_key(timestamp: datetime.datetime) -> int:
+    """Timestamp jako liczba mikrosekund od epoki (UTC) - bez błędów zaokrągleń float"""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+    return (timestamp - _EPOCH) // _MICROSECOND
+
+
+class _SensorWindow:
+    """Timestampy jednego czujnika z okna [najnowszy - window, najnowszy]"""
+
+    __slots__ = ('seen', 'heap', 'newest')
+
+    def __init__(self):
+        self.seen = set()
+        self.heap: List[int] = []
+        self.newest: Optional[int] = None
+
+    def check_and_add(self, key: int, window: int, max_entries: int) -> Optional[bool]:
+        """
+        True - duplikat, False - nowy timestamp (zapamiętany),
+        None - timestamp starszy niż okno, nie da się rozstrzygnąć w pamięci.
+        """
+        if key in self.seen:
+            return True
+        if self.newest is not None and key < self.newest - window:
+            return None
+
+        self.seen.add(key)
+        heapq.heappush(self.heap, key)
+        if self.newest is None or key > self.newest:
+            self.newest = key
+
+        # najstarsze timestampy wypadają z okna lub po przekroczeniu limitu
+        cutoff = self.newest - window
+        while self.heap and (self.heap[0] < cutoff or len(self.heap) > max_entries):
+            self.seen.discard(heapq.heappop(self.heap))
+        return False
+
+    def __len__(self):
+        return len(self.heap)
+
 
 class Deduplicator:
-    def __init__(self, db_manager: DatabaseManager):
-        self.recent_records: Dict[int, str] = {}
+    """
+    Wykrywa powtórzone pomiary (sensor_id, timestamp) - także starsze wiadomości
+    dostarczone ponownie (MQTT QoS1) lub w innej kolejności.
+
+    Dla każdego czujnika pamiętane są dokładne timestampy z okna `window_seconds`
+    wstecz od najnowszego, najwyżej `max_per_sensor` na czujnik; czujniki nieaktywne
+    najdłużej są usuwane po przekroczeniu `max_sensors`. Pamięć jest więc ograniczona,
+    a wynik w oknie dokładny (bez fałszywych trafień). Pomiary spoza okna przechodzą
+    dalej - zapis wsadu i tak pomija istniejące wiersze (ON CONFLICT DO NOTHING).
+
+    Stan nie jest chroniony blokadą - etap dedupe działa w jednym wątku potoku.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, window_seconds: Optional[float] = None,
+                 max_per_sensor: Optional[int] = None, max_sensors: Optional[int] = None):
         self.db_manager = db_manager
+        if window_seconds is None:
+            window_seconds = getattr(settings, 'ACQUISITION_DEDUP_WINDOW_SECONDS', 3600)
+        self.window = int(window_seconds * 1_000_000)
+        self.max_per_sensor = max_per_sensor or getattr(settings, 'ACQUISITION_DEDUP_MAX_PER_SENSOR', 4096)
+        self.max_sensors = max_sensors or getattr(settings, 'ACQUISITION_DEDUP_MAX_SENSORS', 10000)
+        self.recent_records: "OrderedDict[int, _SensorWindow]" = OrderedDict()
+
+        self.checked = 0
+        self.duplicates = 0
+        self.out_of_window = 0
+        self.evicted_sensors = 0
+
+    def is_duplicate(self, sensor_id: int, timestamp: datetime.datetime) -> bool:
+        """Sprawdza i zapamiętuje parę (sensor_id, timestamp)"""
+        self.checked += 1
+        window = self.recent_records.get(sensor_id)
+        if window is None:
+            window = self.recent_records[sensor_id] = _SensorWindow()
+            if len(self.recent_records) > self.max_sensors:
+                self.recent_records.popitem(last=False)
+                self.evicted_sensors += 1
+        else:
+            self.recent_records.move_to_end(sensor_id)
+
+        result = window.check_and_add(_timestamp_key(timestamp), self.window, self.max_per_sensor)
+        if result is None:
+            self.out_of_window += 1
+            return False
+        if result:
+            self.duplicates += 1
+        return result
 
     def merge_duplicates(self, data: Measurement) -> bool:
         """
         Identyfikuje rekordy o identycznym sensor_id i timestamp, scala je.
         """
-        # data.status = MeasurementStatus.DUPLICATE
         sensor_id = data.sensor.id
-        current_ts = data.timestamp.isoformat()
-
-        if sensor_id in self.recent_records:
-            if self.recent_records[sensor_id] == current_ts:
-                if self.db_manager:
-                    self.db_manager.insert_data_log(DataLog(
-                        level=DataLogLevel.INFO,
-                        message=f"Zduplikowana wiadomość dla sensor_id={sensor_id}, timestamp={current_ts}"
-                    ))
-                return True
-
-        self.recent_records[sensor_id] = current_ts
-        return False
\ No newline at end of file
+        if not self.is_duplicate(sensor_id, data.timestamp):
+            return False
+        self._log_duplicate(data)
+        return True
+
+    def check_batch(self, measurements: List[Measurement]) -> List[bool]:
+        """
+        Flagi duplikatów dla wsadu w kolejności wejścia. Powtórzenia wewnątrz wsadu
+        też są wykrywane - pierwsze wystąpienie jest oryginałem.
+        """
+        flags = []
+        for m in measurements:
+            duplicate = self.is_duplicate(m.sensor_id, m.timestamp)
+            if duplicate:
+                self._log_duplicate(m)
+            flags.append(duplicate)
+        return flags
+
+    def _log_duplicate(self, measurement: Measurement) -> None:
+        # pomiar w logu - odcisk agregatora rozróżnia czujniki (liczby w treści są maskowane)
+        if self.db_manager:
+            self.db_manager.insert_data_log(DataLog(
+                measurement=measurement,
+                source='deduplicator',
+                level=DataLogLevel.INFO,
+                message=f"Zduplikowana wiadomość dla sensor_id={measurement.sensor_id}, "
+                        f"timestamp={measurement.timestamp.isoformat()}"
+            ))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'sensors': len(self.recent_records),
+            'timestamps': sum(len(w) for w in self.recent_records.values()),
+            'checked': self.checked,
+            'duplicates': self.duplicates,
+            'out_of_window': self.out_of_window,
+            'evicted_sensors': self.evicted_sensors,
+        }
@@ -1,49 +1,38 @@
 import datetime
-import json
 
-from typing import Dict, Optional
+from typing import List, Optional, Tuple
+
+import numpy as np
+
 from ..logic.database_manager import DatabaseManager
-from ..models import Measurement, DataLog, MeasurementStatus, DataLogLevel, Location, SensorType, Sensor
+from ..logic.payloads import (
+    DeviceStatePayload, MeasurementPayload, Payload, PayloadError, StatusPayload, WeatherPayload,
+    decode_payload, payload_preview,
+)
+from ..logic.topic_router import TopicRouter
+from ..logic.sensor_registry import SensorRegistry, sensor_registry as default_sensor_registry
+from ..models import Measurement, DataLog, MeasurementStatus, DataLogLevel, Sensor
 from .validator import Validator
 from .deduplicator import Deduplicator
 from .transformer import Transformer
 from django.utils import timezone
 
 class HandleData:
-    def __init__(self, db_manager: DatabaseManager, validator: Validator, deduplicator: Deduplicator, transformer: Transformer):
+    def __init__(self, db_manager: DatabaseManager, validator: Validator, deduplicator: Deduplicator, transformer: Transformer,
+                 sensor_registry: Optional[SensorRegistry] = None, topic_router: Optional[TopicRouter] = None):
         self.validator = validator
         self.deduplicator = deduplicator
         self.transformer = transformer
         self.db_manager = db_manager
+        self.sensor_registry = sensor_registry or default_sensor_registry
+        self.topic_router = topic_router or default_topic_router
 
-    def process(self, topic: str, raw_message: str) -> Optional[Measurement]:
+    def process(self, topic: str, raw_message: Payload) -> Optional[Measurement]:
         try:
-            try:
-                data = json.loads(raw_message)
-            except json.JSONDecodeError:
-                self._log_error("Błędny format JSON wiadomości MQTT", level=DataLogLevel.ERROR,
-                                topic=topic, raw_message=raw_message)
-                return None
-
-            # --- obsługa różnych topiców ---
-            if topic.startswith("szebi/status"):
-                # dla statusu logujemy konsumpcję i ładowanie
-                consumption_mode = data.get("consumption_mode")
-                charging_mode = data.get("charging_mode")
-                self._log_error(f"System status: consumption={consumption_mode}, charging={charging_mode}",
-                                level=DataLogLevel.INFO, raw_message=raw_message)
-                return None
-
-            # Weather: szebi/weather/<uuid>/<metryka>
-            elif topic.startswith("szebi/weather/") or topic.startswith("szebi/device/state/"):
-                parts = topic.split("/")
-                if len(parts) < 4:
-                    return None
-                env_uuid = parts[2]  # uuid pogody lub urządzenia
-                metric_name = data.get("metric_name") or "is_active"
-            else:
-                self._log_error(f"Nieznany topic: {topic}", level=DataLogLevel.WARNING, raw_message=raw_message)
+            parsed = self.parse_message(topic, raw_message)
+            if parsed is None:
                 return None
+            env_uuid, metric_name, data = parsed
 
             # Konwersja surowych danych na obiekt modelu
             measurement = self._convert_raw_to_measurement(env_uuid, metric_name, data, topic)
@@ -51,55 +40,146 @@ class HandleData:
                 return None
 
             # Walidacja
-            is_valid = self.validator.validate(measurement, topic=topic, raw_message=raw_message)
-            if not is_valid:
-                measurement.status = MeasurementStatus.ERROR
-                self._log_error(f"Wartość {measurement.value} poza zakresem dla {metric_name}",
-                                level=DataLogLevel.WARNING,
-                                measurement=measurement,
-                                topic=topic,
-                                raw_message=raw_message)
+            self.validate_measurement(measurement, metric_name, topic=topic, raw_message=raw_message)
 
             # Deduplikacja
-            if self.deduplicator.merge_duplicates(measurement):
-                measurement.status = MeasurementStatus.DUPLICATE
+            self.mark_duplicate(measurement)
 
             # Transformacja
             measurement = self.transformer.convert_units(measurement)
 
             # Zapis do bazy i aktualizacja komunikacji sensora
-            self.db_manager.insert_measurements(measurement)
-            self.db_manager.update_sensor(measurement.sensor.id, measurement.timestamp)
+            self.persist(measurement)
 
             return measurement
 
 
         except Exception as e:
-            self._log_error(f"Błąd krytyczny procesowania: {str(e)}",
-                            level=DataLogLevel.CRITICAL,
+            self.log_critical(e, topic, raw_message)
+            return None
+
+    # -------------------
+    # Poszczególne etapy przetwarzania (wykorzystywane też przez potok wsadowy)
+    # -------------------
+    def parse_message(self, topic: str, raw_message: Payload) -> Optional[Tuple[str, str, MeasurementPayload]]:
+        """
+        Dekoduje JSON (wprost z bytes) i rozpoznaje topic.
+        Zwraca (env_uuid, metric_name, payload) lub None, jeśli wiadomość nie niesie pomiaru.
+        """
+        # nieznany topic odrzucany przed dekodowaniem
+        match = self.topic_router.match(topic)
+        if match is None:
+            self._log_error(f"Nieznany topic: {topic}", level=DataLogLevel.WARNING, raw_message=raw_message)
+            return None
+        schema, handler = match.target
+
+        try:
+            payload = schema.from_dict(decode_payload(raw_message))
+        except PayloadError:
+            self._log_error("Błędny format JSON wiadomości MQTT", level=DataLogLevel.ERROR,
+                            topic=topic, raw_message=raw_message)
+            return None
+
+        return handler(self, match.params, payload, raw_message)
+
+    def partition_key(self, topic: str) -> str:
+        """
+        Klucz podziału wiadomości w grupie konsumentów ("hash") - urządzenie lub środowisko
+        z topiku, więc wszystkie wiadomości czujnika trafiają do tego samego procesu
+        """
+        match = self.topic_router.match(topic)
+        if match is None:
+            return topic
+        return match.params.get("device_uuid") or match.params.get("env_uuid") or topic
+
+    # -------------------
+    # Obsługa tras topiców: (handle_data, segmenty topicu, payload, surowa wiadomość)
+    # -> (env_uuid, metric_name, payload) lub None
+    # -------------------
+    @staticmethod
+    def _route_weather(handler: "HandleData", params: dict, payload: MeasurementPayload, raw_message: Payload):
+        # segment metryki z topicu nie jest używany - wiadomości bez metric_name trafiają
+        # do dotychczasowych czujników "is_active", jak przed routerem topiców
+        metric_name = payload.metric_name or "is_active"
+        return params["env_uuid"], metric_name, payload
+
+    @staticmethod
+    def _route_device_state(handler: "HandleData", params: dict, payload: MeasurementPayload, raw_message: Payload):
+        # czujnik stanu jest per urządzenie - uuid urządzenia pełni rolę env_uuid
+        return params["device_uuid"], payload.metric_name or "is_active", payload
+
+    @staticmethod
+    def _route_status(handler: "HandleData", params: dict, payload: StatusPayload, raw_message: Payload):
+        # dla statusu logujemy konsumpcję i ładowanie
+        handler._log_error(f"System status: consumption={payload.consumption_mode}, charging={payload.charging_mode}",
+                           level=DataLogLevel.INFO, raw_message=raw_message)
+        return None
+
+    def validate_measurement(self, measurement: Measurement, metric_name: str,
+                             topic: Optional[str] = None, raw_message: Optional[str] = None) -> bool:
+        is_valid = self.validator.validate(measurement, topic=topic, raw_message=raw_message)
+        if not is_valid:
+            measurement.status = MeasurementStatus.ERROR
+            self._log_error(f"Wartość {measurement.value} poza zakresem dla {metric_name}",
+                            level=DataLogLevel.WARNING,
+                            measurement=measurement,
                             topic=topic,
                             raw_message=raw_message)
-            return None
+        return is_valid
 
-    def _convert_raw_to_measurement(self, env_uuid: str, metric_name: str, data: Dict, topic: Optional[str] = None) -> Optional[Measurement]:
+    def validate_measurements(self, measurements: List[Measurement], metric_names: List[str],
+                              topics: List[Optional[str]], raw_messages: List[Optional[str]]) -> None:
+        """
+        Wsadowy odpowiednik validate_measurement() - zakresy sprawdzane wektorowo.
+        Wyjątek oznacza, że żaden pomiar wsadu nie został oznaczony ani zalogowany.
+        """
+        valid = self.validator.validate_measurements(measurements, topics, raw_messages)
+        for i in np.flatnonzero(~valid):
+            measurement = measurements[i]
+            measurement.status = MeasurementStatus.ERROR
+            try:
+                self._log_error(f"Wartość {measurement.value} poza zakresem dla {metric_names[i]}",
+                                level=DataLogLevel.WARNING,
+                                measurement=measurement,
+                                topic=topics[i],
+                                raw_message=raw_messages[i])
+            except Exception as e:
+                self.log_critical(e, topics[i], raw_messages[i])
+
+    def mark_duplicate(self, measurement: Measurement) -> bool:
+        if self.deduplicator.merge_duplicates(measurement):
+            measurement.status = MeasurementStatus.DUPLICATE
+            return True
+        return False
+
+    def mark_duplicates(self, measurements: List[Measurement]) -> None:
+        for measurement, duplicate in zip(measurements, self.deduplicator.check_batch(measurements)):
+            if duplicate:
+                measurement.status = MeasurementStatus.DUPLICATE
+
+    def persist(self, measurement: Measurement) -> None:
+        self.db_manager.insert_measurements(measurement)
+        self.db_manager.update_sensor(measurement.sensor.id, measurement.timestamp)
+
+    def log_critical(self, error: Exception, topic: Optional[str] = None, raw_message: Optional[Payload] = None) -> None:
+        self._log_error(f"Błąd krytyczny procesowania: {str(error)}",
+                        level=DataLogLevel.CRITICAL,
+                        topic=topic,
+                        raw_message=raw_message)
+
+    def _convert_raw_to_measurement(self, env_uuid: str, metric_name: str, data: MeasurementPayload,
+                                    topic: Optional[str] = None) -> Optional[Measurement]:
         try:
-            unit = data.get("unit", "standard")
+            unit = data.unit
 
             sensor = self._find_or_create_sensor(env_uuid, metric_name, unit)
-            raw_ts = data.get("ts")
+            raw_ts = data.ts
             ts = datetime.datetime.fromtimestamp(raw_ts, tz=datetime.timezone.utc) if raw_ts else timezone.now()
 
-            if "value" in data:
-                val = data["value"]
-            elif "is_active" in data:
-                val = data.get("level", 1.0 if data["is_active"] else 0.0)
-            else:
-                val = 0.0
-
             measurement =  Measurement(
                 sensor=sensor,
                 timestamp=ts,
-                value=float(val),
+                value=float(data.value),
                 status=MeasurementStatus.OK
             )
 
@@ -111,54 +191,25 @@ class HandleData:
             self._log_error(f"Błąd konwersji danych: {e}",
                             level=DataLogLevel.ERROR,
                             topic=topic,
-                            raw_message=str(data))
+                            raw_message=repr(data))
             return None
 
     def _find_or_create_sensor(self, env_name: str, param_name: str, unit) -> Sensor:
+        # --- Rejestr czujników (bez zapytań dla znanych czujników) ---
+        sensor = self.sensor_registry.get(env_name, param_name)
+        if sensor is not None:
+            return sensor
 
         # --- Parsowanie lokalizacji ---
         floor, room, description = self._parse_location_from_env(env_name)
 
-        # --- Location ---
-        location = Location.objects.filter(
-            floor=floor,
-            room__iexact=str(room)  # ignorujemy wielkość liter
-        ).first()
-        if not location:
-            location = Location.objects.create(
-                floor=floor,
-                room=str(room),
-                description=description
-            )
-
-        # --- Typ sensora (SensorType) ---
-        sensor_type = SensorType.objects.filter(name__iexact=param_name).first()
-        if not sensor_type:
-            sensor_type = SensorType.objects.create(
-                name=param_name,
-                default_unit=unit
-            )
-
-        # --- Sensor ---
-        sensor = Sensor.objects.filter(
-            location=location,
-            type=sensor_type
-        ).first()
-        if not sensor:
-            sensor = Sensor.objects.create(
-                location=location,
-                type=sensor_type,
-                name=f"{param_name} @ floor {floor} room {room}",
-                status="ACTIVE"
-            )
-
-        return sensor
+        return self.sensor_registry.resolve(env_name, param_name, unit, floor, room, description)
 
     # def _log_error(self, message: str, level: str):
     #     self.db_manager.insert_data_log(DataLog(level=level, message=message))
 
     def _log_error(self, message: str, level: str = DataLogLevel.ERROR, measurement: Optional[Measurement] = None,
-                   topic: Optional[str] = None, raw_message: Optional[str] = None):
+                   topic: Optional[str] = None, raw_message: Optional[Payload] = None):
         """
         Zapisuje log do tabeli DataLog.
         Opcjonalnie można podać measurement, topic i raw_message, żeby mieć pełny kontekst.
@@ -167,10 +218,11 @@ class HandleData:
         if topic:
             full_message += f" | topic: {topic}"
         if raw_message:
-            full_message += f" | raw: {raw_message}"
+            full_message += f" | raw: {payload_preview(raw_message)}"
 
         self.db_manager.insert_data_log(DataLog(
             measurement=measurement,
+            source='handle_data',
             level=level,
             message=full_message[:255]
         ))
@@ -193,4 +245,21 @@ class HandleData:
             room = 0
             description = "unknown"
 
-        return floor, room, description
\ No newline at end of file
+        return floor, room, description
+
+
+def build_topic_router() -> TopicRouter:
+    """
+    Trasy topiców akwizycji: filtr -> (schemat payloadu, obsługa).
+    Nowy typ urządzenia to kolejny wpis tutaj, a nie kolejny warunek sprawdzany dla każdej wiadomości.
+    """
+    router = TopicRouter()
+    router.add("szebi/weather/{env_uuid}/{metric}", (WeatherPayload, HandleData._route_weather))
+    router.add("szebi/device/state/{device_uuid}/#", (DeviceStatePayload, HandleData._route_device_state))
+    # symulator: szebi/<uuid środowiska>/device/<uuid urządzenia>/state
+    router.add("szebi/{env_uuid}/device/{device_uuid}/state", (DeviceStatePayload, HandleData._route_device_state))
+    router.add("szebi/status/#", (StatusPayload, HandleData._route_status))
+    return router
+
+
+default_topic_router = build_topic_router()
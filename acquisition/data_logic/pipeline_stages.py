@@ -0,0 +1,173 @@
+import time
+from typing import List, Optional
+
+from django.conf import settings
+
+from ..logic.inbox import MessageInbox
+from ..logic.pipeline import Pipeline, PipelineItem, Stage, parse_worker_counts
+from ..logic.reorder_buffer import ReorderBuffer
+from ..models import DataLog, DataLogLevel
+from ..services import AcquisitionDataService
+from .handle_data import HandleData
+
+# Etapy, które muszą działać w jednym wątku: reorder i dedupe mają stan bez blokad, a od reorder
+# do dispatch wsady nie mogą się wyprzedzać - alarmy (BreachTracker, tłumienie) zakładają
+# pomiary czujnika w kolejności czasu. Wiele wątków tylko dla parse i resolve.
+SINGLE_WORKER_STAGES = {'reorder', 'validate', 'dedupe', 'transform', 'persist', 'dispatch'}
+
+
+class AcquisitionStages:
+    """
+    Funkcje etapów potoku akwizycji. Każda przyjmuje mikro-wsad elementów
+    i zwraca elementy przekazywane do kolejnego etapu.
+    Błąd pojedynczej wiadomości nie przerywa przetwarzania reszty wsadu.
+    """
+
+    def __init__(self, data_handler: HandleData, acquisition_service: AcquisitionDataService,
+                 reorder_buffer: Optional[ReorderBuffer] = None):
+        self.data_handler = data_handler
+        self.acquisition_service = acquisition_service
+        if reorder_buffer is None:
+            reorder_buffer = ReorderBuffer(
+                lateness_seconds=getattr(settings, 'ACQUISITION_REORDER_LATENESS_SECONDS', 0.0),
+                max_per_sensor=getattr(settings, 'ACQUISITION_REORDER_MAX_PER_SENSOR', 1000),
+            )
+        self.reorder_buffer = reorder_buffer
+
+    def _each(self, batch: List[PipelineItem], step) -> List[PipelineItem]:
+        """Wykonuje krok dla każdego elementu; elementy, dla których krok zwrócił False, odpadają."""
+        out = []
+        for item in batch:
+            try:
+                if step(item) is not False:
+                    out.append(item)
+            except Exception as e:
+                self.data_handler.log_critical(e, item.topic, item.payload)
+        return out
+
+    def parse(self, batch: List[PipelineItem]) -> List[PipelineItem]:
+        def step(item):
+            parsed = self.data_handler.parse_message(item.topic, item.payload)
+            if parsed is None:
+                return False
+            item.env_uuid, item.metric_name, item.data = parsed
+        return self._each(batch, step)
+
+    def resolve(self, batch: List[PipelineItem]) -> List[PipelineItem]:
+        def step(item):
+            item.measurement = self.data_handler._convert_raw_to_measurement(
+                item.env_uuid, item.metric_name, item.data, item.topic
+            )
+            return item.measurement is not None
+        return self._each(batch, step)
+
+    def reorder(self, batch: List[PipelineItem]) -> List[PipelineItem]:
+        """
+        Dalej idą pomiary w kolejności timestampów czujnika (po minięciu znaku wodnego).
+        Spóźnione przechodzą od razu z flagą late: zapis poprawia agregaty przyrostowo
+        (upsert niezależny od kolejności), ale nie trafiają do reguł alarmów.
+        """
+        now = time.monotonic()
+        late = []
+        for item in batch:
+            m = item.measurement
+            if not self.reorder_buffer.push(m.sensor_id, m.timestamp.timestamp(), item, now):
+                item.late = True
+                late.append(item)
+                self._log_late(m)
+        return late + self.reorder_buffer.pop_ready(now)
+
+    def reorder_tick(self, force: bool) -> List[PipelineItem]:
+        # czujnik bez nowych danych - wstrzymane pomiary wychodzą po czasie lateness
+        return self.reorder_buffer.pop_ready(force=force)
+
+    def _log_late(self, measurement) -> None:
+        self.data_handler.db_manager.insert_data_log(DataLog(
+            measurement=measurement,
+            source='reorder',
+            level=DataLogLevel.INFO,
+            message=f"Spóźniony pomiar sensor_id={measurement.sensor_id}, "
+                    f"timestamp={measurement.timestamp.isoformat()} - poza znakiem wodnym"
+        ))
+
+    def validate(self, batch: List[PipelineItem]) -> List[PipelineItem]:
+        # niepoprawne pomiary idą dalej ze statusem ERROR - tak jak w HandleData.process
+        try:
+            self.data_handler.validate_measurements(
+                [item.measurement for item in batch], [item.metric_name for item in batch],
+                [item.topic for item in batch], [item.payload for item in batch],
+            )
+            return batch
+        except Exception as e:
+            # wyjątek z części wektorowej - żaden pomiar nie został jeszcze oznaczony ani zalogowany
+            self.data_handler.log_critical(e)
+
+        # błąd wsadu - walidacja pojedynczo, żeby odrzucić tylko wadliwe wiadomości
+        def step(item):
+            self.data_handler.validate_measurement(item.measurement, item.metric_name,
+                                                   topic=item.topic, raw_message=item.payload)
+        return self._each(batch, step)
+
+    def dedupe(self, batch: List[PipelineItem]) -> List[PipelineItem]:
+        # cały wsad sprawdzany naraz - wykrywa też powtórzenia wewnątrz wsadu
+        try:
+            self.data_handler.mark_duplicates([item.measurement for item in batch])
+        except Exception as e:
+            self.data_handler.log_critical(e)
+        return batch
+
+    def transform(self, batch: List[PipelineItem]) -> List[PipelineItem]:
+        # konwersja jednostek całego wsadu jednym przebiegiem NumPy
+        try:
+            self.data_handler.transformer.convert_measurements([item.measurement for item in batch])
+            return batch
+        except Exception as e:
+            # wyjątek z części wektorowej - żadna wartość nie została jeszcze przeliczona
+            self.data_handler.log_critical(e)
+
+        def step(item):
+            item.measurement = self.data_handler.transformer.convert_units(item.measurement)
+        return self._each(batch, step)
+
+    def persist(self, batch: List[PipelineItem]) -> List[PipelineItem]:
+        return self._each(batch, lambda item: self.data_handler.persist(item.measurement))
+
+    def dispatch(self, batch: List[PipelineItem]) -> List[PipelineItem]:
+        # cały wsad trafia do modułu alarmów jednym wywołaniem; spóźnione pomijane -
+        # reguły stanowe widzą czas rosnący
+        self.acquisition_service.dispatch_to_alarms([item.measurement for item in batch if not item.late])
+        return batch
+
+
+def build_acquisition_pipeline(data_handler: HandleData, acquisition_service: AcquisitionDataService,
+                               inbox: Optional[MessageInbox] = None) -> Pipeline:
+    """
+    Składa potok: parse -> resolve -> reorder -> validate -> dedupe -> transform -> persist -> dispatch.
+    Rozmiar wsadów, kolejek i liczba wątków na etap pochodzą z ustawień ACQUISITION_PIPELINE_*.
+    Z `inbox` wiadomości są dopisywane na dysk przy odbiorze (MessageInbox).
+    """
+    stages = AcquisitionStages(data_handler, acquisition_service)
+    batch_size = getattr(settings, 'ACQUISITION_PIPELINE_BATCH_SIZE', 64)
+    queue_size = getattr(settings, 'ACQUISITION_PIPELINE_QUEUE_SIZE', 2000)
+    workers = parse_worker_counts(getattr(settings, 'ACQUISITION_PIPELINE_WORKERS', ''))
+
+    for name in SINGLE_WORKER_STAGES.intersection(workers):
+        if workers[name] > 1:
+            print(f"PIPELINE WARNING: etap {name} działa w jednym wątku (kolejność pomiarów), pominięto {name}={workers[name]}")
+
+    def stage(name):
+        count = 1 if name in SINGLE_WORKER_STAGES else workers.get(name, 1)
+        return Stage(name, getattr(stages, name), workers=count,
+                     batch_size=batch_size, queue_size=queue_size,
+                     tick=getattr(stages, f'{name}_tick', None))
+
+    return Pipeline([
+        stage('parse'),
+        stage('resolve'),
+        stage('reorder'),
+        stage('validate'),
+        stage('dedupe'),
+        stage('transform'),
+        stage('persist'),
+        stage('dispatch'),
+    ], inbox=inbox)
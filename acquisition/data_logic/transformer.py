@@ -1,8 +1,45 @@
-from typing import Dict, Callable
+from typing import Dict, Callable, List, Tuple
+
+import numpy as np
 
 from ..logic.database_manager import DatabaseManager
 from ..models import Measurement, DataLog, DataLogLevel
 
+# Konwersje liniowe jednostka -> (przesunięcie, mnożnik, dzielnik): (x + przesunięcie) * mnożnik / dzielnik
+LINEAR_CONVERSIONS: Dict[str, Tuple[float, float, float]] = {
+    # --- Temperatura ---
+    "C": (0, 1, 1),  # C → C
+    "F": (-32, 5, 9),  # F → C
+
+    # --- Prędkość wiatru ---
+    "m/s": (0, 1, 1),  # m/s → m/s
+    "km/h": (0, 1, 3.6),  # km/h → m/s
+
+    # --- Opady ---
+    "mm": (0, 1, 1),  # mm → mm
+    "mm/h": (0, 1, 1),  # mm/h → mm/h
+    "mmh": (0, 1, 1),  # "mmh" → mm/h
+
+    # --- Światło / jasność ---
+    "lux": (0, 1, 1),  # lux → lux
+    "lumen": (0, 1, 100),  # lumeny → lux
+
+    # --- Moc i energia ---
+    "W": (0, 1, 1),  # W → W
+    "kW": (0, 1000, 1),  # kW → W
+    "kWh": (0, 1, 1),  # kWh → kWh
+
+    # --- Procenty / ułamki ---
+    "%": (0, 1, 100.0),  # % → 0.0–1.0
+    "percent": (0, 1, 100.0),  # % → 0–1
+    "fraction": (0, 1, 1),  # fraction → 0.0–1.0
+}
+
+
+def _linear(shift: float, scale: float, divisor: float) -> Callable[[float], float]:
+    return lambda x: (x + shift) * scale / divisor
+
+
 class Transformer:
     def __init__(self, db_manager: DatabaseManager):
 
@@ -10,34 +47,16 @@ class Transformer:
 
         # Tabela konwersji jednostek: Simulation → Measurement / DB
         self.conversion_table: Dict[str, Callable[[float], float]] = {
-            # --- Temperatura ---
-            "C": lambda x: x,  # C → C
-            "F": lambda x: (x - 32) * 5 / 9,  # F → C
-
-            # --- Prędkość wiatru ---
-            "m/s": lambda x: x,  # m/s → m/s
-            "km/h": lambda x: x / 3.6,  # km/h → m/s
-
-            # --- Opady ---
-            "mm": lambda x: x,  # mm → mm
-            "mm/h": lambda x: x,  # mm/h → mm/h
-            "mmh": lambda x: x,  # "mmh" → mm/h
-
-            # --- Światło / jasność ---
-            "lux": lambda x: x,  # lux → lux
-            "lumen": lambda x: x / 100,  # lumeny → lux
-
-            # --- Moc i energia ---
-            "W": lambda x: x,  # W → W
-            "kW": lambda x: x * 1000,  # kW → W
-            "kWh": lambda x: x,  # kWh → kWh
-
-            # --- Procenty / ułamki ---
-            "%": lambda x: x / 100.0,  # % → 0.0–1.0
-            "percent": lambda x: x / 100.0, # % → 0–1
-            "fraction": lambda x: x  # fraction → 0.0–1.0
+            unit: _linear(*params) for unit, params in LINEAR_CONVERSIONS.items()
         }
 
+        # kody jednostek dla konwersji wsadowej: indeksy w tablicach parametrów
+        self.unit_codes: Dict[str, int] = {unit: code for code, unit in enumerate(LINEAR_CONVERSIONS)}
+        params = np.array(list(LINEAR_CONVERSIONS.values()), dtype=float).reshape(-1, 3)
+        # ostatni wiersz - nieznana jednostka (kod -1), wartość bez zmian
+        params = np.vstack([params, (0.0, 1.0, 1.0)])
+        self._shift, self._scale, self._divisor = params.T
+
     def convert_units(self, measurement: Measurement) -> Measurement:
         unit = getattr(measurement, "unit", None)
         if unit in self.conversion_table:
@@ -45,17 +64,63 @@ class Transformer:
                 measurement.value = self.conversion_table[unit](measurement.value)
             except Exception as e:
                 msg = f"TRANSFORMER ERROR: błąd konwersji {measurement.value} [{unit}]: {e}"
-                print(msg)
                 self._log(msg, DataLogLevel.ERROR, measurement)
         else:
             msg = f"TRANSFORMER WARNING: jednostka {unit} nie jest zdefiniowana w tabeli konwersji"
-            print(msg)
             self._log(msg, DataLogLevel.WARNING, measurement)
         return measurement
 
     def _log(self, message: str, level: str, measurement: Measurement):
+        # wypisanie na stdout z limitem powtórzeń agregatora logów
         self.db_manager.insert_data_log(DataLog(
             measurement=measurement,
+            source='transformer',
             level=level,
             message=message[:255]
-        ))
+        ), echo=True)
+
+    # -------------------
+    # Konwersja wsadowa
+    # -------------------
+    def unit_code(self, unit) -> int:
+        """Kod jednostki dla convert_batch; -1 - jednostka nieznana"""
+        return self.unit_codes.get(unit, -1)
+
+    def convert_batch(self, unit_codes: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Konwersja całego wsadu w jednym przebiegu (tablice kolumnowe).
+        Zwraca (przeliczone wartości, maska znanych jednostek); wartości
+        w nieznanych jednostkach i NaN pozostają bez zmian.
+        """
+        unit_codes = np.asarray(unit_codes, dtype=np.int64)
+        values = np.asarray(values, dtype=float)
+        # kod -1 wskazuje na ostatni wiersz tablic - konwersję tożsamościową
+        converted = (values + self._shift[unit_codes]) * self._scale[unit_codes] / self._divisor[unit_codes]
+        return converted, unit_codes >= 0
+
+    def convert_measurements(self, measurements: List[Measurement]) -> List[Measurement]:
+        """
+        Wsadowy odpowiednik convert_units() z tymi samymi logami. Wyjątek wychodzi tylko
+        z części wektorowej, zanim którakolwiek wartość zostanie przeliczona.
+        """
+        count = len(measurements)
+        units = [getattr(m, "unit", None) for m in measurements]
+        codes = np.fromiter((self.unit_code(unit) for unit in units), dtype=np.int64, count=count)
+        values = np.fromiter((np.nan if m.value is None else m.value for m in measurements), dtype=float, count=count)
+        converted, known = self.convert_batch(codes, values)
+
+        unknown = []
+        for m, value, unit, is_known in zip(measurements, converted.tolist(), units, known.tolist()):
+            if not is_known:
+                unknown.append((m, unit))
+            elif m.value is not None:
+                m.value = value
+
+        for m, unit in unknown:
+            msg = f"TRANSFORMER WARNING: jednostka {unit} nie jest zdefiniowana w tabeli konwersji"
+            try:
+                self._log(msg, DataLogLevel.WARNING, m)
+            except Exception as e:
+                # wartości wsadu są już przeliczone - błąd logu nie może wrócić do ścieżki pojedynczej
+                print(f"TRANSFORMER ERROR: nie zapisano logu: {e}")
+        return measurements
@@ -1,16 +1,69 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
 from ..logic.database_manager import DatabaseManager
-from ..models import Measurement, DataLog, DataLogLevel
+from ..logic.payloads import payload_preview
+from ..models import Measurement, DataLog, DataLogLevel, SensorType
+
+
+class ValidationStatus:
+    """Kody wyniku walidacji wsadowej (tablica uint8)"""
+    VALID = 0
+    MISSING = 1       # brak wartości (None/NaN)
+    BELOW_MIN = 2
+    ABOVE_MAX = 3
+    UNKNOWN_TYPE = 4  # typ czujnika spoza tabeli zakresów
+
+
+class TypeRanges:
+    """Zakresy min/max typów czujników jako posortowane tablice - wyszukiwanie wektorowe po type_id"""
+
+    def __init__(self):
+        self._ranges: Dict[int, Tuple[float, float]] = {}
+        self._ids = np.empty(0, dtype=np.int64)
+        self._mins = np.empty(0)
+        self._maxs = np.empty(0)
+
+    def update(self, sensor_types: Iterable[SensorType]) -> None:
+        changed = False
+        for sensor_type in sensor_types:
+            bounds = (np.nan if sensor_type.min_value is None else sensor_type.min_value,
+                      np.nan if sensor_type.max_value is None else sensor_type.max_value)
+            current = self._ranges.get(sensor_type.pk)
+            if current is None or not np.array_equal(current, bounds, equal_nan=True):
+                self._ranges[sensor_type.pk] = bounds
+                changed = True
+        if changed:
+            ids = sorted(self._ranges)
+            self._ids = np.array(ids, dtype=np.int64)
+            self._mins = np.array([self._ranges[i][0] for i in ids], dtype=float)
+            self._maxs = np.array([self._ranges[i][1] for i in ids], dtype=float)
+
+    def lookup(self, type_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(min, max, znany) dla każdego type_id; brak ograniczenia to NaN"""
+        if not len(self._ids):
+            nan = np.full(len(type_ids), np.nan)
+            return nan, nan.copy(), np.zeros(len(type_ids), dtype=bool)
+        index = np.minimum(np.searchsorted(self._ids, type_ids), len(self._ids) - 1)
+        known = self._ids[index] == type_ids
+        return self._mins[index], self._maxs[index], known
+
 
 class Validator:
+    SOURCE = 'validator'
+
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
+        self.type_ranges = TypeRanges()
 
     def validate(self, data: Measurement, topic: str = None, raw_message: str = None) -> bool:
         if data.value is None:
             self.db_manager.insert_data_log(DataLog(
                 measurement=data,
+                source=self.SOURCE,
                 level=DataLogLevel.WARNING,
-                message=f"Brak wartości pomiaru | topic: {topic} | raw: {raw_message}"[:255]
+                message=f"Brak wartości pomiaru | topic: {topic} | raw: {payload_preview(raw_message)}"[:255]
             ))
             return False
 
@@ -21,8 +74,9 @@ class Validator:
             if sensor_type.min_value is not None and data.value < sensor_type.min_value:
                 self.db_manager.insert_data_log(DataLog(
                     measurement=data,
+                    source=self.SOURCE,
                     level=DataLogLevel.WARNING,
-                    message=f"Wartość {data.value} poniżej minimum {sensor_type.min_value} | topic: {topic} | raw: {raw_message}"[
+                    message=f"Wartość {data.value} poniżej minimum {sensor_type.min_value} | topic: {topic} | raw: {payload_preview(raw_message)}"[
                         :255]
                 ))
                 return False
@@ -31,8 +85,9 @@ class Validator:
             if sensor_type.max_value is not None and data.value > sensor_type.max_value:
                 self.db_manager.insert_data_log(DataLog(
                     measurement=data,
+                    source=self.SOURCE,
                     level=DataLogLevel.WARNING,
-                    message=f"Wartość {data.value} powyżej maksimum {sensor_type.max_value} | topic: {topic} | raw: {raw_message}"[
+                    message=f"Wartość {data.value} powyżej maksimum {sensor_type.max_value} | topic: {topic} | raw: {payload_preview(raw_message)}"[
                         :255]
                 ))
                 return False
@@ -40,9 +95,66 @@ class Validator:
         except (AttributeError, TypeError) as e:
             self.db_manager.insert_data_log(DataLog(
                 measurement=data,
+                source=self.SOURCE,
                 level=DataLogLevel.ERROR,
-                message=f"Błąd walidacji: {e} | topic: {topic} | raw: {raw_message}"[:255]
+                message=f"Błąd walidacji: {e} | topic: {topic} | raw: {payload_preview(raw_message)}"[:255]
             ))
             return False
 
-        return True
\ No newline at end of file
+        return True
+
+    # -------------------
+    # Walidacja wsadowa
+    # -------------------
+    def validate_batch(self, type_ids: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """
+        Sprawdzenie zakresów całego wsadu w jednym przebiegu.
+        type_ids i values to tablice kolumnowe (NaN - brak wartości);
+        zwraca tablicę kodów ValidationStatus.
+        """
+        type_ids = np.asarray(type_ids, dtype=np.int64)
+        values = np.asarray(values, dtype=float)
+        mins, maxs, known = self.type_ranges.lookup(type_ids)
+
+        status = np.full(len(values), ValidationStatus.VALID, dtype=np.uint8)
+        # porównania z NaN dają False - brak ograniczenia przepuszcza wartość
+        status[values > maxs] = ValidationStatus.ABOVE_MAX
+        status[values < mins] = ValidationStatus.BELOW_MIN
+        status[~known] = ValidationStatus.UNKNOWN_TYPE
+        status[np.isnan(values)] = ValidationStatus.MISSING
+        return status
+
+    def validate_measurements(self, measurements: List[Measurement], topics: Optional[List[str]] = None,
+                              raw_messages: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Wsadowy odpowiednik validate(): te same logi dla odrzuconych pomiarów.
+        Zwraca maskę poprawnych pomiarów. Wyjątek wychodzi tylko z części wektorowej,
+        zanim którykolwiek pomiar zostanie zalogowany - błąd logu jednego pomiaru nie przerywa wsadu.
+        """
+        count = len(measurements)
+        topics = topics or [None] * count
+        raw_messages = raw_messages or [None] * count
+
+        self.type_ranges.update({m.sensor.type_id: m.sensor.type for m in measurements}.values())
+        type_ids = np.fromiter((m.sensor.type_id for m in measurements), dtype=np.int64, count=count)
+        values = np.fromiter((np.nan if m.value is None else m.value for m in measurements), dtype=float, count=count)
+        status = self.validate_batch(type_ids, values)
+
+        mins, maxs, _ = self.type_ranges.lookup(type_ids)
+        for i in np.flatnonzero(status):
+            data, code = measurements[i], status[i]
+            context = f"| topic: {topics[i]} | raw: {payload_preview(raw_messages[i])}"
+            if code == ValidationStatus.MISSING:
+                level, message = DataLogLevel.WARNING, f"Brak wartości pomiaru {context}"
+            elif code == ValidationStatus.BELOW_MIN:
+                level, message = DataLogLevel.WARNING, f"Wartość {data.value} poniżej minimum {mins[i]} {context}"
+            elif code == ValidationStatus.ABOVE_MAX:
+                level, message = DataLogLevel.WARNING, f"Wartość {data.value} powyżej maksimum {maxs[i]} {context}"
+            else:
+                level, message = DataLogLevel.ERROR, f"Błąd walidacji: nieznany typ czujnika {context}"
+            try:
+                self.db_manager.insert_data_log(DataLog(measurement=data, source=self.SOURCE, level=level,
+                                                        message=message[:255]))
+            except Exception as e:
+                print(f"VALIDATOR ERROR: nie zapisano logu walidacji: {e}")
+        return status == ValidationStatus.VALID
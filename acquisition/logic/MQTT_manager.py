@@ -1,21 +1,37 @@
 import paho.mqtt.client as mqtt
 import queue
 import os
+import zlib
+from typing import Callable, Optional, Tuple
 
 class MQTTManager:
 
-    def __init__(self, broker_url: str, topics: list):
+    def __init__(self, broker_url: str, topics: list, message_handler: Optional[Callable[[str, bytes], None]] = None,
+                 client_id: str = "", shared_group: Optional[str] = None, partition: Optional[Tuple[int, int]] = None,
+                 partition_key: Optional[Callable[[str], str]] = None):
         self.broker_url = os.getenv('MQTT_BROKER_HOST', broker_url)
         self.topics = topics
-        self.client = mqtt.Client()
+        # grupa konsumentów: subskrypcje współdzielone ($share/<grupa>/...) wymagają MQTT v5
+        self.shared_group = shared_group
+        # albo podział po topiku: (numer członka, liczba członków) - reszta wiadomości jest pomijana
+        self.partition = partition
+        # klucz podziału z topiku (domyślnie cały topic) - np. czujnik, żeby jego wiadomości trafiały do jednego procesu
+        self.partition_key = partition_key
+        self.skipped = 0
+        if shared_group:
+            self.client = mqtt.Client(client_id=client_id, protocol=mqtt.MQTTv5)
+        else:
+            self.client = mqtt.Client(client_id=client_id)
         self.message_queue = queue.Queue()
+        # gdy podany, wiadomości trafiają bezpośrednio do handlera (np. potoku) zamiast do kolejki
+        self.message_handler = message_handler
         self.connection_status = False
 
         self.client.on_connect = self._on_connect
         self.client.on_message = self._on_message
         self.client.on_disconnect = self._on_disconnect
 
-    def _on_connect(self, _client, _userdata, _flags, rc):
+    def _on_connect(self, _client, _userdata, _flags, rc, _properties=None):
         if rc == 0:
             self.connection_status = True
             for topic in self.topics:
@@ -24,9 +40,19 @@ class MQTTManager:
             self.connection_status = False
 
     def _on_message(self, _client, _userdata, msg):
-        self.message_queue.put((msg.topic, msg.payload.decode()))
+        if self.partition is not None:
+            member, members = self.partition
+            key = self.partition_key(msg.topic) if self.partition_key is not None else msg.topic
+            if zlib.crc32(key.encode()) % members != member:
+                self.skipped += 1
+                return
+        # payload zostaje w bytes - dekoder JSON czyta go bez kopii do str
+        if self.message_handler is not None:
+            self.message_handler(msg.topic, msg.payload)
+        else:
+            self.message_queue.put((msg.topic, msg.payload))
 
-    def _on_disconnect(self, _client, _userdata, _rc):
+    def _on_disconnect(self, _client, _userdata, _rc, _properties=None):
         self.connection_status = False
 
     def connect(self) -> bool:
@@ -67,6 +93,8 @@ class MQTTManager:
         """
         Subskrybuje określony temat.
         """
+        if self.shared_group:
+            topic = f"$share/{self.shared_group}/{topic}"
         self.client.subscribe(topic)
         # print(f"MQTT: Subskrybowano temat: {topic}")
 
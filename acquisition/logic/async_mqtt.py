@@ -0,0 +1,102 @@
+"""
+Klient MQTT w pętli asyncio - paho bez własnego wątku (loop_start).
+
+Gniazdo klienta rejestrowane jest w pętli zdarzeń (add_reader/add_writer), więc
+wiadomość trafia do message_handler od razu po odczycie, bez kolejki pośredniej
+i bez odpytywania. Zadanie pomocnicze wysyła keepalive (loop_misc) i wznawia
+połączenie po awarii brokera. pause_reading()/resume_reading() przenoszą
+backpressure z kolejki runtime na TCP - broker wstrzymuje wysyłkę.
+Bez message_handler wiadomości trafiają do kolejki i receive() działa jak w MQTTManager.
+"""
+import asyncio
+from typing import Optional
+
+from .MQTT_manager import MQTTManager
+
+
+class AsyncMQTTManager(MQTTManager):
+    # odstęp loop_misc (keepalive) i kolejnych prób połączenia
+    MISC_INTERVAL = 1.0
+    RECONNECT_MAX_DELAY = 30.0
+
+    def __init__(self, *args, loop: Optional[asyncio.AbstractEventLoop] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loop = loop
+        self._sock = None
+        self._paused = False
+        self._closing = False
+        self._misc_task: Optional[asyncio.Task] = None
+
+        self.client.on_socket_open = self._on_socket_open
+        self.client.on_socket_close = self._on_socket_close
+        self.client.on_socket_register_write = self._on_socket_register_write
+        self.client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    def _on_socket_open(self, client, _userdata, sock):
+        self._sock = sock
+        if not self._paused:
+            self.loop.add_reader(sock, client.loop_read)
+
+    def _on_socket_close(self, _client, _userdata, sock):
+        self.loop.remove_reader(sock)
+        self.loop.remove_writer(sock)
+        self._sock = None
+
+    def _on_socket_register_write(self, client, _userdata, sock):
+        self.loop.add_writer(sock, client.loop_write)
+
+    def _on_socket_unregister_write(self, _client, _userdata, sock):
+        self.loop.remove_writer(sock)
+
+    def connect(self) -> bool:
+        """Połączenie z brokerem; wołane z wątku pętli zdarzeń"""
+        self.loop = self.loop or asyncio.get_running_loop()
+        try:
+            self.client.connect(self.broker_url, 1883, 60)
+        except Exception as e:
+            print(f"MQTT connection failed: {e}")
+            return False
+        self._misc_task = self.loop.create_task(self._misc_loop())
+        return True
+
+    async def _misc_loop(self):
+        # reconnect() łączy się synchronicznie - przy awarii brokera pętla stoi najwyżej connect_timeout
+        delay = self.MISC_INTERVAL
+        while not self._closing:
+            if self.client.socket() is None:
+                try:
+                    self.client.reconnect()
+                    delay = self.MISC_INTERVAL
+                except Exception as e:
+                    print(f"MQTT connection failed: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.RECONNECT_MAX_DELAY)
+                    continue
+            self.client.loop_misc()
+            await asyncio.sleep(self.MISC_INTERVAL)
+
+    def pause_reading(self) -> None:
+        if not self._paused:
+            self._paused = True
+            if self._sock is not None:
+                self.loop.remove_reader(self._sock)
+
+    def resume_reading(self) -> None:
+        if self._paused:
+            self._paused = False
+            if self._sock is not None:
+                self.loop.add_reader(self._sock, self.client.loop_read)
+
+    async def close(self, timeout: float = 2.0) -> None:
+        """Wysyła DISCONNECT i czeka na zamknięcie gniazda"""
+        self._closing = True
+        if self._misc_task is not None:
+            self._misc_task.cancel()
+        if self.client.socket() is not None:
+            self.client.disconnect()
+            deadline = self.loop.time() + timeout
+            while self._sock is not None and self.loop.time() < deadline:
+                await asyncio.sleep(0.01)
+        if self._sock is not None:
+            self._on_socket_close(self.client, None, self._sock)
+        self.connection_status = False
@@ -0,0 +1,171 @@
+import io
+import math
+import threading
+import time
+from typing import Dict, List, Any
+
+from django.db import IntegrityError, connection, transaction
+
+from ..models import Measurement
+
+
+class WriterStats:
+    """Liczniki zapisu: wiersze zapisane/pominięte i przepustowość (wiersze/s)"""
+
+    # współczynnik średniej kroczącej (EWMA) przepustowości
+    ALPHA = 0.1
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.rows_written = 0
+        self.rows_skipped = 0
+        self.errors = 0
+        self.last_rows_per_sec = 0.0
+        self.avg_rows_per_sec = 0.0
+
+    def record(self, written: int, skipped: int, elapsed_s: float):
+        rate = (written + skipped) / elapsed_s if elapsed_s > 0 else 0.0
+        with self._lock:
+            self.batches += 1
+            self.rows_written += written
+            self.rows_skipped += skipped
+            self.last_rows_per_sec = rate
+            if self.batches == 1:
+                self.avg_rows_per_sec = rate
+            else:
+                self.avg_rows_per_sec += self.ALPHA * (rate - self.avg_rows_per_sec)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'batches': self.batches,
+            'rows_written': self.rows_written,
+            'rows_skipped': self.rows_skipped,
+            'errors': self.errors,
+            'last_rows_per_sec': round(self.last_rows_per_sec, 1),
+            'avg_rows_per_sec': round(self.avg_rows_per_sec, 1),
+        }
+
+
+def _copy_value(value) -> str:
+    """Wartość w formacie tekstowym COPY (kolumny rozdzielone tabulatorem, NULL jako \\N)"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, float):
+        if math.isnan(value):
+            return 'NaN'
+        if math.isinf(value):
+            return 'Infinity' if value > 0 else '-Infinity'
+        return repr(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+
+class MeasurementBulkWriter:
+    """
+    Zapis wsadów pomiarów z semantyką ON CONFLICT DO NOTHING względem
+    unique_together (sensor, timestamp).
+
+    PostgreSQL: wsad trafia przez COPY FROM STDIN do tymczasowej tabeli pośredniej,
+    skąd jednym INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING przechodzi do
+    tabeli pomiarów - bez budowania zapytań z parametrami dla każdego wiersza.
+    Inne bazy: bulk_create pomiarów, których jeszcze nie ma w bazie.
+
+    write() zwraca pomiary faktycznie zapisane (z ustawionym pk) - tylko one
+    są doliczane do agregatów.
+    """
+
+    STAGING_TABLE = 'acquisition_measurement_staging'
+    COLUMNS = ('sensor_id', 'timestamp', 'value', 'status')
+
+    def __init__(self):
+        self.stats = WriterStats()
+
+    def write(self, batch: List[Measurement]) -> List[Measurement]:
+        if not batch:
+            return []
+        started = time.perf_counter()
+        try:
+            if connection.vendor == 'postgresql':
+                written = self._write_copy(batch)
+            else:
+                written = self._write_orm(batch)
+        except Exception:
+            self.stats.record_error()
+            raise
+        self.stats.record(len(written), len(batch) - len(written), time.perf_counter() - started)
+        return written
+
+    def _write_copy(self, batch: List[Measurement]) -> List[Measurement]:
+        qn = connection.ops.quote_name
+        table = qn(Measurement._meta.db_table)
+        staging = qn(self.STAGING_TABLE)
+        columns = ', '.join(qn(c) for c in self.COLUMNS)
+
+        buffer = io.StringIO()
+        for m in batch:
+            buffer.write('\t'.join(_copy_value(v) for v in (m.sensor_id, m.timestamp, m.value, m.status)))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            # tabela tymczasowa żyje w sesji połączenia, a jej zawartość tylko do końca transakcji
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {staging} ("
+                f"{qn('sensor_id')} integer, {qn('timestamp')} timestamptz, "
+                f"{qn('value')} double precision, {qn('status')} varchar(15)"
+                f") ON COMMIT DELETE ROWS"
+            )
+            cursor.cursor.copy_expert(f"COPY {staging} ({columns}) FROM STDIN", buffer)
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} "
+                f"ON CONFLICT ({qn('sensor_id')}, {qn('timestamp')}) DO NOTHING "
+                f"RETURNING {qn(Measurement._meta.pk.column)}, {qn('sensor_id')}, {qn('timestamp')}"
+            )
+            inserted = {(sensor_id, ts): pk for pk, sensor_id, ts in cursor.fetchall()}
+
+        written = []
+        for m in batch:
+            pk = inserted.pop((m.sensor_id, m.timestamp), None)
+            if pk is not None:
+                m.pk = pk
+                m._state.adding = False
+                written.append(m)
+        return written
+
+    def _write_orm(self, batch: List[Measurement]) -> List[Measurement]:
+        sensor_ids = {m.sensor_id for m in batch}
+        timestamps = {m.timestamp for m in batch}
+        existing = set(
+            Measurement.objects.filter(sensor_id__in=sensor_ids, timestamp__in=timestamps)
+            .values_list('sensor_id', 'timestamp')
+        )
+
+        fresh = []
+        for m in batch:
+            key = (m.sensor_id, m.timestamp)
+            if key not in existing:
+                existing.add(key)
+                fresh.append(m)
+        if not fresh:
+            return []
+
+        try:
+            with transaction.atomic():
+                return Measurement.objects.bulk_create(fresh)
+        except IntegrityError:
+            # równoległy zapis tych samych pomiarów - zapisujemy pojedynczo to, co zostało
+            written = []
+            for m in fresh:
+                try:
+                    with transaction.atomic():
+                        m.save(force_insert=True)
+                    written.append(m)
+                except IntegrityError:
+                    m.pk = None
+            return written
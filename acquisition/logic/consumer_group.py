@@ -0,0 +1,153 @@
+"""
+Grupa konsumentów MQTT: N procesów akwizycji dzieli strumień wiadomości.
+
+Tryby podziału:
+- "hash"   (domyślny) - każdy proces subskrybuje wszystko i przetwarza tylko wiadomości,
+  dla których crc32(klucz czujnika z topiku) % members == member; działa z każdym brokerem,
+  a wszystkie wiadomości czujnika trafiają zawsze do tego samego procesu,
+- "shared" - subskrypcje współdzielone MQTT ($share/<grupa>/<topic>); broker rozdziela
+  wiadomości między członków grupy bez względu na czujnik. Stan per czujnik (okno
+  deduplikacji, bufor reorder, reguły z duration_seconds, indeks otwartych alarmów) jest
+  wtedy niespójny - tryb tylko dla brokera z routingiem przypisanym do czujnika.
+
+Każdy proces ma własny potok i bufor zapisu i co kilka sekund zapisuje swój stan
+w tabeli AcquisitionWorker. Panel sterowania uruchamia procesy lokalnie
+(manage.py run_acquisition_worker) i zatrzymuje całą grupę flagą stop_requested.
+"""
+import datetime
+import os
+import socket
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import AcquisitionWorker
+
+SHARED = 'shared'
+HASH = 'hash'
+MODES = (SHARED, HASH)
+
+# procesy uruchomione z tego procesu (panel sterowania): member -> Popen
+_processes: Dict[int, subprocess.Popen] = {}
+
+
+def group_name() -> str:
+    return getattr(settings, 'ACQUISITION_GROUP_NAME', 'szebi')
+
+
+def group_size() -> int:
+    return max(1, getattr(settings, 'ACQUISITION_GROUP_SIZE', 1))
+
+
+def group_mode() -> str:
+    mode = getattr(settings, 'ACQUISITION_GROUP_MODE', HASH)
+    if mode not in MODES:
+        raise ValueError(f"Nieznany tryb grupy konsumentów: {mode}")
+    return mode
+
+
+def heartbeat_seconds() -> float:
+    return getattr(settings, 'ACQUISITION_WORKER_HEARTBEAT_SECONDS', 5.0)
+
+
+def worker_name(group: str, member: int) -> str:
+    return f"{group}-{member}"
+
+
+# -------------------
+# Stan procesów (tabela AcquisitionWorker)
+# -------------------
+def register_worker(member: int, members: int, group: Optional[str] = None) -> AcquisitionWorker:
+    group = group or group_name()
+    now = timezone.now()
+    worker, _ = AcquisitionWorker.objects.update_or_create(
+        name=worker_name(group, member),
+        defaults={
+            'group': group,
+            'member': member,
+            'members': members,
+            'host': socket.gethostname(),
+            'pid': os.getpid(),
+            'started_at': now,
+            'last_heartbeat': now,
+            'stop_requested': False,
+            'stats': {},
+        },
+    )
+    return worker
+
+
+def report_health(name: str, stats: Dict[str, Any]) -> bool:
+    """
+    Zapisz stan procesu; zwraca True, gdy proces ma zakończyć pracę - panel zażądał
+    zatrzymania albo jego miejsce w grupie zajął już nowy proces.
+    """
+    own = AcquisitionWorker.objects.filter(name=name, host=socket.gethostname(), pid=os.getpid())
+    if not own.update(last_heartbeat=timezone.now(), stats=stats):
+        return True
+    return own.filter(stop_requested=True).exists()
+
+
+def unregister_worker(name: str) -> None:
+    AcquisitionWorker.objects.filter(name=name, host=socket.gethostname(), pid=os.getpid()).delete()
+
+
+def is_alive(worker: AcquisitionWorker, now: Optional[datetime.datetime] = None) -> bool:
+    stale = getattr(settings, 'ACQUISITION_WORKER_STALE_SECONDS', 30)
+    return ((now or timezone.now()) - worker.last_heartbeat).total_seconds() <= stale
+
+
+def group_status(group: Optional[str] = None) -> List[Dict[str, Any]]:
+    now = timezone.now()
+    return [
+        {
+            'name': w.name,
+            'member': w.member,
+            'members': w.members,
+            'host': w.host,
+            'pid': w.pid,
+            'alive': is_alive(w, now),
+            'stop_requested': w.stop_requested,
+            'started_at': w.started_at,
+            'last_heartbeat': w.last_heartbeat,
+            'stats': w.stats,
+        }
+        for w in AcquisitionWorker.objects.filter(group=group or group_name()).order_by('member')
+    ]
+
+
+def is_group_running(group: Optional[str] = None) -> bool:
+    return any(w['alive'] and not w['stop_requested'] for w in group_status(group))
+
+
+# -------------------
+# Sterowanie grupą (panel sterowania)
+# -------------------
+def start_group(size: Optional[int] = None, group: Optional[str] = None) -> List[int]:
+    """Uruchom brakujących członków grupy jako procesy lokalne; zwraca ich numery"""
+    size = size or group_size()
+    group = group or group_name()
+    running = {w['member'] for w in group_status(group) if w['alive'] and not w['stop_requested']}
+    manage_py = os.path.join(settings.BASE_DIR, 'manage.py')
+
+    started = []
+    for member in range(size):
+        process = _processes.get(member)
+        if member in running or (process is not None and process.poll() is None):
+            continue
+        _processes[member] = subprocess.Popen(
+            [sys.executable, manage_py, 'run_acquisition_worker',
+             '--member', str(member), '--members', str(size), '--group', group],
+            cwd=settings.BASE_DIR,
+            start_new_session=True,
+        )
+        started.append(member)
+    return started
+
+
+def stop_group(group: Optional[str] = None) -> int:
+    """Zażądaj zatrzymania wszystkich członków grupy (także na innych hostach)"""
+    return AcquisitionWorker.objects.filter(group=group or group_name()).update(stop_requested=True)
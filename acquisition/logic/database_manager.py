@@ -104,89 +104,256 @@
 #
 #         return list(queryset.order_by('timestamp'))
 import datetime
+import os
 import threading
 import queue
-from typing import Optional, List, Dict, Any
+import time
+from typing import Optional, Iterator, List, Dict, Any
 
-from ..models import Measurement, DataLog
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connection, transaction
+
+from ..models import Measurement, DataLog, MeasurementRollup
 from acquisition.models import Sensor
+from .rollups import DEFAULT_MAX_BUCKETS, get_rollups, upsert_rollups
+from .export import chunk_size as export_chunk_size, filter_measurements
+from .log_aggregator import LogAggregator
+from .sensor_statistics import get_sensor_statistics, increment_counters
+from .bulk_writer import MeasurementBulkWriter
+from .heartbeat import HeartbeatTracker
+from .write_queue import FlushStats, OverflowPolicy, WriteQueue
+from .spool import SegmentSpool, SpoolLocked
+
+
+def _encode_measurement(measurement: Measurement) -> tuple:
+    return measurement.sensor_id, measurement.timestamp, measurement.value, measurement.status
+
+
+def _decode_measurement(record: tuple) -> Measurement:
+    sensor_id, timestamp, value, status = record
+    return Measurement(sensor_id=sensor_id, timestamp=timestamp, value=value, status=status)
+
 
 class DatabaseManager:
-    def __init__(self):
-        # Kolejka do pomiarów
-        self._measurement_queue = queue.Queue()
+    # ponawianie zapisu, gdy baza jest niedostępna (sekundy, wykładniczo do limitu)
+    RETRY_BASE_SECONDS = 0.5
+    RETRY_MAX_SECONDS = 10.0
+
+    def __init__(self, spool: bool = False, spool_name: str = ''):
+        # wsad zapisywany po zebraniu batch_size elementów lub po flush_seconds od pierwszego z nich
+        self.batch_size = getattr(settings, 'ACQUISITION_WRITER_BATCH_SIZE', 500)
+        self.flush_seconds = getattr(settings, 'ACQUISITION_WRITER_FLUSH_SECONDS', 0.25)
+        self.measurement_writer = MeasurementBulkWriter()
+        self._stopping = threading.Event()
+
+        queue_size = getattr(settings, 'ACQUISITION_WRITER_QUEUE_SIZE', 10000)
+        spill_dir = getattr(settings, 'ACQUISITION_WRITER_SPILL_DIR', None)
+        if spill_dir and spool_name:
+            # każdy proces grupy konsumentów ma własne pliki przepełnienia
+            spill_dir = os.path.join(spill_dir, spool_name)
+
+        # Kolejka do pomiarów - trwały bufor na dysku albo ograniczona kolejka w pamięci
+        self._measurement_queue = (spool and self._open_spool(queue_size, spool_name)) or WriteQueue(
+            'measurements', queue_size,
+            getattr(settings, 'ACQUISITION_WRITER_OVERFLOW', OverflowPolicy.BLOCK), spill_dir)
+        self._measurement_flush_stats = FlushStats()
         self._worker_thread = threading.Thread(target=self._measurement_worker, daemon=True)
         self._worker_thread.start()
 
         # Kolejka dla DataLogs
-        self._log_queue = queue.Queue()
+        self._log_queue = WriteQueue(
+            'datalogs', queue_size,
+            getattr(settings, 'ACQUISITION_LOG_OVERFLOW', OverflowPolicy.BLOCK), spill_dir)
+        self._log_flush_stats = FlushStats()
         self._log_worker_thread = threading.Thread(target=self._log_worker, daemon=True)
         self._log_worker_thread.start()
 
+        # powtarzające się logi zbierane w jeden wiersz na okno (LogAggregator)
+        self.log_aggregator = LogAggregator(
+            window_seconds=getattr(settings, 'ACQUISITION_LOG_WINDOW_SECONDS', 60.0),
+            echo_limit=getattr(settings, 'ACQUISITION_LOG_ECHO_LIMIT', 1),
+        )
+
+        # last_communication czujników zapisywane zbiorczo co heartbeat_seconds
+        self.heartbeat_seconds = getattr(settings, 'ACQUISITION_HEARTBEAT_FLUSH_SECONDS', 5.0)
+        self.heartbeats = HeartbeatTracker()
+        self._heartbeat_stop = threading.Event()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_worker, daemon=True)
+        self._heartbeat_thread.start()
+
+    @staticmethod
+    def _open_spool(memory_items: int, name: str = '') -> Optional[SegmentSpool]:
+        """
+        Bufor pomiarów na dysku: pomiar jest bezpieczny po dopisaniu do segmentu,
+        a niepotwierdzone zapisy są odtwarzane po restarcie. Używany tylko przez
+        proces akwizycji (DatabaseManager(spool=True)).
+        """
+        if not getattr(settings, 'ACQUISITION_SPOOL_ENABLED', False):
+            return None
+        directory = getattr(settings, 'ACQUISITION_SPOOL_DIR', None) or os.path.join(settings.BASE_DIR, 'var', 'spool')
+        if name:
+            # każdy proces grupy konsumentów ma własny katalog bufora
+            directory = os.path.join(directory, name)
+        try:
+            spool = SegmentSpool(
+                directory,
+                encode=_encode_measurement,
+                decode=_decode_measurement,
+                segment_bytes=getattr(settings, 'ACQUISITION_SPOOL_SEGMENT_MB', 64) * 1024 * 1024,
+                fsync_seconds=getattr(settings, 'ACQUISITION_SPOOL_FSYNC_SECONDS', 0.05),
+                memory_items=memory_items,
+            )
+        except SpoolLocked:
+            # bufor należy do innego procesu (np. działającego workera) - zapis przez pamięć
+            print(f"DB WARNING: bufor {directory} jest używany przez inny proces, pomiary tylko w pamięci")
+            return None
+        if spool.pending:
+            print(f"DB: Odtwarzanie {spool.pending} niezapisanych pomiarów z {directory}")
+        return spool
+
     def insert_measurements(self, measurement: Measurement):
         """Wrzuć measurement do kolejki zamiast natychmiastowego zapisu"""
         self._measurement_queue.put(measurement)
 
-    def _measurement_worker(self):
+    def _drain(self, source, flush, stats: FlushStats) -> None:
+        """
+        Zbiera elementy kolejki we wsady i przekazuje je do `flush`, gdy wsad jest pełny
+        albo gdy od pierwszego elementu minęło flush_seconds - rzadko nadające
+        czujniki nie czekają w pamięci na zapełnienie wsadu.
+        """
         batch = []
-        batch_size = 50
+        deadline = None
         while True:
-            measurement = self._measurement_queue.get()
-            if measurement is None:  # sentinel do zamknięcia
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = source.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # upłynął termin zapisu
+
+            if item is None:  # sentinel do zamknięcia
                 break
-            batch.append(measurement)
+            if item is not False:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_seconds
+                batch.append(item)
 
-            if len(batch) >= batch_size:
-                try:
-                    Measurement.objects.bulk_create(batch)
-                except Exception as e:
-                    print(f"DB ERROR przy bulk_create: {e}")
-                batch.clear()
-            self._measurement_queue.task_done()
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                if not self._flush_with_retry(batch, flush, stats, deadline - self.flush_seconds):
+                    # zamykanie przy niedostępnej bazie - reszta zostaje w buforze
+                    return
+                source.ack()
+                batch = []
+                deadline = None
 
         # zapis pozostałych elementów po zamknięciu kolejki
-        if batch:
+        if batch and self._flush_with_retry(batch, flush, stats, deadline - self.flush_seconds):
+            source.ack()
+
+    def _flush_with_retry(self, batch, flush, stats: FlushStats, first_item_at: float) -> bool:
+        """
+        Zapis wsadu; False, gdy wsad porzucono przy zamykaniu. Przy utracie połączenia z bazą wsad jest ponawiany z rosnącą przerwą -
+        w tym czasie kolejka się zapełnia i działa jej polityka przepełnienia,
+        więc zużycie pamięci pozostaje ograniczone.
+        """
+        attempt = 0
+        while True:
+            started = time.monotonic()
             try:
-                Measurement.objects.bulk_create(batch)
-            except Exception as e:
-                print(f"DB ERROR przy bulk_create końcowym: {e}")
+                flush(batch)
+                stats.record(len(batch), time.monotonic() - started, time.monotonic() - first_item_at)
+                return True
+            except (OperationalError, InterfaceError) as e:
+                attempt += 1
+                stats.record_retry()
+                # zerwane połączenie zostanie otwarte na nowo przy kolejnej próbie
+                connection.close()
+                if self._stopping.is_set():
+                    print(f"DB ERROR: baza niedostępna przy zamykaniu, porzucono wsad ({len(batch)}): {e}")
+                    stats.record_dropped(len(batch))
+                    return False
+                delay = min(self.RETRY_MAX_SECONDS, self.RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+                print(f"DB ERROR: baza niedostępna ({e}), ponowienie za {delay:.1f}s")
+                time.sleep(delay)
 
+    def _measurement_worker(self):
+        self._drain(self._measurement_queue, self._flush_measurements, self._measurement_flush_stats)
 
+    def _flush_measurements(self, batch: List[Measurement]) -> None:
+        # zapis pomiarów, agregatów i liczników w jednej transakcji - ponowienie po utracie
+        # połączenia nie może zastać wierszy bez agregatów (ON CONFLICT DO NOTHING by je pominął)
+        try:
+            with transaction.atomic():
+                written = self.measurement_writer.write(batch)
+                # agregaty liczone tylko z pomiarów, które faktycznie trafiły do bazy
+                upsert_rollups(written)
+                increment_counters(written)
+        except Exception as e:
+            # wycofane wiersze nie zachowują nadanych kluczy - logi nie wskażą nieistniejących pomiarów
+            for m in batch:
+                m.pk = None
+                m._state.adding = True
+            if isinstance(e, (OperationalError, InterfaceError)):
+                raise
+            print(f"DB ERROR przy zapisie wsadu pomiarów: {e}")
 
-    def insert_data_log(self, data_log: DataLog):
-        self._log_queue.put(data_log)
+    def get_writer_stats(self) -> Dict[str, Any]:
+        stats = self.measurement_writer.stats.as_dict()
+        stats['measurement_queue'] = self._measurement_queue.get_stats()
+        stats['measurement_flush'] = self._measurement_flush_stats.as_dict()
+        stats['log_queue'] = self._log_queue.get_stats()
+        stats['log_flush'] = self._log_flush_stats.as_dict()
+        stats['heartbeat'] = self.heartbeats.get_stats()
+        stats['log_aggregator'] = self.log_aggregator.get_stats()
+        return stats
 
-    def _log_worker(self):
-        batch = []
-        batch_size = 50
-        while True:
-            log = self._log_queue.get()
-            if log is None:
-                break
-            batch.append(log)
-            if len(batch) >= batch_size:
-                try:
-                    DataLog.objects.bulk_create(batch)
-                except Exception as e:
-                    print(f"DB ERROR przy bulk_create DataLog: {e}")
-                batch.clear()
+    def insert_data_log(self, data_log: DataLog, echo: bool = False):
+        """Log trafia do agregatora; echo - wypisz też na stdout (z limitem na odcisk komunikatu)"""
+        for ready in self.log_aggregator.add(data_log, echo):
+            self._log_queue.put(ready)
 
-            self._log_queue.task_done()
+    def _collect_logs(self, force: bool = False) -> None:
+        for ready in self.log_aggregator.collect(force=force):
+            self._log_queue.put(ready)
 
-        if batch:
-            try:
-                DataLog.objects.bulk_create(batch)
-            except Exception as e:
-                print(f"DB ERROR przy bulk_create DataLog końcowym: {e}")
+    def _log_worker(self):
+        self._drain(self._log_queue, self._flush_logs, self._log_flush_stats)
+
+    def _flush_logs(self, batch: List[DataLog]) -> None:
+        measurement_field = DataLog._meta.get_field('measurement')
+        for log in batch:
+            # pomiar odrzucony lub jeszcze niezapisany - log zostaje bez powiązania
+            if measurement_field.is_cached(log) and log.measurement is not None and log.measurement.pk is None:
+                log.measurement = None
+        try:
+            DataLog.objects.bulk_create(batch)
+        except (OperationalError, InterfaceError):
+            raise
+        except Exception as e:
+            print(f"DB ERROR przy bulk_create DataLog: {e}")
 
     # -------------------
     # Pozostałe metody synchroniczne
     # -------------------
     def update_sensor(self, sensor_id: int, timestamp: datetime.datetime) -> None:
+        """Zapamiętaj komunikację czujnika - zapis do bazy następuje zbiorczo w tle"""
+        self.heartbeats.touch(sensor_id, timestamp)
+
+    def _heartbeat_worker(self):
+        # ten sam wątek zamyka minione okna agregatora logów
+        interval = self.heartbeat_seconds
+        if self.log_aggregator.window_seconds > 0:
+            interval = min(interval, self.log_aggregator.window_seconds)
+        while not self._heartbeat_stop.wait(interval):
+            self._flush_heartbeats()
+            self._collect_logs()
+        self._flush_heartbeats()
+        self._collect_logs(force=True)
+
+    def _flush_heartbeats(self) -> None:
         try:
-            Sensor.objects.filter(pk=sensor_id).update(last_communication=timestamp)
+            self.heartbeats.flush()
         except Exception as e:
-            print(f"DB ERROR przy aktualizacji sensora: {e}")
+            print(f"DB ERROR przy aktualizacji sensorów: {e}")
 
     def get_sensor(self, sensor_id: int) -> Optional[Sensor]:
         return Sensor.objects.filter(pk=sensor_id).first()
@@ -197,20 +364,27 @@ class DatabaseManager:
             Measurement.objects.filter(sensor_id=sensor_id, timestamp__range=(start, end)).order_by(
                 'timestamp'))
 
+    def iter_measurements(self, sensor_id: int, start: datetime.datetime,
+                          end: datetime.datetime) -> Iterator[Measurement]:
+        queryset = Measurement.objects.filter(sensor_id=sensor_id, timestamp__range=(start, end))
+        return queryset.order_by('timestamp').iterator(chunk_size=export_chunk_size())
+
+    def get_rollups(
+            self,
+            sensor_id: int,
+            start: datetime.datetime,
+            end: datetime.datetime,
+            resolution: Optional[str] = None,
+            max_buckets: int = DEFAULT_MAX_BUCKETS
+    ) -> List[MeasurementRollup]:
+        return list(get_rollups(sensor_id, start, end, resolution, max_buckets))
+
     def get_last_measurement(self, sensor_id: int) -> Optional[Measurement]:
+        # jedno zapytanie - indeks (sensor, -timestamp) w każdej partycji, PostgreSQL łączy je z LIMIT 1
         return Measurement.objects.filter(sensor_id=sensor_id).order_by('-timestamp').first()
 
     def get_sensor_statistics(self) -> List[Dict[str, Any]]:
-        stats = []
-        for sensor in Sensor.objects.all():
-            count = Measurement.objects.filter(sensor=sensor).count()
-            stats.append({
-                'sensor_name': sensor.name,
-                'status': sensor.status,
-                'total_measurements': count,
-                'last_seen': sensor.last_communication
-            })
-        return stats
+        return get_sensor_statistics()
 
     def get_logs(self, level: str) -> List[DataLog]:
         return list(DataLog.objects.filter(level=level).order_by('-timestamp'))
@@ -222,16 +396,18 @@ class DatabaseManager:
             start_time: Optional[datetime.datetime] = None,
             end_time: Optional[datetime.datetime] = None
     ) -> List[Measurement]:
-        queryset = Measurement.objects.all()
-        if room:
-            queryset = queryset.filter(sensor__location__room=room)
-        if metric:
-            queryset = queryset.filter(sensor__type__name=metric)
-        if start_time:
-            queryset = queryset.filter(timestamp__gte=start_time)
-        if end_time:
-            queryset = queryset.filter(timestamp__lte=end_time)
-        return list(queryset.order_by('timestamp'))
+        return list(filter_measurements(room, metric, None, start_time, end_time).order_by('timestamp'))
+
+    def iter_filtered_measurements(
+            self,
+            room: Optional[str] = None,
+            metric: Optional[str] = None,
+            start_time: Optional[datetime.datetime] = None,
+            end_time: Optional[datetime.datetime] = None
+    ) -> Iterator[Measurement]:
+        """Jak get_filtered_measurements, ale strumieniowo - kursor serwerowy, porcje po chunk_size()"""
+        queryset = filter_measurements(room, metric, None, start_time, end_time).order_by('timestamp', 'id')
+        return queryset.iterator(chunk_size=export_chunk_size())
 
     def get_all_rooms(self) -> List[str]:
         return list(Sensor.objects.values_list('location__room', flat=True).distinct())
@@ -240,8 +416,14 @@ class DatabaseManager:
         return list(Sensor.objects.values_list('type__name', flat=True).distinct())
 
     def shutdown(self):
-        self._measurement_queue.put(None)
+        self._stopping.set()
+        self._measurement_queue.put_sentinel()
         self._worker_thread.join()
-        self._log_queue.put(None)
+        # przed zamknięciem kolejki logów - wątek oddaje jeszcze otwarte okna agregatora
+        self._heartbeat_stop.set()
+        self._heartbeat_thread.join()
+        self._log_queue.put_sentinel()
         self._log_worker_thread.join()
+        self._measurement_queue.close()
+        self._log_queue.close()
 
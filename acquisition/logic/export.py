@@ -0,0 +1,144 @@
+"""
+Strumieniowy eksport pomiarów.
+
+Pomiary czytane są stronami po kluczu (timestamp, id): każda strona to osobne,
+krótkie zapytanie WHERE (timestamp, id) > ostatni klucz ORDER BY timestamp, id LIMIT n
+zwracające krotki (values_list), bez obiektów modelu. Pamięć zależy więc od rozmiaru
+strony, a nie od zakresu czasu, a zapytania nie trzymają otwartej transakcji przez
+cały eksport. Ten sam klucz, zakodowany jako kursor, pozwala wznowić eksport
+od miejsca przerwania.
+"""
+import base64
+import csv
+import datetime
+import io
+import json
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from ..models import Measurement
+
+# kolumny eksportu i odpowiadające im pola zapytania
+COLUMNS = ('id', 'timestamp', 'sensor_id', 'room', 'metric', 'value', 'status')
+_FIELDS = ('id', 'timestamp', 'sensor_id', 'sensor__location__room', 'sensor__type__name', 'value', 'status')
+
+Row = Tuple
+Cursor = Tuple[datetime.datetime, int]
+
+
+class ExportError(ValueError):
+    """Niepoprawne parametry eksportu (np. uszkodzony kursor)"""
+
+
+def chunk_size() -> int:
+    return getattr(settings, 'ACQUISITION_EXPORT_CHUNK_SIZE', 5000)
+
+
+def filter_measurements(room: Optional[str] = None, metric: Optional[str] = None, sensor_id: Optional[int] = None,
+                        start_time: Optional[datetime.datetime] = None,
+                        end_time: Optional[datetime.datetime] = None):
+    queryset = Measurement.objects.all()
+    if room:
+        queryset = queryset.filter(sensor__location__room=room)
+    if metric:
+        queryset = queryset.filter(sensor__type__name=metric)
+    if sensor_id is not None:
+        queryset = queryset.filter(sensor_id=sensor_id)
+    if start_time:
+        queryset = queryset.filter(timestamp__gte=start_time)
+    if end_time:
+        queryset = queryset.filter(timestamp__lte=end_time)
+    return queryset
+
+
+def _after(queryset, cursor: Optional[Cursor]):
+    if cursor is None:
+        return queryset
+    timestamp, pk = cursor
+    return queryset.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk))
+
+
+def iter_pages(queryset, cursor: Optional[Cursor] = None, size: Optional[int] = None,
+               limit: Optional[int] = None) -> Iterator[List[Row]]:
+    """Kolejne strony krotek COLUMNS od kursora (wyłącznie); najwyżej `limit` wierszy łącznie"""
+    size = size or chunk_size()
+    queryset = queryset.order_by('timestamp', 'id').values_list(*_FIELDS)
+    remaining = limit
+    while remaining is None or remaining > 0:
+        take = size if remaining is None else min(size, remaining)
+        page = list(_after(queryset, cursor)[:take])
+        if not page:
+            return
+        yield page
+        if remaining is not None:
+            remaining -= len(page)
+        if len(page) < take:
+            return
+        cursor = (page[-1][1], page[-1][0])
+
+
+def next_cursor(queryset, cursor: Optional[Cursor], limit: int) -> Optional[Cursor]:
+    """
+    Kursor za stroną `limit` wierszy - jedno zapytanie po kluczu, przed wysłaniem danych
+    (nagłówek odpowiedzi musi być znany przed strumieniem). None - to ostatnia strona.
+    """
+    ordered = _after(queryset, cursor).order_by('timestamp', 'id').values_list('timestamp', 'id')
+    # ostatni wiersz strony i pierwszy następnej - brak drugiego oznacza koniec danych
+    boundary = list(ordered[limit - 1:limit + 1])
+    if len(boundary) < 2:
+        return None
+    return boundary[0]
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    timestamp, pk = cursor
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{pk}".encode()).decode()
+
+
+def decode_cursor(value: str) -> Cursor:
+    try:
+        timestamp, pk = base64.urlsafe_b64decode(value.encode()).decode().rsplit('|', 1)
+        parsed = parse_datetime(timestamp)
+        if parsed is None:
+            raise ValueError(timestamp)
+        return parsed, int(pk)
+    except ValueError as e:
+        raise ExportError(f"Niepoprawny kursor: {value}") from e
+
+
+# -------------------
+# Formaty wyjściowe - jeden fragment tekstu na stronę
+# -------------------
+def ndjson_chunks(pages: Iterable[List[Row]]) -> Iterator[str]:
+    for page in pages:
+        yield ''.join(
+            json.dumps({
+                'id': pk, 'timestamp': timestamp.isoformat(), 'sensor_id': sensor_id,
+                'room': room, 'metric': metric, 'value': value, 'status': status,
+            }) + '\n'
+            for pk, timestamp, sensor_id, room, metric, value, status in page
+        )
+
+
+def csv_chunks(pages: Iterable[List[Row]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue()
+    for page in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (pk, timestamp.isoformat(), sensor_id, room, metric, value, status)
+            for pk, timestamp, sensor_id, room, metric, value, status in page
+        )
+        yield buffer.getvalue()
+
+
+FORMATS = {
+    'ndjson': (ndjson_chunks, 'application/x-ndjson'),
+    'csv': (csv_chunks, 'text/csv'),
+}
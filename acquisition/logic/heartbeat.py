@@ -0,0 +1,93 @@
+import datetime
+import threading
+from typing import Dict, Any
+
+from django.db import connection, transaction
+
+from ..models import Sensor
+
+
+class HeartbeatTracker:
+    """
+    Koalescencja aktualizacji Sensor.last_communication.
+
+    Zamiast jednego UPDATE na każdą wiadomość pamięta najnowszy timestamp każdego
+    czujnika i okresowo zapisuje wszystkie zmienione czujniki jednym zapytaniem
+    UPDATE ... FROM (VALUES ...). last_communication nigdy nie jest cofane -
+    spóźnione pomiary nie nadpisują nowszej wartości.
+    """
+
+    # ile czujników w jednym zapytaniu
+    CHUNK_SIZE = 500
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[int, datetime.datetime] = {}
+        self.touches = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+
+    def touch(self, sensor_id: int, timestamp: datetime.datetime) -> None:
+        with self._lock:
+            self.touches += 1
+            current = self._pending.get(sensor_id)
+            if current is None or timestamp > current:
+                self._pending[sensor_id] = timestamp
+
+    def __len__(self):
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Zapisz oczekujące timestampy. Zwraca liczbę czujników w zapisie."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            items = list(pending.items())
+            if len(items) <= self.CHUNK_SIZE:
+                self._update(items)
+            else:
+                with transaction.atomic():
+                    for i in range(0, len(items), self.CHUNK_SIZE):
+                        self._update(items[i:i + self.CHUNK_SIZE])
+        except Exception:
+            # nieudany zapis wraca do puli - zostanie ponowiony przy kolejnym flush
+            with self._lock:
+                for sensor_id, timestamp in pending.items():
+                    current = self._pending.get(sensor_id)
+                    if current is None or timestamp > current:
+                        self._pending[sensor_id] = timestamp
+            raise
+
+        with self._lock:
+            self.flushes += 1
+            self.rows_flushed += len(pending)
+        return len(pending)
+
+    @staticmethod
+    def _update(items) -> None:
+        qn = connection.ops.quote_name
+        adapt = connection.ops.adapt_datetimefield_value
+        table = qn(Sensor._meta.db_table)
+        pk = qn(Sensor._meta.pk.column)
+        column = qn('last_communication')
+        values = ', '.join(['(%s, %s)'] * len(items))
+        params = [p for sensor_id, timestamp in items for p in (sensor_id, adapt(timestamp))]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"WITH heartbeat (sensor_id, ts) AS (VALUES {values}) "
+                f"UPDATE {table} SET {column} = heartbeat.ts FROM heartbeat "
+                f"WHERE {table}.{pk} = heartbeat.sensor_id "
+                f"AND ({table}.{column} IS NULL OR {table}.{column} < heartbeat.ts)",
+                params,
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'pending': len(self._pending),
+            'touches': self.touches,
+            'flushes': self.flushes,
+            'rows_flushed': self.rows_flushed,
+        }
@@ -0,0 +1,105 @@
+"""
+Trwały bufor odebranych wiadomości MQTT (topic, payload) - dopisywany w chwili odbioru.
+
+Subskrypcja z QoS 0 nie daje ponownego doręczenia, więc wiadomość trzymana tylko w
+kolejkach potoku ginie przy awarii procesu. Inbox dopisuje ją do segmentu na dysku
+(SegmentSpool) przed przekazaniem do potoku; potwierdzenie przesuwa się, gdy wiadomość
+opuści potok - zapisana do bufora pomiarów, wysłana do alarmów albo odrzucona.
+Potok kończy wiadomości w dowolnej kolejności, dlatego potwierdzana jest tylko ciągła
+część od najstarszej. Po restarcie niepotwierdzone wiadomości wracają do potoku
+(recover()); ponowny zapis pomiaru pomija ograniczenie unikalności (sensor, timestamp).
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from .spool import SegmentSpool, SpoolLocked
+
+
+class MessageInbox:
+    # jak często zapisywać pozycję potwierdzenia (zapis pliku ack) - opóźnienie grozi tylko powtórką
+    ACK_SECONDS = 0.5
+
+    def __init__(self, spool: SegmentSpool):
+        self.spool = spool
+        self._lock = threading.Lock()
+        # niepotwierdzone wiadomości z poprzedniego uruchomienia - odczytane od razu,
+        # żeby numery nowych wiadomości odpowiadały kolejnym rekordom bufora
+        self._recovered: List[Tuple[str, Any]] = [spool.get(timeout=0) for _ in range(spool.pending)]
+        self._next_seq = 0
+        # najstarsza wiadomość, która jeszcze nie opuściła potoku
+        self._watermark = 0
+        self._done = set()
+        self._last_ack = time.monotonic()
+        self.appended = 0
+        self.released = 0
+
+    @classmethod
+    def open(cls, name: str = '') -> Optional["MessageInbox"]:
+        """Inbox procesu akwizycji obok bufora pomiarów; None, gdy bufor jest wyłączony lub zajęty"""
+        if not getattr(settings, 'ACQUISITION_SPOOL_ENABLED', False):
+            return None
+        directory = getattr(settings, 'ACQUISITION_SPOOL_DIR', None) or os.path.join(settings.BASE_DIR, 'var', 'spool')
+        directory = os.path.join(directory, name, 'inbox') if name else os.path.join(directory, 'inbox')
+        try:
+            spool = SegmentSpool(
+                directory,
+                segment_bytes=getattr(settings, 'ACQUISITION_SPOOL_SEGMENT_MB', 64) * 1024 * 1024,
+                fsync_seconds=getattr(settings, 'ACQUISITION_SPOOL_FSYNC_SECONDS', 0.05),
+                memory_items=getattr(settings, 'ACQUISITION_PIPELINE_QUEUE_SIZE', 2000) * 4,
+            )
+        except SpoolLocked:
+            print(f"DB WARNING: bufor {directory} jest używany przez inny proces, wiadomości tylko w pamięci")
+            return None
+        inbox = cls(spool)
+        if inbox._recovered:
+            print(f"DB: Odtwarzanie {len(inbox._recovered)} nieprzetworzonych wiadomości z {directory}")
+        return inbox
+
+    def append(self, topic: str, payload) -> int:
+        """Dopisz odebraną wiadomość; zwraca jej numer do release()"""
+        with self._lock:
+            self.spool.append((topic, payload))
+            seq = self._next_seq
+            self._next_seq += 1
+            self.appended += 1
+            return seq
+
+    def recover(self) -> List[Tuple[str, Any]]:
+        """Wiadomości niepotwierdzone przed restartem; trafiają ponownie do potoku przez append()"""
+        recovered, self._recovered = self._recovered, []
+        return recovered
+
+    def release(self, seqs: Iterable[int]) -> None:
+        """Wiadomości opuściły potok; potwierdzana jest ciągła część od najstarszej"""
+        with self._lock:
+            self._done.update(seqs)
+            advanced = False
+            while self._watermark in self._done:
+                self._done.discard(self._watermark)
+                self.spool.get(timeout=0)
+                self._watermark += 1
+                self.released += 1
+                advanced = True
+            if advanced and time.monotonic() - self._last_ack >= self.ACK_SECONDS:
+                self._ack()
+
+    def _ack(self) -> None:
+        self.spool.ack()
+        self._last_ack = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            self._ack()
+        self.spool.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'appended': self.appended,
+            'released': self.released,
+            'in_flight': self._next_seq - self._watermark,
+            'spool': self.spool.get_stats(),
+        }
@@ -0,0 +1,147 @@
+"""
+Generator ruchu MQTT i pomiar wydajności akwizycji bez brokera i symulatora.
+
+Źródła wiadomości (offset w sekundach od startu, topic, payload w bytes):
+- synthetic_traffic - N czujników pogodowych nadających łącznie `rate` wiadomości/s,
+- load_recording    - nagranie NDJSON z liniami {"topic", "payload", "ts"}.
+replay() wysyła je w tempie nagrania (speed=2 - dwa razy szybciej, 0 - bez pauz).
+
+InProcessBroker zastępuje brokera: dostarcza wiadomość subskrybentom, których filtr
+pasuje do topicu - tak samo jak MQTTManager przekazuje ją do Pipeline.submit.
+"""
+import json
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .topic_router import TopicRouter
+
+Message = Tuple[float, str, bytes]
+
+# (metryka, jednostka, wartość bazowa, amplituda) - jednostki znane transformatorowi
+SYNTHETIC_METRICS = (
+    ("temperature", "C", 21.0, 3.0),
+    ("wind_speed", "m/s", 4.0, 2.0),
+    ("light", "lux", 300.0, 200.0),
+    ("power", "W", 800.0, 400.0),
+)
+
+
+def synthetic_traffic(sensors: int, rate: float, duration: Optional[float] = None, count: Optional[int] = None,
+                      start_ts: Optional[float] = None, seed: int = 0) -> Iterator[Message]:
+    """
+    Wiadomości krążące po `sensors` czujnikach (pokoje inside1..N, po kilka metryk na pokój).
+    Kończy się po `count` wiadomościach albo po `duration` sekundach ruchu.
+    """
+    if count is None and duration is None:
+        raise ValueError("Podaj liczbę wiadomości albo czas trwania")
+    if count is None:
+        count = int(duration * rate)
+    rng = random.Random(seed)
+    start_ts = time.time() if start_ts is None else start_ts
+    interval = 1.0 / rate if rate > 0 else 0.0
+    targets = []
+    for i in range(sensors):
+        metric, unit, base, spread = SYNTHETIC_METRICS[i % len(SYNTHETIC_METRICS)]
+        room = i // len(SYNTHETIC_METRICS) + 1
+        targets.append((f"szebi/weather/inside{room}/{metric}", metric, unit, base, spread))
+
+    for n in range(count):
+        topic, metric, unit, base, spread = targets[n % sensors]
+        offset = n * interval
+        payload = json.dumps({
+            "metric_name": metric,
+            "value": round(base + rng.uniform(-spread, spread), 3),
+            "unit": unit,
+            # timestamp unikalny dla czujnika - bez odrzuceń jako duplikaty
+            "ts": start_ts + offset if interval else start_ts + n * 1e-3,
+        }).encode()
+        yield offset, topic, payload
+
+
+def load_recording(path: str) -> Iterator[Message]:
+    """Nagranie NDJSON: payload jako obiekt JSON albo tekst, ts - czas odbioru (sekundy epoki)"""
+    first_ts = None
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            payload = record["payload"]
+            if not isinstance(payload, str):
+                payload = json.dumps(payload)
+            ts = float(record.get("ts") or 0.0)
+            if first_ts is None:
+                first_ts = ts
+            yield max(0.0, ts - first_ts), record["topic"], payload.encode()
+
+
+def replay(messages: Iterable[Message], publish: Callable[[str, bytes], Any], speed: float = 1.0) -> int:
+    """Wysyła wiadomości w tempie nagrania podzielonym przez `speed`; zwraca ich liczbę"""
+    started = time.monotonic()
+    sent = 0
+    for offset, topic, payload in messages:
+        if speed > 0:
+            delay = started + offset / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        publish(topic, payload)
+        sent += 1
+    return sent
+
+
+class InProcessBroker:
+    """Broker w procesie: dopasowanie filtrów subskrypcji tym samym routerem co akwizycja"""
+
+    def __init__(self):
+        self._router = TopicRouter()
+        self._subscribers: Dict[str, List[Callable[[str, bytes], Any]]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.unrouted = 0
+
+    def subscribe(self, topic_filter: str, callback: Callable[[str, bytes], Any]) -> None:
+        if topic_filter not in self._subscribers:
+            self._subscribers[topic_filter] = []
+            self._router.add(topic_filter, self._subscribers[topic_filter])
+        self._subscribers[topic_filter].append(callback)
+
+    def publish(self, topic: str, payload: bytes) -> None:
+        self.published += 1
+        match = self._router.match(topic)
+        if match is None:
+            self.unrouted += 1
+            return
+        for callback in match.target:
+            callback(topic, payload)
+            self.delivered += 1
+
+
+class QueueSampler:
+    """Wątek próbkujący głębokości kolejek; zapamiętuje maksimum każdej z nich"""
+
+    def __init__(self, probe: Callable[[], Dict[str, int]], interval: float = 0.05):
+        self.probe = probe
+        self.interval = interval
+        self.max_depths: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="acq-bench-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        for name, depth in self.probe().items():
+            if depth > self.max_depths.get(name, 0):
+                self.max_depths[name] = depth
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
@@ -0,0 +1,152 @@
+"""
+Kompaktowanie burz logów akwizycji.
+
+Komunikaty są grupowane po odcisku (poziom, moduł, czujnik, szablon). Szablon to treść
+z liczbami zamienionymi na "#" i bez fragmentu "raw:" - wartości i surowe wiadomości
+różnią się między powtórzeniami, topic zostaje (identyfikuje źródło, gdy brak czujnika).
+Pierwsze wystąpienie trafia do zapisu od razu i otwiera okno `window_seconds`; do jego końca
+kolejne tylko zwiększają licznik. Po zamknięciu okna, jeśli były powtórzenia, do bazy trafia
+jeden wiersz podsumowania: pierwsze powtórzenie z repeat_count (liczba powtórzeń), first_seen
+i last_seen. Wypisywanie na stdout jest ograniczone do `echo_limit` komunikatów odcisku na
+okno, a przy zamknięciu okna wypisywane jest podsumowanie pominiętych.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from django.utils import timezone
+
+from ..models import DataLog
+
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?')
+
+Fingerprint = Tuple[str, str, Optional[int], str]
+
+
+def message_template(message: str) -> str:
+    parts = []
+    for part in message.split(' | '):
+        if part.startswith('raw:'):
+            continue
+        parts.append(part if part.startswith('topic:') else _NUMBER.sub('#', part))
+    return ' | '.join(parts)
+
+
+def _sensor_id(log: DataLog) -> Optional[int]:
+    # pomiar przypięty do logu bez odpytywania bazy
+    if not DataLog._meta.get_field('measurement').is_cached(log) or log.measurement is None:
+        return None
+    return log.measurement.sensor_id
+
+
+class _Window:
+    __slots__ = ('repeat', 'count', 'first_seen', 'last_seen', 'echoed', 'opened_at')
+
+    def __init__(self, opened_at: float):
+        # pierwsze powtórzenie - wiersz podsumowania okna
+        self.repeat: Optional[DataLog] = None
+        self.count = 1
+        self.first_seen = None
+        self.last_seen = None
+        self.echoed = 0
+        self.opened_at = opened_at
+
+
+class LogAggregator:
+    def __init__(self, window_seconds: float = 60.0, echo_limit: int = 1, max_fingerprints: int = 10000):
+        self.window_seconds = window_seconds
+        self.echo_limit = echo_limit
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        # kolejność otwarcia okien - najstarsze na początku
+        self._windows: "OrderedDict[Fingerprint, _Window]" = OrderedDict()
+        self.received = 0
+        self.emitted = 0
+        self.suppressed_echo = 0
+
+    @staticmethod
+    def fingerprint(log: DataLog) -> Fingerprint:
+        return log.level, log.source, _sensor_id(log), message_template(log.message)
+
+    def add(self, log: DataLog, echo: bool = False, now: Optional[float] = None) -> List[DataLog]:
+        """
+        Dolicz komunikat. Zwraca logi gotowe do zapisu: pierwsze wystąpienie odcisku (lub każdy
+        log, gdy agregacja jest wyłączona - window_seconds <= 0) oraz podsumowanie okna zwolnionego
+        po przekroczeniu max_fingerprints.
+        """
+        now = time.monotonic() if now is None else now
+        seen = timezone.now()
+        log.first_seen = log.last_seen = seen
+        if self.window_seconds <= 0:
+            if echo:
+                print(log.message)
+            self.received += 1
+            self.emitted += 1
+            return [log]
+
+        key = self.fingerprint(log)
+        ready = []
+        with self._lock:
+            self.received += 1
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = _Window(now)
+                self.emitted += 1
+                ready.append(log)
+                if len(self._windows) > self.max_fingerprints:
+                    evicted = self._close(self._windows.popitem(last=False)[1])
+                    if evicted is not None:
+                        ready.append(evicted)
+            else:
+                window.count += 1
+                if window.repeat is None:
+                    window.repeat = log
+                    window.first_seen = seen
+                window.last_seen = seen
+            print_now = echo and window.echoed < self.echo_limit
+            if print_now:
+                window.echoed += 1
+            elif echo:
+                self.suppressed_echo += 1
+        if print_now:
+            print(log.message)
+        return ready
+
+    def collect(self, now: Optional[float] = None, force: bool = False) -> List[DataLog]:
+        """Logi z okien, które minęły (force - wszystkie, np. przy zamykaniu)"""
+        now = time.monotonic() if now is None else now
+        ready = []
+        with self._lock:
+            while self._windows:
+                key, window = next(iter(self._windows.items()))
+                if not force and now - window.opened_at < self.window_seconds:
+                    break
+                del self._windows[key]
+                summary = self._close(window)
+                if summary is not None:
+                    ready.append(summary)
+        return ready
+
+    def _close(self, window: _Window) -> Optional[DataLog]:
+        """Podsumowanie powtórzeń okna; None, gdy komunikat wystąpił raz (już zapisany)"""
+        log = window.repeat
+        if log is None:
+            return None
+        log.repeat_count = window.count - 1
+        log.first_seen = window.first_seen
+        log.last_seen = window.last_seen
+        if window.echoed and window.count > window.echoed:
+            print(f"[{log.level}] {message_template(log.message)} - powtórzono {window.count} razy "
+                  f"w {self.window_seconds:g} s")
+        self.emitted += 1
+        return log
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'open_windows': len(self._windows),
+            'received': self.received,
+            'emitted': self.emitted,
+            'suppressed_echo': self.suppressed_echo,
+        }
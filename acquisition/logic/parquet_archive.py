@@ -0,0 +1,233 @@
+"""
+Kolumnowe archiwum historii pomiarów (Parquet).
+
+Układ katalogów (partycjonowanie w stylu Hive):
+    <ACQUISITION_PARQUET_DIR>/<źródło>/metric=<typ czujnika>/date=<RRRR-MM-DD>/part-0.parquet
+Źródła: "raw" - surowe pomiary, "hourly" - agregaty godzinowe (MeasurementRollup).
+
+Eksport dnia czyta pomiary posortowane po typie czujnika i zapisuje jeden plik na typ,
+więc w pamięci jest najwyżej jeden typ z jednej doby. Pliki są podmieniane atomowo
+(os.replace pliku tymczasowego z kropką - pomijanego przez odczyt), więc czytelnik widzi
+stary albo nowy plik typu, nigdy brak danych. Ponowny eksport dnia nadpisuje go w całości:
+typy, które tej doby nie mają już danych, są usuwane dopiero po zapisaniu pozostałych.
+Odczyt (read_frame/read_columns) używa pyarrow.dataset: partycje spoza zakresu dat
+i typu są pomijane bez otwierania plików, a filtr czujników i czasu trafia do
+skanera Parquet (statystyki grup wierszy) - bez obiektów ORM.
+
+pyarrow jest zależnością opcjonalną; bez niego eksport i odczyt zgłaszają ImproperlyConfigured.
+"""
+import datetime
+import os
+import shutil
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from ..models import Measurement, MeasurementRollup, RollupResolution
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = ds = pq = None
+
+RAW = 'raw'
+HOURLY = 'hourly'
+
+_UTC = datetime.timezone.utc
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImproperlyConfigured("Archiwum Parquet wymaga pakietu pyarrow (pip install pyarrow)")
+
+
+def archive_dir() -> str:
+    return str(getattr(settings, 'ACQUISITION_PARQUET_DIR', os.path.join(settings.BASE_DIR, 'var', 'parquet')))
+
+
+def _compression() -> str:
+    return getattr(settings, 'ACQUISITION_PARQUET_COMPRESSION', 'zstd')
+
+
+class _Source:
+    """Źródło archiwum: zapytanie dla doby i kolumny pliku (bez kolumny typu czujnika)"""
+
+    def __init__(self, name: str, time_field: str, fields: List[str], columns: List[str], types):
+        self.name = name
+        self.time_field = time_field
+        self.fields = fields
+        self.columns = columns
+        self.types = types
+
+    def rows(self, start: datetime.datetime, end: datetime.datetime) -> Iterable[tuple]:
+        if self.name == RAW:
+            queryset = Measurement.objects.all()
+        else:
+            queryset = MeasurementRollup.objects.filter(resolution=RollupResolution.HOUR)
+        return (
+            queryset.filter(**{f'{self.time_field}__gte': start, f'{self.time_field}__lt': end})
+            .order_by('sensor__type__name', 'sensor_id', self.time_field)
+            .values_list('sensor__type__name', *self.fields)
+            .iterator(chunk_size=getattr(settings, 'ACQUISITION_EXPORT_CHUNK_SIZE', 5000))
+        )
+
+
+def _sources() -> Dict[str, _Source]:
+    _require_pyarrow()
+    timestamp = pa.timestamp('us', tz='UTC')
+    return {
+        RAW: _Source(
+            RAW, 'timestamp',
+            ['sensor_id', 'timestamp', 'value', 'status'],
+            ['sensor_id', 'timestamp', 'value', 'status'],
+            [pa.int32(), timestamp, pa.float64(), pa.string()],
+        ),
+        HOURLY: _Source(
+            HOURLY, 'bucket_start',
+            ['sensor_id', 'bucket_start', 'min_value', 'max_value', 'sum_value', 'count', 'last_value'],
+            ['sensor_id', 'timestamp', 'min_value', 'max_value', 'sum_value', 'count', 'last_value'],
+            [pa.int32(), timestamp, pa.float64(), pa.float64(), pa.float64(), pa.int64(), pa.float64()],
+        ),
+    }
+
+
+def _day_bounds(day: datetime.date):
+    start = datetime.datetime.combine(day, datetime.time.min, tzinfo=_UTC)
+    return start, start + datetime.timedelta(days=1)
+
+
+def _partition_path(root: str, source: str, metric: str, day: datetime.date) -> str:
+    return os.path.join(root, source, f"metric={quote(metric, safe='')}", f"date={day.isoformat()}")
+
+
+def _write_partition(path: str, source: _Source, columns: List[list]) -> None:
+    arrays = [pa.array(values, type=type_) for values, type_ in zip(columns, source.types)]
+    if source.name == RAW:
+        # kilka wartości statusu na miliony wierszy - kodowanie słownikowe
+        arrays[3] = arrays[3].dictionary_encode()
+    table = pa.Table.from_arrays(arrays, names=source.columns)
+
+    os.makedirs(path, exist_ok=True)
+    target = os.path.join(path, 'part-0.parquet')
+    # nazwa z kropką - pyarrow.dataset pomija taki plik, gdy eksport jeszcze trwa
+    tmp = os.path.join(path, '.part-0.parquet.tmp')
+    pq.write_table(table, tmp, compression=_compression())
+    os.replace(tmp, target)
+
+
+def export_day(day: datetime.date, source: str = RAW, root: Optional[str] = None) -> Dict[str, int]:
+    """Zapisz dobę (UTC) do archiwum; zwraca liczbę wierszy dla każdego typu czujnika"""
+    spec = _sources()[source]
+    root = root or archive_dir()
+    start, end = _day_bounds(day)
+
+    written: Dict[str, int] = {}
+    metric = None
+    columns: List[list] = []
+    for row in spec.rows(start, end):
+        if row[0] != metric:
+            if metric is not None:
+                _write_partition(_partition_path(root, source, metric, day), spec, columns)
+                written[metric] = len(columns[0])
+            metric = row[0]
+            columns = [[] for _ in spec.columns]
+        for column, value in zip(columns, row[1:]):
+            column.append(value)
+    if metric is not None:
+        _write_partition(_partition_path(root, source, metric, day), spec, columns)
+        written[metric] = len(columns[0])
+
+    # poprzedni eksport tej doby - typy bez danych nie mogą zostać w archiwum
+    current = {os.path.dirname(_partition_path(root, source, name, day)) for name in written}
+    for entry in _existing_metrics(root, source):
+        if os.path.join(root, source, entry) in current:
+            continue
+        stale = os.path.join(root, source, entry, f"date={day.isoformat()}")
+        if os.path.isdir(stale):
+            shutil.rmtree(stale)
+    return written
+
+
+def export_range(start_day: datetime.date, end_day: datetime.date, source: str = RAW,
+                 root: Optional[str] = None) -> int:
+    """Eksport dób [start_day, end_day]; zwraca łączną liczbę wierszy"""
+    total = 0
+    day = start_day
+    while day <= end_day:
+        total += sum(export_day(day, source, root).values())
+        day += datetime.timedelta(days=1)
+    return total
+
+
+def _existing_metrics(root: str, source: str) -> List[str]:
+    path = os.path.join(root, source)
+    if not os.path.isdir(path):
+        return []
+    return [entry for entry in os.listdir(path) if entry.startswith('metric=')]
+
+
+# -------------------
+# Odczyt
+# -------------------
+def _dataset(source: str, root: Optional[str]):
+    _require_pyarrow()
+    path = os.path.join(root or archive_dir(), source)
+    if not os.path.isdir(path):
+        return None
+    partitioning = ds.partitioning(pa.schema([('metric', pa.string()), ('date', pa.string())]), flavor='hive')
+    return ds.dataset(path, format='parquet', partitioning=partitioning)
+
+
+def _filter(metric: Optional[str], sensor_ids: Optional[Iterable[int]],
+            start: Optional[datetime.datetime], end: Optional[datetime.datetime]):
+    timestamp = pa.timestamp('us', tz='UTC')
+    conditions = []
+    if metric:
+        conditions.append(ds.field('metric') == metric)
+    if sensor_ids is not None:
+        conditions.append(ds.field('sensor_id').isin(list(sensor_ids)))
+    if start is not None:
+        start = start if start.tzinfo else start.replace(tzinfo=_UTC)
+        # warunek na partycji dnia pomija katalogi bez otwierania plików
+        conditions.append(ds.field('date') >= start.astimezone(_UTC).date().isoformat())
+        conditions.append(ds.field('timestamp') >= pa.scalar(start, type=timestamp))
+    if end is not None:
+        end = end if end.tzinfo else end.replace(tzinfo=_UTC)
+        conditions.append(ds.field('date') <= end.astimezone(_UTC).date().isoformat())
+        conditions.append(ds.field('timestamp') <= pa.scalar(end, type=timestamp))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_table(source: str = RAW, metric: Optional[str] = None, sensor_ids: Optional[Iterable[int]] = None,
+               start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+               columns: Optional[List[str]] = None, root: Optional[str] = None):
+    """Tabela pyarrow z archiwum, posortowana po czujniku i czasie"""
+    dataset = _dataset(source, root)
+    if dataset is None:
+        spec = _sources()[source]
+        names = columns or spec.columns + ['metric']
+        schema = pa.schema([(n, t) for n, t in zip(spec.columns, spec.types)] + [('metric', pa.string())])
+        return schema.empty_table().select(names)
+    # kolumny sortowania są czytane zawsze, a odrzucane po posortowaniu
+    scan = None if columns is None else list(dict.fromkeys(list(columns) + ['sensor_id', 'timestamp']))
+    table = dataset.to_table(columns=scan, filter=_filter(metric, sensor_ids, start, end))
+    table = table.sort_by([('sensor_id', 'ascending'), ('timestamp', 'ascending')])
+    return table if columns is None else table.select(columns)
+
+
+def read_frame(*args, **kwargs):
+    """Jak read_table, jako pandas.DataFrame"""
+    return read_table(*args, **kwargs).to_pandas()
+
+
+def read_columns(*args, **kwargs) -> Dict[str, "object"]:
+    """Jak read_table, jako słownik kolumn NumPy"""
+    table = read_table(*args, **kwargs)
+    return {name: table.column(name).to_numpy() for name in table.column_names}
@@ -0,0 +1,175 @@
+"""
+Miesięczne partycjonowanie (PostgreSQL, PARTITION BY RANGE) tabel pomiarów i logów.
+
+Partycje nazywane są <tabela>_pRRRRMM i obejmują [początek miesiąca, początek kolejnego).
+Wiersze spoza istniejących partycji trafiają do <tabela>_default, więc zapis nigdy
+nie zawodzi z powodu brakującej partycji. Retencja usuwa całe partycje (DROP TABLE)
+zamiast DELETE - bez martwych krotek i presji na VACUUM; liczniki SensorStatistics
+są pomniejszane o pomiary usuwanej partycji w tej samej transakcji.
+Na innych bazach (SQLite w testach) wszystkie operacje są pomijane.
+"""
+import datetime
+import re
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection as default_connection, transaction
+from django.utils import timezone
+
+from ..models import Measurement
+from .sensor_statistics import subtract_table_counts
+
+# tabela -> (kolumna klucza partycjonowania, kolumna klucza głównego)
+PARTITIONED_TABLES: Dict[str, Tuple[str, str]] = {
+    'acquisition_measurement': ('timestamp', 'measurement_id'),
+    'acquisition_datalog': ('timestamp', 'log_id'),
+}
+
+_PARTITION_SUFFIX = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def is_supported(connection=None) -> bool:
+    return (connection or default_connection).vendor == 'postgresql'
+
+
+def month_start(value: datetime.datetime) -> datetime.datetime:
+    """Początek miesiąca (UTC) zawierającego podaną chwilę"""
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc)
+    return datetime.datetime(value.year, value.month, 1, tzinfo=datetime.timezone.utc)
+
+
+def add_months(month: datetime.datetime, count: int) -> datetime.datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+def partition_name(table: str, month: datetime.datetime) -> str:
+    return f"{table}_p{month.year:04d}{month.month:02d}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def _bound(month: datetime.datetime) -> str:
+    return month.strftime('%Y-%m-%d 00:00:00+00')
+
+
+def list_partitions(cursor, table: str) -> Dict[datetime.datetime, str]:
+    """Istniejące partycje miesięczne tabeli: początek miesiąca -> nazwa"""
+    cursor.execute(
+        """
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = %s
+        """,
+        [table],
+    )
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        match = _PARTITION_SUFFIX.search(name)
+        if match:
+            month = datetime.datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=datetime.timezone.utc)
+            partitions[month] = name
+    return partitions
+
+
+def create_partition(cursor, table: str, month: datetime.datetime) -> str:
+    """
+    Utwórz partycję miesiąca. Jeśli w partycji domyślnej są już wiersze z tego zakresu,
+    są do niej przenoszone (PostgreSQL nie pozwala dołączyć partycji, której zakres
+    pokrywa wiersze w partycji domyślnej).
+    """
+    column, _ = PARTITIONED_TABLES[table]
+    qn = cursor.db.ops.quote_name
+    name = partition_name(table, month)
+    default = default_partition_name(table)
+    start, end = _bound(month), _bound(add_months(month, 1))
+
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {qn(default)} WHERE {qn(column)} >= %s AND {qn(column)} < %s)",
+        [start, end],
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {qn(name)} PARTITION OF {qn(table)} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+        return name
+
+    with transaction.atomic(using=cursor.db.alias):
+        cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(default)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(name)} PARTITION OF {qn(table)} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {qn(default)} WHERE {qn(column)} >= %s AND {qn(column)} < %s RETURNING *) "
+            f"INSERT INTO {qn(name)} SELECT * FROM moved",
+            [start, end],
+        )
+        cursor.execute(f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(default)} DEFAULT")
+    return name
+
+
+def ensure_partitions(months_ahead: Optional[int] = None, now: Optional[datetime.datetime] = None,
+                      connection=None) -> List[str]:
+    """Utwórz brakujące partycje od bieżącego miesiąca do months_ahead miesięcy naprzód"""
+    connection = connection or default_connection
+    if not is_supported(connection):
+        return []
+    if months_ahead is None:
+        months_ahead = getattr(settings, 'ACQUISITION_PARTITION_MONTHS_AHEAD', 3)
+    current = month_start(now or timezone.now())
+
+    created = []
+    with connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            existing = list_partitions(cursor, table)
+            for offset in range(months_ahead + 1):
+                month = add_months(current, offset)
+                if month not in existing:
+                    created.append(create_partition(cursor, table, month))
+    return created
+
+
+def retention_months() -> Dict[str, int]:
+    """Okres przechowywania (w miesiącach) per tabela; 0 - bez limitu"""
+    return {
+        'acquisition_measurement': getattr(settings, 'ACQUISITION_MEASUREMENT_RETENTION_MONTHS', 0),
+        'acquisition_datalog': getattr(settings, 'ACQUISITION_DATALOG_RETENTION_MONTHS', 3),
+    }
+
+
+def expired_partitions(partitions: Dict[datetime.datetime, str], keep_months: int,
+                       now: datetime.datetime) -> List[str]:
+    """Partycje, które w całości są starsze niż keep_months pełnych miesięcy przed bieżącym"""
+    if keep_months <= 0:
+        return []
+    cutoff = add_months(month_start(now), -keep_months)
+    return [name for month, name in sorted(partitions.items()) if month < cutoff]
+
+
+def drop_expired_partitions(now: Optional[datetime.datetime] = None, dry_run: bool = False,
+                            connection=None) -> List[str]:
+    """Usuń partycje starsze niż okres retencji (DROP TABLE zamiast DELETE)"""
+    connection = connection or default_connection
+    if not is_supported(connection):
+        return []
+    now = now or timezone.now()
+    qn = connection.ops.quote_name
+
+    dropped = []
+    with connection.cursor() as cursor:
+        for table, keep_months in retention_months().items():
+            for name in expired_partitions(list_partitions(cursor, table), keep_months, now):
+                if not dry_run:
+                    with transaction.atomic(using=connection.alias):
+                        if table == Measurement._meta.db_table:
+                            subtract_table_counts(cursor, name)
+                        cursor.execute(f"DROP TABLE {qn(name)}")
+                dropped.append(name)
+    return dropped
@@ -0,0 +1,129 @@
+"""
+Dekodowanie wiadomości MQTT bez pośredniego str.
+
+Payload trafia z paho jako bytes i w tej postaci jest przekazywany do dekodera:
+orjson, a gdy go brak - msgspec, a na końcu json z biblioteki standardowej.
+Wynik mapowany jest na lekkie obiekty ze __slots__ - osobny schemat dla każdej
+rodziny topiców - zamiast przekazywać dalej słownik.
+Do logów trafia tylko początek surowej wiadomości (payload_preview).
+"""
+import json
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+Payload = Union[bytes, bytearray, memoryview, str]
+
+# maksymalna długość surowej wiadomości w logach
+PREVIEW_LENGTH = 120
+
+
+class PayloadError(ValueError):
+    """Wiadomość nie jest poprawnym obiektem JSON"""
+
+
+if orjson is not None:
+    DECODER = 'orjson'
+
+    def _loads(payload: Payload) -> Any:
+        return orjson.loads(payload)
+
+    _DECODE_ERRORS = (orjson.JSONDecodeError,)
+elif msgspec is not None:
+    DECODER = 'msgspec'
+    _decoder = msgspec.json.Decoder()
+
+    def _loads(payload: Payload) -> Any:
+        return _decoder.decode(payload)
+
+    _DECODE_ERRORS = (msgspec.DecodeError,)
+else:
+    DECODER = 'json'
+
+    def _loads(payload: Payload) -> Any:
+        if isinstance(payload, memoryview):
+            payload = payload.tobytes()
+        return json.loads(payload)
+
+    _DECODE_ERRORS = (ValueError,)
+
+
+def decode_payload(payload: Payload) -> dict:
+    """Dekoduje obiekt JSON wprost z bytes/memoryview; PayloadError dla błędnej wiadomości"""
+    try:
+        data = _loads(payload)
+    except _DECODE_ERRORS as e:
+        raise PayloadError(str(e)) from e
+    if not isinstance(data, dict):
+        raise PayloadError(f"oczekiwano obiektu JSON, otrzymano {type(data).__name__}")
+    return data
+
+
+def payload_preview(payload: Optional[Payload], limit: int = PREVIEW_LENGTH) -> Optional[str]:
+    """Początek wiadomości do logów - dekodowany jest tylko fragment, nie cały payload"""
+    if payload is None or isinstance(payload, str):
+        return payload if payload is None or len(payload) <= limit else payload[:limit] + '...'
+    view = memoryview(payload)
+    text = bytes(view[:limit]).decode('utf-8', errors='replace')
+    return text + '...' if len(view) > limit else text
+
+
+# -------------------
+# Schematy rodzin topiców
+# -------------------
+class MeasurementPayload:
+    """Pomiar: wartość liczbowa, jednostka i czas (sekundy epoki)"""
+
+    __slots__ = ('metric_name', 'value', 'unit', 'ts')
+
+    def __init__(self, metric_name: Optional[str], value: float, unit: str = "standard", ts: Optional[float] = None):
+        self.metric_name = metric_name
+        self.value = value
+        self.unit = unit
+        self.ts = ts
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MeasurementPayload":
+        if "value" in data:
+            value = data["value"]
+        elif "is_active" in data:
+            value = data.get("level", 1.0 if data["is_active"] else 0.0)
+        else:
+            value = 0.0
+        return cls(data.get("metric_name"), value, data.get("unit", "standard"), data.get("ts"))
+
+    def __repr__(self):
+        return (f"{type(self).__name__}(metric_name={self.metric_name!r}, value={self.value!r}, "
+                f"unit={self.unit!r}, ts={self.ts!r})")
+
+
+class WeatherPayload(MeasurementPayload):
+    """szebi/weather/<uuid>/<metryka>"""
+    __slots__ = ()
+
+
+class DeviceStatePayload(MeasurementPayload):
+    """szebi/device/state/<uuid>/... - stan urządzenia (is_active, level)"""
+    __slots__ = ()
+
+
+class StatusPayload:
+    """szebi/status - tryby pracy systemu"""
+
+    __slots__ = ('consumption_mode', 'charging_mode')
+
+    def __init__(self, consumption_mode=None, charging_mode=None):
+        self.consumption_mode = consumption_mode
+        self.charging_mode = charging_mode
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StatusPayload":
+        return cls(data.get("consumption_mode"), data.get("charging_mode"))
@@ -0,0 +1,318 @@
+import collections
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Any
+
+from django.db import connections
+
+
+class PipelineItem:
+    """Pojedyncza wiadomość MQTT przechodząca przez kolejne etapy potoku."""
+
+    __slots__ = ('topic', 'payload', 'received_at', 'env_uuid', 'metric_name', 'data', 'measurement', 'late', 'seq')
+
+    def __init__(self, topic: str, payload, received_at: Optional[float] = None, seq: Optional[int] = None):
+        self.topic = topic
+        self.payload = payload
+        self.received_at = received_at if received_at is not None else time.monotonic()
+        self.env_uuid = None
+        self.metric_name = None
+        self.data = None
+        self.measurement = None
+        # pomiar spóźniony względem znaku wodnego czujnika (etap reorder)
+        self.late = False
+        # numer wiadomości w MessageInbox (None - bez trwałego bufora odbioru)
+        self.seq = seq
+
+
+class StageStats:
+    """Liczniki jednego etapu: przetworzone elementy i opóźnienie wsadów."""
+
+    # współczynnik średniej kroczącej (EWMA) opóźnień
+    ALPHA = 0.1
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.items_in = 0
+        self.items_out = 0
+        self.batches = 0
+        self.errors = 0
+        self.avg_batch_latency_ms = 0.0
+        self.max_batch_latency_ms = 0.0
+
+    def record(self, items_in: int, items_out: int, latency_s: float):
+        latency_ms = latency_s * 1000.0
+        with self._lock:
+            self.items_in += items_in
+            self.items_out += items_out
+            self.batches += 1
+            if self.batches == 1:
+                self.avg_batch_latency_ms = latency_ms
+            else:
+                self.avg_batch_latency_ms += self.ALPHA * (latency_ms - self.avg_batch_latency_ms)
+            self.max_batch_latency_ms = max(self.max_batch_latency_ms, latency_ms)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+
+class Stage:
+    """
+    Etap potoku: pula wątków pobierająca mikro-wsady z ograniczonej kolejki wejściowej,
+    przetwarzająca je funkcją `handler` i przekazująca wynik do kolejki kolejnego etapu.
+    Pełna kolejka wyjściowa blokuje etap (backpressure).
+
+    Etap ze stanem może podać `tick(force)` - wołane, gdy brak wejścia, oraz z force=True
+    przy zatrzymaniu potoku; zwrócone elementy idą do kolejnego etapu (np. bufor reorder).
+
+    `on_drop` (ustawiane przez Pipeline) dostaje elementy wsadu, których etap nie przekazał
+    dalej; etap z tick może je wstrzymać, więc dla niego tylko przy błędzie wsadu.
+    """
+
+    # jak długo wątek czeka na pierwszy element wsadu, zanim sprawdzi sygnał zatrzymania
+    POLL_TIMEOUT = 0.1
+
+    def __init__(self, name: str, handler: Callable[[List[Any]], List[Any]],
+                 workers: int = 1, batch_size: int = 64, queue_size: int = 2000,
+                 tick: Optional[Callable[[bool], List[Any]]] = None):
+        self.name = name
+        self.handler = handler
+        self.tick = tick
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.input: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.output: Optional[queue.Queue] = None
+        self.stats = StageStats()
+        self.on_drop: Optional[Callable[[List[Any]], None]] = None
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        self._stop_event.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"acq-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 2.0):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def flush(self):
+        """Oddaje elementy wstrzymane przez tick; wołane przez Pipeline.stop po opróżnieniu wejścia"""
+        if self.tick is None:
+            return
+        results = self._run_tick(True)
+        if self.output is not None:
+            for item in results:
+                self.output.put(item)
+
+    def _run_tick(self, force: bool) -> List[Any]:
+        try:
+            return self.tick(force) or []
+        except Exception as e:
+            print(f"PIPELINE ERROR [{self.name}]: {e}")
+            self.stats.record_error()
+            return []
+
+    def _next_batch(self) -> List[Any]:
+        try:
+            batch = [self.input.get(timeout=self.POLL_TIMEOUT)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.input.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _put(self, item):
+        while not self._stop_event.is_set():
+            try:
+                self.output.put(item, timeout=self.POLL_TIMEOUT)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self):
+        try:
+            while not self._stop_event.is_set():
+                batch = self._next_batch()
+                if not batch:
+                    if self.tick is not None and self.output is not None:
+                        for item in self._run_tick(False):
+                            self._put(item)
+                    continue
+
+                started = time.perf_counter()
+                failed = False
+                try:
+                    results = self.handler(batch) or []
+                except Exception as e:
+                    print(f"PIPELINE ERROR [{self.name}]: {e}")
+                    self.stats.record_error()
+                    results = []
+                    failed = True
+                self.stats.record(len(batch), len(results), time.perf_counter() - started)
+                if self.on_drop is not None and (self.tick is None or failed) and len(results) < len(batch):
+                    kept = {id(item) for item in results}
+                    self.on_drop([item for item in batch if id(item) not in kept])
+
+                if self.output is not None:
+                    for item in results:
+                        self._put(item)
+
+                # dopiero po przekazaniu wyników dalej - stop() czeka na opróżnienie etapu
+                for _ in batch:
+                    self.input.task_done()
+        finally:
+            # każdy wątek ma własne połączenie z bazą - zamykamy je przy wyjściu
+            connections.close_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'queue_depth': self.input.qsize(),
+            'queue_capacity': self.input.maxsize,
+            'items_in': self.stats.items_in,
+            'items_out': self.stats.items_out,
+            'batches': self.stats.batches,
+            'errors': self.stats.errors,
+            'avg_batch_latency_ms': round(self.stats.avg_batch_latency_ms, 3),
+            'max_batch_latency_ms': round(self.stats.max_batch_latency_ms, 3),
+        }
+
+
+class Pipeline:
+    """
+    Wieloetapowy potok mikro-wsadowy.
+    Etapy łączone są ograniczonymi kolejkami; ostatni etap mierzy opóźnienie end-to-end.
+
+    Z `inbox` (MessageInbox) wiadomość jest dopisywana na dysk przy odbiorze i potwierdzana,
+    gdy opuści potok - po ostatnim etapie albo odrzucona po drodze.
+    """
+
+    # liczba ostatnich opóźnień end-to-end, z których liczone są percentyle
+    LATENCY_SAMPLES = 10000
+
+    def __init__(self, stages: List[Stage], inbox=None):
+        if not stages:
+            raise ValueError("Potok wymaga co najmniej jednego etapu")
+        self.stages = stages
+        self.inbox = inbox
+        for current, following in zip(stages, stages[1:]):
+            current.output = following.input
+            if inbox is not None:
+                current.on_drop = self._release
+
+        # ostatni etap raportuje czas od odbioru wiadomości
+        last = stages[-1]
+        last_handler = last.handler
+
+        def _measure_end_to_end(batch):
+            try:
+                results = last_handler(batch)
+            finally:
+                self._release(batch)
+            now = time.monotonic()
+            for item in batch:
+                self._record_end_to_end(now - item.received_at)
+            return results
+
+        last.handler = _measure_end_to_end
+
+        self._latency_lock = threading.Lock()
+        # ostatnie opóźnienia end-to-end (ms) do percentyli
+        self._recent_latencies = collections.deque(maxlen=self.LATENCY_SAMPLES)
+        self.completed = 0
+        self.avg_end_to_end_ms = 0.0
+        self.max_end_to_end_ms = 0.0
+
+    def _release(self, items: List[Any]) -> None:
+        if self.inbox is not None:
+            self.inbox.release(item.seq for item in items if item.seq is not None)
+
+    def _record_end_to_end(self, latency_s: float):
+        latency_ms = latency_s * 1000.0
+        with self._latency_lock:
+            self.completed += 1
+            self._recent_latencies.append(latency_ms)
+            if self.completed == 1:
+                self.avg_end_to_end_ms = latency_ms
+            else:
+                self.avg_end_to_end_ms += StageStats.ALPHA * (latency_ms - self.avg_end_to_end_ms)
+            self.max_end_to_end_ms = max(self.max_end_to_end_ms, latency_ms)
+
+    def latency_percentiles(self, *percentiles: float) -> List[float]:
+        """Percentyle opóźnienia end-to-end (ms) z ostatnich LATENCY_SAMPLES wiadomości"""
+        return compute_percentiles(self.latency_samples(), *percentiles)
+
+    def latency_samples(self) -> List[float]:
+        """Ostatnie opóźnienia end-to-end (ms), od najstarszego"""
+        with self._latency_lock:
+            return list(self._recent_latencies)
+
+    @property
+    def input(self) -> queue.Queue:
+        return self.stages[0].input
+
+    def submit(self, topic: str, payload) -> None:
+        """Przyjmuje wiadomość z MQTT. Blokuje, gdy potok jest przepełniony."""
+        seq = self.inbox.append(topic, payload) if self.inbox is not None else None
+        self.input.put(PipelineItem(topic, payload, seq=seq))
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        if self.inbox is not None:
+            # wiadomości, które przed awarią nie opuściły potoku
+            for topic, payload in self.inbox.recover():
+                self.submit(topic, payload)
+
+    def stop(self, drain_timeout: float = 5.0):
+        """Zatrzymuje etapy po kolei, dając każdemu szansę opróżnić kolejkę."""
+        deadline = time.monotonic() + drain_timeout
+        for stage in self.stages:
+            while stage.input.unfinished_tasks and time.monotonic() < deadline:
+                time.sleep(0.01)
+            stage.flush()
+            stage.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        p50, p99 = self.latency_percentiles(50, 99)
+        return {
+            'stages': {stage.name: stage.get_stats() for stage in self.stages},
+            'completed': self.completed,
+            'avg_end_to_end_ms': round(self.avg_end_to_end_ms, 3),
+            'p50_end_to_end_ms': round(p50, 3),
+            'p99_end_to_end_ms': round(p99, 3),
+            'max_end_to_end_ms': round(self.max_end_to_end_ms, 3),
+            'inbox': self.inbox.get_stats() if self.inbox is not None else None,
+        }
+
+
+def compute_percentiles(samples: List[float], *percentiles: float) -> List[float]:
+    """Percentyle metodą najbliższej pozycji; 0.0 dla pustej próbki"""
+    ordered = sorted(samples)
+    if not ordered:
+        return [0.0 for _ in percentiles]
+    return [ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))] for p in percentiles]
+
+
+def parse_worker_counts(raw: str) -> Dict[str, int]:
+    """Parsuje konfigurację w postaci "parse=2,resolve=2" na słownik."""
+    counts = {}
+    for part in (raw or '').split(','):
+        if '=' not in part:
+            continue
+        name, value = part.split('=', 1)
+        try:
+            counts[name.strip()] = int(value)
+        except ValueError:
+            continue
+    return counts
@@ -0,0 +1,123 @@
+"""
+Bufor porządkujący pomiary w czasie zdarzeń (timestamp z payloadu), osobno dla każdego czujnika.
+
+Element czeka w kopcu czujnika, aż znak wodny (najnowszy timestamp czujnika minus
+`lateness_seconds`) go minie albo aż przeleży w buforze `lateness_seconds` czasu
+rzeczywistego - czujnik nadający rzadko nie blokuje swoich pomiarów. Elementy
+wychodzą w kolejności timestampów. Pomiar starszy niż ostatni wydany dla czujnika
+jest spóźniony: push() zwraca False i nie buforuje go (ścieżka danych spóźnionych).
+Przy `lateness_seconds` <= 0 (domyślnie) bufor niczego nie wstrzymuje - tylko wykrywa spóźnione.
+
+Bufor chroniony blokadą - pop_ready(force=True) woła też wątek zatrzymujący potok.
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class _SensorBuffer:
+    __slots__ = ('heap', 'newest', 'released')
+
+    def __init__(self):
+        # (timestamp, numer kolejny, element)
+        self.heap: List[Tuple[float, int, Any]] = []
+        self.newest: Optional[float] = None
+        self.released: Optional[float] = None
+
+    def pop_until(self, limit: float, out: List[Any]) -> None:
+        while self.heap and self.heap[0][0] <= limit:
+            key, _, item = heapq.heappop(self.heap)
+            self.released = key
+            out.append(item)
+
+
+class ReorderBuffer:
+    def __init__(self, lateness_seconds: float = 0.0, max_per_sensor: int = 1000):
+        self.lateness = lateness_seconds
+        self.max_per_sensor = max_per_sensor
+        self._lock = threading.Lock()
+        self._sensors: Dict[Any, _SensorBuffer] = {}
+        # czujniki, których znak wodny przesunął się od ostatniego pop_ready
+        self._advanced = set()
+        # (czas przyjęcia, czujnik, timestamp) - czasy przyjęcia rosną, więc kolejka jest posortowana
+        self._arrivals: deque = deque()
+        self._ready: List[Any] = []
+        self._seq = itertools.count()
+
+        self.received = 0
+        self.released = 0
+        self.late = 0
+        self.reordered = 0
+        self.forced = 0
+
+    def push(self, sensor_id, timestamp: float, item: Any, now: Optional[float] = None) -> bool:
+        """Przyjmij element; False - spóźniony (starszy niż ostatni wydany), nie trafia do bufora"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.received += 1
+            sensor = self._sensors.get(sensor_id)
+            if sensor is None:
+                sensor = self._sensors[sensor_id] = _SensorBuffer()
+            if sensor.released is not None and timestamp < sensor.released:
+                self.late += 1
+                return False
+
+            if sensor.newest is not None and timestamp < sensor.newest:
+                self.reordered += 1
+            if sensor.newest is None or timestamp > sensor.newest:
+                sensor.newest = timestamp
+                self._advanced.add(sensor_id)
+
+            if self.lateness <= 0:
+                sensor.released = timestamp
+                self._ready.append(item)
+                return True
+
+            heapq.heappush(sensor.heap, (timestamp, next(self._seq), item))
+            self._arrivals.append((now, sensor_id, timestamp))
+            if len(sensor.heap) > self.max_per_sensor:
+                # przepełniony kopiec - najstarszy element wychodzi przed znakiem wodnym
+                self.forced += 1
+                sensor.pop_until(sensor.heap[0][0], self._ready)
+            return True
+
+    def pop_ready(self, now: Optional[float] = None, force: bool = False) -> List[Any]:
+        """Elementy gotowe do wydania, dla każdego czujnika w kolejności timestampów"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            out, self._ready = self._ready, []
+            if force:
+                for sensor in self._sensors.values():
+                    sensor.pop_until(float('inf'), out)
+                self._arrivals.clear()
+            else:
+                for sensor_id in self._advanced:
+                    sensor = self._sensors[sensor_id]
+                    sensor.pop_until(sensor.newest - self.lateness, out)
+                # elementy przetrzymane dłużej niż lateness (czas rzeczywisty) wraz ze starszymi
+                expired = now - self.lateness
+                while self._arrivals and self._arrivals[0][0] <= expired:
+                    _, sensor_id, timestamp = self._arrivals.popleft()
+                    self._sensors[sensor_id].pop_until(timestamp, out)
+            self._advanced.clear()
+            self.released += len(out)
+            return out
+
+    def __len__(self):
+        return sum(len(sensor.heap) for sensor in self._sensors.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'lateness_seconds': self.lateness,
+                'sensors': len(self._sensors),
+                'buffered': sum(len(sensor.heap) for sensor in self._sensors.values()),
+                'received': self.received,
+                'released': self.released,
+                'reordered': self.reordered,
+                'late': self.late,
+                'forced': self.forced,
+            }
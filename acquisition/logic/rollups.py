@@ -0,0 +1,216 @@
+import datetime
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection, transaction
+
+from ..models import Measurement, MeasurementRollup, MeasurementStatus, RollupResolution
+
+# rozdzielczości od najdrobniejszej do najgrubszej: (rozdzielczość, długość przedziału w sekundach)
+RESOLUTIONS: List[Tuple[str, int]] = [
+    (RollupResolution.MINUTE, 60),
+    (RollupResolution.QUARTER_HOUR, 15 * 60),
+    (RollupResolution.HOUR, 3600),
+    (RollupResolution.DAY, 86400),
+]
+RESOLUTION_SECONDS: Dict[str, int] = dict(RESOLUTIONS)
+
+# domyślna maksymalna liczba przedziałów na czujnik zwracana przez zapytanie
+DEFAULT_MAX_BUCKETS = 2000
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def bucket_start(timestamp: datetime.datetime, seconds: int) -> datetime.datetime:
+    """Początek przedziału (UTC) o długości `seconds`, do którego należy timestamp"""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+    epoch = int((timestamp - _EPOCH).total_seconds())
+    return _EPOCH + datetime.timedelta(seconds=epoch - epoch % seconds)
+
+
+class _Bucket:
+    """Agregat częściowy jednego przedziału, liczony w pamięci przed zapisem"""
+
+    __slots__ = ('min_value', 'max_value', 'sum_value', 'count', 'last_value', 'last_timestamp')
+
+    def __init__(self, value: float, timestamp: datetime.datetime):
+        self.min_value = value
+        self.max_value = value
+        self.sum_value = value
+        self.count = 1
+        self.last_value = value
+        self.last_timestamp = timestamp
+
+    def add(self, value: float, timestamp: datetime.datetime):
+        self.min_value = min(self.min_value, value)
+        self.max_value = max(self.max_value, value)
+        self.sum_value += value
+        self.count += 1
+        if timestamp >= self.last_timestamp:
+            self.last_value = value
+            self.last_timestamp = timestamp
+
+
+def aggregate(measurements: Iterable[Measurement]) -> Dict[Tuple[int, str, datetime.datetime], _Bucket]:
+    """
+    Zwiń pomiary do agregatów (czujnik, rozdzielczość, początek przedziału).
+    Uwzględniane są tylko poprawne pomiary (status OK, wartość skończona).
+    """
+    buckets: Dict[Tuple[int, str, datetime.datetime], _Bucket] = {}
+    for m in measurements:
+        if m.status != MeasurementStatus.OK or m.value is None or not math.isfinite(m.value):
+            continue
+        for resolution, seconds in RESOLUTIONS:
+            key = (m.sensor_id, resolution, bucket_start(m.timestamp, seconds))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = _Bucket(m.value, m.timestamp)
+            else:
+                bucket.add(m.value, m.timestamp)
+    return buckets
+
+
+_UPSERT_SQL = {
+    'postgresql': """
+        INSERT INTO {table} (sensor_id, resolution, bucket_start, min_value, max_value,
+                             sum_value, count, last_value, last_timestamp)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (sensor_id, resolution, bucket_start) DO UPDATE SET
+            min_value = LEAST({table}.min_value, EXCLUDED.min_value),
+            max_value = GREATEST({table}.max_value, EXCLUDED.max_value),
+            sum_value = {table}.sum_value + EXCLUDED.sum_value,
+            count = {table}.count + EXCLUDED.count,
+            last_value = CASE WHEN EXCLUDED.last_timestamp >= {table}.last_timestamp
+                              THEN EXCLUDED.last_value ELSE {table}.last_value END,
+            last_timestamp = GREATEST({table}.last_timestamp, EXCLUDED.last_timestamp)
+    """,
+    'sqlite': """
+        INSERT INTO {table} (sensor_id, resolution, bucket_start, min_value, max_value,
+                             sum_value, count, last_value, last_timestamp)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (sensor_id, resolution, bucket_start) DO UPDATE SET
+            min_value = MIN({table}.min_value, excluded.min_value),
+            max_value = MAX({table}.max_value, excluded.max_value),
+            sum_value = {table}.sum_value + excluded.sum_value,
+            count = {table}.count + excluded.count,
+            last_value = CASE WHEN excluded.last_timestamp >= {table}.last_timestamp
+                              THEN excluded.last_value ELSE {table}.last_value END,
+            last_timestamp = MAX({table}.last_timestamp, excluded.last_timestamp)
+    """,
+}
+
+
+def upsert_rollups(measurements: Iterable[Measurement]) -> int:
+    """
+    Dolicz zapisane pomiary do agregatów wszystkich rozdzielczości.
+    Wsad jest najpierw zwijany w pamięci, więc do bazy trafia jeden wiersz na przedział.
+    Zwraca liczbę zaktualizowanych przedziałów.
+    """
+    buckets = aggregate(measurements)
+    if not buckets:
+        return 0
+
+    sql = _UPSERT_SQL.get(connection.vendor)
+    if sql is None:
+        _merge_with_orm(buckets)
+        return len(buckets)
+
+    adapt = connection.ops.adapt_datetimefield_value
+    params = [
+        (sensor_id, resolution, adapt(start), b.min_value, b.max_value,
+         b.sum_value, b.count, b.last_value, adapt(b.last_timestamp))
+        for (sensor_id, resolution, start), b in buckets.items()
+    ]
+    table = connection.ops.quote_name(MeasurementRollup._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(sql.format(table=table), params)
+    return len(buckets)
+
+
+def _merge_with_orm(buckets: Dict[Tuple[int, str, datetime.datetime], _Bucket]) -> None:
+    """Wolniejsza ścieżka dla baz bez INSERT ... ON CONFLICT"""
+    with transaction.atomic():
+        for (sensor_id, resolution, start), b in buckets.items():
+            rollup = MeasurementRollup.objects.select_for_update().filter(
+                sensor_id=sensor_id, resolution=resolution, bucket_start=start
+            ).first()
+            if rollup is None:
+                MeasurementRollup.objects.create(
+                    sensor_id=sensor_id, resolution=resolution, bucket_start=start,
+                    min_value=b.min_value, max_value=b.max_value, sum_value=b.sum_value,
+                    count=b.count, last_value=b.last_value, last_timestamp=b.last_timestamp,
+                )
+                continue
+            rollup.min_value = min(rollup.min_value, b.min_value)
+            rollup.max_value = max(rollup.max_value, b.max_value)
+            rollup.sum_value += b.sum_value
+            rollup.count += b.count
+            if b.last_timestamp >= rollup.last_timestamp:
+                rollup.last_value = b.last_value
+                rollup.last_timestamp = b.last_timestamp
+            rollup.save()
+
+
+def select_resolution(start: datetime.datetime, end: datetime.datetime,
+                      max_buckets: int = DEFAULT_MAX_BUCKETS) -> str:
+    """
+    Najdrobniejsza rozdzielczość, przy której zakres mieści się w max_buckets przedziałach
+    (czyli najgrubsza potrzebna). Dla dłuższych zakresów - dobowa.
+    """
+    span = max((end - start).total_seconds(), 0)
+    for resolution, seconds in RESOLUTIONS:
+        if span / seconds <= max_buckets:
+            return resolution
+    return RESOLUTIONS[-1][0]
+
+
+def get_rollups(sensor_ids, start: datetime.datetime, end: datetime.datetime,
+                resolution: Optional[str] = None, max_buckets: int = DEFAULT_MAX_BUCKETS):
+    """
+    Agregaty czujników w zakresie [start, end], posortowane po czujniku i czasie.
+    Bez podanej rozdzielczości wybierana jest przez select_resolution.
+    """
+    if isinstance(sensor_ids, int):
+        sensor_ids = [sensor_ids]
+    if resolution is None:
+        resolution = select_resolution(start, end, max_buckets)
+    seconds = RESOLUTION_SECONDS[resolution]
+    return MeasurementRollup.objects.filter(
+        sensor_id__in=sensor_ids,
+        resolution=resolution,
+        bucket_start__gte=bucket_start(start, seconds),
+        bucket_start__lte=end,
+    ).order_by('sensor_id', 'bucket_start')
+
+
+def rebuild_rollups(sensor_ids=None, since: Optional[datetime.datetime] = None, chunk_size: int = 5000) -> int:
+    """
+    Przelicz agregaty od nowa z surowych pomiarów (np. po imporcie danych).
+    Zakres `since` jest wyrównywany do początku doby, żeby przedziały dobowe były kompletne.
+    Zwraca liczbę przetworzonych pomiarów.
+    """
+    rollups = MeasurementRollup.objects.all()
+    measurements = Measurement.objects.filter(status=MeasurementStatus.OK)
+    if sensor_ids:
+        rollups = rollups.filter(sensor_id__in=sensor_ids)
+        measurements = measurements.filter(sensor_id__in=sensor_ids)
+    if since is not None:
+        since = bucket_start(since, RESOLUTION_SECONDS[RollupResolution.DAY])
+        rollups = rollups.filter(bucket_start__gte=since)
+        measurements = measurements.filter(timestamp__gte=since)
+
+    processed = 0
+    with transaction.atomic():
+        rollups.delete()
+        chunk = []
+        for m in measurements.order_by('sensor_id', 'timestamp').iterator(chunk_size=chunk_size):
+            chunk.append(m)
+            if len(chunk) >= chunk_size:
+                upsert_rollups(chunk)
+                processed += len(chunk)
+                chunk = []
+        if chunk:
+            upsert_rollups(chunk)
+            processed += len(chunk)
+    return processed
@@ -0,0 +1,157 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import F
+
+from ..models import Location, SensorType, Sensor, SensorStatus, SensorRegistryVersion
+
+
+class SensorRegistry:
+    """
+    Rejestr czujników współdzielony w obrębie procesu.
+
+    Mapuje (env_uuid, metric_name) na gotowy obiekt Sensor z wczytanymi
+    relacjami `type` i `location`, dzięki czemu gorąca ścieżka akwizycji
+    nie wykonuje zapytań do bazy dla znanych czujników.
+
+    Zmiany w innych procesach (np. panel administracyjny) docierają przez
+    wiersz SensorRegistryVersion - sync_version() przeładowuje rejestr,
+    gdy wersja w bazie różni się od wczytanej.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # (env_uuid, metric_name) -> Sensor
+        self._by_topic: Dict[Tuple[str, str], Sensor] = {}
+        # (floor, room, type_name) -> Sensor, wypełniane przez warm_up()
+        self._by_location: Dict[Tuple[Optional[int], str, str], Sensor] = {}
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        # wersja definicji czujników, z której pochodzi zawartość rejestru
+        self.version: Optional[int] = None
+        self.reloads = 0
+
+    @staticmethod
+    def _location_key(floor: Optional[int], room, type_name: str) -> Tuple[Optional[int], str, str]:
+        return floor, str(room).lower(), type_name.lower()
+
+    def warm_up(self) -> int:
+        """
+        Wczytuje wszystkie czujniki z bazy jednym zapytaniem.
+        Zwraca liczbę zarejestrowanych czujników.
+        """
+        # wersja odczytana przed czujnikami - zmiana w trakcie wczytywania wymusi kolejne przeładowanie
+        version = self.current_version()
+        sensors = Sensor.objects.select_related('type', 'location').all()
+        by_location = {
+            self._location_key(s.location.floor, s.location.room, s.type.name): s
+            for s in sensors
+        }
+        with self._lock:
+            self._by_location = by_location
+            self._by_topic = {}
+            self.version = version
+        return len(by_location)
+
+    @staticmethod
+    def current_version() -> int:
+        version = SensorRegistryVersion.objects.filter(pk=1).values_list('version', flat=True).first()
+        return version or 0
+
+    @staticmethod
+    def bump_version() -> None:
+        """Oznacza zmianę definicji czujników dla wszystkich procesów"""
+        if not SensorRegistryVersion.objects.filter(pk=1).update(version=F('version') + 1):
+            SensorRegistryVersion.objects.get_or_create(pk=1, defaults={'version': 1})
+
+    def sync_version(self) -> bool:
+        """
+        Przeładowuje rejestr, jeśli definicje czujników zmieniły się w innym procesie.
+        Zwraca True, gdy rejestr został przeładowany.
+        """
+        if self.current_version() == self.version:
+            return False
+        self.warm_up()
+        self.reloads += 1
+        return True
+
+    def invalidate(self) -> None:
+        """Czyści rejestr - kolejne odczyty zostaną ponownie rozwiązane z bazy."""
+        with self._lock:
+            self._by_topic = {}
+            self._by_location = {}
+
+    def get(self, env_uuid: str, metric_name: str) -> Optional[Sensor]:
+        """Zwraca czujnik z rejestru lub None, jeśli nie był jeszcze rozwiązany."""
+        sensor = self._by_topic.get((env_uuid, metric_name))
+        if sensor is not None:
+            self.hits += 1
+        return sensor
+
+    def resolve(self, env_uuid: str, metric_name: str, unit: str,
+                floor: Optional[int], room, description: str) -> Sensor:
+        """
+        Rozwiązuje czujnik dla (env_uuid, metric_name), w razie potrzeby tworząc
+        brakujące wiersze Location, SensorType i Sensor.
+        """
+        key = self._location_key(floor, room, metric_name)
+
+        with self._lock:
+            sensor = self._by_location.get(key)
+            if sensor is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                sensor = self._get_or_create(metric_name, unit, floor, room, description)
+                self._by_location[key] = sensor
+            self._by_topic[(env_uuid, metric_name)] = sensor
+        return sensor
+
+    def _get_or_create(self, metric_name: str, unit: str,
+                       floor: Optional[int], room, description: str) -> Sensor:
+        # get_or_create przy ograniczeniach unikalności chroni przed
+        # duplikatami, gdy kilka workerów trafi jednocześnie na nowy czujnik
+        with transaction.atomic():
+            location, location_created = Location.objects.get_or_create(
+                floor=floor,
+                room__iexact=str(room),
+                defaults={'room': str(room), 'description': description}
+            )
+            sensor_type, type_created = SensorType.objects.get_or_create(
+                name__iexact=metric_name,
+                defaults={'name': metric_name, 'default_unit': unit}
+            )
+            sensor, sensor_created = Sensor.objects.get_or_create(
+                location=location,
+                type=sensor_type,
+                defaults={
+                    'name': f"{metric_name} @ floor {floor} room {room}",
+                    'status': SensorStatus.ACTIVE,
+                }
+            )
+
+        if location_created or type_created or sensor_created:
+            self.created += 1
+
+        # relacje przypisane wprost - bez dodatkowych zapytań przy sensor.type / sensor.location
+        sensor.location = location
+        sensor.type = sensor_type
+        return sensor
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._by_location),
+            'hits': self.hits,
+            'misses': self.misses,
+            'created': self.created,
+            'version': self.version,
+            'reloads': self.reloads,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
+
+
+# Instancja współdzielona przez cały proces
+sensor_registry = SensorRegistry()
@@ -0,0 +1,164 @@
+"""
+Statystyki czujników dla panelu akwizycji.
+
+Liczba pomiarów czujnika utrzymywana jest w tabeli SensorStatistics: zapis wsadu
+dolicza do niej pomiary faktycznie wstawione do bazy (jeden wiersz na czujnik we wsadzie).
+Odczyt to jedno zapytanie (czujniki LEFT JOIN liczniki), dodatkowo buforowane
+w procesie na ACQUISITION_STATS_CACHE_SECONDS - panel odpytuje endpoint cyklicznie.
+Po imporcie lub usunięciu danych liczniki przelicza rebuild_sensor_statistics();
+retencja usuwająca partycje odejmuje ich pomiary (subtract_table_counts).
+"""
+import datetime
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Max
+
+from ..models import Measurement, Sensor, SensorStatistics
+
+_UPSERT_SQL = {
+    'postgresql': """
+        INSERT INTO {table} (sensor_id, total_measurements, last_measurement_at, updated_at)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (sensor_id) DO UPDATE SET
+            total_measurements = {table}.total_measurements + EXCLUDED.total_measurements,
+            last_measurement_at = GREATEST({table}.last_measurement_at, EXCLUDED.last_measurement_at),
+            updated_at = EXCLUDED.updated_at
+    """,
+    'sqlite': """
+        INSERT INTO {table} (sensor_id, total_measurements, last_measurement_at, updated_at)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (sensor_id) DO UPDATE SET
+            total_measurements = {table}.total_measurements + excluded.total_measurements,
+            last_measurement_at = MAX(COALESCE({table}.last_measurement_at, excluded.last_measurement_at),
+                                      excluded.last_measurement_at),
+            updated_at = excluded.updated_at
+    """,
+}
+
+
+def count_by_sensor(measurements: Iterable[Measurement]) -> Dict[int, Tuple[int, datetime.datetime]]:
+    """sensor_id -> (liczba pomiarów, najnowszy timestamp)"""
+    counts: Dict[int, Tuple[int, datetime.datetime]] = {}
+    for m in measurements:
+        current = counts.get(m.sensor_id)
+        if current is None:
+            counts[m.sensor_id] = (1, m.timestamp)
+        else:
+            counts[m.sensor_id] = (current[0] + 1, max(current[1], m.timestamp))
+    return counts
+
+
+def increment_counters(measurements: Iterable[Measurement]) -> int:
+    """
+    Dolicz zapisane pomiary do liczników czujników.
+    Zwraca liczbę zaktualizowanych czujników.
+    """
+    counts = count_by_sensor(measurements)
+    if not counts:
+        return 0
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    sql = _UPSERT_SQL.get(connection.vendor)
+    if sql is None:
+        _merge_with_orm(counts, now)
+        return len(counts)
+
+    adapt = connection.ops.adapt_datetimefield_value
+    params = [(sensor_id, count, adapt(last), adapt(now)) for sensor_id, (count, last) in counts.items()]
+    table = connection.ops.quote_name(SensorStatistics._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(sql.format(table=table), params)
+    return len(counts)
+
+
+def _merge_with_orm(counts: Dict[int, Tuple[int, datetime.datetime]], now: datetime.datetime) -> None:
+    """Wolniejsza ścieżka dla baz bez INSERT ... ON CONFLICT"""
+    with transaction.atomic():
+        for sensor_id, (count, last) in counts.items():
+            stats, _ = SensorStatistics.objects.select_for_update().get_or_create(sensor_id=sensor_id)
+            stats.total_measurements += count
+            if stats.last_measurement_at is None or last > stats.last_measurement_at:
+                stats.last_measurement_at = last
+            stats.save()
+
+
+def rebuild_sensor_statistics(sensor_ids=None) -> int:
+    """
+    Przelicz liczniki od nowa jednym zapytaniem GROUP BY po tabeli pomiarów.
+    Zwraca liczbę czujników z licznikami.
+    """
+    measurements = Measurement.objects.all()
+    statistics = SensorStatistics.objects.all()
+    if sensor_ids:
+        measurements = measurements.filter(sensor_id__in=sensor_ids)
+        statistics = statistics.filter(sensor_id__in=sensor_ids)
+
+    rows = measurements.order_by().values('sensor_id').annotate(total=Count('pk'), last=Max('timestamp'))
+    with transaction.atomic():
+        statistics.delete()
+        SensorStatistics.objects.bulk_create([
+            SensorStatistics(sensor_id=row['sensor_id'], total_measurements=row['total'],
+                             last_measurement_at=row['last'])
+            for row in rows
+        ])
+    invalidate_cache()
+    return len(rows)
+
+
+def subtract_table_counts(cursor, table: str) -> None:
+    """
+    Odejmij od liczników pomiary tabeli (partycji), która zaraz zostanie usunięta - skan
+    tylko tej partycji zamiast przeliczania wszystkich pomiarów. Wołane w transakcji z DROP.
+    """
+    qn = cursor.db.ops.quote_name
+    statistics = qn(SensorStatistics._meta.db_table)
+    cursor.execute(
+        f"UPDATE {statistics} SET total_measurements = GREATEST({statistics}.total_measurements - dropped.total, 0) "
+        f"FROM (SELECT sensor_id, COUNT(*) AS total FROM {qn(table)} GROUP BY sensor_id) dropped "
+        f"WHERE {statistics}.sensor_id = dropped.sensor_id"
+    )
+    invalidate_cache()
+
+
+# -------------------
+# Odczyt (panel akwizycji)
+# -------------------
+_cache_lock = threading.Lock()
+_cache: Optional[Tuple[float, List[Dict[str, Any]]]] = None
+
+
+def invalidate_cache() -> None:
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def get_sensor_statistics() -> List[Dict[str, Any]]:
+    """Statystyki wszystkich czujników - jedno zapytanie, wynik buforowany na krótki czas"""
+    global _cache
+    ttl = getattr(settings, 'ACQUISITION_STATS_CACHE_SECONDS', 5)
+    with _cache_lock:
+        if _cache is not None and _cache[0] > time.monotonic():
+            return _cache[1]
+
+    rows = Sensor.objects.order_by('pk').values_list(
+        'name', 'status', 'last_communication', 'statistics__total_measurements'
+    )
+    stats = [
+        {
+            'sensor_name': name,
+            'status': str(status),
+            'total_measurements': total or 0,
+            'last_seen': last_seen,
+        }
+        for name, status, last_seen, total in rows
+    ]
+
+    if ttl > 0:
+        with _cache_lock:
+            _cache = (time.monotonic() + ttl, stats)
+    return stats
@@ -0,0 +1,301 @@
+"""
+Trwały bufor zapisu pomiarów: segmenty dopisywane na dysku przed zapisem do bazy.
+
+Rekord segmentu: nagłówek (długość, crc32) i pickle zakodowanego elementu.
+Pozycja potwierdzonego zapisu (segment, offset) trzymana jest w pliku `ack`,
+podmienianym atomowo. Po restarcie wszystko za tą pozycją jest odtwarzane,
+a niedokończony rekord na końcu ostatniego segmentu jest odcinany.
+Segmenty w całości potwierdzone są usuwane.
+
+Zapis jest przekazywany do systemu operacyjnego po każdym rekordzie (przeżywa
+awarię procesu), fsync wykonywany jest grupowo co `fsync_seconds` (0 - po każdym rekordzie).
+"""
+import collections
+import os
+import pickle
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows - bez blokady katalogu
+    fcntl = None
+
+Position = Tuple[int, int]
+
+
+class SpoolLocked(Exception):
+    """Katalog bufora jest używany przez inny proces"""
+
+
+class SegmentSpool:
+    SEGMENT_SUFFIX = '.seg'
+    ACK_FILE = 'ack'
+    LOCK_FILE = 'lock'
+
+    _HEADER = struct.Struct('>II')  # długość, crc32
+    _ACK = struct.Struct('>QQ')     # segment, offset
+
+    def __init__(self, directory: str, encode: Callable[[Any], Any] = None,
+                 decode: Callable[[Any], Any] = None, segment_bytes: int = 64 * 1024 * 1024,
+                 fsync_seconds: float = 0.05, memory_items: int = 10000):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_seconds = fsync_seconds
+        self.memory_items = memory_items
+        self._encode = encode or (lambda item: item)
+        self._decode = decode or (lambda record: record)
+        self._cond = threading.Condition()
+        self._closed = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = self._acquire_lock()
+
+        self.appended = 0
+        self.replayed = 0
+        self.fsyncs = 0
+        self.disk_reads = 0
+        self._last_fsync = time.monotonic()
+        self._dirty = False
+
+        # elementy dopisane w tym procesie - odczyt bez dekodowania z dysku
+        self._recent = collections.deque()
+
+        self._ack = self._read_ack()
+        segments = self._list_segments()
+        for seq in segments:
+            if seq < self._ack[0]:
+                os.remove(self._segment_path(seq))
+        segments = [seq for seq in segments if seq >= self._ack[0]] or [self._ack[0] or 1]
+
+        self._write_seq = segments[-1]
+        self._write_offset = self._recover_tail(self._write_seq)
+        self._writer = open(self._segment_path(self._write_seq), 'ab')
+
+        if self._ack[0] == segments[0]:
+            self._read_pos: Position = self._ack
+        else:
+            self._read_pos = (segments[0], 0)
+        if self._read_pos[0] == self._write_seq and self._read_pos[1] > self._write_offset:
+            # segment krótszy niż potwierdzona pozycja (np. utracony bez fsync) - zaczynamy nowy
+            self._roll()
+            self._read_pos = (self._write_seq, 0)
+        self._reader = None
+        self._reader_seq = None
+
+        self.pending = self._count_from(self._read_pos, segments)
+        self.replayed = self.pending
+
+    # -------------------
+    # Pliki
+    # -------------------
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:012d}{self.SEGMENT_SUFFIX}")
+
+    def _list_segments(self) -> List[int]:
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SEGMENT_SUFFIX):
+                try:
+                    segments.append(int(name[:-len(self.SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(segments)
+
+    def _acquire_lock(self):
+        handle = open(os.path.join(self.directory, self.LOCK_FILE), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                raise SpoolLocked(self.directory)
+        return handle
+
+    def _read_ack(self) -> Position:
+        try:
+            with open(os.path.join(self.directory, self.ACK_FILE), 'rb') as f:
+                data = f.read(self._ACK.size)
+        except FileNotFoundError:
+            return (0, 0)
+        if len(data) < self._ACK.size:
+            return (0, 0)
+        return self._ACK.unpack(data)
+
+    def _write_ack(self, position: Position) -> None:
+        path = os.path.join(self.directory, self.ACK_FILE)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(self._ACK.pack(*position))
+        os.replace(tmp, path)
+
+    def _scan(self, handle, offset: int = 0):
+        """Kolejne poprawne rekordy segmentu od offsetu: (offset, offset końca, dane)"""
+        handle.seek(offset)
+        while True:
+            header = handle.read(self._HEADER.size)
+            if len(header) < self._HEADER.size:
+                return
+            size, crc = self._HEADER.unpack(header)
+            data = handle.read(size)
+            if len(data) < size or zlib.crc32(data) != crc:
+                return
+            end = offset + self._HEADER.size + size
+            yield offset, end, data
+            offset = end
+
+    def _recover_tail(self, seq: int) -> int:
+        """Odetnij niedokończony rekord z końca segmentu; zwraca rozmiar segmentu"""
+        path = self._segment_path(seq)
+        if not os.path.exists(path):
+            return 0
+        valid = 0
+        with open(path, 'r+b') as f:
+            for _, end, _ in self._scan(f):
+                valid = end
+            f.seek(0, os.SEEK_END)
+            if f.tell() != valid:
+                f.truncate(valid)
+        return valid
+
+    def _count_from(self, position: Position, segments: List[int]) -> int:
+        count = 0
+        for seq in segments:
+            if seq < position[0]:
+                continue
+            with open(self._segment_path(seq), 'rb') as f:
+                count += sum(1 for _ in self._scan(f, position[1] if seq == position[0] else 0))
+        return count
+
+    # -------------------
+    # Zapis
+    # -------------------
+    def append(self, item: Any) -> None:
+        data = pickle.dumps(self._encode(item), protocol=pickle.HIGHEST_PROTOCOL)
+        with self._cond:
+            if self._write_offset and self._write_offset + len(data) > self.segment_bytes:
+                self._roll()
+            position = (self._write_seq, self._write_offset)
+            self._writer.write(self._HEADER.pack(len(data), zlib.crc32(data)))
+            self._writer.write(data)
+            self._writer.flush()
+            self._write_offset += self._HEADER.size + len(data)
+            self._dirty = True
+            if self.fsync_seconds <= 0 or time.monotonic() - self._last_fsync >= self.fsync_seconds:
+                self._fsync()
+
+            if len(self._recent) < self.memory_items:
+                self._recent.append((position, self._write_offset, item))
+            self.appended += 1
+            self.pending += 1
+            self._cond.notify()
+
+    # interfejs zgodny z WriteQueue
+    put = append
+
+    def _roll(self) -> None:
+        self._fsync()
+        self._writer.close()
+        self._write_seq += 1
+        self._write_offset = 0
+        self._writer = open(self._segment_path(self._write_seq), 'ab')
+
+    def _fsync(self) -> None:
+        if self._dirty:
+            os.fsync(self._writer.fileno())
+            self._dirty = False
+            self.fsyncs += 1
+        self._last_fsync = time.monotonic()
+
+    def sync(self) -> None:
+        with self._cond:
+            self._fsync()
+
+    # -------------------
+    # Odczyt i potwierdzanie
+    # -------------------
+    def put_sentinel(self) -> None:
+        """Zamknięcie - get() zwróci None po odczytaniu wszystkich rekordów"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """Kolejny nieodczytany element; None po put_sentinel(), queue.Empty po timeout"""
+        with self._cond:
+            if not self.pending:
+                if self._closed:
+                    return None
+                self._cond.wait_for(lambda: self.pending or self._closed, timeout)
+                if not self.pending:
+                    if self._closed:
+                        return None
+                    raise queue.Empty
+            item = self._next()
+            self.pending -= 1
+            return item
+
+    def _next(self) -> Any:
+        seq, offset = self._read_pos
+        while self._recent and self._recent[0][0] < self._read_pos:
+            self._recent.popleft()
+        if self._recent and self._recent[0][0] == self._read_pos:
+            _, end, item = self._recent.popleft()
+            self._read_pos = (seq, end)
+            return item
+
+        while True:
+            if self._reader_seq != seq:
+                if self._reader is not None:
+                    self._reader.close()
+                self._reader = open(self._segment_path(seq), 'rb')
+                self._reader_seq = seq
+            for _, end, data in self._scan(self._reader, offset):
+                self._read_pos = (seq, end)
+                self.disk_reads += 1
+                return self._decode(pickle.loads(data))
+            # koniec segmentu - rekordy oczekujące są w kolejnym
+            seq, offset = seq + 1, 0
+            self._read_pos = (seq, offset)
+
+    def ack(self) -> None:
+        """Potwierdź zapis wszystkich odczytanych elementów i usuń zbędne segmenty"""
+        with self._cond:
+            position = self._read_pos
+            if position == self._ack:
+                return
+            self._fsync()
+            self._write_ack(position)
+            if position[0] != self._ack[0]:
+                for seq in self._list_segments():
+                    if seq >= position[0]:
+                        break
+                    if seq == self._reader_seq:
+                        self._reader.close()
+                        self._reader, self._reader_seq = None, None
+                    os.remove(self._segment_path(seq))
+            self._ack = position
+
+    # -------------------
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'depth': self.pending,
+            'segments': self._write_seq - self._read_pos[0] + 1,
+            'appended': self.appended,
+            'replayed': self.replayed,
+            'disk_reads': self.disk_reads,
+            'fsyncs': self.fsyncs,
+        }
+
+    def close(self) -> None:
+        with self._cond:
+            self._fsync()
+            self._writer.close()
+            if self._reader is not None:
+                self._reader.close()
+                self._reader, self._reader_seq = None, None
+            self._lock_file.close()
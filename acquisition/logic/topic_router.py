@@ -0,0 +1,135 @@
+"""
+Router topiców MQTT: drzewo (trie) filtrów z symbolami wieloznacznymi + i #.
+
+Filtry rejestruje się z nazwanymi segmentami, np. "szebi/weather/{env_uuid}/{metric}";
+{nazwa} działa jak + i jego wartość trafia do RouteMatch.params. Dopasowanie dzieli
+topic raz, a przejście drzewa ma koszt zależny od głębokości topicu, nie od liczby tras.
+Pierwszeństwo: segment dosłowny, potem +, na końcu #. Wyniki dla powtarzających się
+topiców (liczba czujników jest ograniczona) są buforowane.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class TopicRoute:
+    __slots__ = ('filter', 'target', 'names')
+
+    def __init__(self, topic_filter: str, target: Any, names: Tuple[Optional[str], ...]):
+        self.filter = topic_filter
+        self.target = target
+        # nazwy kolejnych segmentów +, None dla + bez nazwy
+        self.names = names
+
+    def __repr__(self):
+        return f"TopicRoute({self.filter!r})"
+
+
+class RouteMatch:
+    __slots__ = ('route', 'params')
+
+    def __init__(self, route: TopicRoute, params: Dict[str, str]):
+        self.route = route
+        self.params = params
+
+    @property
+    def target(self) -> Any:
+        return self.route.target
+
+
+class _Node:
+    __slots__ = ('children', 'plus', 'hash', 'route')
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.plus: Optional["_Node"] = None
+        self.hash: Optional[TopicRoute] = None
+        self.route: Optional[TopicRoute] = None
+
+
+class TopicRouter:
+    def __init__(self, cache_size: int = 10000):
+        self._root = _Node()
+        self._routes: List[TopicRoute] = []
+        self._cache: Dict[str, Optional[RouteMatch]] = {}
+        self.cache_size = cache_size
+
+    def add(self, pattern: str, target: Any) -> TopicRoute:
+        """Zarejestruj filtr; {nazwa} - nazwany segment +, # tylko na końcu"""
+        levels = pattern.split('/')
+        names = []
+        mqtt_levels = []
+        node = self._root
+        for i, level in enumerate(levels):
+            if level == '#':
+                if i != len(levels) - 1:
+                    raise ValueError(f"'#' musi być ostatnim segmentem filtra: {pattern}")
+                mqtt_levels.append('#')
+                break
+            if level == '+' or (level.startswith('{') and level.endswith('}')):
+                names.append(level[1:-1] if level != '+' else None)
+                mqtt_levels.append('+')
+                if node.plus is None:
+                    node.plus = _Node()
+                node = node.plus
+            elif '+' in level or '#' in level or '{' in level:
+                raise ValueError(f"Niepoprawny segment filtra '{level}': {pattern}")
+            else:
+                mqtt_levels.append(level)
+                node = node.children.setdefault(level, _Node())
+
+        route = TopicRoute('/'.join(mqtt_levels), target, tuple(names))
+        if mqtt_levels[-1] == '#':
+            if node.hash is not None:
+                raise ValueError(f"Filtr {route.filter} jest już zarejestrowany")
+            node.hash = route
+        else:
+            if node.route is not None:
+                raise ValueError(f"Filtr {route.filter} jest już zarejestrowany")
+            node.route = route
+        self._routes.append(route)
+        self._cache.clear()
+        return route
+
+    def filters(self) -> List[str]:
+        """Filtry MQTT do subskrypcji"""
+        return [route.filter for route in self._routes]
+
+    def match(self, topic: str) -> Optional[RouteMatch]:
+        try:
+            return self._cache[topic]
+        except KeyError:
+            pass
+        result = self._match(topic)
+        if self.cache_size:
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[topic] = result
+        return result
+
+    def _match(self, topic: str) -> Optional[RouteMatch]:
+        # topiki systemowe ($SYS/...) nie pasują do filtrów zaczynających się od + lub #
+        if topic.startswith('$'):
+            return None
+        levels = topic.split('/')
+        values: List[str] = []
+        route = self._walk(self._root, levels, 0, len(levels), values)
+        if route is None:
+            return None
+        return RouteMatch(route, {name: value for name, value in zip(route.names, values) if name})
+
+    def _walk(self, node: _Node, levels: List[str], i: int, depth: int, values: List[str]) -> Optional[TopicRoute]:
+        """Przejście w głąb z powrotami; pierwszeństwo: dosłowny, +, #"""
+        if i == depth:
+            # "a/#" pasuje także do samego "a"
+            return node.route or node.hash
+        child = node.children.get(levels[i])
+        if child is not None:
+            route = self._walk(child, levels, i + 1, depth, values)
+            if route is not None:
+                return route
+        if node.plus is not None:
+            values.append(levels[i])
+            route = self._walk(node.plus, levels, i + 1, depth, values)
+            if route is not None:
+                return route
+            values.pop()
+        return node.hash
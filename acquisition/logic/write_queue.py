@@ -0,0 +1,232 @@
+import os
+import pickle
+import queue
+import struct
+import threading
+from typing import Any, Dict, Optional
+
+from .spool import SpoolLocked, fcntl
+
+
+class FlushStats:
+    """Opóźnienie zapisu wsadów: czas samego zapisu i wiek najstarszego elementu wsadu"""
+
+    # współczynnik średniej kroczącej (EWMA)
+    ALPHA = 0.1
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.retries = 0
+        self.dropped = 0
+        self.avg_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.avg_batch_age_ms = 0.0
+        self.max_batch_age_ms = 0.0
+
+    def record(self, items: int, flush_s: float, age_s: float):
+        flush_ms, age_ms = flush_s * 1000.0, age_s * 1000.0
+        with self._lock:
+            self.batches += 1
+            self.items += items
+            if self.batches == 1:
+                self.avg_flush_ms, self.avg_batch_age_ms = flush_ms, age_ms
+            else:
+                self.avg_flush_ms += self.ALPHA * (flush_ms - self.avg_flush_ms)
+                self.avg_batch_age_ms += self.ALPHA * (age_ms - self.avg_batch_age_ms)
+            self.max_flush_ms = max(self.max_flush_ms, flush_ms)
+            self.max_batch_age_ms = max(self.max_batch_age_ms, age_ms)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_dropped(self, items: int):
+        with self._lock:
+            self.dropped += items
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'retries': self.retries,
+            'dropped': self.dropped,
+            'avg_flush_ms': round(self.avg_flush_ms, 3),
+            'max_flush_ms': round(self.max_flush_ms, 3),
+            'avg_batch_age_ms': round(self.avg_batch_age_ms, 3),
+            'max_batch_age_ms': round(self.max_batch_age_ms, 3),
+        }
+
+
+class OverflowPolicy:
+    """Zachowanie pełnej kolejki zapisu"""
+    BLOCK = 'block'              # producent czeka (backpressure aż do potoku i MQTT)
+    DROP_OLDEST = 'drop_oldest'  # najstarszy element jest odrzucany
+    SPILL = 'spill'              # nadmiar trafia do pliku na dysku i wraca, gdy kolejka się zwolni
+
+    ALL = (BLOCK, DROP_OLDEST, SPILL)
+
+
+class SpillFile:
+    """
+    Kolejka FIFO na dysku: rekordy pickle poprzedzone długością.
+    Plik jest obcinany, gdy odczyt dogoni zapis; po restarcie zawartość jest
+    odczytywana od początku. Plik ma jednego właściciela - blokada fcntl na czas
+    otwarcia, inny proces (lub instancja) dostaje SpoolLocked.
+    """
+
+    _HEADER = struct.Struct('>I')
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._file.close()
+                raise SpoolLocked(path)
+        self._read_offset = 0
+        self._pending = self._count_records()
+
+    def _count_records(self) -> int:
+        count = 0
+        self._file.seek(0)
+        while True:
+            header = self._file.read(self._HEADER.size)
+            if len(header) < self._HEADER.size:
+                break
+            (size,) = self._HEADER.unpack(header)
+            if len(self._file.read(size)) < size:
+                break
+            count += 1
+        return count
+
+    def __len__(self):
+        return self._pending
+
+    def append(self, item: Any) -> None:
+        data = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(self._HEADER.pack(len(data)))
+            self._file.write(data)
+            self._file.flush()
+            self._pending += 1
+
+    def pop(self) -> Any:
+        """Najstarszy rekord; IndexError, gdy plik jest pusty"""
+        with self._lock:
+            if not self._pending:
+                raise IndexError("spill file is empty")
+            self._file.seek(self._read_offset)
+            (size,) = self._HEADER.unpack(self._file.read(self._HEADER.size))
+            item = pickle.loads(self._file.read(size))
+            self._read_offset = self._file.tell()
+            self._pending -= 1
+            if not self._pending:
+                self._file.truncate(0)
+                self._read_offset = 0
+            return item
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class WriteQueue:
+    """
+    Ograniczona kolejka przed zapisem do bazy z konfigurowalną polityką przepełnienia.
+    Pamięć zajmowana przez kolejkę nie przekracza `maxsize` elementów niezależnie
+    od dostępności bazy.
+    """
+
+    def __init__(self, name: str, maxsize: int, policy: str = OverflowPolicy.BLOCK,
+                 spill_dir: Optional[str] = None):
+        if policy not in OverflowPolicy.ALL:
+            raise ValueError(f"Nieznana polityka przepełnienia: {policy}")
+        self.name = name
+        self.policy = policy
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.spilled = 0
+        self._spill: Optional[SpillFile] = None
+        if policy == OverflowPolicy.SPILL:
+            path = os.path.join(spill_dir or '.', f"{name}.spill")
+            try:
+                self._spill = SpillFile(path)
+            except SpoolLocked:
+                # plik należy do innego procesu - bez pliku nadmiar czeka w pamięci (backpressure)
+                print(f"DB WARNING: plik przepełnienia {path} jest używany przez inny proces, polityka block")
+                self.policy = OverflowPolicy.BLOCK
+
+    @property
+    def maxsize(self) -> int:
+        return self._queue.maxsize
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def put(self, item: Any) -> None:
+        if self.policy == OverflowPolicy.BLOCK:
+            self._queue.put(item)
+            return
+
+        with self._lock:
+            # dopóki na dysku są elementy, nowe też tam trafiają - zachowana kolejność FIFO
+            if self._spill is not None and len(self._spill):
+                self._spill.append(item)
+                self.spilled += 1
+                return
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    pass
+                if self._spill is not None:
+                    self._spill.append(item)
+                    self.spilled += 1
+                    return
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def put_sentinel(self) -> None:
+        """Sygnał zamknięcia - zawsze trafia do kolejki, niezależnie od polityki"""
+        self._queue.put(None)
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """Element z pamięci, a gdy jej brak - z pliku przepełnienia. queue.Empty po timeout."""
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        if self._spill is not None:
+            with self._lock:
+                if len(self._spill):
+                    return self._spill.pop()
+        return self._queue.get(timeout=timeout)
+
+    def ack(self) -> None:
+        """Elementy w pamięci nie wymagają potwierdzenia zapisu (interfejs zgodny z SegmentSpool)"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'depth': self._queue.qsize(),
+            'capacity': self._queue.maxsize,
+            'policy': self.policy,
+            'dropped': self.dropped,
+            'spilled': self.spilled,
+            'spill_pending': len(self._spill) if self._spill is not None else 0,
+        }
+
+    def close(self) -> None:
+        if self._spill is not None:
+            self._spill.close()
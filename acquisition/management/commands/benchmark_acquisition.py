@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from acquisition.benchmark import MODES, PIPELINE, run_pipeline_benchmark, run_process_benchmark
+from acquisition.logic.load_generator import load_recording, synthetic_traffic
+
+
+class Command(BaseCommand):
+    help = ("Benchmark akwizycji: ruch syntetyczny lub nagranie NDJSON (topic, payload, ts) "
+            "przez HandleData.process albo pełny potok. Domyślnie na tymczasowej bazie testowej.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=MODES, default=PIPELINE)
+        parser.add_argument('--replay', help="Plik NDJSON z nagranym ruchem zamiast generatora")
+        parser.add_argument('--sensors', type=int, default=100, help="Liczba czujników generatora")
+        parser.add_argument('--rate', type=float, default=1000.0, help="Wiadomości/s generatora (łącznie)")
+        parser.add_argument('--duration', type=float, default=10.0, help="Sekundy ruchu generatora")
+        parser.add_argument('--count', type=int, help="Liczba wiadomości generatora (zamiast --duration)")
+        parser.add_argument('--speed', type=float, default=1.0,
+                            help="Mnożnik tempa wysyłki; 0 - bez pauz (maksymalna przepustowość)")
+        parser.add_argument('--use-database', action='store_true',
+                            help="Zapis do skonfigurowanej bazy zamiast tymczasowej bazy testowej")
+        parser.add_argument('--max-p99-ms', type=float,
+                            help="Zakończ błędem, gdy p99 opóźnienia przekroczy próg (np. 100)")
+        parser.add_argument('--json', action='store_true', help="Raport w formacie JSON")
+
+    def handle(self, *args, **options):
+        if options['replay']:
+            messages = load_recording(options['replay'])
+        else:
+            if options['sensors'] <= 0 or options['rate'] <= 0:
+                raise CommandError("--sensors i --rate muszą być dodatnie")
+            messages = synthetic_traffic(options['sensors'], options['rate'],
+                                         duration=options['duration'], count=options['count'])
+        run = run_pipeline_benchmark if options['mode'] == PIPELINE else run_process_benchmark
+
+        old_name = None
+        if not options['use_database']:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            report = run(messages, options['speed'])
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            for key, value in report.items():
+                self.stdout.write(f"{key:>18}: {value}")
+
+        limit = options['max_p99_ms']
+        if limit is not None and report['p99_latency_ms'] > limit:
+            raise CommandError(f"p99 opóźnienia {report['p99_latency_ms']} ms przekracza próg {limit} ms")
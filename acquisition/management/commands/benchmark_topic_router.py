@@ -0,0 +1,61 @@
+import random
+import timeit
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from acquisition.data_logic.handle_data import build_topic_router
+
+
+def _if_chain(topic: str):
+    """Dawne rozpoznawanie topicu (łańcuch startswith + split) - punkt odniesienia"""
+    if topic.startswith("szebi/weather/"):
+        kind = "weather"
+    elif topic.startswith("szebi/device/state/"):
+        kind = "device"
+    elif topic.startswith("szebi/status"):
+        kind = "status"
+    else:
+        return None
+    parts = topic.split("/")
+    if len(parts) < 4:
+        return None
+    return kind, parts[2]
+
+
+class Command(BaseCommand):
+    help = "Mikrobenchmark rozpoznawania topiców MQTT: router (trie) vs łańcuch startswith."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sensors', type=int, default=1000, help="Liczba różnych topiców")
+        parser.add_argument('--messages', type=int, default=200000, help="Liczba dopasowań w pomiarze")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        shapes = [
+            "szebi/weather/{}/temperature",
+            "szebi/device/state/{}",
+            "szebi/{}/device/%s/state" % uuid.UUID(int=1),
+            "szebi/status",
+            "environment/{}/unknown",
+        ]
+        distinct = [rng.choice(shapes).format(uuid.UUID(int=rng.getrandbits(128)))
+                    for _ in range(options['sensors'])]
+        topics = [rng.choice(distinct) for _ in range(options['messages'])]
+
+        cached = build_topic_router()
+        # cache_size=0 - każde dopasowanie przechodzi przez drzewo
+        uncached = build_topic_router()
+        uncached.cache_size = 0
+
+        def run(match):
+            def loop():
+                for topic in topics:
+                    match(topic)
+            best = min(timeit.repeat(loop, number=1, repeat=options['repeat']))
+            return best / len(topics) * 1e9, len(topics) / best
+
+        for label, match in (("if-chain", _if_chain), ("router", uncached.match), ("router+cache", cached.match)):
+            ns, rate = run(match)
+            self.stdout.write(f"{label:>14}: {ns:8.1f} ns/wiadomość  {rate:12,.0f} wiadomości/s")
@@ -0,0 +1,42 @@
+import datetime
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from acquisition.logic.parquet_archive import HOURLY, RAW, archive_dir, export_range
+
+
+class Command(BaseCommand):
+    help = "Eksportuje historię pomiarów do archiwum Parquet (plik na dobę i typ czujnika)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Pierwsza doba (YYYY-MM-DD); domyślnie wczoraj")
+        parser.add_argument('--until', help="Ostatnia doba (YYYY-MM-DD); domyślnie równa --since")
+        parser.add_argument('--source', choices=[RAW, HOURLY], default=RAW,
+                            help="raw - surowe pomiary, hourly - agregaty godzinowe")
+        parser.add_argument('--dir', help="Katalog archiwum; domyślnie ACQUISITION_PARQUET_DIR")
+
+    def handle(self, *args, **options):
+        since = self._parse(options['since']) if options['since'] else (
+            timezone.now().astimezone(datetime.timezone.utc).date() - datetime.timedelta(days=1))
+        until = self._parse(options['until']) if options['until'] else since
+        if until < since:
+            raise CommandError("--until nie może być wcześniejsze niż --since")
+
+        try:
+            rows = export_range(since, until, options['source'], options['dir'])
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Wyeksportowano {rows} wierszy ({options['source']}, {since} - {until}) "
+            f"do {options['dir'] or archive_dir()}"
+        ))
+
+    @staticmethod
+    def _parse(value):
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Niepoprawna data: {value}")
+        return day
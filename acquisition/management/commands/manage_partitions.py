@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from acquisition.logic.partitioning import drop_expired_partitions, ensure_partitions, is_supported
+
+
+class Command(BaseCommand):
+    help = ("Tworzy partycje miesięczne pomiarów i logów z wyprzedzeniem oraz usuwa partycje "
+            "starsze niż okres retencji (ACQUISITION_*_RETENTION_MONTHS).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=None,
+                            help="Ile miesięcy naprzód utworzyć (domyślnie ACQUISITION_PARTITION_MONTHS_AHEAD)")
+        parser.add_argument('--no-retention', action='store_true', help="Nie usuwaj starych partycji")
+        parser.add_argument('--dry-run', action='store_true', help="Tylko pokaż partycje do usunięcia")
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            self.stdout.write("Partycjonowanie wymaga PostgreSQL - pomijam.")
+            return
+
+        if not options['dry_run']:
+            for name in ensure_partitions(options['ahead']):
+                self.stdout.write(f"Utworzono partycję {name}")
+
+        if not options['no_retention']:
+            for name in drop_expired_partitions(dry_run=options['dry_run']):
+                prefix = "Do usunięcia" if options['dry_run'] else "Usunięto"
+                self.stdout.write(f"{prefix}: {name}")
+
+        self.stdout.write(self.style.SUCCESS("Partycje zaktualizowane"))
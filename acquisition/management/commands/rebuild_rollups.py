@@ -0,0 +1,31 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime, parse_date
+
+from acquisition.logic.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Przelicza agregaty pomiarów (MeasurementRollup) od nowa z surowych danych."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sensor', type=int, action='append', dest='sensors',
+                            help="ID czujnika (można podać wielokrotnie); domyślnie wszystkie")
+        parser.add_argument('--since', help="Przelicz tylko od tej daty (YYYY-MM-DD lub ISO8601)")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                day = parse_date(options['since'])
+                if day is None:
+                    raise CommandError(f"Niepoprawna data: {options['since']}")
+                since = datetime.datetime.combine(day, datetime.time.min)
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=datetime.timezone.utc)
+
+        processed = rebuild_rollups(options['sensors'], since, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Przeliczono agregaty z {processed} pomiarów"))
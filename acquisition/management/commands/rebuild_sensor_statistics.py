@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from acquisition.logic.sensor_statistics import rebuild_sensor_statistics
+
+
+class Command(BaseCommand):
+    help = "Przelicza liczniki pomiarów czujników (SensorStatistics) od nowa z surowych danych."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sensor', type=int, action='append', dest='sensors',
+                            help="ID czujnika (można podać wielokrotnie); domyślnie wszystkie")
+
+    def handle(self, *args, **options):
+        sensors = rebuild_sensor_statistics(options['sensors'])
+        self.stdout.write(self.style.SUCCESS(f"Przeliczono liczniki {sensors} czujników"))
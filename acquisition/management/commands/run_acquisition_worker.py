@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from acquisition import mqtt_runner
+from acquisition.logic import consumer_group
+
+
+class Command(BaseCommand):
+    help = ("Uruchamia jeden proces grupy konsumentów MQTT (własny potok i bufor zapisu). "
+            "Podział wiadomości według ACQUISITION_GROUP_MODE: subskrypcje współdzielone lub hash topiku.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--member', type=int, required=True, help="Numer procesu w grupie (od 0)")
+        parser.add_argument('--members', type=int, default=None,
+                            help="Liczba procesów w grupie (domyślnie ACQUISITION_GROUP_SIZE)")
+        parser.add_argument('--group', default=None, help="Nazwa grupy (domyślnie ACQUISITION_GROUP_NAME)")
+
+    def handle(self, *args, **options):
+        members = options['members'] or consumer_group.group_size()
+        member = options['member']
+        if not 0 <= member < members:
+            raise CommandError(f"--member musi być z zakresu 0..{members - 1}")
+        group = options['group'] or consumer_group.group_name()
+
+        self.stdout.write(f"Proces {member + 1}/{members} grupy {group} ({consumer_group.group_mode()})")
+        mqtt_runner.run_worker(member, members, group)
+        self.stdout.write(self.style.SUCCESS("Proces akwizycji zakończony"))
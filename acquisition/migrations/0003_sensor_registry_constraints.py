@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:07
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def _duplicates(rows, key):
+    """Grupy wierszy o tym samym kluczu: (wiersz z najmniejszym pk, pozostałe)"""
+    groups = {}
+    for row in sorted(rows, key=lambda row: row.pk):
+        groups.setdefault(key(row), []).append(row)
+    return [(group[0], group[1:]) for group in groups.values() if len(group) > 1]
+
+
+def merge_duplicates(apps, schema_editor):
+    # istniejące duplikaty uniemożliwiłyby dodanie ograniczeń - scalane do wiersza z najmniejszym pk
+    Location = apps.get_model('acquisition', 'Location')
+    SensorType = apps.get_model('acquisition', 'SensorType')
+    Sensor = apps.get_model('acquisition', 'Sensor')
+    Measurement = apps.get_model('acquisition', 'Measurement')
+
+    for keep, duplicates in _duplicates(Location.objects.all(), lambda l: (l.floor, l.room.lower())):
+        Sensor.objects.filter(location__in=duplicates).update(location=keep)
+        Location.objects.filter(pk__in=[l.pk for l in duplicates]).delete()
+
+    for keep, duplicates in _duplicates(SensorType.objects.all(), lambda t: t.name.lower()):
+        Sensor.objects.filter(type__in=duplicates).update(type=keep)
+        SensorType.objects.filter(pk__in=[t.pk for t in duplicates]).delete()
+
+    for keep, duplicates in _duplicates(Sensor.objects.all(), lambda s: (s.location_id, s.type_id)):
+        for duplicate in duplicates:
+            # pomiar o tym samym czasie już jest przy czujniku docelowym (unique_together sensor, timestamp)
+            Measurement.objects.filter(
+                sensor=duplicate, timestamp__in=Measurement.objects.filter(sensor=keep).values('timestamp')
+            ).delete()
+            Measurement.objects.filter(sensor=duplicate).update(sensor=keep)
+        last = Sensor.objects.filter(pk__in=[keep.pk] + [s.pk for s in duplicates]).aggregate(
+            last=Max('last_communication'))['last']
+        Sensor.objects.filter(pk=keep.pk).update(last_communication=last)
+        Sensor.objects.filter(pk__in=[s.pk for s in duplicates]).delete()
+
+    if schema_editor.connection.vendor == 'postgresql':
+        # odroczone sprawdzenia kluczy obcych przed ALTER TABLE w tej samej transakcji
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acquisition', '0002_acquisitioncontrol'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='location',
+            constraint=models.UniqueConstraint(models.F('floor'), django.db.models.functions.text.Lower('room'), name='unique_location_floor_room', nulls_distinct=False),
+        ),
+        migrations.AddConstraint(
+            model_name='sensor',
+            constraint=models.UniqueConstraint(fields=('location', 'type'), name='unique_sensor_location_type'),
+        ),
+        migrations.AddConstraint(
+            model_name='sensortype',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='unique_sensor_type_name'),
+        ),
+    ]
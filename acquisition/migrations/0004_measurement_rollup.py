@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acquisition', '0003_sensor_registry_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementRollup',
+            fields=[
+                ('id', models.BigAutoField(db_column='rollup_id', primary_key=True, serialize=False)),
+                ('resolution', models.CharField(choices=[('1m', 'Minute'), ('15m', 'Quarter Hour'), ('1h', 'Hour'), ('1d', 'Day')], max_length=3)),
+                ('bucket_start', models.DateTimeField()),
+                ('min_value', models.FloatField()),
+                ('max_value', models.FloatField()),
+                ('sum_value', models.FloatField()),
+                ('count', models.PositiveIntegerField()),
+                ('last_value', models.FloatField()),
+                ('last_timestamp', models.DateTimeField()),
+                ('sensor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='acquisition.sensor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('sensor', 'resolution', 'bucket_start'), name='unique_rollup_sensor_resolution_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,130 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:21
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+# Zamrożona kopia konwersji - migracja nie importuje kodu aplikacji (acquisition.logic.partitioning),
+# więc późniejsze zmiany modułu nie zmieniają jej działania.
+
+# tabela -> (kolumna klucza partycjonowania, kolumna klucza głównego)
+TABLES = {
+    'acquisition_measurement': ('timestamp', 'measurement_id'),
+    'acquisition_datalog': ('timestamp', 'log_id'),
+}
+MONTHS_AHEAD = 3
+
+
+def _month_start(value):
+    value = value.astimezone(datetime.timezone.utc)
+    return datetime.datetime(value.year, value.month, 1, tzinfo=datetime.timezone.utc)
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+def _bound(month):
+    return month.strftime('%Y-%m-%d 00:00:00+00')
+
+
+def convert_to_partitioned(schema_editor, table, now=None):
+    """
+    Zamień zwykłą tabelę na tabelę partycjonowaną miesięcznie (PARTITION BY RANGE), zachowując dane,
+    indeksy, ograniczenia UNIQUE/FK i sekwencję klucza głównego. Partycje <tabela>_pRRRRMM od miesiąca
+    najstarszego wiersza do MONTHS_AHEAD naprzód oraz <tabela>_default.
+    Klucz główny staje się złożony (pk, kolumna partycjonowania) - wymóg PostgreSQL.
+    """
+    column, pk_column = TABLES[table]
+    qn = schema_editor.quote_name
+    old = f"{table}_unpartitioned"
+
+    with schema_editor.connection.cursor() as cursor:
+        # definicje indeksów i ograniczeń zapamiętane przed zmianą nazwy tabeli
+        cursor.execute(
+            """
+            SELECT pg_get_indexdef(i.indexrelid)
+            FROM pg_index i
+            WHERE i.indrelid = %s::regclass
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+            """,
+            [table],
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype IN ('u', 'f')
+            """,
+            [table],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(f"SELECT MIN({qn(column)}) FROM {qn(table)}")
+        oldest = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(old)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({qn(column)})"
+        )
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY ({qn(pk_column)}, {qn(column)})")
+        cursor.execute(f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+
+        current = _month_start(now or timezone.now())
+        month = _month_start(oldest) if oldest is not None else current
+        while month <= _add_months(current, MONTHS_AHEAD):
+            name = f"{table}_p{month.year:04d}{month.month:02d}"
+            cursor.execute(
+                f"CREATE TABLE {qn(name)} PARTITION OF {qn(table)} "
+                f"FOR VALUES FROM ('{_bound(month)}') TO ('{_bound(_add_months(month, 1))}')"
+            )
+            month = _add_months(month, 1)
+
+        cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(old)}")
+        # bez CASCADE - tabela nie może mieć już przychodzących kluczy obcych
+        cursor.execute(f"DROP TABLE {qn(old)}")
+
+        sequence = f"{table}_{pk_column}_seq"
+        cursor.execute(f"CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.{qn(pk_column)}")
+        cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN {qn(pk_column)} SET DEFAULT nextval('{sequence}')")
+        cursor.execute(
+            f"SELECT setval('{sequence}', COALESCE((SELECT MAX({qn(pk_column)}) FROM {qn(table)}), 0) + 1, false)"
+        )
+
+        for name, definition in constraints:
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+        for definition in index_defs:
+            cursor.execute(definition)
+
+
+def partition_tables(apps, schema_editor):
+    # partycjonowanie deklaratywne jest dostępne tylko w PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        convert_to_partitioned(schema_editor, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acquisition', '0004_measurement_rollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='datalog',
+            name='measurement',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='acquisition.measurement'),
+        ),
+        # tabele pozostają partycjonowane także po cofnięciu migracji - dane nie są przepisywane
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='measurement',
+            index=models.Index(fields=['sensor', '-timestamp'], name='measurement_sensor_ts_desc'),
+        ),
+    ]
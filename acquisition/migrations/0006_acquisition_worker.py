@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acquisition', '0005_partition_measurement_datalog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AcquisitionWorker',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('group', models.CharField(max_length=100)),
+                ('member', models.PositiveIntegerField()),
+                ('members', models.PositiveIntegerField()),
+                ('host', models.CharField(max_length=255)),
+                ('pid', models.PositiveIntegerField()),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_heartbeat', models.DateTimeField(default=django.utils.timezone.now)),
+                ('stop_requested', models.BooleanField(default=False)),
+                ('stats', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['group', 'member'], name='acquisition_group_0ff29d_idx')],
+            },
+        ),
+    ]
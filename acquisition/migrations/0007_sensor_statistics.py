@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def fill_statistics(apps, schema_editor):
+    # jedno zapytanie GROUP BY - dalej liczniki doliczane są przy zapisie wsadów
+    Measurement = apps.get_model('acquisition', 'Measurement')
+    SensorStatistics = apps.get_model('acquisition', 'SensorStatistics')
+    rows = Measurement.objects.order_by().values('sensor_id').annotate(total=Count('pk'), last=Max('timestamp'))
+    SensorStatistics.objects.bulk_create([
+        SensorStatistics(sensor_id=row['sensor_id'], total_measurements=row['total'],
+                         last_measurement_at=row['last'])
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acquisition', '0006_acquisition_worker'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorStatistics',
+            fields=[
+                ('sensor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to='acquisition.sensor')),
+                ('total_measurements', models.BigIntegerField(default=0)),
+                ('last_measurement_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(fill_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acquisition', '0007_sensor_statistics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='measurement',
+            index=models.Index(fields=['timestamp', 'id'], name='measurement_ts_id'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('acquisition', '0008_measurement_export_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datalog',
+            name='first_seen',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='datalog',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='datalog',
+            name='repeat_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='datalog',
+            name='source',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+    ]
@@ -1,24 +1,34 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 from .enumeration_models import (
     DataLogLevel,
     SensorStatus,
-    MeasurementStatus
+    MeasurementStatus,
+    RollupResolution
 )
 
 
 class DataLog(models.Model):
     id = models.AutoField(primary_key=True, db_column="log_id")
+    # bez ograniczenia w bazie - tabela pomiarów jest partycjonowana, a jej partycje usuwane w całości
     measurement = models.ForeignKey(
         'Measurement',
         on_delete=models.SET_NULL,
         null=True,
-        blank=True
+        blank=True,
+        db_constraint=False
     )
     message = models.TextField()
     level = models.CharField(max_length=15, choices=DataLogLevel.choices, default=DataLogLevel.INFO)
     # nie ma w schemacie ale by się przydało
     timestamp = models.DateTimeField(auto_now_add=True)
+    # moduł zgłaszający (handle_data, validator, transformer, deduplicator)
+    source = models.CharField(max_length=50, blank=True, default='')
+    # powtórzenia tego samego komunikatu zebrane w jeden wiersz (LogAggregator)
+    repeat_count = models.PositiveIntegerField(default=1)
+    first_seen = models.DateTimeField(null=True, blank=True)
+    last_seen = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         indexes = [
@@ -39,6 +49,13 @@ class Location(models.Model):
         indexes = [
             models.Index(fields=["room"]),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                'floor', Lower('room'),
+                name='unique_location_floor_room',
+                nulls_distinct=False,
+            ),
+        ]
 
     def __str__(self):
         if self.floor is not None:
@@ -52,6 +69,11 @@ class SensorType(models.Model):
     min_value = models.FloatField(null=True)
     max_value = models.FloatField(null=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(Lower('name'), name='unique_sensor_type_name'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.default_unit})"
 
@@ -69,6 +91,9 @@ class Sensor(models.Model):
             models.Index(fields=["status"]),
             models.Index(fields=["last_communication"]),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'type'], name='unique_sensor_location_type'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.type.name}, {self.location.room})"
@@ -83,7 +108,89 @@ class Measurement(models.Model):
 
     class Meta:
         unique_together = ('sensor', 'timestamp')
+        indexes = [
+            # zakresy czasu i ostatni pomiar czujnika (get_measurements, get_last_measurement)
+            models.Index(fields=['sensor', '-timestamp'], name='measurement_sensor_ts_desc'),
+            # eksport stronicowany po kluczu (timestamp, id)
+            models.Index(fields=['timestamp', 'id'], name='measurement_ts_id'),
+        ]
 
     def __str__(self):
         return f"{self.sensor} at {self.timestamp} ({self.value} / {self.status})"
 
+
+
+class MeasurementRollup(models.Model):
+    """Agregat pomiarów czujnika w przedziale czasu (utrzymywany przyrostowo przy zapisie)"""
+    id = models.BigAutoField(primary_key=True, db_column="rollup_id")
+    sensor = models.ForeignKey(Sensor, on_delete=models.CASCADE, related_name='rollups')
+    resolution = models.CharField(max_length=3, choices=RollupResolution.choices)
+    bucket_start = models.DateTimeField()
+    min_value = models.FloatField()
+    max_value = models.FloatField()
+    sum_value = models.FloatField()
+    count = models.PositiveIntegerField()
+    last_value = models.FloatField()
+    last_timestamp = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['sensor', 'resolution', 'bucket_start'],
+                name='unique_rollup_sensor_resolution_bucket',
+            ),
+        ]
+
+    @property
+    def mean_value(self):
+        return self.sum_value / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.sensor_id} [{self.resolution}] {self.bucket_start} (n={self.count})"
+
+
+class SensorStatistics(models.Model):
+    """Liczniki pomiarów czujnika - doliczane przy zapisie wsadu, bez COUNT(*) po tabeli pomiarów"""
+    sensor = models.OneToOneField(Sensor, on_delete=models.CASCADE, primary_key=True, related_name='statistics')
+    total_measurements = models.BigIntegerField(default=0)
+    last_measurement_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.sensor_id}: {self.total_measurements}"
+
+
+class AcquisitionWorker(models.Model):
+    """Proces akwizycji w grupie konsumentów MQTT - stan zgłaszany okresowo przez sam proces"""
+    name = models.CharField(max_length=100, unique=True)
+    group = models.CharField(max_length=100)
+    member = models.PositiveIntegerField()
+    members = models.PositiveIntegerField()
+    host = models.CharField(max_length=255)
+    pid = models.PositiveIntegerField()
+    started_at = models.DateTimeField(default=timezone.now)
+    last_heartbeat = models.DateTimeField(default=timezone.now)
+    # ustawiane przez panel sterowania; proces kończy pracę przy najbliższym raporcie
+    stop_requested = models.BooleanField(default=False)
+    stats = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['group', 'member']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.member + 1}/{self.members}, pid {self.pid})"
+
+
+class SensorRegistryVersion(models.Model):
+    """
+    Wersja definicji czujników (jeden wiersz) - podbijana przy zmianie Location/SensorType/Sensor
+    w dowolnym procesie; workery akwizycji sprawdzają ją przy raporcie stanu i przeładowują rejestr
+    """
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"v{self.version}"
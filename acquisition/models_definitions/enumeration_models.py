@@ -16,4 +16,10 @@ class MeasurementStatus(models.TextChoices):
     OK = "OK"
     ERROR = "ERROR"
     DUPLICATE = "DUPLICATE"
-    NULL = "NULL"
\ No newline at end of file
+    NULL = "NULL"
+
+class RollupResolution(models.TextChoices):
+    MINUTE = "1m"
+    QUARTER_HOUR = "15m"
+    HOUR = "1h"
+    DAY = "1d"
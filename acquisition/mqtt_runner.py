@@ -1,10 +1,19 @@
-import queue
+import asyncio
 import threading
 import os
-from typing import Optional
+import signal
+from typing import Optional, Union
 
+from .async_runtime import ASYNCIO, AsyncAcquisitionRuntime, runtime_mode
 from .logic.MQTT_manager import MQTTManager
+from .logic.async_mqtt import AsyncMQTTManager
 from .logic.database_manager import DatabaseManager
+from .logic.inbox import MessageInbox
+from .logic.sensor_registry import sensor_registry
+from .logic.partitioning import ensure_partitions
+from .logic.pipeline import Pipeline
+from .logic import consumer_group
+from .data_logic.pipeline_stages import build_acquisition_pipeline
 from .data_logic.handle_data import HandleData
 from .data_logic.validator import Validator
 from .data_logic.deduplicator import Deduplicator
@@ -14,9 +23,13 @@ from .services import AcquisitionDataService
 
 _worker_thread: Optional[threading.Thread] = None
 _stop_event = threading.Event()
+_pipeline: Optional[Union[Pipeline, AsyncAcquisitionRuntime]] = None
+_db_manager: Optional[DatabaseManager] = None
 
 def is_running():
-    return _worker_thread is not None and _worker_thread.is_alive()
+    if _worker_thread is not None and _worker_thread.is_alive():
+        return True
+    return consumer_group.group_size() > 1 and consumer_group.is_group_running()
 
 def start_mqtt_worker():
     global _worker_thread, _stop_event
@@ -24,6 +37,12 @@ def start_mqtt_worker():
     if is_running():
         return "Akwizycja już działa!"
 
+    if consumer_group.group_size() > 1:
+        # grupa konsumentów - osobne procesy dzielące strumień MQTT
+        started = consumer_group.start_group()
+        print(f"SYSTEM: Uruchamianie grupy konsumentów ({len(started)} procesów)...")
+        return f"Uruchomiono {len(started)} procesów akwizycji."
+
     print("SYSTEM: Uruchamianie Workera MQTT...")
     _stop_event.clear()
     
@@ -35,6 +54,11 @@ def stop_mqtt_worker():
     global _stop_event
     if not is_running():
         return "Akwizycja nie jest uruchomiona."
+
+    if consumer_group.group_size() > 1:
+        stopped = consumer_group.stop_group()
+        print(f"SYSTEM: Zatrzymywanie grupy konsumentów ({stopped} procesów)...")
+        return "Wysłano sygnał zatrzymania do grupy."
     
     print("SYSTEM: Zatrzymywanie Workera MQTT...")
     _stop_event.set()
@@ -111,49 +135,165 @@ def stop_mqtt_worker():
 # --------------------------------
 # wersja asynchroniaczna (żeby spełnić warunek: Obsługuje wiadomości z MQTT w czasie zbliżonym do rzeczywistego (<100ms))
 # --------------------------------
-def _acquisition_loop():
+def get_pipeline_stats() -> Optional[dict]:
+    """Głębokość kolejek i opóźnienia etapów działającego potoku (None, gdy akwizycja stoi)."""
+    pipeline = _pipeline
+    return pipeline.get_stats() if pipeline is not None else None
+
+
+def get_writer_stats() -> Optional[dict]:
+    """Przepustowość zapisu pomiarów do bazy (None, gdy akwizycja stoi)."""
+    db_manager = _db_manager
+    return db_manager.get_writer_stats() if db_manager is not None else None
+
+
+def get_group_status() -> Optional[list]:
+    """Stan procesów grupy konsumentów (None poza trybem grupy)."""
+    return consumer_group.group_status() if consumer_group.group_size() > 1 else None
+
+
+def run_worker(member: int, members: int, group: Optional[str] = None) -> None:
+    """
+    Członek grupy konsumentów uruchomiony jako osobny proces (manage.py run_acquisition_worker).
+    Działa na pierwszym planie do SIGTERM/SIGINT lub żądania zatrzymania z panelu.
+    """
+    group = group or consumer_group.group_name()
+    name = consumer_group.worker_name(group, member)
+    consumer_group.register_worker(member, members, group)
+    _stop_event.clear()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: _stop_event.set())
+    try:
+        _acquisition_loop(member=member, members=members, group=group)
+    finally:
+        consumer_group.unregister_worker(name)
+
+
+def _wait_for_stop(worker: Optional[str], mqtt_manager: MQTTManager) -> None:
+    """
+    Czekanie na sygnał zatrzymania; w tym czasie proces sprawdza wersję definicji czujników
+    (zmiany z panelu administracyjnego), a członek grupy raportuje swój stan
+    """
+    while not _stop_event.wait(consumer_group.heartbeat_seconds()):
+        try:
+            if sensor_registry.sync_version():
+                print(f"WORKER: Definicje czujników zmienione - przeładowano rejestr (v{sensor_registry.version}).")
+        except Exception as e:
+            print(f"WORKER: Błąd odświeżania rejestru czujników: {e}")
+        if worker is None:
+            continue
+        stats = {
+            'connected': mqtt_manager.get_connection_status(),
+            'skipped_messages': mqtt_manager.skipped,
+            'pipeline': get_pipeline_stats(),
+            'writer': get_writer_stats(),
+        }
+        try:
+            if consumer_group.report_health(worker, stats):
+                print(f"WORKER {worker}: Zatrzymanie na żądanie panelu.")
+                return
+        except Exception as e:
+            print(f"WORKER {worker}: Błąd raportu stanu: {e}")
+
+
+async def _async_acquisition(worker: Optional[str], data_handler: HandleData,
+                             acquisition_service: AcquisitionDataService, broker_host: str, group_options: dict,
+                             inbox: Optional[MessageInbox] = None) -> None:
+    """Odbiór, przetwarzanie i wysyłka w jednej pętli asyncio; paho bez wątku loop_start"""
+    global _pipeline
+    runtime = AsyncAcquisitionRuntime(data_handler, acquisition_service, inbox=inbox)
+    mqtt_manager = AsyncMQTTManager(broker_url=broker_host, topics=data_handler.topic_router.filters(),
+                                    message_handler=runtime.submit, **group_options)
+    runtime.source = mqtt_manager
+    async with runtime:
+        _pipeline = runtime
+        try:
+            if not mqtt_manager.connect():
+                print("WORKER ERROR: Nie udało się połączyć z MQTT.")
+                return
+            print("WORKER: Połączono (asyncio). Rozpoczynam nasłuchiwanie.")
+
+            # oczekiwanie i raporty stanu grupy są blokujące - w wątku, pętla dalej odbiera wiadomości
+            await asyncio.to_thread(_wait_for_stop, worker, mqtt_manager)
+            await mqtt_manager.close()
+        finally:
+            _pipeline = None
+    print("WORKER: Pętla zatrzymana bezpiecznie.")
+
+
+def _acquisition_loop(member: Optional[int] = None, members: int = 1, group: Optional[str] = None):
     """
     Główna pętla modułu Acquisition.
     - Obsługuje wiadomości z MQTT w czasie zbliżonym do rzeczywistego (<100ms)
-    - Walidacja, deduplikacja, transformacja
+    - Wieloetapowy potok mikro-wsadowy: parse -> resolve -> reorder -> validate -> dedupe -> transform -> persist -> dispatch
+    - Ograniczone kolejki między etapami (backpressure aż do klienta MQTT)
+    - ACQUISITION_RUNTIME = "asyncio" - te same etapy w pętli asyncio (_async_acquisition)
     - Zapis asynchroniczny do bazy
     - Wysyłka do modułu alarmów
     """
+    global _pipeline, _db_manager
+    pipeline = None
+    db_manager = None
+    inbox = None
     try:
         # Inicjalizacja komponentów
-        db_manager = DatabaseManager()
+        worker = consumer_group.worker_name(group, member) if member is not None else None
+        # pomiary trafiają do bufora na dysku - po restarcie niezapisane są odtwarzane
+        db_manager = DatabaseManager(spool=True, spool_name=worker or '')
+        _db_manager = db_manager
+        # odebrane wiadomości na dysku od chwili odbioru (QoS 0 - broker ich nie powtórzy)
+        inbox = MessageInbox.open(worker or '')
         validator = Validator(db_manager)
         deduplicator = Deduplicator(db_manager)
         transformer = Transformer(db_manager)
         data_handler = HandleData(db_manager, validator, deduplicator, transformer)
         acquisition_service = AcquisitionDataService(db_manager)
 
-        # Konfiguracja MQTT
+        # Partycje na najbliższe miesiące (PostgreSQL) - zapis nie trafia do partycji domyślnej
+        created = ensure_partitions()
+        if created:
+            print(f"WORKER: Utworzono partycje: {', '.join(created)}")
+
+        # Rozgrzanie rejestru czujników - znane czujniki bez zapytań do bazy
+        registered = sensor_registry.warm_up()
+        print(f"WORKER: Wczytano {registered} czujników do rejestru.")
+
+        # Konfiguracja MQTT - wiadomości trafiają wprost do kolejki wejściowej potoku
         broker_host = os.getenv('MQTT_BROKER_HOST', 'localhost')
-        mqtt_manager = MQTTManager(broker_url=broker_host, topics=["environment/#"])
+        group_options = {}
+        if worker is not None:
+            group_options['client_id'] = f"acquisition-{worker}"
+            if consumer_group.group_mode() == consumer_group.SHARED:
+                # broker nie gwarantuje, że wiadomości czujnika trafią do jednego procesu
+                print("WORKER: UWAGA - tryb shared nie przypisuje czujników do procesów; stan per czujnik "
+                      "(deduplikacja, reorder, reguły z duration_seconds) wymaga routingu po czujniku w brokerze.")
+                group_options['shared_group'] = group
+            else:
+                group_options['partition'] = (member, members)
+                group_options['partition_key'] = data_handler.partition_key
 
-        if not mqtt_manager.connect():
-            print("WORKER ERROR: Nie udało się połączyć z MQTT.")
+        if runtime_mode() == ASYNCIO:
+            asyncio.run(_async_acquisition(worker, data_handler, acquisition_service, broker_host, group_options,
+                                           inbox))
             return
 
-        print("WORKER: Połączono. Rozpoczynam nasłuchiwanie.")
+        pipeline = build_acquisition_pipeline(data_handler, acquisition_service, inbox)
+        pipeline.start()
+        _pipeline = pipeline
 
-        # Pętla odbioru danych
-        while not _stop_event.is_set():
-            try:
-                # Pobieramy wiadomości z kolejki MQTT
-                topic_payload = mqtt_manager.message_queue.get(timeout=0.05)
-            except queue.Empty:
-                continue
+        mqtt_manager = MQTTManager(broker_url=broker_host, topics=data_handler.topic_router.filters(),
+                                   message_handler=pipeline.submit, **group_options)
 
-            topic, payload = topic_payload
-            measurement = data_handler.process(topic, payload)
+        if not mqtt_manager.connect():
+            print("WORKER ERROR: Nie udało się połączyć z MQTT.")
+            return
 
-            if measurement:
-                acquisition_service.post_to_alarms(measurement)
+        print("WORKER: Połączono. Rozpoczynam nasłuchiwanie.")
 
-            mqtt_manager.message_queue.task_done()
+        _wait_for_stop(worker, mqtt_manager)
 
+        mqtt_manager.client.loop_stop()
+        mqtt_manager.client.disconnect()
         print("WORKER: Pętla zatrzymana bezpiecznie.")
 
     except Exception as e:
@@ -163,10 +303,23 @@ def _acquisition_loop():
         print(traceback.format_exc())
 
         try:
-            DatabaseManager().insert_data_log(DataLog(
+            # shutdown() w finally zapisze log przed zakończeniem wątku
+            db_manager = db_manager or DatabaseManager()
+            db_manager.insert_data_log(DataLog(
                 level=DataLogLevel.CRITICAL,
                 message=error_msg[:255]
             ))
         except Exception as e:
             print(f"ERROR: {e}")
             pass
+    finally:
+        if pipeline is not None:
+            pipeline.stop()
+        _pipeline = None
+        # po zatrzymaniu potoku - potwierdzone jest wszystko, co z niego wyszło
+        if inbox is not None:
+            inbox.close()
+        # zapis wsadów, które nie doczekały się terminu
+        if db_manager is not None:
+            db_manager.shutdown()
+        _db_manager = None
@@ -1,20 +1,37 @@
 import datetime
 import requests
 import os
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any
+
+from django.conf import settings
 
 from .logic.database_manager import DatabaseManager
-from .models import Measurement, DataLog
+from .logic.rollups import DEFAULT_MAX_BUCKETS
+from .models import Measurement, MeasurementRollup, DataLog
 
 class AcquisitionDataService:
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
         # self.alarms_url = "http://localhost:8000/api/data-inspection/check_rules/"
         self.alarms_url = os.getenv('INSPECTION_API_URL', "http://localhost:8000/api/data-inspection/check_rules/")
+        self.alarms_batch_url = os.getenv('INSPECTION_BATCH_API_URL', "http://localhost:8000/api/data-inspection/check_rules_batch/")
+        # "inprocess" - reguły sprawdzane bezpośrednio w tym procesie, "http" - przez API modułu alarmów
+        self.alarms_dispatch = getattr(settings, 'ACQUISITION_ALARMS_DISPATCH', 'inprocess')
 
-    def post_to_alarms(self, measurement: Measurement):
+    @staticmethod
+    def _build_alarm_payload(measurement: Measurement) -> Dict[str, Any]:
+        return {
+            "metric_name": measurement.sensor.type.name,
+            "value": measurement.value,
+            "timestamp": measurement.timestamp,
+            "details": {
+                "sensor_id": measurement.sensor.id,
+                "room": measurement.sensor.location.room,
+                "status": measurement.status
+            }
+        }
 
-        metric_name = measurement.sensor.type.name
+    def post_to_alarms(self, measurement: Measurement):
 
         # payload = {
         #     "metric_name": metric_name,
@@ -22,16 +39,8 @@ class AcquisitionDataService:
         #     "timestamp": measurement.timestamp.isoformat()
         # }
 
-        payload = {
-            "metric_name": metric_name,
-            "value": measurement.value,
-            "timestamp": measurement.timestamp.isoformat(),
-            "details": {
-                "sensor_id": measurement.sensor.id,
-                "room": measurement.sensor.location.room,
-                "status": measurement.status
-            }
-        }
+        payload = self._build_alarm_payload(measurement)
+        payload["timestamp"] = measurement.timestamp.isoformat()
 
         try:
             response = requests.post(self.alarms_url, json=payload, timeout=5)
@@ -39,6 +48,37 @@ class AcquisitionDataService:
         except requests.exceptions.RequestException as e:
             print(f"Błąd wysyłki do alarmów: {e}")
 
+    def build_alarm_batch(self, measurements: List[Measurement]) -> Dict[str, Any]:
+        """Treść żądania do API wsadowego alarmów (timestampy w ISO 8601)"""
+        payloads = [self._build_alarm_payload(m) for m in measurements]
+        for payload in payloads:
+            payload["timestamp"] = payload["timestamp"].isoformat()
+        return {"measurements": payloads}
+
+    def dispatch_to_alarms(self, measurements: List[Measurement]):
+        """
+        Przekazuje wsad pomiarów do modułu alarmów.
+        Domyślnie reguły sprawdzane są w tym samym procesie, bez pętli HTTP.
+        """
+        if not measurements:
+            return
+
+        if self.alarms_dispatch == 'http':
+            try:
+                response = requests.post(self.alarms_batch_url, json=self.build_alarm_batch(measurements), timeout=5)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                print(f"Błąd wysyłki do alarmów: {e}")
+            return
+
+        payloads = [self._build_alarm_payload(m) for m in measurements]
+        # import lokalny - moduł alarmów nie musi być załadowany przy imporcie akwizycji
+        from alarms.services import MonitoringService
+        try:
+            MonitoringService.inspect_batch(payloads)
+        except Exception as e:
+            print(f"Błąd sprawdzania reguł alarmów: {e}")
+
     def get_measurements_by_time_range(
         self,
         sensor_id: int,
@@ -51,6 +91,21 @@ class AcquisitionDataService:
         """
         return self.db_manager.get_measurements(sensor_id, start_time, end_time)
 
+    def get_aggregated_measurements(
+        self,
+        sensor_id: int,
+        start_time: datetime.datetime,
+        end_time: datetime.datetime,
+        resolution: Optional[str] = None,
+        max_buckets: int = DEFAULT_MAX_BUCKETS
+    ) -> List[MeasurementRollup]:
+        """
+        Pobiera agregaty (min/max/średnia/liczba/ostatnia wartość) czujnika w zakresie czasu.
+        Bez podanej rozdzielczości wybierana jest najgrubsza, która daje co najwyżej
+        max_buckets przedziałów - raport roczny czyta setki wierszy zamiast surowych pomiarów.
+        """
+        return self.db_manager.get_rollups(sensor_id, start_time, end_time, resolution, max_buckets)
+
     def get_latest_measurement(self, sensor_id: int) -> Optional[Measurement]:
         """
         Pobiera najnowszy, pojedynczy pomiar dla czujnika, niezależnie od tego, kiedy wpłynął.
@@ -76,6 +131,24 @@ class AcquisitionDataService:
             end_time=end_time
         )
 
+    def stream_analysis_data(
+            self,
+            room: Optional[str] = None,
+            metric: Optional[str] = None,
+            start_time: Optional[datetime.datetime] = None,
+            end_time: Optional[datetime.datetime] = None,
+    ) -> Iterator[Measurement]:
+        """
+        Jak get_filtered_analysis_data, ale bez wczytywania całego zakresu do pamięci -
+        dla długich okresów (miesiące danych do prognoz i analiz).
+        """
+        return self.db_manager.iter_filtered_measurements(
+            room=room,
+            metric=metric,
+            start_time=start_time,
+            end_time=end_time
+        )
+
     # --- Pobieranie logów ---
     def get_logs_by_level(self, level: str) -> List[DataLog]:
         return self.db_manager.get_logs(level)
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Location, SensorType, Sensor
+from .logic.sensor_registry import sensor_registry
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=SensorType)
+@receiver(post_save, sender=Sensor)
+def sensor_definition_saved(sender, instance, created, **kwargs):
+    """Zmiana istniejącego czujnika, typu lub lokalizacji unieważnia rejestr - też w innych procesach"""
+    # nowe wiersze nie zmieniają już zarejestrowanych mapowań
+    if not created:
+        sensor_registry.invalidate()
+        sensor_registry.bump_version()
+
+
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=SensorType)
+@receiver(post_delete, sender=Sensor)
+def sensor_definition_deleted(sender, instance, **kwargs):
+    sensor_registry.invalidate()
+    sensor_registry.bump_version()
@@ -0,0 +1,207 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, override_settings
+from django.core.exceptions import ImproperlyConfigured
+
+from acquisition import async_runtime
+from acquisition.async_runtime import AsyncAcquisitionRuntime, runtime_mode
+from acquisition.logic.async_mqtt import AsyncMQTTManager
+from acquisition.logic.reorder_buffer import ReorderBuffer
+
+
+class FakeStages:
+    """Etapy bez bazy: payload to timestamp pomiaru, czujnik to payload % sensors"""
+
+    def __init__(self, lateness=0, sensors=1000):
+        self.sensors = sensors
+        self.reorder_buffer = ReorderBuffer(lateness_seconds=lateness)
+        self.threads = set()
+        self.persisted = []
+        self.dispatched = []
+
+    def _pass(self, batch):
+        self.threads.add(threading.current_thread().name)
+        return batch
+
+    parse = resolve = validate = dedupe = transform = _pass
+
+    def reorder(self, batch):
+        for item in batch:
+            item.measurement = SimpleNamespace(timestamp=item.payload, sensor_id=item.payload % self.sensors)
+            self.reorder_buffer.push(0, item.payload, item)
+        return self.reorder_buffer.pop_ready()
+
+    def reorder_tick(self, force):
+        return self.reorder_buffer.pop_ready(force=force)
+
+    def persist(self, batch):
+        self.persisted.extend(item.payload for item in batch)
+        return batch
+
+    def dispatch(self, batch):
+        self.dispatched.extend(item.payload for item in batch)
+        return batch
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+
+class FakeHttpClient:
+    def __init__(self, delay=lambda body: 0.01):
+        self.delay = delay
+        self.posts = []
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    async def post(self, url, json):
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        await asyncio.sleep(self.delay(json))
+        self.concurrent -= 1
+        self.posts.append(json)
+        return FakeResponse()
+
+
+class FakeService:
+    alarms_batch_url = "http://alarms/batch"
+
+    def __init__(self, dispatch='inprocess'):
+        self.alarms_dispatch = dispatch
+
+    def build_alarm_batch(self, measurements):
+        return {"measurements": [m.timestamp for m in measurements]}
+
+
+class FakeSource:
+    def __init__(self):
+        self.calls = []
+
+    def pause_reading(self):
+        self.calls.append('pause')
+
+    def resume_reading(self):
+        self.calls.append('resume')
+
+
+class AsyncAcquisitionRuntimeTest(SimpleTestCase):
+    def _runtime(self, stages, service=None, **kwargs):
+        return AsyncAcquisitionRuntime(None, service or FakeService(), stages=stages, **kwargs)
+
+    def test_messages_are_processed_off_loop_and_dispatched(self):
+        stages = FakeStages()
+        runtime = self._runtime(stages, batch_size=4)
+
+        async def scenario():
+            async with runtime:
+                for ts in range(10):
+                    runtime.submit('t', ts)
+
+        asyncio.run(scenario())
+
+        self.assertEqual(stages.persisted, list(range(10)))
+        self.assertEqual(stages.dispatched, list(range(10)))
+        # etapy synchroniczne w jednym wątku pomocniczym, nie w pętli zdarzeń
+        self.assertEqual(len(stages.threads), 1)
+        self.assertTrue(next(iter(stages.threads)).startswith('acq-async-sync'))
+        stats = runtime.get_stats()
+        self.assertEqual((stats['received'], stats['completed']), (10, 10))
+
+    def test_held_items_are_flushed_on_stop(self):
+        stages = FakeStages(lateness=3600)
+        runtime = self._runtime(stages)
+
+        async def scenario():
+            async with runtime:
+                for ts in (3, 1, 2):
+                    runtime.submit('t', ts)
+                await asyncio.sleep(0.05)
+                self.assertEqual(stages.persisted, [])
+
+        asyncio.run(scenario())
+
+        self.assertEqual(stages.persisted, [1, 2, 3])
+        self.assertEqual(runtime.completed, 3)
+
+    def test_http_dispatch_keeps_batches_in_flight(self):
+        stages = FakeStages()
+        client = FakeHttpClient()
+        runtime = self._runtime(stages, FakeService('http'), batch_size=1, http_client=client)
+
+        async def scenario():
+            async with runtime:
+                for ts in range(20):
+                    runtime.submit('t', ts)
+
+        asyncio.run(scenario())
+
+        self.assertEqual(sorted(post["measurements"][0] for post in client.posts), list(range(20)))
+        self.assertGreater(client.max_concurrent, 1)
+        self.assertEqual(stages.dispatched, [])
+
+    def test_http_dispatch_keeps_sensor_order(self):
+        stages = FakeStages(sensors=2)
+        # starsze wsady odpowiadają wolniej - bez kolejkowania wyprzedziłyby je nowsze
+        client = FakeHttpClient(delay=lambda body: 0.02 if body["measurements"][0] % 4 < 2 else 0.001)
+        runtime = self._runtime(stages, FakeService('http'), batch_size=1, http_client=client)
+
+        async def scenario():
+            async with runtime:
+                for ts in range(20):
+                    runtime.submit('t', ts)
+
+        asyncio.run(scenario())
+
+        sent = [post["measurements"][0] for post in client.posts]
+        for sensor in (0, 1):
+            self.assertEqual([ts for ts in sent if ts % 2 == sensor], list(range(sensor, 20, 2)))
+        # różne czujniki nadal wysyłane równolegle
+        self.assertEqual(client.max_concurrent, 2)
+        self.assertEqual(runtime._sensor_tails, {})
+
+    def test_full_queue_pauses_source(self):
+        runtime = self._runtime(FakeStages(), queue_size=4)
+        source = runtime.source = FakeSource()
+
+        async def scenario():
+            async with runtime:
+                for ts in range(6):
+                    runtime.submit('t', ts)
+                self.assertEqual(source.calls, ['pause'])
+
+        asyncio.run(scenario())
+
+        self.assertEqual(source.calls, ['pause', 'resume'])
+        self.assertEqual(runtime.get_stats()['pauses'], 1)
+
+    def test_http_mode_requires_httpx(self):
+        runtime = self._runtime(FakeStages(), FakeService('http'))
+        original, async_runtime.httpx = async_runtime.httpx, None
+        self.addCleanup(setattr, async_runtime, 'httpx', original)
+
+        with self.assertRaises(ImproperlyConfigured):
+            asyncio.run(runtime.start())
+
+    def test_runtime_mode_setting(self):
+        self.assertEqual(runtime_mode(), 'threads')
+        with override_settings(ACQUISITION_RUNTIME='gevent'):
+            with self.assertRaises(ImproperlyConfigured):
+                runtime_mode()
+
+
+class AsyncMQTTManagerTest(SimpleTestCase):
+    def test_receive_matches_sync_manager(self):
+        message = SimpleNamespace(topic='szebi/weather/in1/temperature', payload=b'{}')
+
+        handled = []
+        with_handler = AsyncMQTTManager('localhost', ['szebi/#'], message_handler=lambda *args: handled.append(args))
+        with_handler._on_message(None, None, message)
+        self.assertEqual(with_handler.receive(), [])
+        self.assertEqual(handled, [(message.topic, message.payload)])
+
+        queued = AsyncMQTTManager('localhost', ['szebi/#'])
+        queued._on_message(None, None, message)
+        self.assertEqual(queued.receive(), [(message.topic, message.payload)])
@@ -0,0 +1,88 @@
+import numpy as np
+from unittest.mock import MagicMock
+
+from django.test import TestCase
+
+from acquisition.data_logic.transformer import Transformer
+from acquisition.data_logic.validator import ValidationStatus, Validator
+from acquisition.models import Location, SensorType, Sensor, Measurement
+
+
+class BatchValidationTest(TestCase):
+    def setUp(self):
+        self.db_manager = MagicMock()
+        location = Location.objects.create(floor=1, room="101")
+        self.temperature = SensorType.objects.create(name="temperature", default_unit="C",
+                                                     min_value=-40.0, max_value=60.0)
+        self.humidity = SensorType.objects.create(name="humidity", default_unit="%", max_value=100.0)
+        self.t_sensor = Sensor.objects.create(location=location, type=self.temperature, name="t101")
+        self.h_sensor = Sensor.objects.create(location=location, type=self.humidity, name="h101")
+        self.validator = Validator(self.db_manager)
+        self.transformer = Transformer(self.db_manager)
+
+    def test_validate_batch_status_codes(self):
+        self.validator.type_ranges.update([self.temperature, self.humidity])
+        t, h = self.temperature.pk, self.humidity.pk
+
+        status = self.validator.validate_batch(
+            np.array([t, t, t, h, h, t, 999]),
+            np.array([20.0, -50.0, 70.0, -5.0, 120.0, np.nan, 1.0]),
+        )
+
+        self.assertEqual(status.tolist(), [
+            ValidationStatus.VALID, ValidationStatus.BELOW_MIN, ValidationStatus.ABOVE_MAX,
+            ValidationStatus.VALID, ValidationStatus.ABOVE_MAX, ValidationStatus.MISSING,
+            ValidationStatus.UNKNOWN_TYPE,
+        ])
+
+    def test_validate_measurements_matches_single_validation(self):
+        measurements = [
+            Measurement(sensor=self.t_sensor, value=value)
+            for value in (20.0, -50.0, 70.0, None)
+        ] + [Measurement(sensor=self.h_sensor, value=150.0)]
+
+        valid = self.validator.validate_measurements(measurements)
+
+        single = [Validator(MagicMock()).validate(m) for m in measurements]
+        self.assertEqual(valid.tolist(), single)
+        self.assertEqual(self.db_manager.insert_data_log.call_count, 4)
+        messages = [call.args[0].message for call in self.db_manager.insert_data_log.call_args_list]
+        self.assertTrue(messages[0].startswith("Wartość -50.0 poniżej minimum -40.0"))
+
+    def test_ranges_are_refreshed_from_sensor_types(self):
+        self.validator.validate_measurements([Measurement(sensor=self.t_sensor, value=50.0)])
+        self.temperature.max_value = 40.0
+
+        valid = self.validator.validate_measurements([Measurement(sensor=self.t_sensor, value=50.0)])
+        self.assertEqual(valid.tolist(), [False])
+
+    def test_convert_batch_matches_conversion_table(self):
+        units = ["C", "F", "km/h", "kW", "%", "lumen", "unknown"]
+        values = [21.5, 98.6, 36.0, 1.5, 55.0, 250.0, 7.0]
+        codes = np.array([self.transformer.unit_code(u) for u in units])
+
+        converted, known = self.transformer.convert_batch(codes, np.array(values))
+
+        self.assertEqual(known.tolist(), [True] * 6 + [False])
+        expected = [self.transformer.conversion_table[u](v) for u, v in zip(units[:-1], values[:-1])] + [7.0]
+        self.assertEqual(converted.tolist(), expected)
+
+    def test_convert_measurements(self):
+        measurements = [Measurement(sensor=self.t_sensor, value=value) for value in (212.0, None, 5.0)]
+        for m, unit in zip(measurements, ("F", "F", "?")):
+            m.unit = unit
+
+        self.transformer.convert_measurements(measurements)
+
+        self.assertEqual([m.value for m in measurements], [100.0, None, 5.0])
+        self.assertEqual(self.db_manager.insert_data_log.call_count, 1)
+
+    def test_failed_log_does_not_reconvert_batch(self):
+        measurements = [Measurement(sensor=self.t_sensor, value=value) for value in (212.0, 5.0)]
+        for m, unit in zip(measurements, ("F", "?")):
+            m.unit = unit
+        self.db_manager.insert_data_log.side_effect = RuntimeError("kolejka zamknięta")
+
+        self.transformer.convert_measurements(measurements)
+
+        self.assertEqual([m.value for m in measurements], [100.0, 5.0])
@@ -0,0 +1,158 @@
+import datetime
+import threading
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase
+
+from acquisition.logic.bulk_writer import MeasurementBulkWriter, _copy_value
+from acquisition.logic.database_manager import DatabaseManager
+from acquisition.logic.write_queue import FlushStats, WriteQueue
+from acquisition.models import (
+    Location, SensorType, Sensor, Measurement, DataLog, MeasurementRollup, SensorStatistics,
+)
+
+UTC = datetime.timezone.utc
+
+
+class MeasurementBulkWriterTest(TestCase):
+    def setUp(self):
+        location = Location.objects.create(floor=1, room="101")
+        sensor_type = SensorType.objects.create(name="temperature", default_unit="C")
+        self.sensor = Sensor.objects.create(location=location, type=sensor_type, name="t101")
+        self.start = datetime.datetime(2024, 3, 1, 12, 0, tzinfo=UTC)
+        self.writer = MeasurementBulkWriter()
+
+    def _measurement(self, offset, value=20.0):
+        return Measurement(sensor=self.sensor, value=value,
+                           timestamp=self.start + datetime.timedelta(seconds=offset))
+
+    def test_conflicting_rows_are_skipped(self):
+        Measurement.objects.create(sensor=self.sensor, value=1.0, timestamp=self.start)
+        batch = [self._measurement(0), self._measurement(10), self._measurement(10, value=99.0), self._measurement(20)]
+
+        written = self.writer.write(batch)
+
+        self.assertEqual([m.timestamp for m in written], [batch[1].timestamp, batch[3].timestamp])
+        self.assertTrue(all(m.pk is not None for m in written))
+        self.assertEqual(Measurement.objects.count(), 3)
+        self.assertEqual(Measurement.objects.get(timestamp=batch[1].timestamp).value, 20.0)
+        stats = self.writer.stats.as_dict()
+        self.assertEqual((stats['rows_written'], stats['rows_skipped']), (2, 2))
+
+    def test_copy_text_format(self):
+        self.assertEqual(_copy_value(None), '\\N')
+        self.assertEqual(_copy_value(float('nan')), 'NaN')
+        self.assertEqual(_copy_value(float('-inf')), '-Infinity')
+        self.assertEqual(_copy_value(0.1), '0.1')
+        self.assertEqual(_copy_value(self.start), '2024-03-01T12:00:00+00:00')
+        self.assertEqual(_copy_value("a\tb"), 'a\\tb')
+
+    def test_flush_updates_rollups_only_for_written_rows(self):
+        manager = DatabaseManager.__new__(DatabaseManager)
+        manager.measurement_writer = self.writer
+        Measurement.objects.create(sensor=self.sensor, value=1.0, timestamp=self.start)
+
+        manager._flush_measurements([self._measurement(0), self._measurement(30, value=30.0)])
+
+        rollup = MeasurementRollup.objects.get(resolution='1m')
+        self.assertEqual(rollup.count, 1)
+        self.assertEqual(rollup.last_value, 30.0)
+
+    def test_retry_after_failed_rollup_keeps_rows_and_rollups_consistent(self):
+        manager = DatabaseManager.__new__(DatabaseManager)
+        manager.measurement_writer = self.writer
+        batch = [self._measurement(0), self._measurement(30, value=30.0)]
+
+        with mock.patch('acquisition.logic.database_manager.upsert_rollups',
+                        side_effect=OperationalError("connection lost")):
+            with self.assertRaises(OperationalError):
+                manager._flush_measurements(batch)
+        # wiersze wycofane razem z agregatami
+        self.assertEqual(Measurement.objects.count(), 0)
+        self.assertTrue(all(m.pk is None for m in batch))
+
+        manager._flush_measurements(batch)
+
+        self.assertEqual(Measurement.objects.count(), 2)
+        self.assertEqual(MeasurementRollup.objects.get(resolution='1m').count, 2)
+        self.assertEqual(SensorStatistics.objects.get(sensor=self.sensor).total_measurements, 2)
+
+    def test_logs_of_unsaved_measurements_are_detached(self):
+        manager = DatabaseManager.__new__(DatabaseManager)
+        saved = Measurement.objects.create(sensor=self.sensor, value=1.0, timestamp=self.start)
+
+        manager._flush_logs([
+            DataLog(message="odrzucony", measurement=self._measurement(5)),
+            DataLog(message="zapisany", measurement=saved),
+        ])
+
+        self.assertIsNone(DataLog.objects.get(message="odrzucony").measurement_id)
+        self.assertEqual(DataLog.objects.get(message="zapisany").measurement_id, saved.pk)
+
+
+class WriterDeadlineTest(TestCase):
+    def _manager(self):
+        manager = DatabaseManager.__new__(DatabaseManager)
+        manager.batch_size = 100
+        manager.flush_seconds = 0.05
+        manager._stopping = threading.Event()
+        return manager
+
+    def test_partial_batch_is_flushed_after_deadline(self):
+        manager = self._manager()
+        source = WriteQueue('test', 100)
+        stats = FlushStats()
+        flushed = []
+        done = threading.Event()
+
+        def flush(batch):
+            flushed.append(list(batch))
+            done.set()
+
+        worker = threading.Thread(target=manager._drain, args=(source, flush, stats), daemon=True)
+        worker.start()
+        for i in range(3):
+            source.put(i)
+
+        # wsad niepełny, ale zapisany bez czekania na kolejne elementy
+        self.assertTrue(done.wait(2.0))
+        self.assertEqual(flushed, [[0, 1, 2]])
+
+        source.put(3)
+        source.put_sentinel()
+        worker.join(2.0)
+        self.assertEqual(flushed, [[0, 1, 2], [3]])
+        self.assertEqual(stats.as_dict()['items'], 4)
+        self.assertGreaterEqual(stats.as_dict()['max_batch_age_ms'], 50.0)
+
+    def test_batch_is_retried_after_connection_error(self):
+        manager = self._manager()
+        stats = FlushStats()
+        attempts = []
+
+        def flush(batch):
+            attempts.append(list(batch))
+            if len(attempts) < 3:
+                raise OperationalError("server closed the connection unexpectedly")
+
+        with mock.patch.object(DatabaseManager, 'RETRY_BASE_SECONDS', 0.001), \
+                mock.patch('acquisition.logic.database_manager.connection') as conn:
+            manager._flush_with_retry([1, 2], flush, stats, 0.0)
+
+        self.assertEqual(attempts, [[1, 2]] * 3)
+        self.assertEqual(conn.close.call_count, 2)
+        self.assertEqual((stats.batches, stats.retries, stats.dropped), (1, 2, 0))
+
+    def test_batch_is_dropped_on_connection_error_during_shutdown(self):
+        manager = self._manager()
+        manager._stopping.set()
+        stats = FlushStats()
+
+        def flush(batch):
+            raise OperationalError("connection refused")
+
+        with mock.patch('acquisition.logic.database_manager.connection'):
+            self.assertFalse(manager._flush_with_retry([1, 2], flush, stats, 0.0))
+
+        self.assertEqual((stats.batches, stats.retries, stats.dropped), (0, 1, 2))
@@ -0,0 +1,106 @@
+import datetime
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from acquisition import mqtt_runner
+from acquisition.data_logic.handle_data import HandleData, build_topic_router
+from acquisition.logic import consumer_group
+from acquisition.logic.MQTT_manager import MQTTManager
+from acquisition.models import AcquisitionWorker
+
+
+class ConsumerGroupTest(TestCase):
+    def test_health_report_and_stop_request(self):
+        worker = consumer_group.register_worker(0, 2, group='test')
+        self.assertEqual((worker.name, worker.pid), ('test-0', os.getpid()))
+
+        self.assertFalse(consumer_group.report_health('test-0', {'pipeline': {'queued': 3}}))
+        self.assertEqual(AcquisitionWorker.objects.get(name='test-0').stats, {'pipeline': {'queued': 3}})
+        self.assertTrue(consumer_group.is_group_running('test'))
+
+        self.assertEqual(consumer_group.stop_group('test'), 1)
+        self.assertTrue(consumer_group.report_health('test-0', {}))
+        self.assertFalse(consumer_group.is_group_running('test'))
+
+    def test_superseded_worker_stops(self):
+        consumer_group.register_worker(1, 2, group='test')
+        AcquisitionWorker.objects.filter(name='test-1').update(pid=os.getpid() + 1)
+
+        self.assertTrue(consumer_group.report_health('test-1', {}))
+        consumer_group.unregister_worker('test-1')
+        self.assertTrue(AcquisitionWorker.objects.filter(name='test-1').exists())
+
+    def test_stale_worker_is_not_alive(self):
+        consumer_group.register_worker(0, 1, group='test')
+        AcquisitionWorker.objects.update(last_heartbeat=timezone.now() - datetime.timedelta(minutes=5))
+
+        self.assertEqual([w['alive'] for w in consumer_group.group_status('test')], [False])
+
+    @override_settings(ACQUISITION_GROUP_SIZE=3)
+    def test_start_group_spawns_missing_members(self):
+        consumer_group.register_worker(1, 3, group='test')
+        with mock.patch.object(consumer_group, '_processes', {}), \
+                mock.patch('acquisition.logic.consumer_group.subprocess.Popen') as popen:
+            started = consumer_group.start_group(group='test')
+
+        self.assertEqual(started, [0, 2])
+        args = popen.call_args_list[0].args[0]
+        self.assertEqual(args[-7:], ['run_acquisition_worker', '--member', '0', '--members', '3', '--group', 'test'])
+
+    @override_settings(ACQUISITION_GROUP_SIZE=2, ACQUISITION_GROUP_NAME='test')
+    def test_control_panel_controls_group(self):
+        with mock.patch.object(consumer_group, 'start_group', return_value=[0, 1]) as start:
+            self.assertEqual(mqtt_runner.start_mqtt_worker(), "Uruchomiono 2 procesów akwizycji.")
+        start.assert_called_once()
+
+        consumer_group.register_worker(0, 2, group='test')
+        self.assertTrue(mqtt_runner.is_running())
+        mqtt_runner.stop_mqtt_worker()
+        self.assertFalse(mqtt_runner.is_running())
+        self.assertEqual(len(mqtt_runner.get_group_status()), 1)
+
+
+class MQTTManagerGroupTest(TestCase):
+    def _message(self, topic):
+        return SimpleNamespace(topic=topic, payload=b'{}')
+
+    def test_shared_subscription(self):
+        manager = MQTTManager('localhost', ['szebi/#'], shared_group='szebi')
+        with mock.patch.object(manager.client, 'subscribe') as subscribe:
+            manager.subscribe('szebi/#')
+        subscribe.assert_called_once_with('$share/szebi/szebi/#')
+
+    def test_hash_partition_splits_topics(self):
+        topics = [f"szebi/weather/room{i}/temperature" for i in range(50)]
+        received = {0: [], 1: []}
+        for member in (0, 1):
+            manager = MQTTManager('localhost', ['szebi/#'], partition=(member, 2),
+                                  message_handler=lambda topic, _p, m=member: received[m].append(topic))
+            for topic in topics:
+                manager._on_message(None, None, self._message(topic))
+
+        self.assertEqual(sorted(received[0] + received[1]), sorted(topics))
+        self.assertFalse(set(received[0]) & set(received[1]))
+        self.assertTrue(received[0] and received[1])
+
+    def test_partition_key_keeps_device_topics_together(self):
+        handler = SimpleNamespace(topic_router=build_topic_router())
+        key = HandleData.partition_key.__get__(handler)
+        topics = [f"szebi/device/state/dev-{i}/{part}" for i in range(20) for part in ('power', 'mode')]
+        received = {0: [], 1: []}
+        for member in (0, 1):
+            manager = MQTTManager('localhost', ['szebi/#'], partition=(member, 2), partition_key=key,
+                                  message_handler=lambda topic, _p, m=member: received[m].append(topic))
+            for topic in topics:
+                manager._on_message(None, None, self._message(topic))
+
+        devices = [{topic.split('/')[3] for topic in received[m]} for m in (0, 1)]
+        self.assertEqual(len(received[0]) + len(received[1]), len(topics))
+        self.assertFalse(devices[0] & devices[1])
+
+    def test_hash_mode_is_default(self):
+        self.assertEqual(consumer_group.group_mode(), consumer_group.HASH)
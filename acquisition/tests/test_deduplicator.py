@@ -0,0 +1,78 @@
+import datetime
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase
+
+from acquisition.data_logic.deduplicator import Deduplicator
+from acquisition.models import Measurement
+
+UTC = datetime.timezone.utc
+
+
+class DeduplicatorTest(SimpleTestCase):
+    def setUp(self):
+        self.db_manager = MagicMock()
+        self.start = datetime.datetime(2024, 3, 1, 12, 0, tzinfo=UTC)
+
+    def _ts(self, seconds):
+        return self.start + datetime.timedelta(seconds=seconds)
+
+    def test_redelivered_older_message_is_duplicate(self):
+        dedup = Deduplicator(self.db_manager, window_seconds=600)
+        for offset in (0, 10, 20):
+            self.assertFalse(dedup.is_duplicate(1, self._ts(offset)))
+
+        # ponowne dostarczenie wcześniejszej wiadomości po nowszych
+        self.assertTrue(dedup.is_duplicate(1, self._ts(10)))
+        self.assertFalse(dedup.is_duplicate(2, self._ts(10)))
+        # spóźniona, ale nowa wiadomość w oknie
+        self.assertFalse(dedup.is_duplicate(1, self._ts(5)))
+        self.assertTrue(dedup.is_duplicate(1, self._ts(5)))
+
+    def test_timestamps_outside_window_are_forgotten(self):
+        dedup = Deduplicator(self.db_manager, window_seconds=60)
+        dedup.is_duplicate(1, self._ts(0))
+        dedup.is_duplicate(1, self._ts(120))
+
+        self.assertFalse(dedup.is_duplicate(1, self._ts(0)))
+        stats = dedup.get_stats()
+        self.assertEqual((stats['timestamps'], stats['out_of_window']), (1, 1))
+
+    def test_memory_limits(self):
+        dedup = Deduplicator(self.db_manager, window_seconds=3600, max_per_sensor=3, max_sensors=2)
+        for offset in range(5):
+            dedup.is_duplicate(1, self._ts(offset))
+        dedup.is_duplicate(2, self._ts(0))
+        dedup.is_duplicate(3, self._ts(0))
+
+        stats = dedup.get_stats()
+        self.assertEqual((stats['sensors'], stats['evicted_sensors']), (2, 1))
+        self.assertNotIn(1, dedup.recent_records)
+        self.assertEqual(len(dedup.recent_records[2]), 1)
+
+        # najstarsze timestampy czujnika wypadają po przekroczeniu limitu
+        dedup = Deduplicator(self.db_manager, window_seconds=3600, max_per_sensor=3)
+        for offset in range(5):
+            dedup.is_duplicate(1, self._ts(offset))
+        self.assertTrue(dedup.is_duplicate(1, self._ts(4)))
+        self.assertFalse(dedup.is_duplicate(1, self._ts(0)))
+
+    def test_check_batch_flags_repeats_within_batch(self):
+        dedup = Deduplicator(self.db_manager)
+        dedup.is_duplicate(1, self._ts(0))
+        batch = [
+            Measurement(sensor_id=1, timestamp=self._ts(0), value=1.0),
+            Measurement(sensor_id=1, timestamp=self._ts(1), value=1.0),
+            Measurement(sensor_id=1, timestamp=self._ts(1), value=2.0),
+            Measurement(sensor_id=2, timestamp=self._ts(1), value=1.0),
+        ]
+
+        self.assertEqual(dedup.check_batch(batch), [True, False, True, False])
+        self.assertEqual(self.db_manager.insert_data_log.call_count, 2)
+
+    def test_microsecond_precision(self):
+        dedup = Deduplicator(self.db_manager)
+        ts = datetime.datetime(2024, 3, 1, 12, 0, 0, 1, tzinfo=UTC)
+        dedup.is_duplicate(1, ts)
+        self.assertFalse(dedup.is_duplicate(1, ts.replace(microsecond=2)))
+        self.assertTrue(dedup.is_duplicate(1, ts.astimezone(datetime.timezone(datetime.timedelta(hours=2)))))
@@ -0,0 +1,75 @@
+import csv
+import datetime
+import io
+import json
+
+from django.test import TestCase, override_settings
+
+from acquisition.logic import export
+from acquisition.models import Location, SensorType, Sensor, Measurement
+
+UTC = datetime.timezone.utc
+URL = '/acquisition/api/measurements/export/'
+
+
+@override_settings(ACQUISITION_EXPORT_CHUNK_SIZE=3)
+class MeasurementExportTest(TestCase):
+    def setUp(self):
+        location = Location.objects.create(floor=1, room="101")
+        self.temperature = Sensor.objects.create(
+            location=location, type=SensorType.objects.create(name="temperature", default_unit="C"), name="t101")
+        self.humidity = Sensor.objects.create(
+            location=location, type=SensorType.objects.create(name="humidity", default_unit="%"), name="h101")
+        self.start = datetime.datetime(2024, 3, 1, 12, 0, tzinfo=UTC)
+        measurements = []
+        for i in range(5):
+            timestamp = self.start + datetime.timedelta(minutes=i)
+            # ten sam timestamp dla obu czujników - kolejność rozstrzyga id
+            measurements.append(Measurement(sensor=self.temperature, timestamp=timestamp, value=20.0 + i))
+            measurements.append(Measurement(sensor=self.humidity, timestamp=timestamp, value=40.0 + i))
+        Measurement.objects.bulk_create(measurements)
+        self.expected = list(Measurement.objects.order_by('timestamp', 'id').values_list('id', flat=True))
+
+    def _stream(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_pages_follow_keyset_order(self):
+        pages = list(export.iter_pages(export.filter_measurements()))
+        self.assertEqual([len(p) for p in pages], [3, 3, 3, 1])
+        self.assertEqual([row[0] for page in pages for row in page], self.expected)
+
+    def test_limit_and_cursor(self):
+        queryset = export.filter_measurements()
+        first = [row[0] for page in export.iter_pages(queryset, limit=4) for row in page]
+        cursor = export.next_cursor(queryset, None, 4)
+        rest = [row[0] for page in export.iter_pages(queryset, export.decode_cursor(export.encode_cursor(cursor)))
+                for row in page]
+        self.assertEqual(first + rest, self.expected)
+        self.assertIsNone(export.next_cursor(queryset, None, 10))
+
+    def test_ndjson_endpoint_with_filters(self):
+        response = self.client.get(URL, {"metric": "temperature", "start": "2024-03-01T12:01:00"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in self._stream(response).splitlines()]
+        self.assertEqual([r["value"] for r in rows], [21.0, 22.0, 23.0, 24.0])
+        self.assertEqual(rows[0]["room"], "101")
+        self.assertEqual(rows[0]["timestamp"], "2024-03-01T12:01:00+00:00")
+
+    def test_csv_endpoint_paginated(self):
+        seen = []
+        params = {"format": "csv", "limit": 4}
+        while True:
+            response = self.client.get(URL, params)
+            reader = list(csv.reader(io.StringIO(self._stream(response))))
+            self.assertEqual(tuple(reader[0]), export.COLUMNS)
+            seen.extend(int(row[0]) for row in reader[1:])
+            if "X-Next-Cursor" not in response:
+                break
+            params["cursor"] = response["X-Next-Cursor"]
+        self.assertEqual(seen, self.expected)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(URL, {"format": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get(URL, {"cursor": "???"}).status_code, 400)
+        self.assertEqual(self.client.get(URL, {"start": "yesterday"}).status_code, 400)
+        self.assertEqual(self.client.get(URL, {"limit": "0"}).status_code, 400)
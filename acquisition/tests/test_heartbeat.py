@@ -0,0 +1,45 @@
+import datetime
+
+from django.test import TestCase
+
+from acquisition.logic.heartbeat import HeartbeatTracker
+from acquisition.models import Location, SensorType, Sensor
+
+UTC = datetime.timezone.utc
+
+
+class HeartbeatTrackerTest(TestCase):
+    def setUp(self):
+        location = Location.objects.create(floor=1, room="101")
+        self.sensors = [
+            Sensor.objects.create(location=location, type=SensorType.objects.create(name=name, default_unit="u"), name=name)
+            for name in ("temperature", "humidity", "co2")
+        ]
+        self.tracker = HeartbeatTracker()
+        self.start = datetime.datetime(2024, 3, 1, 12, 0, tzinfo=UTC)
+
+    def _at(self, seconds):
+        return self.start + datetime.timedelta(seconds=seconds)
+
+    def test_many_touches_flush_in_one_statement(self):
+        for second in range(100):
+            for sensor in self.sensors[:2]:
+                self.tracker.touch(sensor.pk, self._at(second))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.tracker.flush(), 2)
+
+        self.assertEqual(Sensor.objects.get(pk=self.sensors[0].pk).last_communication, self._at(99))
+        self.assertIsNone(Sensor.objects.get(pk=self.sensors[2].pk).last_communication)
+        self.assertEqual(len(self.tracker), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.tracker.flush(), 0)
+
+    def test_late_sample_does_not_move_last_communication_back(self):
+        sensor = self.sensors[0]
+        self.tracker.touch(sensor.pk, self._at(60))
+        self.tracker.flush()
+
+        self.tracker.touch(sensor.pk, self._at(30))
+        self.tracker.flush()
+        self.assertEqual(Sensor.objects.get(pk=sensor.pk).last_communication, self._at(60))
@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from acquisition.data_logic.handle_data import build_topic_router
+from acquisition.logic.load_generator import InProcessBroker, load_recording, replay, synthetic_traffic
+from acquisition.logic.pipeline import Pipeline, Stage, compute_percentiles
+
+
+class SyntheticTrafficTest(SimpleTestCase):
+    def test_messages_cycle_over_sensors(self):
+        messages = list(synthetic_traffic(sensors=6, rate=100, count=12, start_ts=1700000000.0))
+
+        self.assertEqual(len(messages), 12)
+        self.assertEqual(len({topic for _, topic, _ in messages}), 6)
+        self.assertEqual(messages[1][0], 0.01)
+        payloads = [json.loads(payload) for _, _, payload in messages]
+        # timestampy unikalne - generator nie produkuje duplikatów
+        self.assertEqual(len({p["ts"] for p in payloads}), 12)
+        self.assertEqual(messages[0][1], "szebi/weather/inside1/temperature")
+        self.assertEqual(messages[4][1], "szebi/weather/inside2/temperature")
+
+    def test_duration_sets_count(self):
+        self.assertEqual(len(list(synthetic_traffic(sensors=2, rate=50, duration=0.5))), 25)
+        with self.assertRaises(ValueError):
+            list(synthetic_traffic(sensors=2, rate=50))
+
+    def test_recording_offsets(self):
+        fd, path = tempfile.mkstemp(suffix=".ndjson")
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, "w") as f:
+            f.write(json.dumps({"topic": "szebi/status", "payload": {"consumption_mode": "eco"}, "ts": 100.5}) + "\n")
+            f.write("\n")
+            f.write(json.dumps({"topic": "szebi/weather/in1/temperature", "payload": '{"value": 1}', "ts": 101.0}) + "\n")
+
+        messages = list(load_recording(path))
+
+        self.assertEqual([(offset, topic) for offset, topic, _ in messages],
+                         [(0.0, "szebi/status"), (0.5, "szebi/weather/in1/temperature")])
+        self.assertEqual(json.loads(messages[0][2]), {"consumption_mode": "eco"})
+
+
+class InProcessBrokerTest(SimpleTestCase):
+    def test_delivers_to_matching_subscriptions(self):
+        broker = InProcessBroker()
+        received = []
+        for topic_filter in build_topic_router().filters():
+            broker.subscribe(topic_filter, lambda topic, payload: received.append(topic))
+        broker.subscribe("szebi/#", lambda topic, payload: received.append("all:" + topic))
+
+        sent = replay([(0.0, "szebi/weather/in1/temperature", b"{}"), (0.0, "environment/x", b"{}")],
+                      broker.publish, speed=0)
+
+        self.assertEqual(sent, 2)
+        # najbardziej szczegółowy filtr - jeden odbiorca, jak w routerze akwizycji
+        self.assertEqual(received, ["szebi/weather/in1/temperature"])
+        self.assertEqual((broker.published, broker.delivered, broker.unrouted), (2, 1, 1))
+
+
+class LatencyPercentilesTest(SimpleTestCase):
+    def test_compute_percentiles(self):
+        samples = [float(i) for i in range(1, 101)]
+        self.assertEqual(compute_percentiles(samples, 50, 99), [51.0, 100.0])
+        self.assertEqual(compute_percentiles([], 50), [0.0])
+
+    def test_pipeline_reports_percentiles(self):
+        pipeline = Pipeline([Stage('noop', lambda batch: batch)])
+        for latency in (0.001, 0.002, 0.1):
+            pipeline._record_end_to_end(latency)
+
+        stats = pipeline.get_stats()
+        self.assertEqual(stats['p50_end_to_end_ms'], 2.0)
+        self.assertEqual(stats['p99_end_to_end_ms'], 100.0)
@@ -0,0 +1,138 @@
+import datetime
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from acquisition.data_logic.deduplicator import Deduplicator
+from acquisition.logic.database_manager import DatabaseManager
+from acquisition.logic.log_aggregator import LogAggregator, message_template
+from acquisition.models import DataLog, DataLogLevel, Location, Measurement, Sensor, SensorType
+
+
+def _log(message, level=DataLogLevel.WARNING, source='validator', measurement=None):
+    return DataLog(measurement=measurement, source=source, level=level, message=message)
+
+
+class MessageTemplateTest(TestCase):
+    def test_numbers_and_raw_payload_are_dropped(self):
+        first = "Wartość 41.5 powyżej maksimum 40 | topic: szebi/weather/in1/temperature | raw: {\"value\": 41.5}"
+        second = "Wartość 43 powyżej maksimum 40 | topic: szebi/weather/in1/temperature | raw: {\"value\": 43}"
+
+        self.assertEqual(message_template(first), message_template(second))
+        self.assertEqual(message_template(first),
+                         "Wartość # powyżej maksimum # | topic: szebi/weather/in1/temperature")
+        # topic zostaje w odcisku - inne źródło to inny odcisk
+        self.assertNotEqual(message_template(first), message_template(first.replace("in1", "in2")))
+
+    def test_fingerprint_includes_sensor(self):
+        sensor_type = SensorType.objects.create(name="temperature", default_unit="C")
+        first = Sensor.objects.create(location=Location.objects.create(floor=1, room="101"), type=sensor_type, name="t1")
+        second = Sensor.objects.create(location=Location.objects.create(floor=1, room="102"), type=sensor_type, name="t2")
+
+        a = LogAggregator.fingerprint(_log("Brak wartości", measurement=Measurement(sensor=first)))
+        b = LogAggregator.fingerprint(_log("Brak wartości", measurement=Measurement(sensor=second)))
+
+        self.assertNotEqual(a, b)
+        self.assertEqual(LogAggregator.fingerprint(_log("Brak wartości"))[2], None)
+
+
+class LogAggregatorTest(TestCase):
+    def test_first_occurrence_is_written_and_repeats_counted(self):
+        aggregator = LogAggregator(window_seconds=60)
+        first = aggregator.add(_log("Wartość 0 poniżej minimum 10"), now=100.0)
+        self.assertEqual([(log.message, log.repeat_count) for log in first], [("Wartość 0 poniżej minimum 10", 1)])
+        for value in range(1, 5):
+            self.assertEqual(aggregator.add(_log(f"Wartość {value} poniżej minimum 10"), now=100.0 + value), [])
+        self.assertEqual(len(aggregator.add(_log("Błąd walidacji", level=DataLogLevel.ERROR), now=101.0)), 1)
+
+        self.assertEqual(aggregator.collect(now=150.0), [])
+        ready = aggregator.collect(now=160.0)
+
+        # podsumowanie powtórzeń - pierwsze wystąpienie jest już zapisane
+        self.assertEqual(len(ready), 1)
+        self.assertEqual(ready[0].message, "Wartość 1 poniżej minimum 10")
+        self.assertEqual(ready[0].repeat_count, 4)
+        self.assertLessEqual(ready[0].first_seen, ready[0].last_seen)
+        # okno bez powtórzeń nie daje drugiego wiersza
+        self.assertEqual(aggregator.collect(now=161.0), [])
+        self.assertEqual(aggregator.get_stats()['emitted'], 3)
+
+    def test_new_window_after_close(self):
+        aggregator = LogAggregator(window_seconds=10)
+        aggregator.add(_log("Wartość 1 poniżej minimum 10"), now=0.0)
+        aggregator.collect(now=10.0)
+
+        ready = aggregator.add(_log("Wartość 2 poniżej minimum 10"), now=11.0)
+
+        self.assertEqual([(log.message, log.repeat_count) for log in ready], [("Wartość 2 poniżej minimum 10", 1)])
+        self.assertEqual(aggregator.collect(force=True), [])
+
+    def test_echo_is_rate_limited(self):
+        aggregator = LogAggregator(window_seconds=60, echo_limit=2)
+        with mock.patch('builtins.print') as printed:
+            for value in range(10):
+                aggregator.add(_log(f"TRANSFORMER WARNING: jednostka {value}", source='transformer'),
+                               echo=True, now=0.0)
+            self.assertEqual(printed.call_count, 2)
+            aggregator.collect(force=True)
+
+        self.assertEqual(printed.call_count, 3)
+        self.assertIn("powtórzono 10 razy", printed.call_args[0][0])
+        self.assertEqual(aggregator.get_stats()['suppressed_echo'], 8)
+
+    def test_disabled_window_passes_through(self):
+        aggregator = LogAggregator(window_seconds=0)
+        log = _log("Wartość 1 poniżej minimum 10")
+
+        self.assertEqual(aggregator.add(log), [log])
+        self.assertEqual(log.repeat_count, 1)
+        self.assertEqual(aggregator.collect(force=True), [])
+
+    def test_oldest_window_is_evicted(self):
+        aggregator = LogAggregator(window_seconds=60, max_fingerprints=2)
+        aggregator.add(_log("pierwszy"), now=0.0)
+        aggregator.add(_log("pierwszy"), now=0.5)
+        aggregator.add(_log("drugi"), now=1.0)
+
+        ready = aggregator.add(_log("trzeci"), now=2.0)
+
+        self.assertEqual([(log.message, log.repeat_count) for log in ready], [("trzeci", 1), ("pierwszy", 1)])
+        self.assertEqual(aggregator.get_stats()['open_windows'], 2)
+
+    def test_duplicates_of_different_sensors_are_not_merged(self):
+        sensor_type = SensorType.objects.create(name="temperature", default_unit="C")
+        sensors = [Sensor.objects.create(location=Location.objects.create(floor=1, room=str(room)),
+                                         type=sensor_type, name=f"t{room}") for room in (1, 2, 3)]
+        deduplicator = Deduplicator(mock.Mock())
+        timestamp = timezone.now()
+        measurements = [Measurement(sensor=sensor, timestamp=timestamp, value=1.0) for sensor in sensors]
+        deduplicator.check_batch(measurements)
+        deduplicator.check_batch(measurements)
+
+        aggregator = LogAggregator(window_seconds=60)
+        ready = [log for call in deduplicator.db_manager.insert_data_log.call_args_list
+                 for log in aggregator.add(call.args[0], now=0.0)]
+
+        self.assertEqual(len(ready), 3)
+        self.assertEqual({log.measurement.sensor_id for log in ready}, {sensor.pk for sensor in sensors})
+
+
+@override_settings(ACQUISITION_LOG_WINDOW_SECONDS=3600)
+class DatabaseManagerLogAggregationTest(TestCase):
+    def test_storm_is_saved_as_first_row_and_summary(self):
+        manager = DatabaseManager()
+        try:
+            for value in range(50):
+                manager.insert_data_log(DataLog(
+                    source='handle_data', level=DataLogLevel.ERROR,
+                    message=f"Niepoprawny JSON w linii {value} | topic: szebi/weather/in1/temperature"))
+        finally:
+            manager.shutdown()
+
+        first, summary = DataLog.objects.order_by('pk')
+        self.assertEqual((first.repeat_count, summary.repeat_count), (1, 49))
+        self.assertIn("linii 0 ", first.message)
+        self.assertEqual(summary.source, 'handle_data')
+        self.assertIsInstance(summary.last_seen, datetime.datetime)
+        self.assertEqual(manager.get_writer_stats()['log_aggregator']['received'], 50)
@@ -0,0 +1,100 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+
+from acquisition.logic import parquet_archive
+from acquisition.logic.parquet_archive import HOURLY, RAW, export_day, read_columns, read_frame
+from acquisition.logic.rollups import upsert_rollups
+from acquisition.models import Location, SensorType, Sensor, Measurement, MeasurementStatus
+
+UTC = datetime.timezone.utc
+
+
+@unittest.skipIf(parquet_archive.pa is None, "pyarrow nie jest zainstalowany")
+class ParquetArchiveTest(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        location = Location.objects.create(floor=1, room="101")
+        self.temperature = Sensor.objects.create(
+            location=location, type=SensorType.objects.create(name="temperature", default_unit="C"), name="t101")
+        self.humidity = Sensor.objects.create(
+            location=location, type=SensorType.objects.create(name="humidity", default_unit="%"), name="h101")
+        self.day = datetime.date(2024, 3, 1)
+        self.start = datetime.datetime(2024, 3, 1, 23, 0, tzinfo=UTC)
+        measurements = []
+        for i in range(6):
+            timestamp = self.start + datetime.timedelta(minutes=20 * i)  # 23:00 - 00:40 następnej doby
+            measurements.append(Measurement(sensor=self.temperature, timestamp=timestamp, value=20.0 + i))
+            measurements.append(Measurement(sensor=self.humidity, timestamp=timestamp, value=40.0 + i,
+                                            status=MeasurementStatus.ERROR if i == 0 else MeasurementStatus.OK))
+        Measurement.objects.bulk_create(measurements)
+        upsert_rollups(measurements)
+
+    def test_export_writes_file_per_type_and_day(self):
+        written = export_day(self.day, root=self.root)
+
+        self.assertEqual(written, {"temperature": 3, "humidity": 3})
+        self.assertTrue(os.path.exists(
+            os.path.join(self.root, RAW, "metric=temperature", "date=2024-03-01", "part-0.parquet")))
+
+    def test_read_with_filters(self):
+        export_day(self.day, root=self.root)
+        export_day(self.day + datetime.timedelta(days=1), root=self.root)
+
+        frame = read_frame(metric="temperature", start=self.start + datetime.timedelta(minutes=30), root=self.root)
+        self.assertEqual(list(frame["value"]), [22.0, 23.0, 24.0, 25.0])
+
+        columns = read_columns(sensor_ids=[self.humidity.id], end=self.start + datetime.timedelta(minutes=20),
+                               columns=["value", "status"], root=self.root)
+        self.assertEqual(list(columns["value"]), [40.0, 41.0])
+        self.assertEqual(list(columns["status"]), [MeasurementStatus.ERROR, MeasurementStatus.OK])
+
+    def test_reexport_replaces_day(self):
+        export_day(self.day, root=self.root)
+        Measurement.objects.filter(sensor=self.humidity).delete()
+
+        self.assertEqual(export_day(self.day, root=self.root), {"temperature": 3})
+        self.assertEqual(len(read_frame(root=self.root)), 3)
+
+    def test_failed_reexport_keeps_previous_files(self):
+        export_day(self.day, root=self.root)
+        write = parquet_archive._write_partition
+
+        def fail_on_temperature(path, *args):
+            if "metric=temperature" in path:
+                raise OSError("dysk pełny")
+            write(path, *args)
+
+        with mock.patch.object(parquet_archive, '_write_partition', fail_on_temperature):
+            with self.assertRaises(OSError):
+                export_day(self.day, root=self.root)
+
+        self.assertEqual(len(read_frame(root=self.root)), 6)
+
+    def test_hourly_rollups(self):
+        export_day(self.day, source=HOURLY, root=self.root)
+
+        frame = read_frame(HOURLY, metric="temperature", root=self.root)
+        self.assertEqual(list(frame["count"]), [3])
+        self.assertEqual(list(frame["max_value"]), [22.0])
+
+    def test_missing_archive_is_empty(self):
+        self.assertEqual(len(read_frame(root=self.root)), 0)
+
+
+class ParquetUnavailableTest(TestCase):
+    def test_clear_error_without_pyarrow(self):
+        original = parquet_archive.pa
+        parquet_archive.pa = None
+        try:
+            with self.assertRaises(ImproperlyConfigured):
+                export_day(datetime.date(2024, 3, 1), root=tempfile.gettempdir())
+        finally:
+            parquet_archive.pa = original
@@ -0,0 +1,205 @@
+import datetime
+import importlib
+import unittest
+from io import StringIO
+from types import SimpleNamespace
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from acquisition.logic.database_manager import DatabaseManager
+from acquisition.logic.partitioning import (add_months, create_partition, drop_expired_partitions, ensure_partitions,
+                                            expired_partitions, list_partitions, month_start, partition_name)
+from acquisition.models import Location, SensorType, Sensor, Measurement
+
+UTC = datetime.timezone.utc
+
+
+class PartitioningTest(TestCase):
+    def test_month_arithmetic(self):
+        ts = datetime.datetime(2024, 12, 31, 23, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=-2)))
+        # 2025-01-01 01:30 UTC
+        self.assertEqual(month_start(ts), datetime.datetime(2025, 1, 1, tzinfo=UTC))
+        self.assertEqual(add_months(datetime.datetime(2024, 11, 1, tzinfo=UTC), 3),
+                         datetime.datetime(2025, 2, 1, tzinfo=UTC))
+        self.assertEqual(add_months(datetime.datetime(2024, 1, 1, tzinfo=UTC), -1),
+                         datetime.datetime(2023, 12, 1, tzinfo=UTC))
+        self.assertEqual(partition_name('acquisition_measurement', datetime.datetime(2024, 3, 1, tzinfo=UTC)),
+                         'acquisition_measurement_p202403')
+
+    def test_retention_keeps_whole_recent_months(self):
+        partitions = {datetime.datetime(2024, m, 1, tzinfo=UTC): f"t_p2024{m:02d}" for m in range(1, 7)}
+        now = datetime.datetime(2024, 6, 15, tzinfo=UTC)
+        self.assertEqual(expired_partitions(partitions, 3, now), ['t_p202401', 't_p202402'])
+        self.assertEqual(expired_partitions(partitions, 0, now), [])
+
+    def test_command_is_noop_without_postgresql(self):
+        out = StringIO()
+        call_command('manage_partitions', stdout=out)
+        self.assertIn("PostgreSQL", out.getvalue())
+
+    def test_last_measurement_is_one_query(self):
+        location = Location.objects.create(floor=1, room="101")
+        sensor_type = SensorType.objects.create(name="temperature", default_unit="C")
+        sensor = Sensor.objects.create(location=location, type=sensor_type, name="t101")
+        newest = datetime.datetime(2024, 3, 10, tzinfo=UTC)
+        Measurement.objects.bulk_create([
+            Measurement(sensor=sensor, value=1.0, timestamp=datetime.datetime(2024, 1, 5, tzinfo=UTC)),
+            Measurement(sensor=sensor, value=2.0, timestamp=newest),
+        ])
+        manager = DatabaseManager.__new__(DatabaseManager)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(manager.get_last_measurement(sensor.pk).timestamp, newest)
+
+
+class RecordingCursor:
+    """Kursor zapisujący SQL zamiast wykonywać go w PostgreSQL; respond(sql) -> wiersze wyniku"""
+
+    def __init__(self, respond=None):
+        self.db = SimpleNamespace(alias='default', ops=connection.ops, vendor='postgresql')
+        self.respond = respond or (lambda sql: [])
+        self.statements = []
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.statements.append(sql)
+        self._rows = self.respond(sql)
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class RecordingConnection:
+    vendor = 'postgresql'
+    alias = 'default'
+    ops = connection.ops
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+
+def _partitions_of(table, *months):
+    return [(partition_name(table, datetime.datetime(2024, m, 1, tzinfo=UTC)),) for m in months]
+
+
+class PartitionSqlTest(TestCase):
+    """Ścieżki PostgreSQL sprawdzane na wygenerowanym SQL"""
+
+    def test_ensure_partitions_creates_missing_months(self):
+        def respond(sql):
+            # każda tabela ma już partycję bieżącego miesiąca i domyślną
+            if 'pg_inherits' in sql:
+                return _partitions_of('t', 3) + [('t_default',)]
+            return [(False,)]
+        cursor = RecordingCursor(respond)
+
+        created = ensure_partitions(months_ahead=2, now=datetime.datetime(2024, 3, 20, tzinfo=UTC),
+                                    connection=RecordingConnection(cursor))
+
+        self.assertEqual(created, ['acquisition_measurement_p202404', 'acquisition_measurement_p202405',
+                                   'acquisition_datalog_p202404', 'acquisition_datalog_p202405'])
+        self.assertIn('CREATE TABLE IF NOT EXISTS "acquisition_measurement_p202404" PARTITION OF '
+                      '"acquisition_measurement" FOR VALUES FROM (\'2024-04-01 00:00:00+00\') '
+                      'TO (\'2024-05-01 00:00:00+00\')', cursor.statements)
+
+    def test_create_partition_moves_rows_out_of_default(self):
+        cursor = RecordingCursor(lambda sql: [(True,)] if sql.startswith('SELECT EXISTS') else [])
+
+        create_partition(cursor, 'acquisition_measurement', datetime.datetime(2024, 2, 1, tzinfo=UTC))
+
+        self.assertEqual([sql.split(' (')[0] for sql in cursor.statements[1:]], [
+            'ALTER TABLE "acquisition_measurement" DETACH PARTITION "acquisition_measurement_default"',
+            'CREATE TABLE "acquisition_measurement_p202402" PARTITION OF "acquisition_measurement" FOR VALUES FROM',
+            'WITH moved AS',
+            'ALTER TABLE "acquisition_measurement" ATTACH PARTITION "acquisition_measurement_default" DEFAULT',
+        ])
+
+    @override_settings(ACQUISITION_MEASUREMENT_RETENTION_MONTHS=2, ACQUISITION_DATALOG_RETENTION_MONTHS=0)
+    def test_drop_expired_partitions(self):
+        def respond(sql):
+            return _partitions_of('acquisition_measurement', 1, 2, 3, 4) if 'pg_inherits' in sql else []
+        now = datetime.datetime(2024, 4, 10, tzinfo=UTC)
+
+        cursor = RecordingCursor(respond)
+        self.assertEqual(drop_expired_partitions(now=now, dry_run=True, connection=RecordingConnection(cursor)),
+                         ['acquisition_measurement_p202401'])
+        self.assertFalse([sql for sql in cursor.statements if sql.startswith('DROP')])
+
+        cursor = RecordingCursor(respond)
+        drop_expired_partitions(now=now, connection=RecordingConnection(cursor))
+        # liczniki pomniejszone o pomiary partycji przed jej usunięciem
+        drop_at = cursor.statements.index('DROP TABLE "acquisition_measurement_p202401"')
+        update = cursor.statements[drop_at - 1]
+        self.assertTrue(update.startswith('UPDATE "acquisition_sensorstatistics" SET total_measurements'))
+        self.assertIn('FROM "acquisition_measurement_p202401" GROUP BY sensor_id', update)
+        self.assertEqual(len([sql for sql in cursor.statements if sql.startswith('DROP')]), 1)
+
+    def test_migration_converts_table_with_data_and_constraints(self):
+        migration = importlib.import_module('acquisition.migrations.0005_partition_measurement_datalog')
+
+        def respond(sql):
+            if 'pg_get_indexdef' in sql:
+                return [('CREATE INDEX measurement_sensor_idx ON acquisition_measurement (sensor_id)',)]
+            if 'pg_get_constraintdef' in sql:
+                return [('measurement_sensor_fk', 'FOREIGN KEY (sensor_id) REFERENCES acquisition_sensor(sensor_id)')]
+            if sql.startswith('SELECT MIN'):
+                return [(datetime.datetime(2024, 1, 15, tzinfo=UTC),)]
+            return []
+        cursor = RecordingCursor(respond)
+        schema_editor = SimpleNamespace(quote_name=connection.ops.quote_name,
+                                        connection=RecordingConnection(cursor))
+
+        migration.convert_to_partitioned(schema_editor, 'acquisition_measurement',
+                                         now=datetime.datetime(2024, 2, 10, tzinfo=UTC))
+
+        statements = cursor.statements[3:]
+        self.assertEqual(statements[0], 'ALTER TABLE "acquisition_measurement" RENAME TO '
+                                        '"acquisition_measurement_unpartitioned"')
+        self.assertTrue(statements[1].endswith('PARTITION BY RANGE ("timestamp")'))
+        self.assertEqual(statements[2], 'ALTER TABLE "acquisition_measurement" ADD PRIMARY KEY '
+                                        '("measurement_id", "timestamp")')
+        # partycje od miesiąca najstarszego wiersza do MONTHS_AHEAD miesięcy po bieżącym
+        created = [sql.split('"')[1] for sql in statements if 'PARTITION OF' in sql]
+        self.assertEqual(created, ['acquisition_measurement_default'] +
+                         [f'acquisition_measurement_p2024{m:02d}' for m in range(1, 6)])
+        tail = statements[-7:]
+        self.assertEqual(tail[0], 'INSERT INTO "acquisition_measurement" SELECT * FROM '
+                                  '"acquisition_measurement_unpartitioned"')
+        self.assertEqual(tail[1], 'DROP TABLE "acquisition_measurement_unpartitioned"')
+        self.assertTrue(tail[4].startswith("SELECT setval('acquisition_measurement_measurement_id_seq'"))
+        self.assertEqual(tail[5], 'ALTER TABLE "acquisition_measurement" ADD CONSTRAINT "measurement_sensor_fk" '
+                                  'FOREIGN KEY (sensor_id) REFERENCES acquisition_sensor(sensor_id)')
+        self.assertEqual(tail[6], 'CREATE INDEX measurement_sensor_idx ON acquisition_measurement (sensor_id)')
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Partycjonowanie wymaga PostgreSQL")
+class PostgresPartitionTest(TestCase):
+    def test_measurements_land_in_monthly_partitions(self):
+        location = Location.objects.create(floor=1, room="101")
+        sensor_type = SensorType.objects.create(name="temperature", default_unit="C")
+        sensor = Sensor.objects.create(location=location, type=sensor_type, name="t101")
+        ensure_partitions(months_ahead=1)
+        now = timezone.now()
+        Measurement.objects.create(sensor=sensor, value=1.0, timestamp=now)
+
+        with connection.cursor() as cursor:
+            partitions = list_partitions(cursor, 'acquisition_measurement')
+            name = partitions[month_start(now)]
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(name)}")
+            self.assertEqual(cursor.fetchone()[0], 1)
@@ -0,0 +1,74 @@
+import json
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase, TestCase
+
+from acquisition.data_logic.deduplicator import Deduplicator
+from acquisition.data_logic.handle_data import HandleData
+from acquisition.data_logic.transformer import Transformer
+from acquisition.data_logic.validator import Validator
+from acquisition.logic.payloads import (
+    DeviceStatePayload, PayloadError, StatusPayload, WeatherPayload, decode_payload, payload_preview,
+)
+from acquisition.logic.sensor_registry import SensorRegistry
+
+
+class PayloadDecodingTest(SimpleTestCase):
+    def test_decode_from_bytes_and_memoryview(self):
+        raw = b'{"metric_name": "temperature", "value": 21.5}'
+        self.assertEqual(decode_payload(raw)["value"], 21.5)
+        self.assertEqual(decode_payload(memoryview(raw))["metric_name"], "temperature")
+        self.assertEqual(decode_payload(raw.decode())["value"], 21.5)
+
+    def test_invalid_payloads(self):
+        for raw in (b"not json", b"[1, 2]", b""):
+            with self.assertRaises(PayloadError):
+                decode_payload(raw)
+
+    def test_preview_is_truncated(self):
+        raw = b'{"value": "' + b'x' * 500 + b'"}'
+        preview = payload_preview(raw, limit=20)
+        self.assertEqual(preview, '{"value": "xxxxxxxxx...')
+        self.assertEqual(payload_preview(b"\xff ok"), "� ok")
+        self.assertIsNone(payload_preview(None))
+
+    def test_topic_family_schemas(self):
+        weather = WeatherPayload.from_dict({"metric_name": "wind", "value": 3, "unit": "m/s", "ts": 1700000000})
+        self.assertEqual((weather.metric_name, weather.value, weather.unit, weather.ts), ("wind", 3, "m/s", 1700000000))
+
+        device = DeviceStatePayload.from_dict({"is_active": True})
+        self.assertEqual((device.metric_name, device.value, device.unit), (None, 1.0, "standard"))
+        self.assertEqual(DeviceStatePayload.from_dict({"is_active": True, "level": 0.4}).value, 0.4)
+
+        status = StatusPayload.from_dict({"consumption_mode": "eco"})
+        self.assertEqual((status.consumption_mode, status.charging_mode), ("eco", None))
+
+
+class BytesPayloadHandlingTest(TestCase):
+    def setUp(self):
+        self.db_manager = MagicMock()
+        self.handler = HandleData(
+            self.db_manager,
+            Validator(self.db_manager),
+            Deduplicator(self.db_manager),
+            Transformer(self.db_manager),
+            sensor_registry=SensorRegistry(),
+        )
+
+    def test_process_bytes_payload(self):
+        raw = json.dumps({"metric_name": "temperature", "value": 21.5, "unit": "C", "ts": 1700000000}).encode()
+
+        measurement = self.handler.process("szebi/weather/inside101/temperature", raw)
+
+        self.assertEqual(measurement.value, 21.5)
+        self.db_manager.insert_measurements.assert_called_once_with(measurement)
+
+    def test_error_log_contains_only_preview(self):
+        raw = b"{" + b"x" * 1000
+
+        self.assertIsNone(self.handler.process("szebi/weather/inside101/temperature", raw))
+
+        log = self.db_manager.insert_data_log.call_args[0][0]
+        self.assertTrue(log.message.startswith("Błędny format JSON wiadomości MQTT"))
+        self.assertIn("| raw: {xxx", log.message)
+        self.assertTrue(log.message.endswith("..."))
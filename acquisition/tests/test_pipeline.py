@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from acquisition.data_logic.deduplicator import Deduplicator
+from acquisition.data_logic.handle_data import HandleData
+from acquisition.data_logic.pipeline_stages import AcquisitionStages, build_acquisition_pipeline
+from acquisition.data_logic.transformer import Transformer
+from acquisition.data_logic.validator import Validator
+from acquisition.logic.pipeline import Pipeline, PipelineItem, Stage, parse_worker_counts
+from acquisition.logic.reorder_buffer import ReorderBuffer
+from acquisition.logic.sensor_registry import SensorRegistry
+from acquisition.models import DataLogLevel, MeasurementStatus, SensorType
+
+
+class PipelineTest(SimpleTestCase):
+    def _wait_for(self, condition, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_items_flow_through_stages_in_micro_batches(self):
+        seen = []
+        lock = threading.Lock()
+
+        def double(batch):
+            for item in batch:
+                item.payload *= 2
+            return batch
+
+        def collect(batch):
+            with lock:
+                seen.extend(item.payload for item in batch)
+            return batch
+
+        pipeline = Pipeline([
+            Stage('double', double, workers=2, batch_size=8, queue_size=16),
+            Stage('collect', collect, batch_size=8, queue_size=16),
+        ])
+        pipeline.start()
+        try:
+            for i in range(100):
+                pipeline.submit('t', i)
+            self.assertTrue(self._wait_for(lambda: len(seen) == 100))
+        finally:
+            pipeline.stop()
+
+        self.assertEqual(sorted(seen), [i * 2 for i in range(100)])
+        stats = pipeline.get_stats()
+        self.assertEqual(stats['completed'], 100)
+        self.assertEqual(stats['stages']['double']['items_in'], 100)
+        self.assertEqual(stats['stages']['double']['queue_capacity'], 16)
+        self.assertLessEqual(stats['stages']['collect']['batches'], 100)
+
+    def test_filtered_items_do_not_reach_next_stage(self):
+        received = []
+        pipeline = Pipeline([
+            Stage('filter', lambda batch: [i for i in batch if i.payload % 2 == 0]),
+            Stage('sink', lambda batch: received.extend(batch) or batch),
+        ])
+        pipeline.start()
+        try:
+            for i in range(10):
+                pipeline.submit('t', i)
+            self._wait_for(lambda: pipeline.get_stats()['stages']['filter']['items_in'] == 10)
+            self._wait_for(lambda: len(received) == 5)
+        finally:
+            pipeline.stop()
+        self.assertEqual([item.payload for item in received], [0, 2, 4, 6, 8])
+
+    def test_stage_error_does_not_stop_worker(self):
+        calls = []
+
+        def flaky(batch):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            return batch
+
+        pipeline = Pipeline([Stage('flaky', flaky, batch_size=1)])
+        pipeline.start()
+        try:
+            pipeline.submit('t', 1)
+            pipeline.submit('t', 2)
+            self.assertTrue(self._wait_for(lambda: pipeline.completed == 1))
+        finally:
+            pipeline.stop()
+        self.assertEqual(pipeline.get_stats()['stages']['flaky']['errors'], 1)
+
+    def test_parse_worker_counts(self):
+        self.assertEqual(parse_worker_counts("parse=2, dispatch=4,bad,x=y"), {'parse': 2, 'dispatch': 4})
+        self.assertEqual(parse_worker_counts(""), {})
+
+
+class AcquisitionStagesTest(TestCase):
+    def setUp(self):
+        self.db_manager = MagicMock()
+        self.data_handler = HandleData(
+            self.db_manager,
+            Validator(self.db_manager),
+            Deduplicator(self.db_manager),
+            Transformer(self.db_manager),
+            sensor_registry=SensorRegistry(),
+        )
+        self.service = MagicMock()
+        self.stages = AcquisitionStages(self.data_handler, self.service, ReorderBuffer(lateness_seconds=0))
+
+    def _run(self, items):
+        for name in ('parse', 'resolve', 'reorder', 'validate', 'dedupe', 'transform', 'persist', 'dispatch'):
+            items = getattr(self.stages, name)(items)
+        return items
+
+    @override_settings(ACQUISITION_PIPELINE_WORKERS="parse=2,validate=3,dispatch=4")
+    def test_stages_after_reorder_keep_single_worker(self):
+        pipeline = build_acquisition_pipeline(self.data_handler, self.service)
+
+        workers = {stage.name: stage.workers for stage in pipeline.stages}
+        self.assertEqual(workers['parse'], 2)
+        # od reorder do dispatch wsady nie mogą się wyprzedzać
+        for name in ('reorder', 'validate', 'dedupe', 'transform', 'persist', 'dispatch'):
+            self.assertEqual(workers[name], 1, name)
+
+    def test_measurements_are_persisted_and_dispatched(self):
+        payload = json.dumps({"metric_name": "temperature", "value": 21.5, "unit": "C", "ts": 1700000000})
+        items = self._run([
+            PipelineItem("szebi/weather/inside101/temperature", payload),
+            PipelineItem("szebi/weather/inside101/temperature", payload),
+            PipelineItem("szebi/unknown", "{}"),
+            PipelineItem("szebi/weather/inside101/temperature", "not json"),
+        ])
+
+        self.assertEqual(len(items), 2)
+        self.assertEqual(items[0].measurement.status, MeasurementStatus.OK)
+        self.assertEqual(items[1].measurement.status, MeasurementStatus.DUPLICATE)
+        self.assertEqual(self.db_manager.insert_measurements.call_count, 2)
+        self.service.dispatch_to_alarms.assert_called_once()
+        self.assertEqual(len(self.service.dispatch_to_alarms.call_args[0][0]), 2)
+
+    def test_out_of_range_measurement_continues_with_error_status(self):
+        self.data_handler.sensor_registry.resolve("inside1", "humidity", "%", 1, 1, "inside")
+        SensorType.objects.filter(name="humidity").update(max_value=100.0)
+        self.data_handler.sensor_registry.invalidate()
+
+        payload = json.dumps({"metric_name": "humidity", "value": 150, "unit": "%"})
+        items = self._run([PipelineItem("szebi/weather/inside1/humidity", payload)])
+
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0].measurement.status, MeasurementStatus.ERROR)
+
+    def test_late_measurement_is_persisted_but_not_dispatched(self):
+        def message(ts):
+            return json.dumps({"metric_name": "temperature", "value": 21.5, "unit": "C", "ts": ts})
+
+        self._run([PipelineItem("szebi/weather/inside101/temperature", message(1700000010))])
+        items = self._run([
+            PipelineItem("szebi/weather/inside101/temperature", message(1700000000)),
+            PipelineItem("szebi/weather/inside101/temperature", message(1700000020)),
+        ])
+
+        self.assertEqual([item.late for item in items], [True, False])
+        self.assertEqual(self.db_manager.insert_measurements.call_count, 3)
+        dispatched = self.service.dispatch_to_alarms.call_args[0][0]
+        self.assertEqual([m.timestamp.timestamp() for m in dispatched], [1700000020])
+        self.assertEqual(self.db_manager.insert_data_log.call_args[0][0].source, 'reorder')
+
+    def test_batch_validation_error_is_logged_and_items_validated_one_by_one(self):
+        self.data_handler.sensor_registry.resolve("inside1", "humidity", "%", 1, 1, "inside")
+        SensorType.objects.filter(name="humidity").update(max_value=100.0)
+        self.data_handler.sensor_registry.invalidate()
+        payload = json.dumps({"metric_name": "humidity", "value": 150, "unit": "%"})
+
+        with patch.object(self.data_handler.validator, 'validate_measurements', side_effect=ValueError("wsad")):
+            items = self._run([PipelineItem("szebi/weather/inside1/humidity", payload)])
+
+        self.assertEqual(items[0].measurement.status, MeasurementStatus.ERROR)
+        levels = [call.args[0].level for call in self.db_manager.insert_data_log.call_args_list]
+        self.assertEqual(levels.count(DataLogLevel.CRITICAL), 1)
@@ -0,0 +1,88 @@
+from django.test import SimpleTestCase
+
+from acquisition.logic.pipeline import Pipeline, Stage
+from acquisition.logic.reorder_buffer import ReorderBuffer
+
+
+class ReorderBufferTest(SimpleTestCase):
+    def test_items_are_released_in_timestamp_order_after_watermark(self):
+        buffer = ReorderBuffer(lateness_seconds=5)
+        for ts in (10, 12, 11, 14):
+            self.assertTrue(buffer.push(1, ts, ts, now=0.0))
+        self.assertEqual(buffer.pop_ready(now=0.0), [])
+
+        buffer.push(1, 17, 17, now=0.0)
+
+        # znak wodny 17 - 5 = 12
+        self.assertEqual(buffer.pop_ready(now=0.0), [10, 11, 12])
+        self.assertEqual(buffer.get_stats()['reordered'], 1)
+
+    def test_item_older_than_released_is_late(self):
+        buffer = ReorderBuffer(lateness_seconds=1)
+        buffer.push(1, 10, 'a', now=0.0)
+        buffer.push(1, 12, 'b', now=0.0)
+        self.assertEqual(buffer.pop_ready(now=0.0), ['a'])
+
+        self.assertFalse(buffer.push(1, 9, 'late', now=0.0))
+        # w oknie opóźnienia - wciąż na czas
+        self.assertTrue(buffer.push(1, 11, 'c', now=0.0))
+        # inny czujnik ma własny znak wodny
+        self.assertTrue(buffer.push(2, 9, 'x', now=0.0))
+        self.assertEqual(buffer.get_stats()['late'], 1)
+
+    def test_idle_sensor_is_released_after_lateness(self):
+        buffer = ReorderBuffer(lateness_seconds=2)
+        buffer.push(1, 100, 'b', now=0.0)
+        buffer.push(1, 99, 'a', now=1.0)
+
+        self.assertEqual(buffer.pop_ready(now=1.5), [])
+        # po 2 s czasu rzeczywistego wychodzi 'b' razem ze starszym 'a'
+        self.assertEqual(buffer.pop_ready(now=2.0), ['a', 'b'])
+        self.assertEqual(len(buffer), 0)
+
+    def test_force_releases_everything(self):
+        buffer = ReorderBuffer(lateness_seconds=60)
+        buffer.push(1, 5, 'b', now=0.0)
+        buffer.push(2, 1, 'x', now=0.0)
+        buffer.push(1, 3, 'a', now=0.0)
+
+        self.assertEqual(sorted(buffer.pop_ready(force=True)), ['a', 'b', 'x'])
+        self.assertFalse(buffer.push(1, 4, 'late', now=0.0))
+
+    def test_zero_lateness_passes_through(self):
+        # domyślnie bez wstrzymywania - tylko wykrywanie spóźnionych
+        buffer = ReorderBuffer()
+        self.assertTrue(buffer.push(1, 10, 'a'))
+        self.assertFalse(buffer.push(1, 9, 'late'))
+        self.assertEqual(buffer.pop_ready(), ['a'])
+
+    def test_full_sensor_buffer_releases_oldest(self):
+        buffer = ReorderBuffer(lateness_seconds=60, max_per_sensor=2)
+        for ts in (3, 1, 2):
+            buffer.push(1, ts, ts, now=0.0)
+
+        self.assertEqual(buffer.pop_ready(now=0.0), [1])
+        self.assertEqual(buffer.get_stats()['forced'], 1)
+
+
+class StageTickTest(SimpleTestCase):
+    def test_pipeline_stop_flushes_held_items(self):
+        buffer = ReorderBuffer(lateness_seconds=3600)
+        received = []
+
+        def hold(batch):
+            for item in batch:
+                buffer.push(0, item.payload, item)
+            return buffer.pop_ready()
+
+        pipeline = Pipeline([
+            Stage('hold', hold, tick=lambda force: buffer.pop_ready(force=force)),
+            Stage('sink', lambda batch: received.extend(item.payload for item in batch) or batch),
+        ])
+        pipeline.start()
+        for ts in (3, 1, 2):
+            pipeline.submit('t', ts)
+        pipeline.stop()
+
+        self.assertEqual(received, [1, 2, 3])
+        self.assertEqual(pipeline.completed, 3)
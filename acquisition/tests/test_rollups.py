@@ -0,0 +1,75 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from acquisition.logic.rollups import bucket_start, get_rollups, select_resolution, upsert_rollups
+from acquisition.models import (
+    Location, SensorType, Sensor, Measurement, MeasurementRollup, MeasurementStatus, RollupResolution
+)
+
+UTC = datetime.timezone.utc
+
+
+class MeasurementRollupTest(TestCase):
+    def setUp(self):
+        location = Location.objects.create(floor=1, room="101")
+        sensor_type = SensorType.objects.create(name="temperature", default_unit="C")
+        self.sensor = Sensor.objects.create(location=location, type=sensor_type, name="t101")
+        self.start = datetime.datetime(2024, 3, 1, 12, 0, tzinfo=UTC)
+
+    def _measurements(self, values, step_seconds=20, offset=0, status=MeasurementStatus.OK):
+        return [
+            Measurement(sensor=self.sensor, value=value, status=status,
+                        timestamp=self.start + datetime.timedelta(seconds=offset + i * step_seconds))
+            for i, value in enumerate(values)
+        ]
+
+    def _rollup(self, resolution, start=None):
+        return MeasurementRollup.objects.get(
+            sensor=self.sensor, resolution=resolution, bucket_start=start or self.start)
+
+    def test_bucket_start_floors_to_resolution(self):
+        ts = datetime.datetime(2024, 3, 1, 12, 37, 45, tzinfo=UTC)
+        self.assertEqual(bucket_start(ts, 60), datetime.datetime(2024, 3, 1, 12, 37, tzinfo=UTC))
+        self.assertEqual(bucket_start(ts, 900), datetime.datetime(2024, 3, 1, 12, 30, tzinfo=UTC))
+        self.assertEqual(bucket_start(ts, 86400), datetime.datetime(2024, 3, 1, tzinfo=UTC))
+
+    def test_incremental_batches_merge_into_same_buckets(self):
+        upsert_rollups(self._measurements([20.0, 25.0]))
+        upsert_rollups(self._measurements([18.0], offset=40))
+        # pomiar spóźniony nie nadpisuje ostatniej wartości
+        upsert_rollups(self._measurements([30.0], offset=10))
+
+        minute = self._rollup(RollupResolution.MINUTE)
+        self.assertEqual(minute.count, 4)
+        self.assertEqual(minute.min_value, 18.0)
+        self.assertEqual(minute.max_value, 30.0)
+        self.assertAlmostEqual(minute.mean_value, 23.25)
+        self.assertEqual(minute.last_value, 18.0)
+        self.assertEqual(self._rollup(RollupResolution.DAY, datetime.datetime(2024, 3, 1, tzinfo=UTC)).count, 4)
+
+    def test_only_valid_measurements_are_aggregated(self):
+        upsert_rollups(self._measurements([20.0]) + self._measurements([999.0], offset=5, status=MeasurementStatus.ERROR))
+        self.assertEqual(self._rollup(RollupResolution.MINUTE).count, 1)
+
+    def test_select_resolution_picks_coarsest_needed(self):
+        day = datetime.timedelta(days=1)
+        self.assertEqual(select_resolution(self.start, self.start + datetime.timedelta(hours=2)), RollupResolution.MINUTE)
+        self.assertEqual(select_resolution(self.start, self.start + 7 * day), RollupResolution.QUARTER_HOUR)
+        self.assertEqual(select_resolution(self.start, self.start + 365 * day), RollupResolution.DAY)
+        self.assertEqual(select_resolution(self.start, self.start + 30 * day, max_buckets=1000), RollupResolution.HOUR)
+
+    def test_get_rollups_and_rebuild(self):
+        Measurement.objects.bulk_create(self._measurements([10.0, 20.0, 30.0], step_seconds=3600))
+        call_command('rebuild_rollups', stdout=StringIO())
+
+        hourly = list(get_rollups(self.sensor.pk, self.start, self.start + datetime.timedelta(hours=3),
+                                  resolution=RollupResolution.HOUR))
+        self.assertEqual([r.last_value for r in hourly], [10.0, 20.0, 30.0])
+
+        daily = list(get_rollups(self.sensor.pk, self.start, self.start + datetime.timedelta(days=365)))
+        self.assertEqual(len(daily), 1)
+        self.assertEqual(daily[0].count, 3)
+        self.assertAlmostEqual(daily[0].mean_value, 20.0)
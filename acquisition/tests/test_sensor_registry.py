@@ -0,0 +1,127 @@
+import datetime
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+from acquisition.logic.sensor_registry import SensorRegistry, sensor_registry
+from acquisition.models import Location, SensorType, Sensor
+
+
+class SensorRegistryTest(TestCase):
+    def setUp(self):
+        self.registry = SensorRegistry()
+
+    def test_resolve_creates_sensor_once(self):
+        sensor = self.registry.resolve("inside101", "temperature", "C", 1, 101, "inside")
+
+        self.assertEqual(Sensor.objects.count(), 1)
+        self.assertEqual(sensor.type.name, "temperature")
+        self.assertEqual(sensor.location.room, "101")
+
+        # Drugi odczyt tego samego czujnika nie dotyka bazy
+        with self.assertNumQueries(0):
+            cached = self.registry.get("inside101", "temperature")
+            self.assertEqual(cached.type.name, "temperature")
+            self.assertEqual(cached.location.floor, 1)
+
+        self.assertEqual(cached.pk, sensor.pk)
+        self.assertEqual(self.registry.stats()["hits"], 1)
+        self.assertEqual(self.registry.stats()["misses"], 1)
+
+    def test_resolve_reuses_existing_rows_case_insensitive(self):
+        location = Location.objects.create(floor=1, room="101", description="inside")
+        sensor_type = SensorType.objects.create(name="Temperature", default_unit="C")
+        existing = Sensor.objects.create(location=location, type=sensor_type, name="t")
+
+        sensor = self.registry.resolve("in101", "temperature", "C", 1, 101, "inside")
+
+        self.assertEqual(sensor.pk, existing.pk)
+        self.assertEqual(Sensor.objects.count(), 1)
+        self.assertEqual(SensorType.objects.count(), 1)
+
+    def test_warm_up_loads_known_sensors(self):
+        location = Location.objects.create(floor=None, room="0", description="outside")
+        sensor_type = SensorType.objects.create(name="wind_speed", default_unit="m/s")
+        existing = Sensor.objects.create(location=location, type=sensor_type, name="w")
+
+        self.assertEqual(self.registry.warm_up(), 1)
+
+        with self.assertNumQueries(0):
+            sensor = self.registry.resolve("outside", "wind_speed", "m/s", None, 0, "outside")
+        self.assertEqual(sensor.pk, existing.pk)
+
+    def test_update_invalidates_shared_registry(self):
+        sensor = sensor_registry.resolve("in5", "humidity", "%", 1, 5, "inside")
+        self.assertIsNotNone(sensor_registry.get("in5", "humidity"))
+
+        sensor.type.min_value = 0.0
+        sensor.type.save()
+
+        self.assertIsNone(sensor_registry.get("in5", "humidity"))
+
+    def test_change_in_other_process_reloads_registry(self):
+        location = Location.objects.create(floor=1, room="7", description="inside")
+        sensor_type = SensorType.objects.create(name="co2", default_unit="ppm")
+        Sensor.objects.create(location=location, type=sensor_type, name="c")
+        self.registry.warm_up()
+        self.assertFalse(self.registry.sync_version())
+
+        # zapis w innym procesie widoczny tylko przez wersję w bazie
+        SensorType.objects.filter(pk=sensor_type.pk).update(min_value=300.0)
+        SensorRegistry.bump_version()
+
+        self.assertTrue(self.registry.sync_version())
+        sensor = self.registry.resolve("in7", "co2", "ppm", 1, 7, "inside")
+        self.assertEqual(sensor.type.min_value, 300.0)
+        self.assertFalse(self.registry.sync_version())
+
+    def test_admin_edit_bumps_version(self):
+        sensor = self.registry.resolve("in8", "humidity", "%", 1, 8, "inside")
+        before = SensorRegistry.current_version()
+
+        sensor.name = "renamed"
+        sensor.save()
+
+        self.assertEqual(SensorRegistry.current_version(), before + 1)
+
+
+class MergeDuplicatesMigrationTest(TransactionTestCase):
+    before = ('acquisition', '0002_acquisitioncontrol')
+    after = ('acquisition', '0003_sensor_registry_constraints')
+
+    def _migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.migrate([target])
+        return executor.loader.project_state(target).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_are_merged_before_constraints(self):
+        apps = self._migrate(self.before)
+        Location = apps.get_model('acquisition', 'Location')
+        SensorType = apps.get_model('acquisition', 'SensorType')
+        Sensor = apps.get_model('acquisition', 'Sensor')
+        Measurement = apps.get_model('acquisition', 'Measurement')
+        at = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+        locations = [Location.objects.create(floor=1, room=room) for room in ("101", "101")]
+        types = [SensorType.objects.create(name=name, default_unit="C") for name in ("temperature", "Temperature")]
+        sensors = [Sensor.objects.create(location=location, type=sensor_type, name="t")
+                   for location, sensor_type in zip(locations, types)]
+        Measurement.objects.create(sensor=sensors[0], timestamp=at, value=1.0)
+        # ten sam czas przy duplikacie - zostaje pomiar czujnika docelowego
+        Measurement.objects.create(sensor=sensors[1], timestamp=at, value=2.0)
+        Measurement.objects.create(sensor=sensors[1], timestamp=at + datetime.timedelta(minutes=1), value=3.0)
+
+        apps = self._migrate(self.after)
+        Sensor = apps.get_model('acquisition', 'Sensor')
+        Measurement = apps.get_model('acquisition', 'Measurement')
+
+        self.assertEqual(apps.get_model('acquisition', 'Location').objects.count(), 1)
+        self.assertEqual(apps.get_model('acquisition', 'SensorType').objects.count(), 1)
+        sensor = Sensor.objects.get()
+        self.assertEqual(sensor.pk, sensors[0].pk)
+        self.assertEqual(sorted(Measurement.objects.filter(sensor=sensor).values_list('value', flat=True)), [1.0, 3.0])
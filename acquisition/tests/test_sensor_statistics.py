@@ -0,0 +1,74 @@
+import datetime
+
+from django.test import TestCase, override_settings
+
+from acquisition.logic import sensor_statistics
+from acquisition.logic.bulk_writer import MeasurementBulkWriter
+from acquisition.logic.database_manager import DatabaseManager
+from acquisition.logic.sensor_statistics import (
+    get_sensor_statistics, increment_counters, invalidate_cache, rebuild_sensor_statistics,
+)
+from acquisition.models import Location, SensorType, Sensor, Measurement, SensorStatistics
+
+UTC = datetime.timezone.utc
+
+
+class SensorStatisticsTest(TestCase):
+    def setUp(self):
+        location = Location.objects.create(floor=1, room="101")
+        self.temperature = Sensor.objects.create(
+            location=location, type=SensorType.objects.create(name="temperature", default_unit="C"), name="t101")
+        self.humidity = Sensor.objects.create(
+            location=location, type=SensorType.objects.create(name="humidity", default_unit="%"), name="h101")
+        self.start = datetime.datetime(2024, 3, 1, 12, 0, tzinfo=UTC)
+        invalidate_cache()
+        self.addCleanup(invalidate_cache)
+
+    def _measurement(self, sensor, offset):
+        return Measurement(sensor=sensor, value=20.0, timestamp=self.start + datetime.timedelta(seconds=offset))
+
+    def test_counters_are_incremented(self):
+        increment_counters([self._measurement(self.temperature, 10), self._measurement(self.temperature, 0)])
+        increment_counters([self._measurement(self.temperature, 5), self._measurement(self.humidity, 0)])
+
+        stats = SensorStatistics.objects.get(sensor=self.temperature)
+        self.assertEqual(stats.total_measurements, 3)
+        self.assertEqual(stats.last_measurement_at, self.start + datetime.timedelta(seconds=10))
+        self.assertEqual(SensorStatistics.objects.get(sensor=self.humidity).total_measurements, 1)
+
+    def test_flush_counts_only_written_rows(self):
+        manager = DatabaseManager.__new__(DatabaseManager)
+        manager.measurement_writer = MeasurementBulkWriter()
+        Measurement.objects.create(sensor=self.temperature, value=1.0, timestamp=self.start)
+
+        manager._flush_measurements([self._measurement(self.temperature, 0), self._measurement(self.temperature, 30)])
+
+        self.assertEqual(SensorStatistics.objects.get(sensor=self.temperature).total_measurements, 1)
+
+    def test_statistics_in_one_query_and_cached(self):
+        increment_counters([self._measurement(self.temperature, 0)])
+
+        with self.assertNumQueries(1):
+            stats = get_sensor_statistics()
+        self.assertEqual(
+            [(s['sensor_name'], s['total_measurements']) for s in stats],
+            [("t101", 1), ("h101", 0)],
+        )
+        with self.assertNumQueries(0):
+            self.assertIs(get_sensor_statistics(), stats)
+
+    @override_settings(ACQUISITION_STATS_CACHE_SECONDS=0)
+    def test_cache_can_be_disabled(self):
+        get_sensor_statistics()
+        self.assertIsNone(sensor_statistics._cache)
+
+    def test_rebuild_matches_table(self):
+        Measurement.objects.bulk_create([self._measurement(self.humidity, i) for i in range(4)])
+        increment_counters([self._measurement(self.temperature, 0)])
+
+        self.assertEqual(rebuild_sensor_statistics(), 1)
+
+        self.assertFalse(SensorStatistics.objects.filter(sensor=self.temperature).exists())
+        stats = SensorStatistics.objects.get(sensor=self.humidity)
+        self.assertEqual(stats.total_measurements, 4)
+        self.assertEqual(stats.last_measurement_at, self.start + datetime.timedelta(seconds=3))
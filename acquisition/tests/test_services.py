@@ -0,0 +1,48 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from acquisition.models import Location, Measurement, Sensor, SensorType
+from acquisition.services import AcquisitionDataService
+from alarms.models import Alert, AlertPriority, AlertRule, RuleOperator
+
+
+class DispatchToAlarmsTest(TestCase):
+    def setUp(self):
+        location = Location.objects.create(floor=1, room="101")
+        sensor_type = SensorType.objects.create(name="temperature", default_unit="C")
+        self.sensor = Sensor.objects.create(location=location, type=sensor_type, name="t")
+        AlertRule.objects.create(
+            name="Too hot",
+            target_metric="temperature",
+            operator=RuleOperator.GREATER_THAN,
+            threshold_max=30.0,
+            priority=AlertPriority.LOW,
+        )
+        self.service = AcquisitionDataService(MagicMock())
+
+    def _measurement(self, value):
+        return Measurement(sensor=self.sensor, timestamp=timezone.now(), value=value)
+
+    @patch('acquisition.services.requests.post')
+    def test_inprocess_dispatch_evaluates_rules_without_http(self, mock_post):
+        self.service.alarms_dispatch = 'inprocess'
+        self.service.dispatch_to_alarms([self._measurement(35.0), self._measurement(20.0)])
+
+        mock_post.assert_not_called()
+        self.assertEqual(Alert.objects.count(), 1)
+        alert = Alert.objects.get()
+        self.assertEqual(alert.details["sensor_id"], self.sensor.id)
+        self.assertEqual(alert.details["room"], "101")
+
+    @patch('acquisition.services.requests.post')
+    def test_http_dispatch_sends_single_batch_request(self, mock_post):
+        self.service.alarms_dispatch = 'http'
+        self.service.dispatch_to_alarms([self._measurement(35.0), self._measurement(20.0)])
+
+        mock_post.assert_called_once()
+        args, kwargs = mock_post.call_args
+        self.assertTrue(args[0].endswith('/check_rules_batch/'))
+        self.assertEqual(len(kwargs['json']['measurements']), 2)
+        self.assertIsInstance(kwargs['json']['measurements'][0]['timestamp'], str)
@@ -0,0 +1,192 @@
+import datetime
+import os
+import queue
+import tempfile
+import threading
+
+from django.test import SimpleTestCase, TestCase
+
+from acquisition.logic.bulk_writer import MeasurementBulkWriter
+from acquisition.logic.database_manager import DatabaseManager, _decode_measurement, _encode_measurement
+from acquisition.logic.inbox import MessageInbox
+from acquisition.logic.pipeline import Pipeline, Stage
+from acquisition.logic.spool import SegmentSpool, SpoolLocked
+from acquisition.logic.write_queue import FlushStats
+from acquisition.models import Location, SensorType, Sensor, Measurement
+
+UTC = datetime.timezone.utc
+
+
+class SegmentSpoolTest(SimpleTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _read_all(self, spool):
+        items = []
+        while True:
+            try:
+                items.append(spool.get(timeout=0))
+            except queue.Empty:
+                return items
+
+    def test_unacknowledged_records_are_replayed(self):
+        spool = SegmentSpool(self.directory)
+        for i in range(5):
+            spool.append(i)
+        self.assertEqual([spool.get(timeout=0) for _ in range(2)], [0, 1])
+        spool.ack()
+        self.assertEqual(spool.get(timeout=0), 2)  # odczytany, ale nie potwierdzony
+        spool.close()
+
+        reopened = SegmentSpool(self.directory)
+        self.assertEqual(reopened.get_stats()['replayed'], 3)
+        self.assertEqual(self._read_all(reopened), [2, 3, 4])
+        reopened.close()
+
+    def test_torn_tail_is_truncated(self):
+        spool = SegmentSpool(self.directory)
+        spool.append('a')
+        spool.append('b')
+        spool.close()
+        segment = os.path.join(self.directory, '000000000001.seg')
+        with open(segment, 'r+b') as f:
+            f.truncate(os.path.getsize(segment) - 3)
+
+        reopened = SegmentSpool(self.directory)
+        reopened.append('c')
+        self.assertEqual(self._read_all(reopened), ['a', 'c'])
+        reopened.close()
+
+    def test_acknowledged_segments_are_removed(self):
+        spool = SegmentSpool(self.directory, segment_bytes=64, memory_items=0)
+        for i in range(10):
+            spool.append('x' * 20 + str(i))
+        self.assertGreater(spool.get_stats()['segments'], 3)
+
+        self.assertEqual(len(self._read_all(spool)), 10)
+        spool.ack()
+        segments = [name for name in os.listdir(self.directory) if name.endswith('.seg')]
+        self.assertEqual(len(segments), 1)
+        self.assertEqual(spool.get_stats()['disk_reads'], 10)
+        spool.close()
+
+    def test_sentinel_is_returned_after_pending_records(self):
+        spool = SegmentSpool(self.directory)
+        spool.append(1)
+        spool.put_sentinel()
+        self.assertEqual(spool.get(timeout=0), 1)
+        self.assertIsNone(spool.get(timeout=0))
+        spool.close()
+
+    def test_get_waits_for_append(self):
+        spool = SegmentSpool(self.directory)
+        threading.Timer(0.05, spool.append, args=('late',)).start()
+        self.assertEqual(spool.get(timeout=2.0), 'late')
+        spool.close()
+
+    def test_directory_is_locked_by_one_process(self):
+        spool = SegmentSpool(self.directory)
+        with self.assertRaises(SpoolLocked):
+            SegmentSpool(self.directory)
+        spool.close()
+
+
+class SpoolDrainTest(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        location = Location.objects.create(floor=1, room="101")
+        sensor_type = SensorType.objects.create(name="temperature", default_unit="C")
+        self.sensor = Sensor.objects.create(location=location, type=sensor_type, name="t101")
+        self.start = datetime.datetime(2024, 3, 1, 12, 0, tzinfo=UTC)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _spool(self):
+        return SegmentSpool(self._tmp.name, encode=_encode_measurement, decode=_decode_measurement)
+
+    def test_replayed_measurements_are_written_once(self):
+        spool = self._spool()
+        for offset in range(3):
+            spool.append(Measurement(sensor=self.sensor, value=float(offset),
+                                     timestamp=self.start + datetime.timedelta(seconds=offset)))
+        # zapis do bazy bez potwierdzenia - jak przy awarii procesu przed ack()
+        Measurement.objects.create(sensor=self.sensor, value=0.0, timestamp=self.start)
+        spool.close()
+
+        manager = DatabaseManager.__new__(DatabaseManager)
+        manager.batch_size = 100
+        manager.flush_seconds = 0.01
+        manager._stopping = threading.Event()
+        manager.measurement_writer = MeasurementBulkWriter()
+
+        replayed = self._spool()
+        replayed.put_sentinel()
+        manager._drain(replayed, manager._flush_measurements, FlushStats())
+        replayed.close()
+
+        self.assertEqual(Measurement.objects.count(), 3)
+        self.assertEqual(manager.measurement_writer.stats.rows_skipped, 1)
+        reopened = self._spool()
+        self.assertEqual(reopened.get_stats()['depth'], 0)
+        reopened.close()
+
+
+class MessageInboxTest(SimpleTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directory = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _reopen(self, inbox):
+        # awaria procesu - bez close(), tylko zwolnienie blokady katalogu
+        inbox.spool._writer.flush()
+        inbox.spool._lock_file.close()
+        return MessageInbox(SegmentSpool(self.directory))
+
+    def test_only_contiguous_completed_messages_are_acknowledged(self):
+        inbox = MessageInbox(SegmentSpool(self.directory))
+        inbox.ACK_SECONDS = 0
+        seqs = [inbox.append('szebi/t', f'm{i}'.encode()) for i in range(4)]
+
+        # 0 i 2 zakończone, 1 wciąż w potoku
+        inbox.release([seqs[0], seqs[2]])
+        self.assertEqual(inbox.get_stats()['in_flight'], 3)
+
+        recovered = self._reopen(inbox).recover()
+        self.assertEqual([payload for _, payload in recovered], [b'm1', b'm2', b'm3'])
+
+    def test_pipeline_replays_messages_lost_in_stages(self):
+        inbox = MessageInbox(SegmentSpool(self.directory))
+        inbox.ACK_SECONDS = 0
+        received = []
+        # pierwszy etap odrzuca "bad" - odrzucona wiadomość też jest potwierdzana
+        pipeline = Pipeline([
+            Stage('filter', lambda batch: [item for item in batch if item.payload != b'bad']),
+            Stage('sink', lambda batch: received.extend(item.payload for item in batch) or batch),
+        ], inbox=inbox)
+        pipeline.start()
+        for payload in (b'a', b'bad', b'b'):
+            pipeline.submit('t', payload)
+        pipeline.stop()
+        self.assertEqual(received, [b'a', b'b'])
+        self.assertEqual(inbox.get_stats()['in_flight'], 0)
+
+        # wiadomość przyjęta, ale niedoprowadzona do końca potoku przed awarią
+        inbox.append('t', b'c')
+        restarted = self._reopen(inbox)
+        replayed = []
+        pipeline = Pipeline([Stage('sink', lambda batch: replayed.extend(item.payload for item in batch) or batch)],
+                            inbox=restarted)
+        pipeline.start()
+        pipeline.stop()
+        restarted.close()
+
+        self.assertEqual(replayed, [b'c'])
+        self.assertEqual(MessageInbox(SegmentSpool(self.directory)).recover(), [])
@@ -0,0 +1,106 @@
+import json
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase
+
+from acquisition.data_logic.deduplicator import Deduplicator
+from acquisition.data_logic.handle_data import HandleData, build_topic_router
+from acquisition.data_logic.transformer import Transformer
+from acquisition.data_logic.validator import Validator
+from acquisition.logic.payloads import DeviceStatePayload
+from acquisition.logic.sensor_registry import SensorRegistry
+from acquisition.logic.topic_router import TopicRouter
+
+
+class TopicRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = TopicRouter()
+        self.router.add("a/{x}/c", "plus")
+        self.router.add("a/b/c", "literal")
+        self.router.add("a/#", "hash")
+        self.router.add("+/+/{y}/d", "deep")
+
+    def test_literal_before_plus_before_hash(self):
+        self.assertEqual(self.router.match("a/b/c").target, "literal")
+        match = self.router.match("a/z/c")
+        self.assertEqual((match.target, match.params), ("plus", {"x": "z"}))
+        self.assertEqual(self.router.match("a/z/q").target, "hash")
+
+    def test_hash_matches_parent_level(self):
+        self.assertEqual(self.router.match("a").target, "hash")
+
+    def test_backtracks_to_other_branch(self):
+        match = self.router.match("q/b/c/d")
+        self.assertEqual((match.target, match.params), ("deep", {"y": "c"}))
+        # literał "a" nie ma trasy dla 4 poziomów zakończonych "d" poza # - wygrywa #
+        self.assertEqual(self.router.match("a/b/c/d").target, "hash")
+
+    def test_no_match_and_system_topics(self):
+        self.assertIsNone(self.router.match("x/y"))
+        self.assertIsNone(self.router.match("$SYS/a/b/c"))
+
+    def test_filters_are_mqtt_filters(self):
+        self.assertEqual(self.router.filters(), ["a/+/c", "a/b/c", "a/#", "+/+/+/d"])
+
+    def test_invalid_and_duplicate_filters(self):
+        with self.assertRaises(ValueError):
+            self.router.add("a/#/c", "x")
+        with self.assertRaises(ValueError):
+            self.router.add("a/b+/c", "x")
+        with self.assertRaises(ValueError):
+            self.router.add("a/{other}/c", "x")
+
+    def test_cache_is_invalidated_on_add(self):
+        self.assertEqual(self.router.match("a/z/q").target, "hash")
+        self.router.add("a/z/q", "new")
+        self.assertEqual(self.router.match("a/z/q").target, "new")
+
+
+class AcquisitionRoutesTest(SimpleTestCase):
+    def setUp(self):
+        self.db_manager = MagicMock()
+        self.handler = HandleData(
+            self.db_manager,
+            Validator(self.db_manager),
+            Deduplicator(self.db_manager),
+            Transformer(self.db_manager),
+            sensor_registry=SensorRegistry(),
+            topic_router=build_topic_router(),
+        )
+
+    def test_weather_topic(self):
+        raw = json.dumps({"metric_name": "temperature", "value": 21.5}).encode()
+        env_uuid, metric_name, payload = self.handler.parse_message("szebi/weather/inside101/temperature", raw)
+        self.assertEqual((env_uuid, metric_name, payload.value), ("inside101", "temperature", 21.5))
+
+    def test_weather_topic_without_metric_name_keeps_legacy_fallback(self):
+        # segment metryki z topicu nie zmienia czujnika, do którego trafiają dotychczasowe wiadomości
+        raw = json.dumps({"value": 21.5}).encode()
+        env_uuid, metric_name, _ = self.handler.parse_message("szebi/weather/inside101/temperature", raw)
+        self.assertEqual((env_uuid, metric_name), ("inside101", "is_active"))
+
+    def test_simulator_device_topic(self):
+        raw = json.dumps({"name": "lamp", "is_active": True, "level": 0.5, "ts": 1700000000}).encode()
+        env_uuid, metric_name, payload = self.handler.parse_message("szebi/env-1/device/dev-1/state", raw)
+        self.assertEqual((env_uuid, metric_name), ("dev-1", "is_active"))
+        self.assertIsInstance(payload, DeviceStatePayload)
+        self.assertEqual(payload.value, 0.5)
+
+    def test_legacy_device_topic(self):
+        raw = json.dumps({"is_active": False}).encode()
+        env_uuid, metric_name, payload = self.handler.parse_message("szebi/device/state/dev-2", raw)
+        self.assertEqual((env_uuid, metric_name, payload.value), ("dev-2", "is_active", 0.0))
+
+    def test_status_and_unknown_topics_are_logged(self):
+        self.assertIsNone(self.handler.parse_message("szebi/status", b'{"consumption_mode": "eco"}'))
+        self.assertIn("consumption=eco", self.db_manager.insert_data_log.call_args[0][0].message)
+
+        self.assertIsNone(self.handler.parse_message("environment/a/b", b"{}"))
+        self.assertIn("Nieznany topic", self.db_manager.insert_data_log.call_args[0][0].message)
+
+    def test_new_device_type_plugs_in(self):
+        router = self.handler.topic_router
+        router.add("szebi/{env_uuid}/meter/{device_uuid}/reading",
+                   (DeviceStatePayload, HandleData._route_device_state))
+        parsed = self.handler.parse_message("szebi/env-1/meter/m-1/reading", b'{"metric_name": "power", "value": 3}')
+        self.assertEqual(parsed[:2], ("m-1", "power"))
@@ -0,0 +1,106 @@
+import queue
+import tempfile
+import threading
+
+from django.test import SimpleTestCase
+
+from acquisition.logic.spool import SpoolLocked
+from acquisition.logic.write_queue import OverflowPolicy, SpillFile, WriteQueue
+
+
+class WriteQueueTest(SimpleTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.spill_dir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _drain(self, q):
+        items = []
+        while True:
+            try:
+                items.append(q.get(timeout=0))
+            except queue.Empty:
+                return items
+
+    def test_unknown_policy_is_rejected(self):
+        with self.assertRaises(ValueError):
+            WriteQueue('test', 10, 'unbounded')
+
+    def test_drop_oldest_keeps_newest_items(self):
+        q = WriteQueue('test', 3, OverflowPolicy.DROP_OLDEST)
+        for i in range(5):
+            q.put(i)
+
+        self.assertEqual(self._drain(q), [2, 3, 4])
+        self.assertEqual(q.get_stats()['dropped'], 2)
+
+    def test_spill_preserves_order(self):
+        q = WriteQueue('test', 2, OverflowPolicy.SPILL, self.spill_dir)
+        for i in range(4):
+            q.put(i)
+        self.assertEqual(q.get(timeout=0), 0)
+        # kolejka ma wolne miejsce, ale na dysku czekają starsze elementy
+        q.put(4)
+
+        self.assertEqual(self._drain(q), [1, 2, 3, 4])
+        stats = q.get_stats()
+        self.assertEqual((stats['spilled'], stats['spill_pending'], stats['dropped']), (3, 0, 0))
+        q.close()
+
+    def test_spill_file_survives_reopen(self):
+        q = WriteQueue('test', 1, OverflowPolicy.SPILL, self.spill_dir)
+        for i in range(3):
+            q.put({'value': i})
+        q.close()
+
+        reopened = WriteQueue('test', 1, OverflowPolicy.SPILL, self.spill_dir)
+        self.assertEqual(reopened.get_stats()['spill_pending'], 2)
+        self.assertEqual(self._drain(reopened), [{'value': 1}, {'value': 2}])
+        reopened.close()
+
+    def test_spill_file_has_single_owner(self):
+        owner = WriteQueue('test', 1, OverflowPolicy.SPILL, self.spill_dir)
+        with self.assertRaises(SpoolLocked):
+            SpillFile(f"{self.spill_dir}/test.spill")
+
+        # druga kolejka na tym samym pliku nie dopisuje do niego - czeka w pamięci
+        other = WriteQueue('test', 1, OverflowPolicy.SPILL, self.spill_dir)
+        self.assertEqual(other.policy, OverflowPolicy.BLOCK)
+        owner.close()
+
+        reopened = WriteQueue('test', 1, OverflowPolicy.SPILL, self.spill_dir)
+        self.assertEqual(reopened.policy, OverflowPolicy.SPILL)
+        reopened.close()
+
+    def test_spill_file_is_truncated_when_drained(self):
+        spill = SpillFile(f"{self.spill_dir}/truncate.spill")
+        spill.append(1)
+        self.assertEqual(spill.pop(), 1)
+        with self.assertRaises(IndexError):
+            spill.pop()
+        spill.append(2)
+        self.assertEqual((len(spill), spill.pop()), (1, 2))
+        spill.close()
+
+    def test_block_policy_waits_for_consumer(self):
+        q = WriteQueue('test', 1)
+        q.put(0)
+        producer = threading.Thread(target=q.put, args=(1,), daemon=True)
+        producer.start()
+        producer.join(0.05)
+        self.assertTrue(producer.is_alive())
+
+        self.assertEqual(q.get(timeout=1), 0)
+        producer.join(1.0)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(q.get(timeout=1), 1)
+
+    def test_sentinel_bypasses_overflow_policy(self):
+        q = WriteQueue('test', 1, OverflowPolicy.DROP_OLDEST)
+        q.put(0)
+        threading.Thread(target=q.put_sentinel, daemon=True).start()
+        self.assertEqual(q.get(timeout=1), 0)
+        self.assertIsNone(q.get(timeout=1))
+        self.assertEqual(q.get_stats()['dropped'], 0)
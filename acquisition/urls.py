@@ -6,4 +6,5 @@ urlpatterns = [
     path('api/status/', views.acquisition_status_api, name='api_status'),
     path('api/stats/', views.acquisition_stats_api, name='api_stats'),
     path('api/logs/', views.acquisition_logs_api, name='api_logs'),
+    path('api/measurements/export/', views.measurements_export_api, name='api_measurements_export'),
 ]
\ No newline at end of file
@@ -1,9 +1,14 @@
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods
+import datetime
 import json
 from . import mqtt_runner
-from .models import Sensor, DataLog, Measurement
+from .logic import export
+from .logic.sensor_registry import sensor_registry
+from .logic.sensor_statistics import get_sensor_statistics
+from .models import DataLog
 
 
 @ensure_csrf_cookie
@@ -31,22 +36,18 @@ def acquisition_status_api(request):
     is_running = mqtt_runner.is_running()
     return JsonResponse({
         "running": is_running,
-        "status_text": "Działa (ON)" if is_running else "Zatrzymany (OFF)"
+        "status_text": "Działa (ON)" if is_running else "Zatrzymany (OFF)",
+        "sensor_registry": sensor_registry.stats(),
+        "pipeline": mqtt_runner.get_pipeline_stats(),
+        "writer": mqtt_runner.get_writer_stats(),
+        "group": mqtt_runner.get_group_status()
     })
 
 
 @require_http_methods(["GET"])
 def acquisition_stats_api(request):
-    stats = []
     try:
-        for sensor in Sensor.objects.all():
-            count = Measurement.objects.filter(sensor=sensor).count()
-            stats.append({
-                'sensor_name': sensor.name,
-                'status': str(sensor.status),
-                'total_measurements': count,
-                'last_seen': sensor.last_communication
-            })
+        stats = get_sensor_statistics()
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
@@ -62,7 +63,62 @@ def acquisition_logs_api(request):
         "id": l.pk,
         "timestamp": l.timestamp,
         "level": str(l.level),
-        "message": l.message
+        "source": l.source,
+        "message": l.message,
+        "repeat_count": l.repeat_count,
+        "first_seen": l.first_seen,
+        "last_seen": l.last_seen,
     } for l in logs]
 
-    return JsonResponse({"logs": data})
\ No newline at end of file
+    return JsonResponse({"logs": data})
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise export.ExportError(f"Niepoprawna data: {value}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+
+@require_http_methods(["GET"])
+def measurements_export_api(request):
+    """
+    Strumień pomiarów (NDJSON lub CSV) z filtrami room, metric, sensor, start, end.
+    Z parametrem limit zwracana jest jedna strona, a kursor kolejnej w nagłówku X-Next-Cursor
+    (parametr cursor wznawia eksport).
+    """
+    fmt = request.GET.get("format", "ndjson")
+    if fmt not in export.FORMATS:
+        return JsonResponse({"error": f"Nieznany format: {fmt}"}, status=400)
+    try:
+        sensor_id = request.GET.get("sensor")
+        limit = request.GET.get("limit")
+        limit = int(limit) if limit else None
+        if limit is not None and limit <= 0:
+            raise export.ExportError("limit musi być dodatni")
+        queryset = export.filter_measurements(
+            room=request.GET.get("room"),
+            metric=request.GET.get("metric"),
+            sensor_id=int(sensor_id) if sensor_id else None,
+            start_time=_parse_time(request.GET.get("start")),
+            end_time=_parse_time(request.GET.get("end")),
+        )
+        cursor = request.GET.get("cursor")
+        cursor = export.decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    encode, content_type = export.FORMATS[fmt]
+    response = StreamingHttpResponse(
+        encode(export.iter_pages(queryset, cursor, limit=limit)),
+        content_type=content_type,
+    )
+    if limit is not None:
+        following = export.next_cursor(queryset, cursor, limit)
+        if following is not None:
+            response["X-Next-Cursor"] = export.encode_cursor(following)
+    return response
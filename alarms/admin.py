@@ -20,8 +20,8 @@ from .models import (
 
 @admin.register(Alert)
 class AlertAdmin(admin.ModelAdmin):
-    list_display = ['id', 'status', 'priority',
-                    'timestamp_generated', 'acknowledged_by']
+    list_display = ['id', 'status', 'priority', 'hit_count',
+                    'timestamp_generated', 'last_seen_at', 'acknowledged_by']
     list_filter = ['status', 'priority', 'timestamp_generated']
     search_fields = ['id']
     readonly_fields = ['timestamp_generated']
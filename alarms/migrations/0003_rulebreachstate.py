@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alarms', '0002_alert_details_alert_measurement_timestamp_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RuleBreachState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sensor_key', models.CharField(blank=True, max_length=255)),
+                ('breach_start', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('fired', models.BooleanField(default=False)),
+                ('alert_rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='breach_states', to='alarms.alertrule')),
+            ],
+            options={
+                'verbose_name': 'Stan naruszenia reguły',
+                'verbose_name_plural': 'Stany naruszeń reguł',
+                'db_table': 'rule_breach_state',
+                'constraints': [models.UniqueConstraint(fields=('alert_rule', 'sensor_key'), name='unique_rule_breach_state')],
+            },
+        ),
+    ]
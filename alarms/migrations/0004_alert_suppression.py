@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+
+def backfill_sensor_key(apps, schema_editor):
+    """Uzupełnij sensor_key otwartych alarmów na podstawie details"""
+    Alert = apps.get_model('alarms', 'Alert')
+    open_alerts = Alert.objects.filter(status__in=['NEW', 'ACKNOWLEDGED']).exclude(details=None)
+    for alert in open_alerts.iterator():
+        if not isinstance(alert.details, dict):
+            continue
+        key = alert.details.get('sensor_id')
+        if key is None:
+            key = alert.details.get('room')
+        if key is not None:
+            alert.sensor_key = str(key)
+            alert.save(update_fields=['sensor_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alarms', '0003_rulebreachstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='hit_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='last_value',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='sensor_key',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(backfill_sensor_key, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alarms', '0004_alert_suppression'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='channeltype',
+            name='channel',
+            field=models.CharField(choices=[('EMAIL', 'Email')], max_length=20, unique=True),
+        ),
+    ]
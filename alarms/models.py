@@ -108,6 +108,31 @@ class AlertRule(models.Model):
         return False
 
 
+class RuleBreachState(models.Model):
+    """Zapisany stan trwającego naruszenia reguły z duration_seconds (checkpoint)"""
+    alert_rule = models.ForeignKey(
+        AlertRule,
+        on_delete=models.CASCADE,
+        related_name='breach_states'
+    )
+    sensor_key = models.CharField(max_length=255, blank=True)
+    breach_start = models.DateTimeField()
+    last_seen = models.DateTimeField()
+    fired = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'rule_breach_state'
+        verbose_name = 'Stan naruszenia reguły'
+        verbose_name_plural = 'Stany naruszeń reguł'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['alert_rule', 'sensor_key'], name='unique_rule_breach_state'),
+        ]
+
+    def __str__(self):
+        return f"{self.alert_rule_id}/{self.sensor_key} od {self.breach_start}"
+
+
 class AlertComment(models.Model):
     """Komentarz do alarmu"""
     text = models.TextField()
@@ -144,6 +169,12 @@ class Alert(models.Model):
     timestamp_acknowledged = models.DateTimeField(null=True, blank=True)
     timestamp_closed = models.DateTimeField(null=True, blank=True)
     details = models.JSONField(null=True, blank=True)
+    # źródło pomiaru (sensor_id lub pokój) - klucz tłumienia powtórzeń alarmu
+    sensor_key = models.CharField(max_length=255, blank=True, default='')
+    # kolejne naruszenia reguły podczas otwartego alarmu nie tworzą nowych alarmów
+    hit_count = models.PositiveIntegerField(default=1)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    last_value = models.FloatField(null=True, blank=True)
     status = models.CharField(
         max_length=20,
         choices=AlertStatus.choices,
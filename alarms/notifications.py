@@ -0,0 +1,93 @@
+import queue
+import threading
+import logging
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import Alert
+from .services import NotificationService
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDispatcher:
+    """
+    Wysyłka powiadomień w wątku w tle.
+
+    Sygnał po utworzeniu alarmu tylko wrzuca jego id do kolejki (po zatwierdzeniu
+    transakcji), więc tworzenie alarmów nie czeka na serwer poczty ani emergency-mode.
+    Wątek zbiera alarmy w krótkie wsady i wysyła je przez NotificationService.send_batch.
+    """
+
+    # ile czekać na kolejne alarmy, zanim wsad zostanie wysłany
+    LINGER_SECONDS = 0.5
+
+    def __init__(self, batch_size=None):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._batch_size = batch_size
+
+    @property
+    def batch_size(self):
+        if self._batch_size is not None:
+            return self._batch_size
+        return getattr(settings, 'ALARMS_NOTIFICATION_BATCH_SIZE', 50)
+
+    def enqueue(self, alert_id):
+        self._ensure_started()
+        self._queue.put(alert_id)
+
+    def enqueue_on_commit(self, alert_id):
+        transaction.on_commit(lambda: self.enqueue(alert_id))
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="alarms-notifications", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        alert_ids = [self._queue.get()]
+        while len(alert_ids) < self.batch_size:
+            try:
+                alert_ids.append(self._queue.get(timeout=self.LINGER_SECONDS))
+            except queue.Empty:
+                break
+        return alert_ids
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            alert_ids = [alert_id for alert_id in batch if alert_id is not None]
+            try:
+                close_old_connections()
+                self.dispatch(alert_ids)
+            except Exception as e:
+                logger.error(f"Błąd wysyłki powiadomień: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(alert_ids) < len(batch):  # sentinel do zamknięcia
+                break
+
+    @staticmethod
+    def dispatch(alert_ids):
+        if not alert_ids:
+            return
+        alerts = list(Alert.objects.filter(id__in=alert_ids).select_related('alert_rule').order_by('id'))
+        NotificationService.send_batch(alerts)
+
+    def shutdown(self, timeout=None):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+# Instancja współdzielona przez cały proces
+notification_dispatcher = NotificationDispatcher()
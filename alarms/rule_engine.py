@@ -0,0 +1,113 @@
+import threading
+import time
+import logging
+
+import numpy as np
+from django.conf import settings
+
+from .models import AlertRule, RuleOperator
+
+logger = logging.getLogger(__name__)
+
+
+# operator reguły -> (pole progu, porównanie wektorowe)
+_OPERATORS = {
+    RuleOperator.GREATER_THAN: ('threshold_max', np.greater),
+    RuleOperator.LESS_THAN: ('threshold_min', np.less),
+    RuleOperator.EQUALS: ('threshold_min', np.equal),
+}
+
+
+class CompiledRule:
+    """Reguła z wcześniej wybraną funkcją porównania i progiem"""
+
+    __slots__ = ('rule', 'compare', 'threshold', 'duration')
+
+    def __init__(self, rule, compare, threshold):
+        self.rule = rule
+        self.compare = compare
+        self.threshold = threshold
+        self.duration = rule.duration_seconds or 0
+
+    def evaluate(self, values):
+        """Zwraca maskę logiczną wartości łamiących regułę"""
+        if self.compare is None:
+            return np.zeros(len(values), dtype=bool)
+        return self.compare(values, self.threshold)
+
+
+def compile_rule(rule):
+    """Kompiluj regułę - semantyka zgodna z AlertRule.check_condition"""
+    threshold_field, compare = _OPERATORS.get(rule.operator, (None, None))
+    threshold = getattr(rule, threshold_field) if threshold_field else None
+    # check_condition traktuje brak progu (oraz próg 0) jako regułę, która nigdy nie jest spełniona
+    if not threshold:
+        compare = None
+    return CompiledRule(rule, compare, threshold)
+
+
+class RuleEngine:
+    """
+    Indeks skompilowanych reguł: metryka -> lista reguł.
+    Przeładowywany po zmianie reguł (sygnały post_save/post_delete) oraz
+    okresowo, aby zmiany z innych procesów także były widoczne.
+    """
+
+    def __init__(self, ttl_seconds=None):
+        self._lock = threading.Lock()
+        self._index = None
+        self._loaded_at = 0.0
+        self._ttl = ttl_seconds
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'ALARMS_RULE_CACHE_TTL', 30)
+
+    def invalidate(self):
+        """Oznacz indeks jako nieaktualny - zostanie przeładowany przy następnym użyciu"""
+        self._index = None
+
+    def reload(self):
+        index = {}
+        for rule in AlertRule.objects.all().order_by('id'):
+            index.setdefault(rule.target_metric, []).append(compile_rule(rule))
+        self._index = index
+        self._loaded_at = time.monotonic()
+        logger.debug(f"Przeładowano indeks reguł: {sum(len(r) for r in index.values())} reguł")
+        return index
+
+    def _get_index(self):
+        index = self._index
+        if index is None or time.monotonic() - self._loaded_at > self.ttl:
+            with self._lock:
+                index = self._index
+                if index is None or time.monotonic() - self._loaded_at > self.ttl:
+                    index = self.reload()
+        return index
+
+    def rules_for(self, metric_name):
+        return self._get_index().get(metric_name, [])
+
+    def evaluate(self, metric_name, values):
+        """
+        Sprawdź wektor wartości jednej metryki względem wszystkich jej reguł.
+        Zwraca listę (reguła, maska) dla reguł złamanych przez co najmniej jedną wartość
+        oraz dla wszystkich reguł z duration_seconds - ich stan zależy także od wartości w normie.
+        """
+        rules = self.rules_for(metric_name)
+        if not rules:
+            return []
+
+        values = np.asarray(values, dtype=float)
+        results = []
+        for compiled in rules:
+            mask = compiled.evaluate(values)
+            if compiled.duration > 0 or mask.any():
+                results.append((compiled.rule, mask))
+        return results
+
+
+# Instancja współdzielona przez cały proces
+rule_engine = RuleEngine()
@@ -0,0 +1,202 @@
+import atexit
+import threading
+import time
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import AlertRule, RuleBreachState
+
+logger = logging.getLogger(__name__)
+
+# stan nieodświeżany dłużej niż tyle sekund (czasu pomiarów) jest usuwany przy checkpoincie
+STALE_STATE_SECONDS = 24 * 3600
+
+
+def to_epoch(timestamp):
+    """Zamień timestamp pomiaru (datetime / ISO8601 / None) na sekundy epoki"""
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=dt_timezone.utc)
+    return timestamp.timestamp()
+
+
+def sensor_key_from_details(details):
+    """Klucz źródła pomiaru: sensor_id, a gdy go brak - pokój"""
+    if not isinstance(details, dict):
+        return ''
+    key = details.get('sensor_id')
+    if key is None:
+        key = details.get('room')
+    return '' if key is None else str(key)
+
+
+class BreachState:
+    """Stan naruszenia reguły dla jednego czujnika (czasy w sekundach epoki)"""
+
+    __slots__ = ('breach_start', 'last_seen', 'fired')
+
+    def __init__(self, breach_start, last_seen=None, fired=False):
+        self.breach_start = breach_start
+        self.last_seen = breach_start if last_seen is None else last_seen
+        self.fired = fired
+
+
+class BreachTracker:
+    """
+    Strumieniowa ocena reguł z duration_seconds > 0.
+
+    Dla każdej pary (reguła, czujnik) pamięta tylko początek bieżącego naruszenia.
+    Alarm zgłaszany jest raz, gdy warunek utrzymuje się co najmniej duration_seconds;
+    pierwsza wartość spełniająca normę kasuje stan. Pamięć rośnie więc tylko z liczbą
+    aktualnie naruszanych par. Stan jest okresowo zapisywany do RuleBreachState,
+    żeby restart procesu go nie gubił. Checkpoint zapisuje tylko pary zmienione
+    i usunięte przez ten proces - każdy proces oceniający reguły (gunicorn,
+    akwizycja, procesy grupy konsumentów) ma własny tracker i nie nadpisuje cudzych par.
+    """
+
+    def __init__(self, checkpoint_interval=None):
+        self._lock = threading.Lock()
+        self._states = {}
+        # pary zmienione / usunięte od ostatniego checkpointu
+        self._changed = set()
+        self._removed = set()
+        self._restored = False
+        self._dirty = False
+        self._newest_seen = 0.0
+        self._last_checkpoint = time.monotonic()
+        self._checkpoint_interval = checkpoint_interval
+
+    @property
+    def checkpoint_interval(self):
+        if self._checkpoint_interval is not None:
+            return self._checkpoint_interval
+        return getattr(settings, 'ALARMS_STATE_CHECKPOINT_SECONDS', 30)
+
+    def __len__(self):
+        return len(self._states)
+
+    def reset(self):
+        with self._lock:
+            self._states = {}
+            self._changed = set()
+            self._removed = set()
+            self._restored = False
+            self._dirty = False
+
+    def observe(self, rule_id, sensor_key, timestamp, breached, duration_seconds):
+        """
+        Uwzględnij jedną próbkę. Zwraca True, gdy należy utworzyć alarm.
+        Próbki starsze niż ostatnio widziana dla danej pary są pomijane.
+        """
+        ts = to_epoch(timestamp)
+        key = (rule_id, sensor_key)
+
+        with self._lock:
+            self._ensure_restored()
+            state = self._states.get(key)
+            if state is not None and ts < state.last_seen:
+                return False
+            self._newest_seen = max(self._newest_seen, ts)
+
+            if not breached:
+                if state is not None:
+                    del self._states[key]
+                    self._changed.discard(key)
+                    self._removed.add(key)
+                    self._dirty = True
+                return False
+
+            if state is None:
+                state = BreachState(ts)
+                self._states[key] = state
+            state.last_seen = ts
+            self._changed.add(key)
+            self._removed.discard(key)
+            self._dirty = True
+
+            if not state.fired and ts - state.breach_start >= duration_seconds:
+                state.fired = True
+                return True
+            return False
+
+    # -------------------
+    # Checkpoint
+    # -------------------
+    def _ensure_restored(self):
+        if self._restored:
+            return
+        self._restored = True
+        try:
+            for row in RuleBreachState.objects.all():
+                self._states[(row.alert_rule_id, row.sensor_key)] = BreachState(
+                    row.breach_start.timestamp(), row.last_seen.timestamp(), row.fired
+                )
+        except Exception as e:
+            logger.error(f"Błąd odtwarzania stanu reguł: {e}")
+
+    def maybe_checkpoint(self):
+        if self._dirty and time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Zapisz pary zmienione od ostatniego checkpointu i usuń z bazy pary wygasłe w tym procesie"""
+        with self._lock:
+            stale_before = self._newest_seen - STALE_STATE_SECONDS
+            for key in [k for k, s in self._states.items() if s.last_seen < stale_before]:
+                del self._states[key]
+                self._changed.discard(key)
+                self._removed.add(key)
+            snapshot = [(key, BreachState(s.breach_start, s.last_seen, s.fired))
+                        for key, s in self._states.items() if key in self._changed]
+            removed = self._removed
+            self._changed = set()
+            self._removed = set()
+            self._dirty = False
+            self._last_checkpoint = time.monotonic()
+
+        try:
+            existing_rules = set(AlertRule.objects.values_list('id', flat=True))
+            rows = [
+                RuleBreachState(
+                    alert_rule_id=rule_id,
+                    sensor_key=sensor_key,
+                    breach_start=datetime.fromtimestamp(state.breach_start, tz=dt_timezone.utc),
+                    last_seen=datetime.fromtimestamp(state.last_seen, tz=dt_timezone.utc),
+                    fired=state.fired,
+                )
+                for (rule_id, sensor_key), state in snapshot
+                if rule_id in existing_rules
+            ]
+            with transaction.atomic():
+                if rows:
+                    RuleBreachState.objects.bulk_create(
+                        rows, update_conflicts=True, unique_fields=['alert_rule', 'sensor_key'],
+                        update_fields=['breach_start', 'last_seen', 'fired'],
+                    )
+                for rule_id, sensor_key in removed:
+                    RuleBreachState.objects.filter(alert_rule_id=rule_id, sensor_key=sensor_key).delete()
+        except Exception as e:
+            # niezapisane zmiany wracają do następnego checkpointu
+            with self._lock:
+                self._changed.update(key for key, _ in snapshot if key in self._states)
+                self._removed.update(key for key in removed if key not in self._states)
+                self._dirty = True
+            logger.error(f"Błąd zapisu stanu reguł: {e}")
+
+    def shutdown(self):
+        """Checkpoint przy zamykaniu procesu - zmiany od ostatniego zapisu nie giną"""
+        if self._dirty:
+            self.checkpoint()
+
+
+# Instancja współdzielona przez cały proces
+breach_tracker = BreachTracker()
+atexit.register(breach_tracker.shutdown)
@@ -67,7 +67,11 @@ class AlertSerializer(serializers.ModelSerializer):
             'priority',
             'priority_display',
             'acknowledged_by',
-            'closed_by'
+            'closed_by',
+            'sensor_key',
+            'hit_count',
+            'last_seen_at',
+            'last_value'
         ]
         read_only_fields = [
             'id',
@@ -75,5 +79,9 @@ class AlertSerializer(serializers.ModelSerializer):
             'timestamp_acknowledged',
             'timestamp_closed',
             'acknowledged_by',
-            'closed_by'
+            'closed_by',
+            'sensor_key',
+            'hit_count',
+            'last_seen_at',
+            'last_value'
         ]
@@ -1,6 +1,7 @@
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
 import logging
+import numpy as np
 import requests
 
 from .models import (
@@ -14,6 +15,9 @@ from .models import (
     ChannelType,
     ChannelTypes
 )
+from .rule_engine import rule_engine
+from .rule_state import breach_tracker, sensor_key_from_details
+from .suppression import open_alert_index, record_hits
 from core.models import User, Role
 
 logger = logging.getLogger(__name__)
@@ -115,17 +119,93 @@ class MonitoringService:
     @staticmethod
     def inspect_data(metric_name, value, timestamp, details=None):
         """Analizuj dane i sprawdź reguły"""
-        rules = AlertRule.objects.filter(target_metric=metric_name)
+        MonitoringService.inspect_batch([{
+            'metric_name': metric_name,
+            'value': value,
+            'timestamp': timestamp,
+            'details': details,
+        }])
 
-        for rule in rules:
-            if rule.check_condition(value):
+    @staticmethod
+    def inspect_batch(measurements):
+        """
+        Analizuj wsad pomiarów przy użyciu skompilowanego indeksu reguł.
+        Każdy element to słownik z kluczami: metric_name, value, timestamp, details.
+        Wartości jednej metryki sprawdzane są wektorowo jednym wywołaniem.
+        """
+        if not measurements:
+            return
+
+        positions_by_metric = {}
+        for position, m in enumerate(measurements):
+            positions_by_metric.setdefault(m['metric_name'], []).append(position)
+
+        breaches = []
+        for metric_name, positions in positions_by_metric.items():
+            values = np.fromiter((measurements[p]['value'] for p in positions), dtype=float, count=len(positions))
+            for rule, mask in rule_engine.evaluate(metric_name, values):
+                if rule.duration_seconds > 0:
+                    # alarm dopiero, gdy warunek utrzymuje się przez duration_seconds
+                    for position, breached in zip(positions, mask):
+                        m = measurements[position]
+                        if breach_tracker.observe(rule.id, sensor_key_from_details(m.get('details')),
+                                                  m['timestamp'], bool(breached), rule.duration_seconds):
+                            breaches.append((position, rule))
+                else:
+                    breaches.extend((positions[i], rule) for i in np.flatnonzero(mask))
+
+        # alarmy tworzone w kolejności napływu pomiarów
+        breaches.sort(key=lambda breach: breach[0])
+        MonitoringService._raise_or_suppress(measurements, breaches)
+
+        breach_tracker.maybe_checkpoint()
+
+    @staticmethod
+    def _raise_or_suppress(measurements, breaches):
+        """
+        Utwórz alarmy dla naruszeń. Dopóki dla pary (reguła, czujnik) istnieje otwarty
+        alarm (NEW/ACKNOWLEDGED), kolejne naruszenia tylko zwiększają jego hit_count.
+        """
+        hits = {}
+        last_breach = {}
+        pending = []
+        for position, rule in breaches:
+            m = measurements[position]
+            sensor_key = sensor_key_from_details(m.get('details'))
+            alert_id = open_alert_index.get(rule.id, sensor_key)
+            if alert_id is None:
                 alert = MonitoringService.create_alert(
                     rule=rule,
-                    metric_name=metric_name,
-                    value=value,
-                    timestamp=timestamp,
-                    details=details,
+                    metric_name=m['metric_name'],
+                    value=m['value'],
+                    timestamp=m['timestamp'],
+                    details=m.get('details'),
                 )
+                if alert is not None:
+                    open_alert_index.add(alert)
+                continue
+            key = (alert_id, rule.id, sensor_key)
+            count = hits[key][0] if key in hits else 0
+            hits[key] = (count + 1, m['timestamp'], m['value'])
+            last_breach[key] = (position, rule)
+
+        # alarm zamknięty w międzyczasie - ostatnie naruszenie otwiera nowy
+        for key in record_hits(hits):
+            open_alert_index.discard(key[0])
+            pending.append(last_breach[key])
+        pending.sort(key=lambda breach: breach[0])
+
+        for position, rule in pending:
+            m = measurements[position]
+            alert = MonitoringService.create_alert(
+                rule=rule,
+                metric_name=m['metric_name'],
+                value=m['value'],
+                timestamp=m['timestamp'],
+                details=m.get('details'),
+            )
+            if alert is not None:
+                open_alert_index.add(alert)
 
     # todo: czy timestamp dodac jako timestamp_generated?
     @staticmethod
@@ -147,6 +227,9 @@ class MonitoringService:
                 priority=rule.priority,
                 status=AlertStatus.NEW,
                 details=details,
+                sensor_key=sensor_key_from_details(details),
+                last_seen_at=timestamp,
+                last_value=value,
             )
             logger.info(f"Utworzono alarm {alert.id} dla reguły {rule.name}")
             return alert
@@ -161,18 +244,61 @@ class NotificationService:
     @staticmethod
     def send_alert_notification(alert):
         """Wyślij powiadomienie o alarmie"""
+        NotificationService.send_batch([alert])
+
+    @staticmethod
+    def send_batch(alerts):
+        """
+        Wyślij powiadomienia dla wsadu alarmów.
+        Jeden email na alarm (odbiorcy w BCC), wszystkie przez jedno połączenie SMTP;
+        wpisy NotificationLog zapisywane jednym bulk_create.
+        """
+        if not alerts:
+            return
+
         # Wyślij do emergency-mode tylko jeśli alert jest CRITICAL
-        if alert.priority == AlertPriority.CRITICAL:
-            NotificationService.send_to_emergency_mode(alert)
+        for alert in alerts:
+            if alert.priority == AlertPriority.CRITICAL:
+                NotificationService.send_to_emergency_mode(alert)
+
+        # użytkownicy pobierani raz dla całego wsadu, filtrowani per alarm według roli
+        users = list(User.objects.filter(is_active=True, role__isnull=False).select_related('role'))
+        channel, _ = ChannelType.objects.get_or_create(channel=ChannelTypes.EMAIL)
 
-        # Pobierz użytkowników, którzy powinni otrzymać powiadomienie
-        users = NotificationService.get_recipients(alert)
+        logs = []
+        try:
+            connection = get_connection(fail_silently=False)
+            connection.open()
+        except Exception as e:
+            connection = None
+            connection_error = str(e)
+            logger.error(f"Błąd połączenia z serwerem poczty: {connection_error}")
 
-        for user in users:
-            # Sprawdź czy użytkownik powinien otrzymać powiadomienie dla danego priorytetu
-            if NotificationService._should_notify_user(user, alert):
-                # todo: może wydajniej by było zbierać adresy email i potem wysłać jednego maila do wszystkich
-                NotificationService._send_email(user, alert)
+        try:
+            for alert in alerts:
+                recipients = [user for user in users
+                              if user.email and NotificationService._should_notify_user(user, alert)]
+                if not recipients:
+                    continue
+
+                if connection is None:
+                    status, error_msg = NotificationStatus.FAILED, connection_error
+                else:
+                    status, error_msg = NotificationService._send_email(connection, recipients, alert)
+
+                logs.extend(
+                    NotificationLog(alert=alert, recipient=user, channel=channel,
+                                    status=status, error_message=error_msg)
+                    for user in recipients
+                )
+        finally:
+            if connection is not None:
+                connection.close()
+
+        try:
+            NotificationLog.objects.bulk_create(logs)
+        except Exception as e:
+            logger.error(f"Błąd logowania powiadomień: {e}")
 
     @staticmethod
     def get_recipients(alert):
@@ -218,8 +344,8 @@ class NotificationService:
             logger.error(f"Błąd logowania powiadomienia: {e}")
 
     @staticmethod
-    def _send_email(user, alert):
-        """Wyślij powiadomienie email"""
+    def _send_email(connection, users, alert):
+        """Wyślij jeden email o alarmie do wszystkich odbiorców. Zwraca (status, błąd)."""
         try:
             subject = f"[{alert.priority}] Nowy alarm w systemie"
             message = f"""
@@ -233,24 +359,21 @@ class NotificationService:
             Zaloguj się do systemu aby zobaczyć szczegóły.
             """
 
-            send_mail(
+            email = EmailMessage(
                 subject,
                 message,
                 settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                fail_silently=False,
+                bcc=[user.email for user in users],
+                connection=connection,
             )
+            connection.send_messages([email])
 
-            NotificationService.log_notification(
-                user, alert, ChannelTypes.EMAIL, NotificationStatus.SENT
-            )
-            logger.info(f"Wysłano email do {user.email}")
+            logger.info(f"Wysłano email o alarmie {alert.id} do {len(users)} odbiorców")
+            return NotificationStatus.SENT, ''
         except Exception as e:
             error_msg = str(e)
-            NotificationService.log_notification(
-                user, alert, ChannelTypes.EMAIL, NotificationStatus.FAILED, error_msg
-            )
             logger.error(f"Błąd wysyłania emaila: {error_msg}")
+            return NotificationStatus.FAILED, error_msg
 
     @staticmethod
     def _should_notify_user(user, alert):
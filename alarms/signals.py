@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
+from django.conf import settings
 from django.dispatch import receiver
-from .models import Alert, AlertStatus, AlertPriority
+from .models import Alert, AlertRule, AlertStatus, AlertPriority
 from .services import NotificationService
+from .notifications import notification_dispatcher
+from .rule_engine import rule_engine
+from .suppression import open_alert_index
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,4 +19,27 @@ def alert_created_signal(sender, instance, created, **kwargs):
     if created and instance.status == AlertStatus.NEW:
         logger.info(f"Alert {instance.id} was created, sending notifications")
 
-        NotificationService.send_alert_notification(instance)
+        if getattr(settings, 'ALARMS_NOTIFICATIONS_ASYNC', True):
+            notification_dispatcher.enqueue_on_commit(instance.id)
+        else:
+            NotificationService.send_alert_notification(instance)
+
+
+@receiver(post_save, sender=Alert)
+def alert_closed_signal(sender, instance, created, **kwargs):
+    """Signal that ends suppression of repeated breaches once an alert is closed"""
+    if instance.status == AlertStatus.CLOSED:
+        open_alert_index.discard(instance.id)
+
+
+@receiver(post_delete, sender=Alert)
+def alert_deleted_signal(sender, instance, **kwargs):
+    """Signal that drops a deleted alert from the open alert index"""
+    open_alert_index.discard(instance.id)
+
+
+@receiver(post_save, sender=AlertRule)
+@receiver(post_delete, sender=AlertRule)
+def alert_rule_changed_signal(sender, instance, **kwargs):
+    """Signal that reloads the compiled rule index when a rule changes"""
+    rule_engine.invalidate()
@@ -0,0 +1,100 @@
+import threading
+import time
+import logging
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import Alert, AlertStatus
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = (AlertStatus.NEW, AlertStatus.ACKNOWLEDGED)
+
+
+class OpenAlertIndex:
+    """
+    Indeks otwartych alarmów w pamięci: (reguła, czujnik) -> id alarmu.
+
+    Pozwala sprawdzić bez zapytania do bazy, czy dla naruszenia istnieje już
+    otwarty (NEW/ACKNOWLEDGED) alarm. Wczytywany leniwie i okresowo odświeżany,
+    bo alarmy mogą być zamykane i tworzone także w innych procesach.
+    """
+
+    def __init__(self, ttl_seconds=None):
+        self._lock = threading.Lock()
+        self._open = None
+        self._by_alert = {}
+        self._loaded_at = 0.0
+        self._ttl = ttl_seconds
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'ALARMS_OPEN_ALERTS_TTL', 60)
+
+    def invalidate(self):
+        with self._lock:
+            self._open = None
+            self._by_alert = {}
+
+    def _ensure_loaded(self):
+        if self._open is not None and time.monotonic() - self._loaded_at <= self.ttl:
+            return
+        rows = Alert.objects.filter(
+            status__in=OPEN_STATUSES, alert_rule__isnull=False
+        ).order_by('timestamp_generated').values_list('id', 'alert_rule_id', 'sensor_key')
+        open_alerts = {}
+        for alert_id, rule_id, sensor_key in rows:
+            open_alerts[(rule_id, sensor_key)] = alert_id
+        self._open = open_alerts
+        self._by_alert = {alert_id: key for key, alert_id in open_alerts.items()}
+        self._loaded_at = time.monotonic()
+
+    def get(self, rule_id, sensor_key):
+        with self._lock:
+            self._ensure_loaded()
+            return self._open.get((rule_id, sensor_key))
+
+    def add(self, alert):
+        if alert.alert_rule_id is None:
+            return
+        key = (alert.alert_rule_id, alert.sensor_key)
+        with self._lock:
+            self._ensure_loaded()
+            self._open[key] = alert.id
+            self._by_alert[alert.id] = key
+
+    def discard(self, alert_id):
+        with self._lock:
+            if self._open is None:
+                return
+            key = self._by_alert.pop(alert_id, None)
+            if key is not None and self._open.get(key) == alert_id:
+                del self._open[key]
+
+
+def record_hits(hits):
+    """
+    Zapisz powtórzone naruszenia w otwartych alarmach - jedno UPDATE na alarm.
+    hits: {(id alarmu, reguła, czujnik): (liczba naruszeń, timestamp ostatniego, ostatnia wartość)}
+    Zwraca klucze alarmów, które w międzyczasie zostały zamknięte lub usunięte.
+    """
+    closed = []
+    for key, (count, timestamp, value) in hits.items():
+        alert_id, rule_id, sensor_key = key
+        updated = Alert.objects.filter(
+            pk=alert_id, alert_rule_id=rule_id, sensor_key=sensor_key, status__in=OPEN_STATUSES
+        ).update(
+            hit_count=F('hit_count') + count,
+            last_seen_at=timestamp,
+            last_value=value,
+        )
+        if not updated:
+            closed.append(key)
+    return closed
+
+
+# Instancja współdzielona przez cały proces
+open_alert_index = OpenAlertIndex()
@@ -1,9 +1,21 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+
+import numpy as np
+
+from django.core import mail
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from unittest.mock import patch, MagicMock
-from .models import AlertRule, Alert, RuleOperator, AlertPriority, AlertStatus
-from core.models import User
+from .models import (AlertRule, Alert, RuleOperator, AlertPriority, AlertStatus, RuleBreachState,
+                     NotificationLog, NotificationStatus)
+from core.models import User, Role
 from .services import MonitoringService, NotificationService, AlertManager
+from .rule_engine import RuleEngine, compile_rule, rule_engine
+from .rule_state import BreachTracker, breach_tracker
+from .suppression import open_alert_index
+from .notifications import NotificationDispatcher
 
 User = get_user_model()
 
@@ -74,4 +86,280 @@ class AlarmSystemTest(TestCase):
         
         alert.refresh_from_db()
         self.assertEqual(alert.status, AlertStatus.ACKNOWLEDGED)
-        self.assertEqual(alert.alert_comment.text, "Widzę to")
\ No newline at end of file
+        self.assertEqual(alert.alert_comment.text, "Widzę to")
+
+class DataInspectionBatchTest(TestCase):
+
+    def setUp(self):
+        self.rule = AlertRule.objects.create(
+            name="Humidity High",
+            target_metric="humidity",
+            operator=RuleOperator.GREATER_THAN,
+            threshold_max=80.0,
+            priority=AlertPriority.LOW
+        )
+
+    def test_inspect_batch_creates_alerts_for_breaching_values(self):
+        timestamp = timezone.now()
+        MonitoringService.inspect_batch([
+            {"metric_name": "humidity", "value": 85.0, "timestamp": timestamp, "details": {"sensor_id": 1}},
+            {"metric_name": "humidity", "value": 40.0, "timestamp": timestamp},
+            {"metric_name": "temperature", "value": 99.0, "timestamp": timestamp},
+        ])
+
+        self.assertEqual(Alert.objects.count(), 1)
+        alert = Alert.objects.first()
+        self.assertEqual(alert.triggering_value, 85.0)
+        self.assertEqual(alert.details, {"sensor_id": 1})
+
+    def test_check_rules_batch_endpoint(self):
+        payload = {
+            "measurements": [
+                {"metric_name": "humidity", "value": 90, "timestamp": "2024-01-01T12:00:00+00:00"},
+                {"metric_name": "humidity", "value": "abc"},
+                {"value": 1},
+            ]
+        }
+        response = self.client.post(
+            '/api/data-inspection/check_rules_batch/',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["processed"], 1)
+        self.assertEqual([e["index"] for e in response.json()["errors"]], [1, 2])
+        self.assertEqual(Alert.objects.count(), 1)
+
+    def test_check_rules_batch_requires_list(self):
+        response = self.client.post(
+            '/api/data-inspection/check_rules_batch/',
+            data=json.dumps({"measurements": "nope"}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class RuleEngineTest(TestCase):
+
+    def setUp(self):
+        self.high = AlertRule.objects.create(
+            name="Temp High", target_metric="temperature",
+            operator=RuleOperator.GREATER_THAN, threshold_max=30.0, priority=AlertPriority.LOW
+        )
+        self.low = AlertRule.objects.create(
+            name="Temp Low", target_metric="temperature",
+            operator=RuleOperator.LESS_THAN, threshold_min=5.0, priority=AlertPriority.LOW
+        )
+        self.engine = RuleEngine(ttl_seconds=3600)
+
+    def test_compiled_rules_match_check_condition(self):
+        values = [-10.0, 0.0, 5.0, 29.9, 30.0, 30.1]
+        for rule in (self.high, self.low):
+            mask = compile_rule(rule).evaluate(np.array(values))
+            self.assertEqual(list(mask), [rule.check_condition(v) for v in values])
+
+    def test_evaluate_vector_returns_only_breached_rules(self):
+        results = self.engine.evaluate("temperature", [20.0, 35.0, 40.0])
+        self.assertEqual(len(results), 1)
+        rule, mask = results[0]
+        self.assertEqual(rule.id, self.high.id)
+        self.assertEqual(list(mask), [False, True, True])
+
+        self.assertEqual(self.engine.evaluate("humidity", [100.0]), [])
+
+    def test_index_is_cached_and_reloaded_after_rule_change(self):
+        self.engine.evaluate("temperature", [1.0])
+        with self.assertNumQueries(0):
+            self.engine.evaluate("temperature", [1.0])
+
+        # wspólny indeks unieważniany jest sygnałami post_save/post_delete
+        rule_engine.evaluate("temperature", [1.0])
+        self.high.delete()
+        self.assertEqual([c.rule.id for c in rule_engine.rules_for("temperature")], [self.low.id])
+
+        self.low.threshold_min = 2.0
+        self.low.save()
+        self.assertEqual(rule_engine.rules_for("temperature")[0].threshold, 2.0)
+
+
+class DurationRuleTest(TestCase):
+
+    def setUp(self):
+        breach_tracker.reset()
+        self.addCleanup(breach_tracker.reset)
+        open_alert_index.invalidate()
+        self.rule = AlertRule.objects.create(
+            name="Sustained heat", target_metric="temperature",
+            operator=RuleOperator.GREATER_THAN, threshold_max=30.0,
+            duration_seconds=60, priority=AlertPriority.LOW
+        )
+        self.start = timezone.now()
+
+    def _inspect(self, offset_seconds, value, sensor_id=1):
+        MonitoringService.inspect_data(
+            "temperature", value, self.start + timedelta(seconds=offset_seconds), {"sensor_id": sensor_id})
+
+    def test_alert_fires_once_after_condition_held_for_duration(self):
+        self._inspect(0, 35.0)
+        self._inspect(30, 36.0)
+        self.assertEqual(Alert.objects.count(), 0)
+
+        self._inspect(60, 37.0)
+        self._inspect(90, 38.0)
+        self.assertEqual(Alert.objects.count(), 1)
+        self.assertEqual(Alert.objects.get().triggering_value, 37.0)
+
+    def test_single_spike_and_flapping_do_not_fire(self):
+        for offset in range(0, 640, 40):
+            self._inspect(offset, 35.0 if (offset // 40) % 2 == 0 else 20.0)
+        self.assertEqual(Alert.objects.count(), 0)
+        # po powrocie do normy stan nie jest przechowywany
+        self.assertEqual(len(breach_tracker), 0)
+
+    def test_sensors_are_tracked_separately(self):
+        self._inspect(0, 35.0, sensor_id=1)
+        self._inspect(60, 35.0, sensor_id=2)
+        self.assertEqual(Alert.objects.count(), 0)
+        self._inspect(60, 35.0, sensor_id=1)
+        self.assertEqual(Alert.objects.count(), 1)
+
+    def test_state_survives_restart_through_checkpoint(self):
+        self._inspect(0, 35.0)
+        breach_tracker.checkpoint()
+        self.assertEqual(RuleBreachState.objects.count(), 1)
+
+        restarted = BreachTracker()
+        self.assertFalse(restarted.observe(self.rule.id, "1", self.start + timedelta(seconds=30), True, 60))
+        self.assertTrue(restarted.observe(self.rule.id, "1", self.start + timedelta(seconds=61), True, 60))
+
+    def test_checkpoint_keeps_state_of_other_processes(self):
+        first, second = BreachTracker(), BreachTracker()
+        first.observe(self.rule.id, "1", self.start, True, 60)
+        first.checkpoint()
+        # drugi proces nie zna pary "1" - jego checkpoint jej nie kasuje
+        second.observe(self.rule.id, "2", self.start, True, 60)
+        second.observe(self.rule.id, "3", self.start, True, 60)
+        second.checkpoint()
+        self.assertEqual(set(RuleBreachState.objects.values_list('sensor_key', flat=True)), {"1", "2", "3"})
+
+        second.observe(self.rule.id, "3", self.start + timedelta(seconds=10), False, 60)
+        second.observe(self.rule.id, "2", self.start + timedelta(seconds=10), True, 60)
+        second.checkpoint()
+
+        self.assertEqual(set(RuleBreachState.objects.values_list('sensor_key', flat=True)), {"1", "2"})
+        self.assertEqual(RuleBreachState.objects.get(sensor_key="2").last_seen, self.start + timedelta(seconds=10))
+
+
+class AlertSuppressionTest(TestCase):
+
+    def setUp(self):
+        open_alert_index.invalidate()
+        self.rule = AlertRule.objects.create(
+            name="Overheat", target_metric="temperature",
+            operator=RuleOperator.GREATER_THAN, threshold_max=30.0,
+            priority=AlertPriority.HIGH
+        )
+        self.start = timezone.now()
+
+    def _batch(self, values, sensor_id=1):
+        MonitoringService.inspect_batch([
+            {"metric_name": "temperature", "value": value,
+             "timestamp": self.start + timedelta(seconds=i), "details": {"sensor_id": sensor_id}}
+            for i, value in enumerate(values)
+        ])
+
+    def test_repeated_breaches_update_single_open_alert(self):
+        self._batch([35.0, 20.0, 36.0, 37.0])
+        self._batch([38.0])
+
+        alert = Alert.objects.get()
+        self.assertEqual(alert.hit_count, 4)
+        self.assertEqual(alert.triggering_value, 35.0)
+        self.assertEqual(alert.last_value, 38.0)
+        self.assertEqual(alert.sensor_key, "1")
+
+    def test_acknowledged_alert_still_suppresses(self):
+        self._batch([35.0])
+        Alert.objects.update(status=AlertStatus.ACKNOWLEDGED)
+        self._batch([36.0])
+        self.assertEqual(Alert.objects.count(), 1)
+        self.assertEqual(Alert.objects.get().hit_count, 2)
+
+    def test_closing_alert_ends_suppression(self):
+        self._batch([35.0])
+        alert = Alert.objects.get()
+        alert.status = AlertStatus.CLOSED
+        alert.save()
+
+        self._batch([36.0])
+        self.assertEqual(Alert.objects.count(), 2)
+        self.assertEqual(Alert.objects.filter(status=AlertStatus.NEW).get().triggering_value, 36.0)
+
+    def test_alert_closed_elsewhere_is_detected(self):
+        self._batch([35.0])
+        # zamknięcie bez sygnału (np. w innym procesie) - indeks nadal wskazuje alarm
+        Alert.objects.update(status=AlertStatus.CLOSED)
+
+        self._batch([36.0, 37.0])
+        self.assertEqual(Alert.objects.count(), 2)
+        self.assertEqual(Alert.objects.filter(status=AlertStatus.NEW).get().triggering_value, 37.0)
+
+    def test_sensors_get_separate_alerts(self):
+        self._batch([35.0], sensor_id=1)
+        self._batch([35.0], sensor_id=2)
+        self._batch([36.0], sensor_id=1)
+        self.assertEqual(Alert.objects.count(), 2)
+        self.assertEqual(Alert.objects.get(sensor_key="1").hit_count, 2)
+
+
+class NotificationDispatchTest(TestCase):
+
+    def setUp(self):
+        admin_role, _ = Role.objects.get_or_create(name=Role.ADMIN)
+        maintenance_role, _ = Role.objects.get_or_create(name=Role.MAINTENANCE)
+        worker_role, _ = Role.objects.get_or_create(name=Role.WORKER)
+        User.objects.create(username='admin', email='admin@example.com', role=admin_role)
+        User.objects.create(username='engineer', email='engineer@example.com', role=maintenance_role)
+        User.objects.create(username='worker', email='worker@example.com', role=worker_role)
+        self.rule = AlertRule.objects.create(
+            name="Overheat", target_metric="temperature",
+            operator=RuleOperator.GREATER_THAN, threshold_max=30.0,
+            priority=AlertPriority.HIGH
+        )
+
+    def _alert(self, value=35.0):
+        return Alert.objects.create(alert_rule=self.rule, triggering_value=value, priority=AlertPriority.HIGH)
+
+    def test_one_message_per_alert_with_all_recipients(self):
+        alert = self._alert()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertCountEqual(mail.outbox[0].recipients(), ['admin@example.com', 'engineer@example.com'])
+        self.assertEqual(NotificationLog.objects.filter(alert=alert, status=NotificationStatus.SENT).count(), 2)
+
+    def test_batch_reuses_single_connection(self):
+        with override_settings(ALARMS_NOTIFICATIONS_ASYNC=True), \
+                patch('alarms.signals.notification_dispatcher.enqueue') as enqueue:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                alerts = [self._alert(30.0 + i) for i in range(1, 4)]
+                # do kolejki trafia dopiero po zatwierdzeniu transakcji
+                enqueue.assert_not_called()
+        # alarm nie czeka na wysyłkę
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(len(callbacks), 3)
+        self.assertEqual([c.args[0] for c in enqueue.call_args_list], [a.id for a in alerts])
+
+        with patch('alarms.services.get_connection', wraps=mail.get_connection) as get_connection:
+            NotificationDispatcher.dispatch([a.id for a in alerts])
+        get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(NotificationLog.objects.count(), 6)
+
+    def test_smtp_failure_is_logged_per_recipient(self):
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError("smtp down")):
+            alert = self._alert()
+        logs = NotificationLog.objects.filter(alert=alert)
+        self.assertEqual(logs.count(), 2)
+        self.assertTrue(all(log.status == NotificationStatus.FAILED for log in logs))
+        self.assertEqual(logs.first().error_message, "smtp down")
@@ -218,6 +218,46 @@ class DataInspectionViewSet(viewsets.ViewSet):
     """ViewSet do inspectowania danych i sprawdzania reguł"""
     permission_classes = [AllowAny]
 
+    @staticmethod
+    def _parse_measurement(data):
+        """
+        Waliduje pojedynczy pomiar.
+        Zwraca (pomiar, None) lub (None, komunikat błędu).
+        """
+        metric_name = data.get('metric_name')
+        value = data.get('value')
+        timestamp_raw = data.get('timestamp')
+        details = data.get('details') or {}
+
+        # Walidacja wymaganych pól
+        if not metric_name or value is None:
+            return None, 'Wymagane pola: metric_name, value'
+
+        try:
+            numeric_value = float(value)
+        except (TypeError, ValueError):
+            return None, 'Pole value musi być liczbą'
+
+        # parsowanie timestamp
+        if timestamp_raw:
+            try:
+                parsed_ts = datetime.fromisoformat(timestamp_raw)
+                if timezone.is_naive(parsed_ts):
+                    timestamp = timezone.make_aware(parsed_ts)
+                else:
+                    timestamp = parsed_ts
+            except Exception:
+                return None, 'Nieprawidłowy format timestamp, oczekiwany ISO8601'
+        else:
+            timestamp = timezone.now()
+
+        return {
+            'metric_name': metric_name,
+            'value': numeric_value,
+            'timestamp': timestamp,
+            'details': details,
+        }, None
+
     @action(detail=False, methods=['post'])
     def check_rules(self, request):
         """
@@ -235,53 +275,64 @@ class DataInspectionViewSet(viewsets.ViewSet):
         }
         """
         try:
-            metric_name = request.data.get('metric_name')
-            value = request.data.get('value')
-            timestamp_raw = request.data.get('timestamp')
-            details = request.data.get('details') or {}
+            measurement, error = self._parse_measurement(request.data)
+            if error:
+                return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Walidacja wymaganych pól
-            if not metric_name or value is None:
-                return Response(
-                    {'error': 'Wymagane pola: metric_name, value'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            # Uruchom analizę danych
+            MonitoringService.inspect_data(
+                measurement['metric_name'], measurement['value'],
+                measurement['timestamp'], measurement['details'])
 
-            try:
-                numeric_value = float(value)
-            except (TypeError, ValueError):
+            return Response({
+                'status': 'success',
+                'message': 'Dane zostały przeanalizowane',
+                **measurement
+            })
+
+        except Exception as e:
+            return Response(
+                {'error': f'Błąd podczas analizy danych: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['post'])
+    def check_rules_batch(self, request):
+        """
+        POST endpoint do analizy wielu pomiarów w jednym żądaniu.
+        Oczekuje payloadu:
+        {
+            "measurements": [ {pomiar jak w check_rules}, ... ]
+        }
+        Niepoprawne pomiary są pomijane i zwracane w polu "errors".
+        """
+        try:
+            items = request.data.get('measurements') if isinstance(request.data, dict) else request.data
+            if not isinstance(items, list):
                 return Response(
-                    {'error': 'Pole value musi być liczbą'},
+                    {'error': 'Wymagane pole: measurements (lista pomiarów)'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # parsowanie timestamp
-            if timestamp_raw:
-                try:
-                    parsed_ts = datetime.fromisoformat(timestamp_raw)
-                    if timezone.is_naive(parsed_ts):
-                        timestamp = timezone.make_aware(parsed_ts)
-                    else:
-                        timestamp = parsed_ts
-                except Exception:
-                    return Response(
-                        {'error': 'Nieprawidłowy format timestamp, oczekiwany ISO8601'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-            else:
-                timestamp = timezone.now()
+            measurements = []
+            errors = []
+            for index, item in enumerate(items):
+                if not isinstance(item, dict):
+                    errors.append({'index': index, 'error': 'Pomiar musi być obiektem'})
+                    continue
+                measurement, error = self._parse_measurement(item)
+                if error:
+                    errors.append({'index': index, 'error': error})
+                else:
+                    measurements.append(measurement)
 
-            # Uruchom analizę danych
-            MonitoringService.inspect_data(
-                metric_name, numeric_value, timestamp, details)
+            MonitoringService.inspect_batch(measurements)
 
             return Response({
                 'status': 'success',
                 'message': 'Dane zostały przeanalizowane',
-                'metric_name': metric_name,
-                'value': numeric_value,
-                'timestamp': timestamp,
-                'details': details
+                'processed': len(measurements),
+                'errors': errors
             })
 
         except Exception as e:
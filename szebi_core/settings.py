@@ -168,3 +168,83 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_USE_SSL = config('EMAIL_USE_SSL', default=False, cast=bool)
 DEFAULT_FROM_EMAIL = config(
     'DEFAULT_FROM_EMAIL', default='webmaster@localhost')
+
+# Acquisition pipeline (potok przetwarzania wiadomości MQTT)
+ACQUISITION_PIPELINE_BATCH_SIZE = config('ACQUISITION_PIPELINE_BATCH_SIZE', default=64, cast=int)
+ACQUISITION_PIPELINE_QUEUE_SIZE = config('ACQUISITION_PIPELINE_QUEUE_SIZE', default=2000, cast=int)
+# liczba wątków na etap, np. "parse=2,resolve=2" - etapy od reorder do dispatch zawsze w jednym wątku (kolejność pomiarów)
+ACQUISITION_PIPELINE_WORKERS = config('ACQUISITION_PIPELINE_WORKERS', default='')
+# "inprocess" - reguły alarmów sprawdzane w procesie akwizycji, "http" - przez check_rules_batch
+ACQUISITION_ALARMS_DISPATCH = config('ACQUISITION_ALARMS_DISPATCH', default='inprocess')
+
+# Alarms - skompilowany indeks reguł przeładowywany co najmniej co tyle sekund
+ALARMS_RULE_CACHE_TTL = config('ALARMS_RULE_CACHE_TTL', default=30, cast=int)
+# co ile sekund zapisywać stan reguł z duration_seconds (odporność na restart)
+ALARMS_STATE_CHECKPOINT_SECONDS = config('ALARMS_STATE_CHECKPOINT_SECONDS', default=30, cast=int)
+# co ile sekund przeładować indeks otwartych alarmów (tłumienie powtórzonych naruszeń)
+ALARMS_OPEN_ALERTS_TTL = config('ALARMS_OPEN_ALERTS_TTL', default=60, cast=int)
+# powiadomienia o alarmach wysyłane w wątku w tle (False - synchronicznie w sygnale)
+ALARMS_NOTIFICATIONS_ASYNC = config('ALARMS_NOTIFICATIONS_ASYNC', default=True, cast=bool)
+ALARMS_NOTIFICATION_BATCH_SIZE = config('ALARMS_NOTIFICATION_BATCH_SIZE', default=50, cast=int)
+# partycje miesięczne (PostgreSQL) tworzone z wyprzedzeniem i retencja w miesiącach (0 - bez limitu)
+ACQUISITION_PARTITION_MONTHS_AHEAD = config('ACQUISITION_PARTITION_MONTHS_AHEAD', default=3, cast=int)
+ACQUISITION_MEASUREMENT_RETENTION_MONTHS = config('ACQUISITION_MEASUREMENT_RETENTION_MONTHS', default=0, cast=int)
+ACQUISITION_DATALOG_RETENTION_MONTHS = config('ACQUISITION_DATALOG_RETENTION_MONTHS', default=3, cast=int)
+# zapis pomiarów i logów: maksymalny wsad oraz czas, po którym niepełny wsad jest zapisywany
+ACQUISITION_WRITER_BATCH_SIZE = config('ACQUISITION_WRITER_BATCH_SIZE', default=500, cast=int)
+ACQUISITION_WRITER_FLUSH_SECONDS = config('ACQUISITION_WRITER_FLUSH_SECONDS', default=0.25, cast=float)
+# pojemność kolejek zapisu i polityka przepełnienia: "block", "drop_oldest" lub "spill" (na dysk)
+ACQUISITION_WRITER_QUEUE_SIZE = config('ACQUISITION_WRITER_QUEUE_SIZE', default=10000, cast=int)
+ACQUISITION_WRITER_OVERFLOW = config('ACQUISITION_WRITER_OVERFLOW', default='block')
+ACQUISITION_LOG_OVERFLOW = config('ACQUISITION_LOG_OVERFLOW', default='block')
+# pliki przepełnienia (spill) mają jednego właściciela: worker grupy w podkatalogu <nazwa workera>,
+# inny proces przy zajętym pliku przechodzi na politykę block
+ACQUISITION_WRITER_SPILL_DIR = config('ACQUISITION_WRITER_SPILL_DIR', default=str(BASE_DIR / 'var' / 'spill'))
+# trwały bufor pomiarów na dysku (segmenty odtwarzane po restarcie); fsync grupowo co ACQUISITION_SPOOL_FSYNC_SECONDS
+# w podkatalogu inbox - surowe wiadomości MQTT od chwili odbioru, potwierdzane po wyjściu z potoku
+ACQUISITION_SPOOL_ENABLED = config('ACQUISITION_SPOOL_ENABLED', default=True, cast=bool)
+ACQUISITION_SPOOL_DIR = config('ACQUISITION_SPOOL_DIR', default=str(BASE_DIR / 'var' / 'spool'))
+ACQUISITION_SPOOL_SEGMENT_MB = config('ACQUISITION_SPOOL_SEGMENT_MB', default=64, cast=int)
+ACQUISITION_SPOOL_FSYNC_SECONDS = config('ACQUISITION_SPOOL_FSYNC_SECONDS', default=0.05, cast=float)
+# deduplikacja: okno czasowe wstecz od najnowszego pomiaru czujnika i limity pamięci
+ACQUISITION_DEDUP_WINDOW_SECONDS = config('ACQUISITION_DEDUP_WINDOW_SECONDS', default=3600, cast=float)
+ACQUISITION_DEDUP_MAX_PER_SENSOR = config('ACQUISITION_DEDUP_MAX_PER_SENSOR', default=4096, cast=int)
+ACQUISITION_DEDUP_MAX_SENSORS = config('ACQUISITION_DEDUP_MAX_SENSORS', default=10000, cast=int)
+# grupa konsumentów MQTT: liczba procesów akwizycji (1 - wątek w procesie aplikacji)
+# i podział wiadomości: "hash" (crc32 klucza czujnika z topiku - czujnik zawsze w tym samym procesie)
+# lub "shared" ($share/<grupa>/..., MQTT v5) - broker rozrzuca wiadomości jednego czujnika między procesy,
+# więc stan per czujnik (deduplikacja, reorder, reguły z duration_seconds, otwarte alarmy) nie jest spójny
+ACQUISITION_GROUP_NAME = config('ACQUISITION_GROUP_NAME', default='szebi')
+ACQUISITION_GROUP_SIZE = config('ACQUISITION_GROUP_SIZE', default=1, cast=int)
+ACQUISITION_GROUP_MODE = config('ACQUISITION_GROUP_MODE', default='hash')
+ACQUISITION_WORKER_HEARTBEAT_SECONDS = config('ACQUISITION_WORKER_HEARTBEAT_SECONDS', default=5.0, cast=float)
+ACQUISITION_WORKER_STALE_SECONDS = config('ACQUISITION_WORKER_STALE_SECONDS', default=30, cast=int)
+# ile sekund panel może dostać te same statystyki czujników (0 - bez bufora)
+ACQUISITION_STATS_CACHE_SECONDS = config('ACQUISITION_STATS_CACHE_SECONDS', default=5, cast=float)
+
+# wiersze na stronę eksportu pomiarów (jedno zapytanie po kluczu (timestamp, id) na stronę)
+ACQUISITION_EXPORT_CHUNK_SIZE = config('ACQUISITION_EXPORT_CHUNK_SIZE', default=5000, cast=int)
+
+# archiwum Parquet historii pomiarów (manage.py export_parquet, wymaga pyarrow)
+ACQUISITION_PARQUET_DIR = config('ACQUISITION_PARQUET_DIR', default=str(BASE_DIR / 'var' / 'parquet'))
+ACQUISITION_PARQUET_COMPRESSION = config('ACQUISITION_PARQUET_COMPRESSION', default='zstd')
+
+# okno zbierania powtarzających się logów w jeden wiersz (0 - każdy log osobno)
+ACQUISITION_LOG_WINDOW_SECONDS = config('ACQUISITION_LOG_WINDOW_SECONDS', default=60.0, cast=float)
+# ile razy w oknie ten sam komunikat trafia na stdout
+ACQUISITION_LOG_ECHO_LIMIT = config('ACQUISITION_LOG_ECHO_LIMIT', default=1, cast=int)
+
+# dopuszczalne spóźnienie pomiaru (s): bufor porządkuje pomiary czujnika wg timestampu i wstrzymuje je
+# najwyżej tyle (czasu zdarzeń lub rzeczywistego); starsze niż już wydane idą ścieżką danych spóźnionych.
+# Domyślnie 0 - bez wstrzymywania (tylko wykrywanie spóźnionych), więc bez wpływu na cel <100 ms;
+# wartość > 0 dokłada do opóźnienia end-to-end do tylu sekund
+ACQUISITION_REORDER_LATENESS_SECONDS = config('ACQUISITION_REORDER_LATENESS_SECONDS', default=0.0, cast=float)
+ACQUISITION_REORDER_MAX_PER_SENSOR = config('ACQUISITION_REORDER_MAX_PER_SENSOR', default=1000, cast=int)
+
+# "threads" - potok z wątkiem na etap, "asyncio" - odbiór MQTT i wysyłka do alarmów w jednej pętli asyncio
+# (tryb http wymaga pakietu httpx); ile wsadów może czekać naraz na wysyłkę do alarmów
+ACQUISITION_RUNTIME = config('ACQUISITION_RUNTIME', default='threads')
+ACQUISITION_ASYNC_MAX_IN_FLIGHT = config('ACQUISITION_ASYNC_MAX_IN_FLIGHT', default=1000, cast=int)
+
+# co ile sekund zapisywać zbiorczo Sensor.last_communication
+ACQUISITION_HEARTBEAT_FLUSH_SECONDS = config('ACQUISITION_HEARTBEAT_FLUSH_SECONDS', default=5.0, cast=float)
@@ -20,3 +20,9 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
 }
+
+# Send alert notifications inline so tests can assert on outbox and mocks
+ALARMS_NOTIFICATIONS_ASYNC = False
+
+# Keep acquisition writes in memory - no spool files written by tests
+ACQUISITION_SPOOL_ENABLED = False